@@ -21,6 +21,8 @@ def create_app(config_name=None):
     
     from .config import config
     app.config.from_object(config.get(config_name, config['default']))
+    # Process-pool inference workers build their app from the same config
+    app.config['CONFIG_NAME'] = config_name if config_name in config else 'default'
     
     # Initialize database
     from .database.db import db
@@ -54,6 +56,16 @@ def create_app(config_name=None):
     app.register_blueprint(contact_bp)
     app.register_blueprint(ml_api_bp)
     
+    # Request latency/in-flight hooks and the /metrics endpoint (see METRICS_ENABLED)
+    from .utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Load and warm up the ML model before the first request (see ML_PRELOAD)
+    preload_mode = app.config.get('ML_PRELOAD', 'off')
+    if preload_mode in ('sync', 'background'):
+        from .services.ml_model_service import get_ml_model_service
+        get_ml_model_service().start_preload(app, mode=preload_mode, warm_up=app.config.get('ML_WARMUP', True))
+    
     # Register error handlers
     @app.errorhandler(404)
     def not_found_error(error):
@@ -21,6 +21,10 @@ class Config:
     # Analytics (if using)
     ANALYTICS_ENABLED = os.environ.get('ANALYTICS_ENABLED', 'False').lower() == 'true'
     
+    # Performance telemetry (Prometheus text format, see app/utils/metrics.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'  # Request/stage timings and the scrape endpoint
+    METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')
+    
     # Content Management Settings
     CONTENT_SOURCE = os.environ.get('CONTENT_SOURCE', 'json')  # 'json', 'cms', or 'cms_with_json_fallback'
     
@@ -37,6 +41,34 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{BASE_DIR / "instance" / "portfolio.db"}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # ML inference settings
+    ML_MAX_BATCH_SIZE = int(os.environ.get('ML_MAX_BATCH_SIZE', '256'))  # Max scenarios per /predict/batch request
+    ML_BATCHING_ENABLED = os.environ.get('ML_BATCHING_ENABLED', 'False').lower() == 'true'  # Coalesce concurrent /predict calls
+    ML_BATCH_MAX_SIZE = int(os.environ.get('ML_BATCH_MAX_SIZE', '16'))  # Flush when this many requests are queued
+    ML_BATCH_MAX_WAIT_MS = float(os.environ.get('ML_BATCH_MAX_WAIT_MS', '5'))  # ...or this long after the first one
+    ML_BATCH_MAX_QUEUE = int(os.environ.get('ML_BATCH_MAX_QUEUE', '1024'))  # Reject with 429 beyond this many pending
+    ML_CACHE_ENABLED = os.environ.get('ML_CACHE_ENABLED', 'True').lower() == 'true'  # LRU cache of predict results
+    ML_CACHE_MAX_BYTES = int(os.environ.get('ML_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # Evict LRU beyond this size
+    ML_CACHE_TTL_SECONDS = float(os.environ.get('ML_CACHE_TTL_SECONDS', '3600'))  # Entries expire after this long
+    ML_PRELOAD = os.environ.get('ML_PRELOAD', 'off').lower()  # 'off' (lazy), 'sync' or 'background' model load at startup
+    ML_WARMUP = os.environ.get('ML_WARMUP', 'True').lower() == 'true'  # Dummy forward pass after preloading
+    ML_MMAP_WEIGHTS = os.environ.get('ML_MMAP_WEIGHTS', 'True').lower() == 'true'  # Memory-map best.pt so workers share weight pages
+    ML_TORCHSCRIPT = os.environ.get('ML_TORCHSCRIPT', 'True').lower() == 'true'  # Prefer best.torchscript.pt when exported
+    ML_ONNX = os.environ.get('ML_ONNX', 'True').lower() == 'true'  # Serve best.onnx with ONNX Runtime (no torch model) when exported and onnxruntime is installed
+    ML_ONNX_THREADS = int(os.environ.get('ML_ONNX_THREADS', '0'))  # ONNX Runtime intra-op threads (0 = one per core)
+    ML_STREAM_CHUNK_POINTS = int(os.environ.get('ML_STREAM_CHUNK_POINTS', '1024'))  # Time points per NDJSON chunk when streaming
+    ML_ADAPTIVE_TOLERANCE = float(os.environ.get('ML_ADAPTIVE_TOLERANCE', '1e-3'))  # Default interpolation error for "adaptive" grids (fraction of range)
+    ML_MODEL_MEMORY_BUDGET_MB = float(os.environ.get('ML_MODEL_MEMORY_BUDGET_MB', '0'))  # Evict idle model versions beyond this (0 = unlimited)
+    ML_AB_WEIGHTS = os.environ.get('ML_AB_WEIGHTS', '')  # A/B split across model versions, e.g. 'default:90,candidate:10'
+    ML_EXECUTOR = os.environ.get('ML_EXECUTOR', 'inline').lower()  # Where predict runs: 'inline', 'thread' or 'process' pool
+    ML_EXECUTOR_WORKERS = int(os.environ.get('ML_EXECUTOR_WORKERS', '2'))  # Pool size for the thread/process executors
+    ML_EXECUTOR_MAX_QUEUE = int(os.environ.get('ML_EXECUTOR_MAX_QUEUE', '32'))  # Reject with 429 beyond this many pending
+    ML_EXECUTOR_TIMEOUT_SECONDS = float(os.environ.get('ML_EXECUTOR_TIMEOUT_SECONDS', '30'))  # 504 if inference takes longer
+    ML_LOOKUP_TABLE = os.environ.get('ML_LOOKUP_TABLE', 'False').lower() == 'true'  # Interpolate /predict from lookup/ (scripts/build_lookup_table.py) when it covers the request
+    ML_LOOKUP_MAX_ERROR = float(os.environ.get('ML_LOOKUP_MAX_ERROR', '0.01'))  # Only serve tables whose held-out error (fraction of range) is below this
+    ML_PRECISION = os.environ.get('ML_PRECISION', 'float32').lower()  # Inference precision: 'float32', 'bfloat16' (autocast) or 'int8' (dynamic quantization)
+    ML_PRECISION_MAX_ERROR = float(os.environ.get('ML_PRECISION_MAX_ERROR', '0.01'))  # Fall back to float32 if the reduced mode deviates more (fraction of range)
 
 
 class DevelopmentConfig(Config):
@@ -49,6 +81,9 @@ class ProductionConfig(Config):
     TESTING = False
     SECRET_KEY = os.environ.get('SECRET_KEY')  # Must be set in production
     CONTENT_SOURCE = os.environ.get('CONTENT_SOURCE', 'cms_with_json_fallback')
+    ML_BATCHING_ENABLED = os.environ.get('ML_BATCHING_ENABLED', 'True').lower() == 'true'
+    ML_PRELOAD = os.environ.get('ML_PRELOAD', 'background').lower()
+    ML_EXECUTOR = os.environ.get('ML_EXECUTOR', 'thread').lower()  # Batched forward passes off the event loop
 
 
 class TestingConfig(Config):
@@ -376,86 +376,18 @@ def solve_ocp_and_integrate(sample: Dict[str, float], cfg: Config, t: np.ndarray
         if not _validate_control_unit(sol.u_knots):
             return {}, {"success": False, "message": "control_not_unit"}
 
-    try:
-        integ = integrate_truth(
-            x0=sol.x0,
-            t=t,
-            control_cb=sol.control_cb,
-            phys=phys,
-            limits=limits,
-            env=env,
-            method="rk45",
-            rtol=1e-6,
-            atol=1e-8,
-            normalize_quat_every=1,
-        )
-    except NotImplementedError:
-        # Placeholder: Generate realistic vertical ascent trajectory when WP1 not implemented
-        N = t.shape[0]
-        state = np.zeros((N, 14), dtype=float)
-        control = np.zeros((N, 4), dtype=float)
-        
-        # Get parameters
-        m0 = sample.get("m0", 50.0)
-        Tmax = sample.get("Tmax", 4000.0)
-        Isp = sample.get("Isp", 250.0)
-        g0 = 9.81
-        
-        # Initialize state properly
-        state[0, 0:3] = [0.0, 0.0, 0.0]
-        state[0, 3:6] = [0.0, 0.0, 0.0]
-        state[0, 6:10] = [1.0, 0.0, 0.0, 0.0]  # Identity quaternion
-        state[0, 10:13] = [0.0, 0.0, 0.0]
-        state[0, 13] = m0
-        
-        # Initialize control at t=0
-        control[0, 0] = Tmax * 0.8
-        control[0, 1:4] = [1.0, 0.0, 0.0]
-        
-        # Simple vertical ascent
-        dt = t[1] - t[0] if N > 1 else 1.0
-        for i in range(1, N):
-            T = Tmax * 0.8
-            control[i, 0] = T
-            control[i, 1:4] = [1.0, 0.0, 0.0]
-            
-            m = state[i-1, 13]
-            if m > sample.get("mdry", 35.0):
-                m_dot = -T / (Isp * g0)
-                state[i, 13] = max(state[i-1, 13] + m_dot * dt, sample.get("mdry", 35.0))
-            else:
-                state[i, 13] = state[i-1, 13]
-            
-            a = (T / state[i, 13]) - g0
-            state[i, 5] = state[i-1, 5] + a * dt
-            state[i, 2] = state[i-1, 2] + state[i, 5] * dt
-            
-            q = state[i-1, 6:10].copy()
-            q_norm = np.linalg.norm(q)
-            if q_norm > 1e-9:
-                state[i, 6:10] = q / q_norm
-            else:
-                state[i, 6:10] = [1.0, 0.0, 0.0, 0.0]
-            
-            state[i, 0:2] = state[i-1, 0:2]
-            state[i, 3:5] = state[i-1, 3:5]
-            state[i, 10:13] = state[i-1, 10:13]
-        
-        # Compute monitors
-        rho0 = sample.get("rho0", 1.225)
-        H = sample.get("H", 8500.0)
-        rho = rho0 * np.exp(-np.maximum(state[:, 2], 0.0) / H)  # Clamp altitude to non-negative
-        v_mag = np.linalg.norm(state[:, 3:6], axis=1)
-        q_dyn = 0.5 * rho * v_mag**2
-        # Load factor: total acceleration / g0 (using actual thrust, not Tmax)
-        T_actual = control[:, 0:1]  # Actual thrust at each time
-        a_total = np.sqrt((T_actual / state[:, 13:14])**2 + g0**2)
-        n_load = a_total / g0
-        
-        monitors = {"rho": rho, "q_dyn": q_dyn, "n_load": n_load}
-        ocp_stats = {"KKT": 1e-8, "iterations": 0, "solve_time": 0.0, "success": True}
-        payload = {"time": t, "state": state, "control": control, "monitors": monitors, "ocp": {}}
-        return payload, ocp_stats
+    integ = integrate_truth(
+        x0=sol.x0,
+        t=t,
+        control_cb=sol.control_cb,
+        phys=phys,
+        limits=limits,
+        env=env,
+        method="rk45",
+        rtol=1e-6,
+        atol=1e-8,
+        normalize_quat_every=1,
+    )
 
     # Sanity: state order in integration result
     if not _validate_state_order(integ.x):
@@ -0,0 +1,227 @@
+"""
+On-the-fly training trajectories from the torch rollout engine.
+
+TrajectorySynthesizer LHS-samples parameter sets (SI, CONTEXT_FIELDS names)
+inside configured bounds, integrates them with RolloutEngine in the
+nondimensional convention of compute_dynamics, and returns a dataset with
+the RocketDataset item layout (t, context, state, case_id) plus each case's
+environment (env: environment_params entries). train_pinn uses it to draw
+fresh trajectories every epoch (train.synthetic in the config) instead of
+rereading a fixed HDF5 split, and evaluates the physics residuals of each
+case in the environment it was integrated in.
+
+Cases are vertical launches (body x up) at a constant throttle of Tmax
+along the body axis until the dry mass is reached; gimbal and fin
+deflection stay zero. Wind is constant (wind_mag, wind_dir_rad) or, when
+gust_amp is sampled or fixed, a gust along x (gust_amp, gust_freq), as in
+data/generator.build_phys_limits_env.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from src.physics.dynamics_pytorch import environment_params
+from src.physics.rollout import RolloutEngine, RolloutResult
+
+from .preprocess import CONTEXT_FIELDS, Scales, build_context_vector
+from .sampler import lhs_sample
+
+DEFAULT_BOUNDS = {
+    "m0": (45.0, 65.0),
+    "Isp": (220.0, 280.0),
+    "Cd": (0.25, 0.45),
+    "CL_alpha": (2.5, 4.5),
+    "Cm_alpha": (-1.2, -0.4),
+    "Tmax": (3000.0, 5000.0),
+}
+
+# Fallbacks for fields that are neither sampled nor fixed (generator defaults)
+DEFAULT_FIXED = {"mdry": 35.0, "S": 0.05, "l_ref": 1.2, "rho0": 1.225, "H": 8500.0}
+
+# Body x axis pointing up
+UP_QUATERNION = (math.sqrt(0.5), 0.0, -math.sqrt(0.5), 0.0)
+
+
+class SyntheticRocketDataset(Dataset):
+    """In-memory trajectories with the RocketDataset item layout."""
+
+    def __init__(self, t: torch.Tensor, context: torch.Tensor, state: torch.Tensor,
+                 context_fields: Sequence[str], scales: Dict[str, float],
+                 env: Optional[Dict[str, torch.Tensor]] = None):
+        self.t = t.float()  # [n_cases, N] (nondimensional)
+        self.context = context.float()  # [n_cases, context_dim]
+        self.state = state.float()  # [n_cases, N, 14] (nondimensional)
+        # environment_params entries, [n_cases, ...] (nondimensional wind, g0 in m/s^2)
+        self.env = None if env is None else {
+            k: v if v.dtype == torch.bool else v.float() for k, v in env.items()
+        }
+        self.n_cases, self.N = self.t.shape
+        self.context_dim = self.context.shape[1]
+        self.context_fields = list(context_fields)
+        self.scales = dict(scales)
+
+    def __len__(self) -> int:
+        return self.n_cases
+
+    def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
+        item = {"t": self.t[idx], "context": self.context[idx], "state": self.state[idx], "case_id": idx}
+        if self.env is not None:
+            item["env"] = {k: v[idx] for k, v in self.env.items()}
+        return item
+
+
+class TrajectorySynthesizer:
+    """Samples parameter sets and rolls them out into a fresh training set per epoch."""
+
+    def __init__(
+        self,
+        engine: RolloutEngine,
+        scales: Dict[str, float],
+        bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+        fixed: Optional[Dict[str, float]] = None,
+        context_fields: Optional[Sequence[str]] = None,
+        cases_per_epoch: int = 256,
+        horizon_s: float = 30.0,
+        n_points: int = 301,
+        throttle: float = 0.8,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            engine: Rollout engine (shared physics params, scales, method)
+            scales: Nondimensionalization scales (L, V, T, M, F, W)
+            bounds: SI sampling bounds per parameter (default: DEFAULT_BOUNDS)
+            fixed: SI values of parameters that are not sampled
+            context_fields: Context vector layout (default: CONTEXT_FIELDS);
+                use the training split's meta/context_fields
+            cases_per_epoch: Trajectories synthesized per epoch
+            horizon_s: Trajectory length in seconds
+            n_points: Grid points per trajectory
+            throttle: Thrust as a fraction of Tmax while m > mdry
+            seed: Base seed; epoch e samples with seed + e
+        """
+        self.engine = engine
+        self.scales = dict(scales)
+        self._scales = Scales(**{k: float(scales[k]) for k in ("L", "V", "T", "M", "F", "W")})
+        self.bounds = dict(bounds or DEFAULT_BOUNDS)
+        self.fixed = {**DEFAULT_FIXED, **(fixed or {})}
+        self.context_fields = list(context_fields or CONTEXT_FIELDS)
+        self.cases_per_epoch = int(cases_per_epoch)
+        self.horizon_s = float(horizon_s)
+        self.n_points = int(n_points)
+        self.throttle = float(throttle)
+        self.seed = int(seed)
+
+    @classmethod
+    def from_config(cls, cfg: Dict, physics_params: Dict, scales: Dict[str, float],
+                    context_fields: Optional[Sequence[str]] = None, seed: int = 0) -> "TrajectorySynthesizer":
+        """Build from the train.synthetic config section."""
+        engine = RolloutEngine(
+            physics_params, scales,
+            method=cfg.get("method", "rk4"),
+            rtol=float(cfg.get("rtol", 1e-6)),
+            atol=float(cfg.get("atol", 1e-8)),
+            substeps=int(cfg.get("substeps", 1)),
+            deterministic=bool(cfg.get("deterministic", True)),
+        )
+        bounds = {k: (float(v[0]), float(v[1])) for k, v in cfg["bounds"].items()} if cfg.get("bounds") else None
+        return cls(
+            engine, scales, bounds=bounds, fixed=cfg.get("fixed"), context_fields=context_fields,
+            cases_per_epoch=int(cfg.get("cases_per_epoch", 256)),
+            horizon_s=float(cfg.get("horizon_s", 30.0)),
+            n_points=int(cfg.get("n_points", 301)),
+            throttle=float(cfg.get("throttle", 0.8)),
+            seed=int(cfg.get("seed", seed)),
+        )
+
+    def sample(self, n: int, seed: int) -> Dict[str, np.ndarray]:
+        """[n] SI values per parameter: LHS over the bounds, fixed values elsewhere."""
+        keys = list(self.bounds)
+        samples = lhs_sample(n, self.bounds, seed)
+        params = {key: samples[:, j] for j, key in enumerate(keys)}
+        for key, value in self.fixed.items():
+            params.setdefault(key, np.full(n, float(value)))
+        return params
+
+    @staticmethod
+    def environment(params: Dict[str, np.ndarray]) -> Dict:
+        """Generator env dict ([n] entries) of the sampled cases: a gust if gust_amp is set, else constant wind."""
+        if "gust_amp" in params:
+            wind = {"type": "gust", "gust_amp": params["gust_amp"], "gust_freq": params.get("gust_freq", 1.0)}
+        else:
+            wind = {"type": "constant", "wind_mag": params.get("wind_mag", 0.0),
+                    "wind_dir_rad": params.get("wind_dir_rad", 0.0)}
+        return {"gravity": {"type": "constant", "g0": 9.80665, "use_inverse_square": False}, "wind": wind}
+
+    def _environment_params(self, params: Dict[str, np.ndarray]) -> Dict[str, torch.Tensor]:
+        """Per-case environment tensors (environment_params) of the sampled cases."""
+        n = len(next(iter(params.values())))
+        return environment_params(self.environment(params), n, self.scales, dtype=torch.float64)
+
+    def _case_params(
+        self, params: Dict[str, np.ndarray], env: Optional[Dict[str, torch.Tensor]] = None
+    ) -> Dict[str, torch.Tensor]:
+        """SI samples as per-case compute_dynamics parameters, environment `env` (default: of params) included."""
+        s = self._scales
+        converted = {
+            "Cd": params.get("Cd"),
+            "CL_alpha": params.get("CL_alpha"),
+            "Cm_alpha": params.get("Cm_alpha"),
+            "Isp": params.get("Isp"),
+            "rho0": params.get("rho0"),
+            "h_scale": params.get("H"),
+            "T_max": params["Tmax"] / s.F,
+            "m_dry": params["mdry"] / s.M,
+        }
+        case_params = {k: torch.as_tensor(v) for k, v in converted.items() if v is not None}
+        case_params.update(self._environment_params(params) if env is None else env)
+        return case_params
+
+    def rollout(self, epoch: int, n: Optional[int] = None) -> Tuple[RolloutResult, torch.Tensor]:
+        """Integrate epoch `epoch`'s cases; returns the rollout and the context vectors [n, context_dim]."""
+        result, context, _ = self._rollout(epoch, n)
+        return result, context
+
+    def _rollout(
+        self, epoch: int, n: Optional[int] = None
+    ) -> Tuple[RolloutResult, torch.Tensor, Dict[str, torch.Tensor]]:
+        """rollout, also returning the environment tensors the cases were integrated with."""
+        n = n or self.cases_per_epoch
+        params = self.sample(n, self.seed + epoch)
+        env = self._environment_params(params)
+        case_params = self._case_params(params, env)
+
+        x0 = torch.zeros(n, 14, dtype=torch.float64)
+        x0[:, 6:10] = torch.tensor(UP_QUATERNION, dtype=torch.float64)
+        x0[:, 13] = torch.as_tensor(params["m0"] / self._scales.M)
+        t = torch.linspace(0.0, self.horizon_s / self._scales.T, self.n_points, dtype=torch.float64)
+
+        thrust = self.throttle * case_params["T_max"].to(self.engine.dtype)
+        m_dry = case_params["m_dry"].to(self.engine.dtype)
+
+        def control(time_rows: torch.Tensor, x: torch.Tensor, index: torch.Tensor) -> torch.Tensor:
+            u = x.new_zeros(index.shape[0], 4)
+            u[:, 0] = torch.where(x[:, 13] > m_dry[index], thrust[index], 0.0)
+            return u
+
+        result = self.engine.rollout(x0, t, control, case_params)
+        context = np.stack([
+            build_context_vector({k: float(v[i]) for k, v in params.items()}, self._scales, self.context_fields)
+            for i in range(n)
+        ])
+        return result, torch.from_numpy(context), env
+
+    def dataset(self, epoch: int) -> SyntheticRocketDataset:
+        result, context, env = self._rollout(epoch)
+        return SyntheticRocketDataset(result.t, context, result.state, self.context_fields, self.scales, env=env)
+
+    def dataloader(self, epoch: int, batch_size: int = 8) -> DataLoader:
+        """Fresh shuffled training loader for `epoch` (reproducible per seed and epoch)."""
+        generator = torch.Generator().manual_seed(self.seed + epoch)
+        return DataLoader(self.dataset(epoch), batch_size=batch_size, shuffle=True, generator=generator)
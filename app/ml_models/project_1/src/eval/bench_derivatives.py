@@ -0,0 +1,87 @@
+"""
+CPU micro-benchmark for the shared finite-difference time derivative.
+
+Compares src.physics.derivatives.time_derivative (order 1/2/4) against
+finite_difference_looped, a copy of the previous PhysicsResidualLayer
+implementation that wrote one time step per Python iteration. Timings cover
+the forward pass and forward + backward, as in a training step.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_derivatives --batch 8 --points 1501
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Callable, Dict
+
+import torch
+
+from src.eval.bench_inference import time_fn
+from src.physics.derivatives import time_derivative
+
+
+def finite_difference_looped(t: torch.Tensor, state: torch.Tensor, eps: float = 1e-8) -> torch.Tensor:
+    """Previous PhysicsResidualLayer._finite_difference_time_derivative (reference)."""
+    batch, N, dim = state.shape
+    state_dot = torch.zeros_like(state)
+
+    if N < 2:
+        return state_dot
+
+    t_vals = t[:, :, 0]  # [batch, N]
+
+    dt_forward = (t_vals[:, 1] - t_vals[:, 0]).clamp_min(eps).view(batch, 1)
+    state_dot[:, 0, :] = (state[:, 1, :] - state[:, 0, :]) / dt_forward
+
+    for i in range(1, N - 1):
+        dt_central = (t_vals[:, i+1] - t_vals[:, i-1]).clamp_min(eps).view(batch, 1)
+        state_dot[:, i, :] = (state[:, i+1, :] - state[:, i-1, :]) / dt_central
+
+    dt_backward = (t_vals[:, -1] - t_vals[:, -2]).clamp_min(eps).view(batch, 1)
+    state_dot[:, -1, :] = (state[:, -1, :] - state[:, -2, :]) / dt_backward
+
+    return state_dot
+
+
+def with_backward(fn: Callable[[torch.Tensor], torch.Tensor], state: torch.Tensor) -> Callable[[], None]:
+    """Closure running fn(state) and backpropagating a scalar through it."""
+    def run() -> None:
+        with torch.enable_grad():
+            leaf = state.detach().requires_grad_(True)
+            fn(leaf).square().mean().backward()
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark finite-difference time derivatives")
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--points", type=int, default=1501, help="Time points (30 s at dt=0.02 -> 1501)")
+    parser.add_argument("--dim", type=int, default=14)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    t = torch.linspace(0.0, 1.0, args.points).view(1, args.points, 1).repeat(args.batch, 1, 1)
+    state = torch.randn(args.batch, args.points, args.dim)
+
+    variants: Dict[str, Callable[[torch.Tensor], torch.Tensor]] = {
+        "looped": lambda s: finite_difference_looped(t, s),
+        "order=1": lambda s: time_derivative(s, t, order=1),
+        "order=2": lambda s: time_derivative(s, t, order=2),
+        "order=4": lambda s: time_derivative(s, t, order=4),
+    }
+
+    print(f"batch={args.batch} points={args.points} dim={args.dim} threads={torch.get_num_threads()}")
+    print(f"{'variant':>8} {'fwd ms':>9} {'fwd+bwd ms':>11}")
+    for name, fn in variants.items():
+        forward = time_fn(lambda: fn(state), args.repeats)
+        backward = time_fn(with_backward(fn, state), args.repeats)
+        print(f"{name:>8} {forward['median_ms']:>9.2f} {backward['median_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
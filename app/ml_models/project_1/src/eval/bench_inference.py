@@ -0,0 +1,174 @@
+"""
+CPU latency benchmark for Direction AN inference runtimes.
+
+Compares:
+- eager:        model(t, context), including the physics residual layer
+- eager_state:  eager model with the residual layer skipped (state only)
+- torchscript:  frozen, inference-optimised TorchScript export
+- onnxruntime:  ONNX export run by ONNX Runtime (when onnxruntime is installed)
+
+With --cold-start, each runtime is also started in a fresh interpreter
+(import, load the artifact, first prediction) to compare start-up time and
+resident memory (Linux); the onnxruntime process never imports torch.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_inference --batch 1 --points 1501
+    python -m src.eval.bench_inference --checkpoint best.pt --config config.yaml
+    python -m src.eval.bench_inference --cold-start
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import torch
+import yaml
+
+from src.export.onnx import export_onnx, load_onnx, onnxruntime_available
+from src.export.torchscript import (
+    StateOnlyWrapper,
+    build_direction_an,
+    export_torchscript,
+    load_torchscript,
+)
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+# Run in a fresh interpreter: import the runtime, load the artifact, predict once
+_COLD_START_PREAMBLE = """
+import json, os, sys, time
+start = time.perf_counter()
+"""
+_COLD_START_RUNTIMES = {
+    "eager": """
+import torch
+from src.export.torchscript import build_direction_an
+model = build_direction_an(json.loads(sys.argv[3]), {context_dim})
+model.load_state_dict(torch.load(sys.argv[1], map_location="cpu"))
+model.eval()
+t = torch.linspace(0.0, 1.0, {points}).view(1, {points}, 1)
+with torch.no_grad():
+    model.predict_state(t, torch.zeros(1, {context_dim}))
+""",
+    "torchscript": """
+import torch
+from src.export.torchscript import load_torchscript
+model, _ = load_torchscript(sys.argv[2])
+t = torch.linspace(0.0, 1.0, {points}).view(1, {points}, 1)
+with torch.no_grad():
+    model(t, torch.zeros(1, {context_dim}))
+""",
+    "onnxruntime": """
+import numpy as np
+from src.export.onnx import load_onnx
+model, _ = load_onnx(sys.argv[2])
+model(np.linspace(0.0, 1.0, {points}, dtype=np.float32).reshape(1, {points}, 1), np.zeros((1, {context_dim})))
+assert "torch" not in sys.modules
+""",
+}
+_COLD_START_REPORT = """
+with open("/proc/self/statm") as f:
+    rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+print(json.dumps({{"seconds": time.perf_counter() - start, "rss_mb": rss_mb}}))
+"""
+
+
+def time_fn(fn: Callable, repeats: int, warmup: int = 2) -> Dict[str, float]:
+    """Median / min wall time in milliseconds."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            fn()
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - start) * 1000.0)
+    times.sort()
+    return {"median_ms": times[len(times) // 2], "min_ms": times[0]}
+
+
+def cold_start(runtime: str, artifacts: Dict[str, Path], model_cfg: Dict, context_dim: int,
+               points: int) -> Dict[str, float]:
+    """Start-up time (import + load + first prediction) and resulting RSS of a runtime in a fresh interpreter."""
+    code = _COLD_START_PREAMBLE + _COLD_START_RUNTIMES[runtime] + _COLD_START_REPORT
+    code = code.format(context_dim=context_dim, points=points)
+    artifact = artifacts.get(runtime, artifacts["eager"])
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(artifacts["eager"]), str(artifact), json.dumps(model_cfg)],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Direction AN inference runtimes")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional; random weights otherwise")
+    parser.add_argument("--context-dim", type=int, default=7)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--points", type=int, default=1501, help="Time points (30 s at dt=0.02 -> 1501)")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--skip-eager-physics", action="store_true", help="Skip the slow full forward")
+    parser.add_argument("--cold-start", action="store_true", help="Also time each runtime's start-up in a new process")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model_cfg = {}
+    if Path(args.config).exists():
+        with open(args.config, "r") as f:
+            model_cfg = yaml.safe_load(f).get("model", {})
+    model = build_direction_an(model_cfg, args.context_dim)
+    if args.checkpoint:
+        checkpoint = torch.load(args.checkpoint, map_location="cpu", weights_only=False)
+        model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+    model.eval()
+
+    t = torch.linspace(0.0, 1.0, args.points).view(1, args.points, 1).repeat(args.batch, 1, 1)
+    context = torch.randn(args.batch, args.context_dim)
+
+    state_only = StateOnlyWrapper(model).eval()
+    tmp = tempfile.TemporaryDirectory()
+    artifacts = {
+        "eager": Path(tmp.name) / "bench_state.pt",
+        "torchscript": export_torchscript(model, Path(tmp.name) / "bench.pt", args.context_dim),
+    }
+    torch.save(model.state_dict(), artifacts["eager"])
+    scripted, _ = load_torchscript(artifacts["torchscript"])
+
+    runtimes = {"eager_state": lambda: state_only(t, context), "torchscript": lambda: scripted(t, context)}
+    if onnxruntime_available():
+        artifacts["onnxruntime"] = export_onnx(model, Path(tmp.name) / "bench.onnx", args.context_dim)
+        session, _ = load_onnx(artifacts["onnxruntime"], threads=torch.get_num_threads())
+        t_np, context_np = t.numpy(), context.numpy()
+        runtimes["onnxruntime"] = lambda: session(t_np, context_np)
+    if not args.skip_eager_physics:
+        runtimes = {"eager": lambda: model(t, context), **runtimes}
+
+    print(f"batch={args.batch} points={args.points} threads={torch.get_num_threads()}")
+    print(f"{'runtime':>12} {'median ms':>10} {'min ms':>10}")
+    for name, fn in runtimes.items():
+        result = time_fn(fn, args.repeats)
+        print(f"{name:>12} {result['median_ms']:>10.2f} {result['min_ms']:>10.2f}")
+
+    if args.cold_start:
+        print(f"\n{'cold start':>12} {'seconds':>10} {'RSS MB':>10}")
+        for name in ("eager", "torchscript", "onnxruntime"):
+            if name not in artifacts:
+                continue
+            result = cold_start(name, artifacts, model_cfg, args.context_dim, args.points)
+            print(f"{name:>12} {result['seconds']:>10.2f} {result['rss_mb']:>10.0f}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
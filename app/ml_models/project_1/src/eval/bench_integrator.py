@@ -0,0 +1,185 @@
+"""
+Throughput of the batched truth integrator (``src.physics.dynamics.integrate_truth``).
+
+Cases per second of integrate_truth (rk4, rk45) on batches of open-loop
+ascents (80 % Tmax along the body axis, launched pointing up, LHS-sampled
+mass/Isp/aero/thrust/wind), against ``placeholder_vertical_ascent``: a
+verbatim copy of the per-step Python Euler loop that
+``data/generator.solve_ocp_and_integrate`` falls back to. The placeholder
+only integrates a 1-DOF vertical model, so its rate is an upper bound for
+any per-case Python loop over the full 6-DOF state.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_integrator --batch 1,64,1024
+    python -m src.eval.bench_integrator --batch 256 --methods rk4 --horizon 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.data.generator import build_phys_limits_env
+from src.data.sampler import lhs_sample
+from src.physics.dynamics import integrate_truth
+
+BENCH_BOUNDS = {
+    "m0": (45.0, 65.0),
+    "Isp": (220.0, 280.0),
+    "Cd": (0.25, 0.45),
+    "CL_alpha": (2.5, 4.5),
+    "Cm_alpha": (-1.2, -0.4),
+    "Tmax": (3000.0, 5000.0),
+    "wind_mag": (0.0, 15.0),
+}
+
+# Body x axis pointing up: rotation of -90 deg about y
+UP_QUATERNION = np.array([np.sqrt(0.5), 0.0, -np.sqrt(0.5), 0.0])
+
+
+def placeholder_vertical_ascent(sample: Dict[str, float], t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """Per-step Euler loop of generator.solve_ocp_and_integrate (integrate_truth fallback)."""
+    N = t.shape[0]
+    state = np.zeros((N, 14), dtype=float)
+    control = np.zeros((N, 4), dtype=float)
+
+    # Get parameters
+    m0 = sample.get("m0", 50.0)
+    Tmax = sample.get("Tmax", 4000.0)
+    Isp = sample.get("Isp", 250.0)
+    g0 = 9.81
+
+    # Initialize state properly
+    state[0, 0:3] = [0.0, 0.0, 0.0]
+    state[0, 3:6] = [0.0, 0.0, 0.0]
+    state[0, 6:10] = [1.0, 0.0, 0.0, 0.0]  # Identity quaternion
+    state[0, 10:13] = [0.0, 0.0, 0.0]
+    state[0, 13] = m0
+
+    # Initialize control at t=0
+    control[0, 0] = Tmax * 0.8
+    control[0, 1:4] = [1.0, 0.0, 0.0]
+
+    # Simple vertical ascent
+    dt = t[1] - t[0] if N > 1 else 1.0
+    for i in range(1, N):
+        T = Tmax * 0.8
+        control[i, 0] = T
+        control[i, 1:4] = [1.0, 0.0, 0.0]
+
+        m = state[i-1, 13]
+        if m > sample.get("mdry", 35.0):
+            m_dot = -T / (Isp * g0)
+            state[i, 13] = max(state[i-1, 13] + m_dot * dt, sample.get("mdry", 35.0))
+        else:
+            state[i, 13] = state[i-1, 13]
+
+        a = (T / state[i, 13]) - g0
+        state[i, 5] = state[i-1, 5] + a * dt
+        state[i, 2] = state[i-1, 2] + state[i, 5] * dt
+
+        q = state[i-1, 6:10].copy()
+        q_norm = np.linalg.norm(q)
+        if q_norm > 1e-9:
+            state[i, 6:10] = q / q_norm
+        else:
+            state[i, 6:10] = [1.0, 0.0, 0.0, 0.0]
+
+        state[i, 0:2] = state[i-1, 0:2]
+        state[i, 3:5] = state[i-1, 3:5]
+        state[i, 10:13] = state[i-1, 10:13]
+
+    # Compute monitors
+    rho0 = sample.get("rho0", 1.225)
+    H = sample.get("H", 8500.0)
+    rho = rho0 * np.exp(-np.maximum(state[:, 2], 0.0) / H)  # Clamp altitude to non-negative
+    v_mag = np.linalg.norm(state[:, 3:6], axis=1)
+    q_dyn = 0.5 * rho * v_mag**2
+    # Load factor: total acceleration / g0 (using actual thrust, not Tmax)
+    T_actual = control[:, 0:1]  # Actual thrust at each time
+    a_total = np.sqrt((T_actual / state[:, 13:14])**2 + g0**2)
+    n_load = a_total / g0
+
+    monitors = {"rho": rho, "q_dyn": q_dyn, "n_load": n_load}
+    return state, control, monitors
+
+
+def ascent_cases(n: int, seed: int = 0):
+    """
+    LHS-sampled open-loop ascents.
+
+    Returns:
+        samples (list of dicts), x0 [n, 14], per-case phys/limits/env dicts
+        (build_phys_limits_env), control_cb for the batch
+    """
+    keys = list(BENCH_BOUNDS)
+    samples = [dict(zip(keys, row.tolist())) for row in lhs_sample(n, BENCH_BOUNDS, seed)]
+    cfg = SimpleNamespace(constraints={})
+    phys, limits, env = zip(*(build_phys_limits_env(sample, cfg) for sample in samples))
+
+    x0 = np.zeros((n, 14))
+    x0[:, 6:10] = UP_QUATERNION
+    x0[:, 13] = [sample["m0"] for sample in samples]
+    controls = np.zeros((n, 4))
+    controls[:, 0] = [0.8 * sample["Tmax"] for sample in samples]
+    controls[:, 1] = 1.0
+
+    def control_cb(t: float, x: np.ndarray) -> np.ndarray:
+        return controls
+
+    return samples, x0, list(phys), list(limits), list(env), control_cb
+
+
+def benchmark(batch: int, methods: List[str], t: np.ndarray, rtol: float, atol: float,
+              placeholder_cases: int = 16) -> Dict[str, Dict[str, float]]:
+    """Cases per second of each integrate_truth method and of the placeholder loop."""
+    samples, x0, phys, limits, env, control_cb = ascent_cases(batch)
+    results = {}
+    for method in methods:
+        start = time.perf_counter()
+        result = integrate_truth(x0, t, control_cb, phys, limits, env, method=method, rtol=rtol, atol=atol)
+        elapsed = time.perf_counter() - start
+        results[method] = {
+            "seconds": elapsed,
+            "cases_per_s": batch / elapsed,
+            "steps": result.diag["steps"],
+            "rhs_evals": result.diag["rhs_evals"],
+        }
+
+    n_placeholder = min(batch, placeholder_cases)
+    start = time.perf_counter()
+    for sample in samples[:n_placeholder]:
+        placeholder_vertical_ascent(sample, t)
+    elapsed = time.perf_counter() - start
+    results["placeholder"] = {"seconds": elapsed * batch / n_placeholder, "cases_per_s": n_placeholder / elapsed}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batched truth integrator throughput")
+    parser.add_argument("--batch", type=str, default="1,64,1024", help="Comma-separated batch sizes")
+    parser.add_argument("--methods", type=str, default="rk4,rk45")
+    parser.add_argument("--horizon", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--hz", type=float, default=50.0, help="Output grid rate")
+    parser.add_argument("--rtol", type=float, default=1e-6)
+    parser.add_argument("--atol", type=float, default=1e-8)
+    args = parser.parse_args()
+
+    t = np.linspace(0.0, args.horizon, int(args.horizon * args.hz) + 1)
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    print(f"grid: {len(t)} points over {args.horizon:g} s; rk45 rtol={args.rtol:g} atol={args.atol:g}")
+    print(f"{'batch':>6} {'method':>12} {'seconds':>9} {'cases/s':>10} {'steps':>7} {'rhs evals':>10}")
+    for batch in [int(b) for b in args.batch.split(",")]:
+        for name, metrics in benchmark(batch, methods, t, args.rtol, args.atol).items():
+            steps = metrics.get("steps", "-")
+            evals = metrics.get("rhs_evals", "-")
+            print(f"{batch:>6} {name:>12} {metrics['seconds']:>9.2f} {metrics['cases_per_s']:>10.1f} "
+                  f"{steps:>7} {evals:>10}")
+
+
+if __name__ == "__main__":
+    main()
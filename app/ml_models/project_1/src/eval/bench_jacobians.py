@@ -0,0 +1,122 @@
+"""
+CPU benchmark for the batched dynamics Jacobians (``compute_jacobians``).
+
+Compares compute_jacobians (torch.func.jacrev of the row-summed dynamics)
+against forward mode per row (torch.func.jacfwd vmapped over rows), against
+autograd per row (torch.autograd.functional.jacobian in a Python loop,
+extrapolated from a subset) and, when casadi is installed, against the
+CasADi jacobian of solver/dynamics_casadi.py mapped over rows. Inputs are
+float64; the last column is the largest difference to jacfwd + vmap.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_jacobians --rows 64,1024,8192
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Dict, Tuple
+
+import numpy as np
+import torch
+from torch.func import jacfwd, vmap
+
+from src.eval.bench_dynamics import DEFAULT_SCALES, random_inputs
+from src.eval.bench_inference import time_fn
+from src.physics.dynamics_pytorch import compute_dynamics, compute_jacobians
+
+# Unit scales: compute_dynamics then evaluates the SI model of dynamics_casadi.py
+UNIT_SCALES: Dict[str, float] = {"L": 1.0, "V": 1.0, "T": 1.0, "M": 1.0, "F": 1.0, "RHO": 1.0, "Q": 1.0}
+
+CASADI_PARAMS: Dict[str, object] = {
+    "Cd": 0.3, "CL_alpha": 3.5, "Cm_alpha": -0.8, "C_delta": 0.05, "S_ref": 0.05, "l_ref": 1.2,
+    "Isp": 250.0, "g0": 9.81, "rho0": 1.225, "h_scale": 8400.0, "I_b": [10.0, 10.0, 1.0],
+    "T_max": 4000.0, "m_dry": 35.0,
+}
+
+
+def jacfwd_rows(x: torch.Tensor, u: torch.Tensor, params: Dict, scales: Dict) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Forward-mode Jacobians of each row [M, 14] (shared params), vmapped over rows."""
+    row_jacobian = jacfwd(lambda xx, uu: compute_dynamics(xx, uu, params, scales), argnums=(0, 1))
+    return vmap(row_jacobian)(x, u)
+
+
+def autograd_row(x: torch.Tensor, u: torch.Tensor, params: Dict, scales: Dict) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Reverse-mode Jacobians of a single row [14], [4]."""
+    return torch.autograd.functional.jacobian(lambda xx, uu: compute_dynamics(xx, uu, params, scales), (x, u))
+
+
+def casadi_jacobian_function(params: Dict, rows: int):
+    """CasADi Function (x [14, rows], u [4, rows]) -> (A, B) stacked horizontally, or None without casadi."""
+    try:
+        import casadi as ca
+        from src.solver.dynamics_casadi import compute_dynamics as casadi_dynamics
+    except ImportError:
+        return None
+    x = ca.MX.sym("x", 14)
+    u = ca.MX.sym("u", 4)
+    f = casadi_dynamics(x, u, params)
+    jac = ca.Function("jac", [x, u], [ca.jacobian(f, x), ca.jacobian(f, u)])
+    return jac.map(rows)
+
+
+def casadi_jacobians(jac_map, x: torch.Tensor, u: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Evaluate a mapped CasADi jacobian Function as [rows, 14, 14], [rows, 14, 4]."""
+    A, B = jac_map(x.numpy().T, u.numpy().T)
+    rows = x.shape[0]
+    A = np.asarray(A).reshape(14, rows, 14).transpose(1, 0, 2)
+    B = np.asarray(B).reshape(14, rows, 4).transpose(1, 0, 2)
+    return torch.from_numpy(A), torch.from_numpy(B)
+
+
+def physical_inputs(rows: int, seed: int = 0) -> Tuple[torch.Tensor, torch.Tensor]:
+    """SI states and controls away from the clamps (T in (0, T_max), m > m_dry, z > 0)."""
+    x, u = random_inputs(rows, seed)
+    x = x.double()
+    u = u.double()
+    x[:, 2] = x[:, 2].abs() * 1000.0
+    x[:, 3:6] *= 100.0
+    x[:, 13] = 40.0 + 10.0 * x[:, 13]
+    u[:, 0] = 500.0 + 1000.0 * u[:, 0].clamp(max=3.0)
+    u[:, 1:4] = 0.1 * torch.randn(rows, 3, generator=torch.Generator().manual_seed(seed + 1), dtype=torch.float64)
+    return x, u
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched dynamics Jacobians")
+    parser.add_argument("--rows", type=str, default="64,1024,8192", help="Comma-separated row counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--loop-rows", type=int, default=32, help="Rows timed for the per-row autograd loop")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    print(f"threads={torch.get_num_threads()}")
+    print(f"{'rows':>8} {'jacrev ms':>10} {'jacfwd+vmap ms':>15} {'autograd loop ms':>17} "
+          f"{'casadi ms':>10} {'max |diff|':>11}")
+    for rows in (int(r) for r in args.rows.split(",")):
+        x, u = (tensor.double() for tensor in random_inputs(rows))
+        reverse = time_fn(lambda: compute_jacobians(x, u, {}, DEFAULT_SCALES), args.repeats)
+        forward = time_fn(lambda: jacfwd_rows(x, u, {}, DEFAULT_SCALES), args.repeats)
+        n_loop = min(rows, args.loop_rows)
+        loop = time_fn(lambda: [autograd_row(x[i], u[i], {}, DEFAULT_SCALES) for i in range(n_loop)], 1, warmup=1)
+        loop_ms = loop["median_ms"] * rows / n_loop
+
+        A, B = compute_jacobians(x, u, {}, DEFAULT_SCALES)
+        A_ref, B_ref = jacfwd_rows(x, u, {}, DEFAULT_SCALES)
+        diff = max((A - A_ref).abs().max().item(), (B - B_ref).abs().max().item())
+
+        casadi_ms = "-"
+        jac_map = casadi_jacobian_function(CASADI_PARAMS, rows)
+        if jac_map is not None:
+            x_si, u_si = physical_inputs(rows)
+            casadi_ms = f"{time_fn(lambda: casadi_jacobians(jac_map, x_si, u_si), args.repeats)['median_ms']:.2f}"
+
+        print(f"{rows:>8} {reverse['median_ms']:>10.2f} {forward['median_ms']:>15.2f} {loop_ms:>17.2f} "
+              f"{casadi_ms:>10} {diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
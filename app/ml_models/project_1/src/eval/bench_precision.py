@@ -0,0 +1,176 @@
+"""
+Accuracy / latency report for the reduced-precision inference modes.
+
+Each mode of ``src.export.precision`` is compared against float32:
+- accuracy: RMSE metrics of ``visualize_pinn.evaluate_model`` on the test
+  split (``--data-dir`` with test.h5), and the largest deviation from the
+  float32 prediction as a fraction of each state component's range (the
+  quantity serving checks against ML_PRECISION_MAX_ERROR)
+- latency: state prediction on a batch of the request size
+
+Without ``--data-dir`` only the deviation from float32 (on random contexts)
+and the latency are reported.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_precision --checkpoint best.pt --config config.yaml --data-dir data/processed
+    python -m src.eval.bench_precision --batch 8 --points 1501 --output precision_report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Dict, Optional
+
+import torch
+import yaml
+
+from src.eval.bench_inference import time_fn
+from src.export.precision import PRECISION_MODES, apply_precision, max_relative_error, predict_state
+from src.models.factory import build_model
+
+
+def _initial_state(batch: int) -> torch.Tensor:
+    """Launch state (identity attitude, full mass) for models that need one."""
+    state = torch.zeros(batch, 14)
+    state[:, 6] = 1.0
+    state[:, 13] = 1.0
+    return state
+
+
+def _test_predictions(model: torch.nn.Module, test_loader) -> torch.Tensor:
+    """Concatenated state predictions over the test split."""
+    predictions = []
+    for batch in test_loader:
+        t = batch["t"]
+        if t.dim() == 2:
+            t = t.unsqueeze(-1)
+        predictions.append(predict_state(model, t, batch["context"], batch["state"][:, 0, :]))
+    return torch.cat(predictions)
+
+
+def precision_report(
+    model: torch.nn.Module,
+    modes=PRECISION_MODES,
+    batch: int = 1,
+    points: int = 1501,
+    context_dim: int = 7,
+    repeats: int = 10,
+    test_loader=None,
+    scales=None,
+) -> Dict[str, Dict]:
+    """
+    Compare each precision mode against float32.
+
+    Args:
+        model: Trained float32 model (eval mode, CPU)
+        modes: Modes to report
+        batch, points: Latency benchmark input size
+        context_dim: Context vector size
+        repeats: Timed runs per mode
+        test_loader: Optional test split loader; adds evaluate_model metrics
+        scales: Scales of the test split (required with test_loader)
+
+    Returns:
+        {mode: metrics}; a mode that cannot be applied reports {"error": reason}
+    """
+    torch.manual_seed(0)
+    t = torch.linspace(0.0, 1.0, points).view(1, points, 1).repeat(batch, 1, 1)
+    context = torch.randn(batch, context_dim)
+    initial_state = _initial_state(batch)
+
+    reference = predict_state(model, t, context, initial_state)
+    reference_test = _test_predictions(model, test_loader) if test_loader is not None else None
+    if test_loader is not None:
+        from src.eval.visualize_pinn import evaluate_model  # Pulls in matplotlib
+
+    report = {}
+    for mode in modes:
+        try:
+            candidate = apply_precision(model, mode)
+        except Exception as e:
+            report[mode] = {"error": str(e)}
+            continue
+        timing = time_fn(lambda: predict_state(candidate, t, context, initial_state), repeats)
+        metrics = {
+            "median_ms": timing["median_ms"],
+            "min_ms": timing["min_ms"],
+            "max_error": max_relative_error(reference, predict_state(candidate, t, context, initial_state)),
+        }
+        if test_loader is not None:
+            metrics["max_error"] = max_relative_error(reference_test, _test_predictions(candidate, test_loader))
+            evaluation = evaluate_model(candidate, test_loader, torch.device("cpu"), scales)
+            for key in ("rmse_total", "rmse_translation", "rmse_rotation", "rmse_mass"):
+                metrics[key] = evaluation[key]
+        report[mode] = metrics
+
+    baseline = report.get("float32", {})
+    for metrics in report.values():
+        if "median_ms" in metrics and "median_ms" in baseline:
+            metrics["speedup"] = baseline["median_ms"] / metrics["median_ms"]
+        if "rmse_total" in metrics and "rmse_total" in baseline:
+            metrics["rmse_total_delta"] = metrics["rmse_total"] - baseline["rmse_total"]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Accuracy/latency of reduced-precision inference modes")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional; random weights otherwise")
+    parser.add_argument("--data-dir", type=str, default=None, help="Processed splits (test.h5) for RMSE metrics")
+    parser.add_argument("--scales", type=str, default="scales.yaml")
+    parser.add_argument("--context-dim", type=int, default=7)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--points", type=int, default=1501, help="Time points (30 s at dt=0.02 -> 1501)")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--modes", type=str, default=",".join(PRECISION_MODES))
+    parser.add_argument("--output", type=str, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f) or {}
+    context_dim = int(config.get("context_dim", args.context_dim))
+    model = build_model(dict(config.get("model", {})), context_dim)
+    if args.checkpoint:
+        checkpoint = torch.load(args.checkpoint, map_location="cpu", weights_only=False)
+        model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+    model.eval()
+
+    test_loader: Optional[object] = None
+    scales = None
+    if args.data_dir:
+        from src.data.preprocess import load_scales
+        from src.utils.loaders import create_dataloaders
+
+        _, _, test_loader = create_dataloaders(args.data_dir, batch_size=args.batch)
+        scales = load_scales(args.scales)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    report = precision_report(
+        model, modes, args.batch, args.points, context_dim, args.repeats, test_loader, scales
+    )
+
+    print(f"batch={args.batch} points={args.points} threads={torch.get_num_threads()}"
+          f"{' test split: ' + args.data_dir if args.data_dir else ''}")
+    print(f"{'mode':>10} {'median ms':>10} {'speedup':>8} {'max err':>10} {'rmse':>10} {'d rmse':>10}")
+    for mode, metrics in report.items():
+        if "error" in metrics:
+            print(f"{mode:>10}  unavailable: {metrics['error']}")
+            continue
+        rmse = f"{metrics['rmse_total']:.3e}" if "rmse_total" in metrics else "-"
+        delta = f"{metrics['rmse_total_delta']:+.2e}" if "rmse_total_delta" in metrics else "-"
+        print(f"{mode:>10} {metrics['median_ms']:>10.2f} {metrics['speedup']:>7.2f}x "
+              f"{metrics['max_error']:>10.2e} {rmse:>10} {delta:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
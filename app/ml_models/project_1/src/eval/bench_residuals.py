@@ -0,0 +1,136 @@
+"""
+Training step time with and without reusing the physics layer's ds/dt.
+
+One train_epoch step of the config.yaml model and loss (forward + loss +
+backward) on a batch of trajectories [batch, N, 14]:
+
+    recompute: PINNLoss recomputes ds/dt of the predicted state itself
+               (residuals=None)
+    reuse:     PINNLoss reuses the ds/dt of the model's physics layer
+               (residuals=PhysicsResiduals), as train_epoch does
+
+As in train_pinn, the physics layer is built with loss.derivative_order so
+the stencils match. Only the vertical residual's two derivative channels
+are shared, so the saving is small next to the model itself. The last
+column is the largest difference between the two losses.
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_residuals --batch 8,32 --points 201
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import time
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import torch
+import yaml
+
+from src.data.preprocess import CONTEXT_FIELDS
+from src.models.factory import build_model
+from src.train.losses import PINNLoss
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+SCALES = {"L": 1.0, "V": 313.0, "T": 31.62, "M": 50.0, "F": 490.0}
+
+
+def step_times(fns: Dict[str, Callable], repeats: int, warmup: int = 2) -> Dict[str, float]:
+    """
+    Median wall time in milliseconds of each function (with autograd, unlike
+    bench_inference.time_fn). The functions run interleaved so drift in
+    machine load affects all of them alike.
+    """
+    for _ in range(warmup):
+        for fn in fns.values():
+            fn()
+    times = {name: [] for name in fns}
+    for _ in range(repeats):
+        for name, fn in fns.items():
+            start = time.perf_counter()
+            fn()
+            times[name].append((time.perf_counter() - start) * 1000.0)
+    return {name: sorted(values)[len(values) // 2] for name, values in times.items()}
+
+
+def trajectory_inputs(batch: int, n_points: int, seed: int = 0) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Time grid [batch, N, 1], smooth target states [batch, N, 14] and contexts [batch, context_dim]."""
+    generator = torch.Generator().manual_seed(seed)
+    t = torch.linspace(0.0, 1.0, n_points).view(1, n_points, 1).expand(batch, -1, -1).contiguous()
+    coeffs = torch.randn(batch, 3, 14, generator=generator)
+    state = coeffs[:, 0:1] + coeffs[:, 1:2] * t + coeffs[:, 2:3] * t**2
+    state[..., 13] = 1.0 - 0.3 * t[..., 0]
+    context = 0.5 + torch.rand(batch, len(CONTEXT_FIELDS), generator=generator)
+    return t, state, context
+
+
+def build_training_pair(config: Dict, context_dim: int) -> Tuple[torch.nn.Module, PINNLoss]:
+    """Model and PINNLoss of a config.yaml, with the physics layer at the loss's stencil order."""
+    loss_cfg = config.get("loss", {})
+    derivative_order = int(loss_cfg.get("derivative_order", 1))
+    model_cfg = {"physics_derivative_order": derivative_order, **config.get("model", {})}
+    model = build_model(model_cfg, context_dim, {}, SCALES)
+
+    accepted = inspect.signature(PINNLoss.__init__).parameters
+    loss_kwargs = {
+        k: float(v) for k, v in loss_cfg.items() if k.startswith("lambda_") and k in accepted
+    }
+    loss_fn = PINNLoss(
+        scales=SCALES,
+        component_weights=loss_cfg.get("component_weights"),
+        derivative_order=derivative_order,
+        **loss_kwargs,
+    )
+    return model, loss_fn
+
+
+def benchmark(config: Dict, batch: int, n_points: int, repeats: int) -> Dict[str, float]:
+    """Median forward + loss + backward milliseconds of both paths and the loss difference."""
+    torch.manual_seed(0)
+    t, state_true, context = trajectory_inputs(batch, n_points)
+    model, loss_fn = build_training_pair(config, context.shape[-1])
+    model.train()
+    losses = {}
+
+    def step(name: str, reuse: bool) -> Callable:
+        def run():
+            model.zero_grad(set_to_none=True)
+            state_pred, physics = model(t, context)
+            residuals = physics if reuse else None
+            loss, _ = loss_fn(state_pred, state_true, t, context=context, residuals=residuals)
+            loss.backward()
+            losses[name] = loss.detach()
+        return run
+
+    results = step_times({"recompute": step("recompute", False), "reuse": step("reuse", True)}, repeats)
+    results["max_loss_diff"] = (losses["recompute"] - losses["reuse"]).abs().item()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Training step time with reused physics-layer derivatives")
+    parser.add_argument("--config", type=str, default=str(PROJECT_DIR / "config.yaml"))
+    parser.add_argument("--batch", type=str, default="8,32", help="Comma-separated batch sizes")
+    parser.add_argument("--points", type=int, default=201, help="Grid points per trajectory")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    order = int(config.get("loss", {}).get("derivative_order", 1))
+    print(f"model: {config.get('model', {}).get('type')}; derivative order: {order}; "
+          f"grid: {args.points} points; torch threads: {torch.get_num_threads()}")
+    print(f"{'batch':>6} {'recompute ms':>13} {'reuse ms':>9} {'reduction':>10} {'max |dloss|':>12}")
+    for batch in [int(b) for b in args.batch.split(",")]:
+        r = benchmark(config, batch, args.points, args.repeats)
+        reduction = 1.0 - r["reuse"] / r["recompute"]
+        print(f"{batch:>6} {r['recompute']:>13.2f} {r['reuse']:>9.2f} {reduction:>9.1%} {r['max_loss_diff']:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
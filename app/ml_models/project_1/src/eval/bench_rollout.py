@@ -0,0 +1,75 @@
+"""
+Throughput of the torch rollout engine (``src.physics.rollout``).
+
+Trajectories per second of RolloutEngine (rk4, rk45) on batches of the
+synthetic training cases (``src.data.synthetic``), against rolling the same
+cases out one at a time (batch of 1 in a Python loop, the cost of
+integrating per case).
+
+Usage (from the project_1 directory):
+    python -m src.eval.bench_rollout --batch 64,1024,4096
+    python -m src.eval.bench_rollout --batch 256 --methods rk45 --points 101
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List
+
+import torch
+
+from src.data.synthetic import TrajectorySynthesizer
+from src.physics.rollout import RolloutEngine
+
+SCALES = {"L": 10000.0, "V": 313.0, "T": 31.62, "M": 50.0, "F": 490.0, "W": 0.0316}
+
+
+def benchmark(batch: int, methods: List[str], n_points: int, horizon_s: float,
+              looped_cases: int = 4) -> Dict[str, Dict[str, float]]:
+    """Trajectories per second of each method, batched and looped over single cases."""
+    results = {}
+    for method in methods:
+        engine = RolloutEngine({}, SCALES, method=method, deterministic=True)
+        synthesizer = TrajectorySynthesizer(engine, SCALES, cases_per_epoch=batch,
+                                            horizon_s=horizon_s, n_points=n_points)
+        # Single cases first (also warms up the torch kernels)
+        n_looped = min(batch, looped_cases)
+        start = time.perf_counter()
+        for epoch in range(n_looped):
+            synthesizer.rollout(epoch=epoch, n=1)
+        elapsed = time.perf_counter() - start
+        looped = {"seconds": elapsed * batch / n_looped, "traj_per_s": n_looped / elapsed}
+
+        result, _ = synthesizer.rollout(epoch=0)
+        results[method] = {
+            "seconds": result.elapsed_s,
+            "traj_per_s": result.trajectories_per_s,
+            "mean_steps": float(result.steps.double().mean()),
+        }
+        results[f"{method} looped"] = looped
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Torch rollout engine throughput")
+    parser.add_argument("--batch", type=str, default="64,1024,4096", help="Comma-separated batch sizes")
+    parser.add_argument("--methods", type=str, default="rk4,rk45")
+    parser.add_argument("--points", type=int, default=301, help="Grid points per trajectory")
+    parser.add_argument("--horizon", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    print(f"grid: {args.points} points over {args.horizon:g} s; torch threads: {torch.get_num_threads()}")
+    print(f"{'batch':>6} {'method':>12} {'seconds':>9} {'traj/s':>9} {'steps':>7}")
+    for batch in [int(b) for b in args.batch.split(",")]:
+        for name, metrics in benchmark(batch, methods, args.points, args.horizon).items():
+            steps = f"{metrics['mean_steps']:.0f}" if "mean_steps" in metrics else "-"
+            print(f"{batch:>6} {name:>12} {metrics['seconds']:>9.2f} {metrics['traj_per_s']:>9.1f} {steps:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-stage time/memory profile of a PINN model (``src.utils.profiler``).
+
+Modes:
+- inference: the serving path (``predict_state`` under no_grad)
+- forward:   full forward pass with physics residuals, plus backward
+
+Usage (from the project_1 directory):
+    python -m src.eval.profile_stages --config config.yaml --checkpoint best.pt --batch 8
+    python -m src.eval.profile_stages --mode forward --points 301 --depth 2 --trace trace.json
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import torch
+import yaml
+
+from src.export.precision import predict_state
+from src.models.factory import build_model
+from src.utils.profiler import StageProfiler, profile_stage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-stage time/memory profile of a PINN model")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Optional; random weights otherwise")
+    parser.add_argument("--context-dim", type=int, default=7)
+    parser.add_argument("--mode", choices=("inference", "forward"), default="inference",
+                        help="inference: serving path (predict_state, no grad); "
+                             "forward: full forward pass with physics residuals + backward")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--points", type=int, default=1501, help="Time points (30 s at dt=0.02 -> 1501)")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=1, help="Submodule depth to hook")
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--trace", type=str, default=None, help="Write a Chrome trace JSON")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f) or {}
+    context_dim = int(config.get("context_dim", args.context_dim))
+    device = torch.device(args.device)
+    model = build_model(dict(config.get("model", {})), context_dim)
+    if args.checkpoint:
+        checkpoint = torch.load(args.checkpoint, map_location="cpu", weights_only=False)
+        model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+    model.to(device).eval()
+
+    torch.manual_seed(0)
+    t = torch.linspace(0.0, 1.0, args.points, device=device).view(1, args.points, 1).repeat(args.batch, 1, 1)
+    context = torch.randn(args.batch, context_dim, device=device)
+    initial_state = torch.zeros(args.batch, 14, device=device)
+    initial_state[:, 6] = 1.0
+    initial_state[:, 13] = 1.0
+
+    def step():
+        if args.mode == "inference":
+            predict_state(model, t, context, initial_state)
+            return
+        with profile_stage("forward"):
+            if getattr(model, "requires_initial_state", False):
+                output = model(t, context, initial_state)
+            else:
+                output = model(t, context)
+        state = output[0] if isinstance(output, (tuple, list)) else output
+        with profile_stage("backward"):
+            state.sum().backward()
+        model.zero_grad(set_to_none=True)
+
+    step()  # Warm-up (lazy initialisation, allocator)
+    with StageProfiler(model, depth=args.depth) as profiler:
+        for _ in range(args.repeats):
+            step()
+
+    print(f"{type(model).__name__} mode={args.mode} batch={args.batch} points={args.points} "
+          f"repeats={args.repeats} device={device}")
+    print(profiler.summary())
+    if args.trace:
+        profiler.export_chrome_trace(args.trace)
+        print(f"Chrome trace written to {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
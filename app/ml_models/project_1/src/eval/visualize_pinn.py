@@ -570,6 +570,18 @@ def _forward_with_initial_state_if_needed(
     return model(t, context)
 
 
+def _predict_state(
+    model: torch.nn.Module,
+    t: torch.Tensor,
+    context: torch.Tensor,
+    state_true: torch.Tensor,
+) -> torch.Tensor:
+    """State-only prediction; skips physics residuals for models with `predict_state`."""
+    if hasattr(model, "predict_state") and not _requires_initial_state(model):
+        return model.predict_state(t, context)
+    return _forward_with_initial_state_if_needed(model, t, context, state_true)
+
+
 def _aggregate_debug_records(records):
     if not records:
         return {}
@@ -638,7 +650,7 @@ def evaluate_model(
             if t.dim() == 2:
                 t = t.unsqueeze(-1)
             
-            output = _forward_with_initial_state_if_needed(model, t, context, state_true)
+            output = _predict_state(model, t, context, state_true)
             # Handle models that return (state, residuals) tuple (e.g., DirectionANPINN)
             if isinstance(output, (tuple, list)):
                 state_pred = output[0]
@@ -0,0 +1 @@
+"""Inference export formats for trained models."""
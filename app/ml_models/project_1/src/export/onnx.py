@@ -0,0 +1,203 @@
+"""
+ONNX export of Direction AN for torch-free serving.
+
+The exported graph is the model's inference-only ``predict_state`` path
+(``StateOnlyWrapper``) with dynamic batch and time axes:
+``t [B, N, 1], context [B, C] -> state [B, N, 14]``.
+
+The artifact is written next to the checkpoint (``best.onnx``) with a
+``best.onnx.json`` sidecar recording the sha256 of the checkpoint it was
+exported from, so a stale artifact is never served after ``best.pt`` changes.
+
+Serving side, ``OnnxStateModel`` runs the graph with ONNX Runtime on numpy
+arrays. This module only imports torch inside the export functions, so a
+process that loads an ONNX artifact never imports it.
+
+Usage (from the project_1 directory):
+    python -m src.export.onnx --checkpoint best.pt --config config.yaml
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+ARTIFACT_NAME = "best.onnx"
+METADATA_SUFFIX = ".json"
+OPSET_VERSION = 17
+INPUT_NAMES = ("t", "context")
+OUTPUT_NAME = "state"
+
+
+def metadata_path(artifact_path) -> Path:
+    """Sidecar JSON file of an ONNX artifact."""
+    artifact_path = Path(artifact_path)
+    return artifact_path.with_name(artifact_path.name + METADATA_SUFFIX)
+
+
+def onnxruntime_available() -> bool:
+    """True if the onnxruntime package can be imported."""
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_onnx(
+    model,
+    output_path,
+    context_dim: int,
+    metadata: Optional[Dict] = None,
+    opset_version: int = OPSET_VERSION,
+) -> Path:
+    """
+    Export the state-only inference graph of a model to ONNX.
+
+    Args:
+        model: Trained model (eager); not modified
+        output_path: Where to write the .onnx artifact (metadata goes to <output_path>.json)
+        context_dim: Context vector size
+        metadata: Extra JSON-serialisable info stored in the sidecar
+        opset_version: ONNX opset
+
+    Returns:
+        Path to the written artifact
+    """
+    import torch
+
+    from src.export.torchscript import StateOnlyWrapper, _example_inputs
+
+    if getattr(model, "requires_initial_state", False):
+        raise ValueError(f"{type(model).__name__} needs an initial state; only (t, context) models can be exported")
+
+    wrapper = StateOnlyWrapper(model).eval()
+    output_path = Path(output_path)
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            _example_inputs(2, 64, context_dim),
+            str(output_path),
+            input_names=list(INPUT_NAMES),
+            output_names=[OUTPUT_NAME],
+            dynamic_axes={
+                "t": {0: "batch", 1: "time"},
+                "context": {0: "batch"},
+                OUTPUT_NAME: {0: "batch", 1: "time"},
+            },
+            opset_version=opset_version,
+            dynamo=False,
+        )
+    meta = {"context_dim": context_dim, "opset_version": opset_version, **(metadata or {})}
+    metadata_path(output_path).write_text(json.dumps(meta))
+    return output_path
+
+
+class OnnxStateModel:
+    """
+    ONNX Runtime session for an exported artifact: ``(t, context) -> state`` on numpy arrays.
+
+    Exposes the capability flags the serving code reads from torch models
+    (no initial state, no chunked inference).
+    """
+
+    requires_initial_state = False
+    supports_chunked_inference = False
+
+    def __init__(self, path, threads: int = 0) -> None:
+        """
+        Args:
+            path: .onnx artifact
+            threads: intra-op threads (0: ONNX Runtime default, one per core)
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(self.path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.nbytes = self.path.stat().st_size
+
+    def __call__(self, t: np.ndarray, context: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            t: [B, N, 1] nondimensional times
+            context: [B, C] normalized context
+
+        Returns:
+            [B, N, 14] nondimensional state (float32)
+        """
+        feeds = {
+            "t": np.ascontiguousarray(t, dtype=np.float32),
+            "context": np.ascontiguousarray(context, dtype=np.float32),
+        }
+        return self.session.run([OUTPUT_NAME], feeds)[0]
+
+
+def load_onnx(path, threads: int = 0) -> Tuple[OnnxStateModel, Dict]:
+    """
+    Load an exported artifact (requires onnxruntime).
+
+    Returns:
+        Tuple of (model, metadata)
+    """
+    sidecar = metadata_path(path)
+    metadata = json.loads(sidecar.read_text()) if sidecar.exists() else {}
+    return OnnxStateModel(path, threads=threads), metadata
+
+
+def main() -> None:
+    import torch
+    import yaml
+
+    from src.export.torchscript import StateOnlyWrapper, _example_inputs, build_direction_an, file_sha256
+
+    parser = argparse.ArgumentParser(description="Export Direction AN to ONNX")
+    parser.add_argument("--checkpoint", type=str, default="best.pt")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--context-dim", type=int, default=7)
+    parser.add_argument("--output", type=str, default=None, help=f"Default: {ARTIFACT_NAME} next to the checkpoint")
+    parser.add_argument("--opset", type=int, default=OPSET_VERSION)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    model_cfg = config.get("model", {})
+    if model_cfg.get("type", "direction_an").lower() != "direction_an":
+        raise SystemExit(f"Unsupported model type for export: {model_cfg.get('type')}")
+
+    model = build_direction_an(model_cfg, args.context_dim)
+    checkpoint = torch.load(args.checkpoint, map_location="cpu", weights_only=False)
+    model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+    model.eval()
+
+    output = Path(args.output) if args.output else Path(args.checkpoint).with_name(ARTIFACT_NAME)
+    export_onnx(
+        model,
+        output,
+        context_dim=args.context_dim,
+        metadata={"checkpoint_sha256": file_sha256(args.checkpoint)},
+        opset_version=args.opset,
+    )
+    print(f"Saved {output}")
+
+    # Parity check against eager mode, on a shape other than the export example
+    if onnxruntime_available():
+        session, _ = load_onnx(output)
+        t, context = _example_inputs(4, 1501, args.context_dim)
+        with torch.no_grad():
+            eager_state = StateOnlyWrapper(model)(t, context).numpy()
+        max_err = float(np.abs(eager_state - session(t.numpy(), context.numpy())).max())
+        print(f"max |eager - onnxruntime| = {max_err:.2e}")
+    else:
+        print("onnxruntime is not installed; skipped the parity check")
+
+
+if __name__ == "__main__":
+    main()
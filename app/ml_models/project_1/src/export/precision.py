@@ -0,0 +1,172 @@
+"""
+Reduced-precision inference modes.
+
+- ``float32``:  the trained model, unchanged
+- ``bfloat16``: weights stay float32; the forward pass runs under
+                ``torch.autocast`` (bfloat16 matmuls), outputs are cast back
+- ``int8``:     ``torch.ao.quantization.quantize_dynamic`` on the
+                ``nn.Linear`` layers of the stem and branch MLPs (int8
+                weights, activations quantized on the fly; CPU only).
+                Encoders, dynamics networks and decoders stay float32:
+                their errors are integrated / fed back along the trajectory
+
+Reduced modes change the predictions, so callers compare them against
+float32 first (``max_relative_error``) and only serve a mode whose error is
+within their budget. ``src.eval.bench_precision`` reports accuracy and
+latency of every mode.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Optional, Tuple
+
+import torch
+import torch.nn as nn
+
+PRECISION_MODES = ("float32", "bfloat16", "int8")
+
+# Top-level submodules quantized in int8 mode: shared stems/backbones and the output branches/heads
+QUANTIZED_STEMS = ("stem", "shared_stem", "backbone")
+QUANTIZED_BRANCH_SUFFIX = "_branch"
+QUANTIZED_HEAD_PREFIX = "head_"
+
+
+# Attention blocks read their Linear weights directly (fused fast path), so they stay float32
+_UNQUANTIZABLE_BLOCKS = (nn.MultiheadAttention, nn.TransformerEncoderLayer, nn.TransformerDecoderLayer)
+
+
+def _is_stem_or_branch(name: str) -> bool:
+    top = name.split(".")[0]
+    return top in QUANTIZED_STEMS or top.endswith(QUANTIZED_BRANCH_SUFFIX) or top.startswith(QUANTIZED_HEAD_PREFIX)
+
+
+def _mlp_linear_names(model: nn.Module):
+    """Qualified names of the stem/branch nn.Linear layers outside attention blocks."""
+    blocks = [name for name, module in model.named_modules() if isinstance(module, _UNQUANTIZABLE_BLOCKS)]
+    return {
+        name for name, module in model.named_modules()
+        if type(module) is nn.Linear
+        and _is_stem_or_branch(name)
+        and not any(name.startswith(block + ".") for block in blocks)
+    }
+
+
+def _to_float32(output: Any) -> Any:
+    """Cast the floating tensors of a (nested tuple/list of) output back to float32."""
+    if isinstance(output, torch.Tensor):
+        return output.float() if output.is_floating_point() else output
+    if isinstance(output, (tuple, list)):
+        return type(output)(_to_float32(item) for item in output)
+    return output
+
+
+class AutocastWrapper(nn.Module):
+    """
+    Runs a model's inference entry points under ``torch.autocast``.
+
+    Exposes the same interface the serving code uses (``forward``,
+    ``predict_state``, ``predict_state_chunk`` and the capability flags), with
+    float32 outputs.
+    """
+
+    def __init__(self, model: nn.Module, dtype: torch.dtype = torch.bfloat16) -> None:
+        super().__init__()
+        self.model = model
+        self.dtype = dtype
+        self.requires_initial_state = bool(getattr(model, "requires_initial_state", False))
+        self.supports_chunked_inference = bool(getattr(model, "supports_chunked_inference", False))
+
+    def _autocast(self):
+        device_type = next(self.model.parameters()).device.type
+        return torch.autocast(device_type=device_type, dtype=self.dtype)
+
+    def forward(self, *args, **kwargs):
+        with self._autocast():
+            return _to_float32(self.model(*args, **kwargs))
+
+    def predict_state(self, t: torch.Tensor, context: torch.Tensor) -> torch.Tensor:
+        with self._autocast():
+            if hasattr(self.model, "predict_state"):
+                return _to_float32(self.model.predict_state(t, context))
+            output = self.model(t, context)
+        output = _to_float32(output)
+        return output[0] if isinstance(output, (tuple, list)) else output
+
+    def predict_state_chunk(self, *args, **kwargs) -> torch.Tensor:
+        with self._autocast():
+            return _to_float32(self.model.predict_state_chunk(*args, **kwargs))
+
+
+def quantize_int8(model: nn.Module) -> Tuple[nn.Module, int]:
+    """
+    Dynamic int8 quantization of the stem and branch ``nn.Linear`` layers.
+
+    Args:
+        model: Float32 model on CPU; not modified
+
+    Returns:
+        (quantized copy, number of quantized layers)
+
+    Raises:
+        ValueError: If the model has no stem/branch Linear layers
+    """
+    names = _mlp_linear_names(model)
+    if not names:
+        raise ValueError(f"{type(model).__name__} has no stem/branch Linear layers to quantize")
+    quantized = torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(model), qconfig_spec=names, dtype=torch.qint8
+    )
+    return quantized.eval(), len(names)
+
+
+def apply_precision(model: nn.Module, mode: str) -> nn.Module:
+    """
+    Inference model for a precision mode.
+
+    Args:
+        model: Trained float32 model (eval mode); not modified
+        mode: One of PRECISION_MODES
+
+    Returns:
+        ``model`` itself for float32, otherwise a new module with the same
+        inference interface
+    """
+    if mode not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision mode '{mode}', expected one of {', '.join(PRECISION_MODES)}")
+    if mode == "float32":
+        return model
+    if mode == "bfloat16":
+        return AutocastWrapper(model, torch.bfloat16).eval()
+    if next(model.parameters()).device.type != "cpu":
+        raise ValueError("int8 dynamic quantization is only supported on CPU")
+    return quantize_int8(model)[0]
+
+
+def predict_state(
+    model: nn.Module,
+    t: torch.Tensor,
+    context: torch.Tensor,
+    initial_state: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    """State-only prediction [B, N, 14] for any servable model."""
+    with torch.no_grad():
+        if getattr(model, "requires_initial_state", False):
+            output = model(t, context, initial_state)
+        elif hasattr(model, "predict_state"):
+            return model.predict_state(t, context)
+        else:
+            output = model(t, context)
+    return output[0] if isinstance(output, (tuple, list)) else output
+
+
+def max_relative_error(reference: torch.Tensor, candidate: torch.Tensor) -> float:
+    """
+    Largest deviation of candidate from reference over all points, each of the
+    14 state components scaled by its range in the reference.
+    """
+    reference = reference.detach().float().reshape(-1, reference.shape[-1])
+    candidate = candidate.detach().float().reshape(-1, candidate.shape[-1])
+    span = reference.max(dim=0).values - reference.min(dim=0).values
+    span = torch.where(span > 0, span, torch.ones_like(span))
+    return float(((candidate - reference).abs() / span).max())
@@ -0,0 +1,178 @@
+"""
+TorchScript export of Direction AN for inference.
+
+Serving only needs the packed state, so the exported graph traces the model's
+inference-only ``predict_state`` path: the physics residual layer loops over
+time steps in Python and would be unrolled to a fixed length by tracing.
+The traced wrapper is frozen and passed through
+``torch.jit.optimize_for_inference``.
+
+The artifact is written next to the checkpoint (``best.torchscript.pt``) with
+a ``metadata.json`` extra file recording the sha256 of the checkpoint it was
+exported from, so a stale artifact is never served after ``best.pt`` changes.
+
+Usage (from the project_1 directory):
+    python -m src.export.torchscript --checkpoint best.pt --config config.yaml
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import warnings
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import torch
+import torch.nn as nn
+import yaml
+
+ARTIFACT_NAME = "best.torchscript.pt"
+METADATA_FILE = "metadata.json"
+
+
+class StateOnlyWrapper(nn.Module):
+    """Wraps a model as ``(t [B, N, 1], context [B, C]) -> state [B, N, 14]``."""
+
+    def __init__(self, model: nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, t: torch.Tensor, context: torch.Tensor) -> torch.Tensor:
+        if hasattr(self.model, "predict_state"):
+            return self.model.predict_state(t, context)
+        output = self.model(t, context)
+        if isinstance(output, (tuple, list)):
+            return output[0]
+        return output
+
+
+def _example_inputs(batch: int, n_points: int, context_dim: int) -> Tuple[torch.Tensor, torch.Tensor]:
+    t = torch.linspace(0.0, 1.0, n_points).view(1, n_points, 1).repeat(batch, 1, 1)
+    context = torch.randn(batch, context_dim)
+    return t, context
+
+
+def file_sha256(path) -> str:
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_torchscript(
+    model: nn.Module,
+    output_path,
+    context_dim: int,
+    metadata: Optional[Dict] = None,
+    optimize: bool = True,
+) -> Path:
+    """
+    Trace, freeze and save a model for inference.
+
+    Args:
+        model: Trained model (eager); not modified
+        output_path: Where to write the TorchScript artifact
+        context_dim: Context vector size
+        metadata: Extra JSON-serialisable info stored in the artifact
+        optimize: Run torch.jit.optimize_for_inference after freezing
+
+    Returns:
+        Path to the written artifact
+    """
+    wrapper = StateOnlyWrapper(model).eval()
+    example = _example_inputs(2, 64, context_dim)
+    # Check the trace generalises over batch size and grid length
+    check = _example_inputs(3, 17, context_dim)
+
+    # Shape-dependent Python branches raise TracerWarnings; check_inputs verifies
+    # the traced graph on a second shape instead
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", torch.jit.TracerWarning)
+        traced = torch.jit.trace(wrapper, example, check_inputs=[example, check])
+    frozen = torch.jit.freeze(traced.eval())
+    if optimize:
+        frozen = torch.jit.optimize_for_inference(frozen)
+
+    output_path = Path(output_path)
+    meta = {"context_dim": context_dim, "optimized": optimize, **(metadata or {})}
+    torch.jit.save(frozen, str(output_path), _extra_files={METADATA_FILE: json.dumps(meta)})
+    return output_path
+
+
+def load_torchscript(path, map_location="cpu") -> Tuple[torch.jit.ScriptModule, Dict]:
+    """
+    Load an exported artifact.
+
+    Returns:
+        Tuple of (module, metadata)
+    """
+    extra_files = {METADATA_FILE: ""}
+    module = torch.jit.load(str(path), map_location=map_location, _extra_files=extra_files)
+    raw = extra_files[METADATA_FILE]
+    metadata = json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw or "{}")
+    return module, metadata
+
+
+def build_direction_an(model_cfg: Dict, context_dim: int) -> nn.Module:
+    """Build a DirectionANPINN from the ``model`` section of config.yaml."""
+    from src.models.direction_an_pinn import DirectionANPINN
+
+    return DirectionANPINN(
+        context_dim=context_dim,
+        fourier_features=int(model_cfg.get("fourier_features", 8)),
+        stem_hidden_dim=int(model_cfg.get("stem_hidden_dim", 128)),
+        stem_layers=int(model_cfg.get("stem_layers", 4)),
+        activation=model_cfg.get("activation", "tanh"),
+        layer_norm=bool(model_cfg.get("layer_norm", True)),
+        translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
+        rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
+        mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
+        dropout=float(model_cfg.get("dropout", 0.0)),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export Direction AN to TorchScript")
+    parser.add_argument("--checkpoint", type=str, default="best.pt")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--context-dim", type=int, default=7)
+    parser.add_argument("--output", type=str, default=None, help=f"Default: {ARTIFACT_NAME} next to the checkpoint")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip optimize_for_inference")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    model_cfg = config.get("model", {})
+    if model_cfg.get("type", "direction_an").lower() != "direction_an":
+        raise SystemExit(f"Unsupported model type for export: {model_cfg.get('type')}")
+
+    model = build_direction_an(model_cfg, args.context_dim)
+    checkpoint = torch.load(args.checkpoint, map_location="cpu", weights_only=False)
+    model.load_state_dict(checkpoint.get("model_state_dict", checkpoint))
+    model.eval()
+
+    output = Path(args.output) if args.output else Path(args.checkpoint).with_name(ARTIFACT_NAME)
+    export_torchscript(
+        model,
+        output,
+        context_dim=args.context_dim,
+        metadata={"checkpoint_sha256": file_sha256(args.checkpoint)},
+        optimize=not args.no_optimize,
+    )
+
+    # Parity check against eager mode
+    scripted, _ = load_torchscript(output)
+    t, context = _example_inputs(4, 1501, args.context_dim)
+    with torch.no_grad():
+        eager_state = StateOnlyWrapper(model)(t, context)
+        scripted_state = scripted(t, context)
+    max_err = (eager_state - scripted_state).abs().max().item()
+    print(f"Saved {output} (max |eager - scripted| = {max_err:.2e})")
+
+
+if __name__ == "__main__":
+    main()
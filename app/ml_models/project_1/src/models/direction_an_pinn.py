@@ -37,12 +37,14 @@ import torch.nn as nn
 
 from .architectures import FourierFeatures, ContextEncoder, normalize_quaternion
 from .branches import (
+    TranslationBranch,
     TranslationBranchReducedXYFree,
     RotationBranch,
     MassBranch,
     MonotonicMassBranch,
 )
 from src.physics.physics_residual_layer import PhysicsResidualLayer, PhysicsResiduals
+from src.utils.profiler import profile_stage
 from .input_block_v2 import InputBlockV2
 
 
@@ -177,16 +179,23 @@ class DirectionANPINN(nn.Module):
     - Translation branch: [vx, vy, z, vz] (x,y reconstructed by integration)
     - Rotation branch: quaternion + angular rates
     - Mass branch: scalar mass
-    - Physics layer: `PhysicsResidualLayer`
+    - Physics layer: `PhysicsResidualLayer` (stencil order
+      `physics_derivative_order`; train_pinn sets it to loss.derivative_order)
 
     Forward returns:
         state_pred, physics_residuals
     where:
         state_pred       : [..., 14] packed state
         physics_residuals: PhysicsResiduals dataclass
+
+    Use `predict_state` for inference: it returns only the state and skips
+    the physics residual layer. The stem and branches are pointwise in t, so
+    long grids can also be evaluated piecewise with `predict_state_chunk`.
     """
 
     requires_initial_state = False
+    accepts_environment = True  # forward(..., env=...) feeds the physics layer
+    supports_chunked_inference = True
 
     def __init__(
         self,
@@ -202,6 +211,7 @@ class DirectionANPINN(nn.Module):
         dropout: float = 0.0,
         physics_params: Optional[dict] = None,
         physics_scales: Optional[dict] = None,
+        physics_derivative_order: int = 2,
     ) -> None:
         super().__init__()
 
@@ -241,6 +251,7 @@ class DirectionANPINN(nn.Module):
         self.physics_layer = PhysicsResidualLayer(
             physics_params=physics_params,
             scales=physics_scales,
+            derivative_order=physics_derivative_order,
         )
 
     def forward(
@@ -250,6 +261,7 @@ class DirectionANPINN(nn.Module):
         control: Optional[torch.Tensor] = None,
         T_mag: Optional[torch.Tensor] = None,
         q_dyn: Optional[torch.Tensor] = None,
+        env: Optional[dict] = None,
     ) -> Tuple[torch.Tensor, PhysicsResiduals]:
         """
         Full forward pass.
@@ -258,11 +270,78 @@ class DirectionANPINN(nn.Module):
             t: Time [..., 1] or [batch, N, 1]
             context: Context [..., context_dim] or [batch, context_dim]
             control: Optional control trajectory [..., 4] or [batch, N, 4]
+            env: Optional per-case environment for the physics residuals
+                 (environment_params entries, [batch] tensors)
 
         Returns:
             state: Predicted state [..., 14]
             residuals: PhysicsResiduals object
         """
+        state, t_model = self._compute_state(t, context)
+
+        # 3. Physics residuals (autograd-based)
+        residuals = self.physics_layer(t_model, state, control=control, env=env)
+
+        return state, residuals
+
+    def predict_state(self, t: torch.Tensor, context: torch.Tensor) -> torch.Tensor:
+        """
+        Inference-only forward pass: packed state without physics residuals.
+
+        Args:
+            t: Time [..., 1] or [batch, N, 1]
+            context: Context [..., context_dim] or [batch, context_dim]
+
+        Returns:
+            state: Predicted state [batch, N, 14]
+        """
+        state, _ = self._compute_state(t, context)
+        return state
+
+    def predict_state_chunk(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        carry: Optional[torch.Tensor] = None,
+        dt: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        Inference on one consecutive piece of a longer time grid.
+
+        Only the x/y velocity integration and the cumulative mass carry
+        information across points; both restart from `carry`, the last packed
+        state of the previous chunk. Concatenating the chunks reproduces
+        `predict_state` on the full grid.
+
+        Args:
+            t: Time chunk [batch, n, 1]
+            context: Context [batch, context_dim]
+            carry: Last state of the previous chunk [batch, 14], None for the first chunk
+            dt: Grid spacing [batch] (nondim); required when chunks may hold a single point
+
+        Returns:
+            state: Predicted state [batch, n, 14]; state[:, -1] is the next carry
+        """
+        state, _ = self._compute_state(t, context, carry=carry, dt=dt)
+        return state
+
+    def _compute_state(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        carry: Optional[torch.Tensor] = None,
+        dt: Optional[torch.Tensor] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Shared stem + mission branches.
+
+        Args:
+            carry, dt: See `predict_state_chunk`
+
+        Returns:
+            state: Packed state [batch, N, 14]
+            t_model: Time in batched layout (input to the physics layer)
+        """
         # Use the same time tensor for physics layer (finite differences don't need gradients)
         t_model = t
 
@@ -296,6 +375,11 @@ class DirectionANPINN(nn.Module):
         
         m0 = m0_ctx.unsqueeze(1)  # [batch, 1, 1]
         mdry = mdry_ctx.unsqueeze(1)  # [batch, 1, 1]
+        if carry is not None:
+            # Continue the cumulative mass from the previous chunk. Once the
+            # clamp below is active it stays active (deltas are <= 0), so the
+            # clamped value is an exact restart point.
+            m0 = carry[:, 13:14].unsqueeze(1)
         mass_out = self.mass_branch(latent, m0)  # [batch, N, 1], structurally decreasing
         mass_out = torch.clamp(mass_out, min=mdry)  # Enforce lower bound m_dry
 
@@ -317,7 +401,9 @@ class DirectionANPINN(nn.Module):
             t_for_dt = t_model.unsqueeze(0)
         else:
             t_for_dt = t_model
-        if N > 1:
+        if dt is not None:
+            dt_scalar = dt.to(latent.dtype).view(-1, 1, 1)
+        elif N > 1:
             dt_scalar = (t_for_dt[:, 1, 0] - t_for_dt[:, 0, 0]).view(batch_size, 1, 1)
         else:
             dt_scalar = torch.ones(
@@ -325,11 +411,20 @@ class DirectionANPINN(nn.Module):
             )
 
         # Use left-point rule with x(0)=y(0)=0 enforced exactly.
-        zero_pad = torch.zeros_like(vx_pred[:, 0:1, :])
-        vx_for_int = torch.cat([zero_pad, vx_pred[:, :-1, :]], dim=1)
-        vy_for_int = torch.cat([zero_pad, vy_pred[:, :-1, :]], dim=1)
-        x_pred = torch.cumsum(vx_for_int, dim=1) * dt_scalar
-        y_pred = torch.cumsum(vy_for_int, dim=1) * dt_scalar
+        with profile_stage("position_reconstruction"):
+            if carry is None:
+                vx_pad = vy_pad = torch.zeros_like(vx_pred[:, 0:1, :])
+            else:
+                # Previous chunk's last velocity opens this chunk's integral
+                vx_pad = carry[:, 3:4].unsqueeze(1)
+                vy_pad = carry[:, 4:5].unsqueeze(1)
+            vx_for_int = torch.cat([vx_pad, vx_pred[:, :-1, :]], dim=1)
+            vy_for_int = torch.cat([vy_pad, vy_pred[:, :-1, :]], dim=1)
+            x_pred = torch.cumsum(vx_for_int, dim=1) * dt_scalar
+            y_pred = torch.cumsum(vy_for_int, dim=1) * dt_scalar
+            if carry is not None:
+                x_pred = x_pred + carry[:, 0:1].unsqueeze(1)
+                y_pred = y_pred + carry[:, 1:2].unsqueeze(1)
 
         v_pred = torch.cat([vx_pred, vy_pred, vz_pred], dim=-1)  # [batch, N, 3]
         pos_pred = torch.cat([x_pred, y_pred, z_pred], dim=-1)  # [batch, N, 3]
@@ -340,10 +435,7 @@ class DirectionANPINN(nn.Module):
             dim=-1,
         )  # [batch, N, 14], with x,y reconstructed via integration
 
-        # 3. Physics residuals (autograd-based)
-        residuals = self.physics_layer(t_model, state, control=control)
-
-        return state, residuals
+        return state, t_model
 
     def predict_trajectory(
         self,
@@ -354,8 +446,7 @@ class DirectionANPINN(nn.Module):
         """
         Convenience wrapper returning only the state prediction.
         """
-        state, _ = self.forward(t, context, control)
-        return state
+        return self.predict_state(t, context)
 
 
 class DirectionANPINN_AN1(nn.Module):
@@ -372,9 +463,13 @@ class DirectionANPINN_AN1(nn.Module):
     where:
         state_pred       : [..., 14] packed state
         physics_residuals: PhysicsResiduals dataclass
+
+    Use `predict_state` for inference: it returns only the state and skips
+    the physics residual layer.
     """
     
     requires_initial_state = False
+    accepts_environment = True  # forward(..., env=...) feeds the physics layer
     
     def __init__(
         self,
@@ -392,6 +487,7 @@ class DirectionANPINN_AN1(nn.Module):
         dropout: float = 0.0,
         physics_params: Optional[dict] = None,
         physics_scales: Optional[dict] = None,
+        physics_derivative_order: int = 2,
     ) -> None:
         super().__init__()
         
@@ -452,6 +548,7 @@ class DirectionANPINN_AN1(nn.Module):
         self.physics_layer = PhysicsResidualLayer(
             physics_params=physics_params,
             scales=physics_scales,
+            derivative_order=physics_derivative_order,
         )
     
     def _ensure_batched(
@@ -477,6 +574,7 @@ class DirectionANPINN_AN1(nn.Module):
         control: Optional[torch.Tensor] = None,
         T_mag: torch.Tensor = None,
         q_dyn: torch.Tensor = None,
+        env: Optional[dict] = None,
     ) -> Tuple[torch.Tensor, PhysicsResiduals]:
         """
         Full forward pass with v2 features.
@@ -487,11 +585,53 @@ class DirectionANPINN_AN1(nn.Module):
             control: Optional control trajectory [..., 4] or [batch, N, 4]
             T_mag: Thrust magnitude [..., 1] or [batch, N, 1] (required for v2)
             q_dyn: Dynamic pressure [..., 1] or [batch, N, 1] (required for v2)
+            env: Optional per-case environment for the physics residuals
+                 (environment_params entries, [batch] tensors)
             
         Returns:
             state: Predicted state [..., 14]
             residuals: PhysicsResiduals object
         """
+        state, t, was_unbatched = self._compute_state(t, context, T_mag, q_dyn)
+        
+        # Physics residuals (finite-difference based)
+        residuals = self.physics_layer(t, state, control=control, env=env)
+        
+        if was_unbatched:
+            state = state.squeeze(0)
+        
+        return state, residuals
+    
+    def predict_state(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        T_mag: torch.Tensor = None,
+        q_dyn: torch.Tensor = None,
+    ) -> torch.Tensor:
+        """
+        Inference-only forward pass: packed state without physics residuals.
+        """
+        state, _, was_unbatched = self._compute_state(t, context, T_mag, q_dyn)
+        if was_unbatched:
+            state = state.squeeze(0)
+        return state
+    
+    def _compute_state(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        T_mag: torch.Tensor,
+        q_dyn: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, bool]:
+        """
+        Input block + mission branches.
+        
+        Returns:
+            state: Packed state [batch, N, 14]
+            t: Time in batched layout (input to the physics layer)
+            was_unbatched: Whether the inputs were unbatched
+        """
         if T_mag is None or q_dyn is None:
             raise ValueError("DirectionANPINN_AN1 requires T_mag and q_dyn (v2 features)")
         
@@ -584,11 +724,12 @@ class DirectionANPINN_AN1(nn.Module):
             )
 
         # Use left-point rule with x(0)=y(0)=0 enforced exactly.
-        zero_pad = torch.zeros_like(vx_pred[:, 0:1, :])
-        vx_for_int = torch.cat([zero_pad, vx_pred[:, :-1, :]], dim=1)
-        vy_for_int = torch.cat([zero_pad, vy_pred[:, :-1, :]], dim=1)
-        x_pred = torch.cumsum(vx_for_int, dim=1) * dt_scalar
-        y_pred = torch.cumsum(vy_for_int, dim=1) * dt_scalar
+        with profile_stage("position_reconstruction"):
+            zero_pad = torch.zeros_like(vx_pred[:, 0:1, :])
+            vx_for_int = torch.cat([zero_pad, vx_pred[:, :-1, :]], dim=1)
+            vy_for_int = torch.cat([zero_pad, vy_pred[:, :-1, :]], dim=1)
+            x_pred = torch.cumsum(vx_for_int, dim=1) * dt_scalar
+            y_pred = torch.cumsum(vy_for_int, dim=1) * dt_scalar
 
         v_pred = torch.cat([vx_pred, vy_pred, vz_pred], dim=-1)  # [batch, N, 3]
         pos_pred = torch.cat([x_pred, y_pred, z_pred], dim=-1)  # [batch, N, 3]
@@ -599,13 +740,7 @@ class DirectionANPINN_AN1(nn.Module):
             dim=-1,
         )  # [batch, N, 14], with x,y reconstructed via integration
         
-        # Physics residuals (finite-difference based)
-        residuals = self.physics_layer(t, state, control=control)
-        
-        if was_unbatched:
-            state = state.squeeze(0)
-        
-        return state, residuals
+        return state, t, was_unbatched
     
     def predict_trajectory(
         self,
@@ -618,8 +753,7 @@ class DirectionANPINN_AN1(nn.Module):
         """
         Convenience wrapper returning only the state prediction.
         """
-        state, _ = self.forward(t, context, control, T_mag=T_mag, q_dyn=q_dyn)
-        return state
+        return self.predict_state(t, context, T_mag=T_mag, q_dyn=q_dyn)
 
 
 class DirectionANPINN_AN2(nn.Module):
@@ -633,6 +767,7 @@ class DirectionANPINN_AN2(nn.Module):
     """
 
     requires_initial_state = False
+    accepts_environment = True  # forward(..., env=...) feeds the physics layer
 
     def __init__(
         self,
@@ -648,6 +783,7 @@ class DirectionANPINN_AN2(nn.Module):
         dropout: float = 0.0,
         physics_params: Optional[dict] = None,
         physics_scales: Optional[dict] = None,
+        physics_derivative_order: int = 2,
         use_v2_inputs: bool = False,
         extra_embedding_dim: int = 16,
         context_embedding_dim: int = 32,
@@ -724,6 +860,7 @@ class DirectionANPINN_AN2(nn.Module):
         self.physics_layer = PhysicsResidualLayer(
             physics_params=physics_params,
             scales=physics_scales,
+            derivative_order=physics_derivative_order,
         )
 
     def _ensure_batched(
@@ -749,9 +886,49 @@ class DirectionANPINN_AN2(nn.Module):
         control: Optional[torch.Tensor] = None,
         T_mag: Optional[torch.Tensor] = None,
         q_dyn: Optional[torch.Tensor] = None,
+        env: Optional[dict] = None,
     ) -> Tuple[torch.Tensor, PhysicsResiduals]:
         """
-        Forward pass with optional v2 features.
+        Forward pass with optional v2 features and per-case environment (env).
+        """
+        state, t, was_unbatched = self._compute_state(t, context, T_mag, q_dyn)
+
+        residuals = self.physics_layer(t, state, control=control, env=env)
+
+        if was_unbatched:
+            state = state.squeeze(0)
+
+        return state, residuals
+
+    def predict_state(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        T_mag: Optional[torch.Tensor] = None,
+        q_dyn: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        """
+        Inference-only forward pass: packed state without physics residuals.
+        """
+        state, _, was_unbatched = self._compute_state(t, context, T_mag, q_dyn)
+        if was_unbatched:
+            state = state.squeeze(0)
+        return state
+
+    def _compute_state(
+        self,
+        t: torch.Tensor,
+        context: torch.Tensor,
+        T_mag: Optional[torch.Tensor],
+        q_dyn: Optional[torch.Tensor],
+    ) -> Tuple[torch.Tensor, torch.Tensor, bool]:
+        """
+        Stem (or v2 input block) + mission branches.
+
+        Returns:
+            state: Packed state [batch, N, 14]
+            t: Time in batched layout (input to the physics layer)
+            was_unbatched: Whether the inputs were unbatched
         """
         t, context, was_unbatched = self._ensure_batched(t, context)
 
@@ -803,12 +980,7 @@ class DirectionANPINN_AN2(nn.Module):
 
         state = torch.cat([x_pred, v_pred, q_pred, w_pred, mass_out], dim=-1)
 
-        residuals = self.physics_layer(t, state, control=control)
-
-        if was_unbatched:
-            state = state.squeeze(0)
-
-        return state, residuals
+        return state, t, was_unbatched
 
     def predict_trajectory(
         self,
@@ -818,6 +990,5 @@ class DirectionANPINN_AN2(nn.Module):
         T_mag: Optional[torch.Tensor] = None,
         q_dyn: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
-        state, _ = self.forward(t, context, control, T_mag, q_dyn)
-        return state
+        return self.predict_state(t, context, T_mag, q_dyn)
 
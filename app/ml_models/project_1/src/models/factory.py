@@ -0,0 +1,302 @@
+"""
+Model factory: builds any supported PINN architecture from the ``model``
+section of a training config.
+
+Shared by the training entry point and the serving layer so that a
+checkpoint is always rebuilt with the architecture it was trained with.
+"""
+
+from typing import Dict, Optional
+
+import torch.nn as nn
+
+from src.models.pinn import PINN
+
+MODEL_TYPES = (
+    "pinn", "latent_ode", "sequence", "hybrid", "hybrid_c1", "hybrid_c2", "hybrid_c3",
+    "direction_d", "direction_d1", "direction_d15", "direction_d154", "direction_an", "direction_an1",
+)
+
+
+def safe_float(value, default=None):
+    """Safely convert value to float, handling strings like '1e-3'."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return default
+    return default
+
+
+def build_model(
+    model_cfg: Dict,
+    context_dim: int,
+    physics_params: Optional[Dict] = None,
+    scales: Optional[Dict] = None,
+) -> nn.Module:
+    """
+    Instantiate the architecture named by ``model_cfg["type"]``.
+
+    Args:
+        model_cfg: ``model`` section of config.yaml
+        context_dim: Context vector dimension
+        physics_params: Physical parameters for models with a physics layer
+        scales: Nondimensionalization scales dict for models with a physics layer
+
+    Returns:
+        Freshly initialised model (on CPU)
+
+    Raises:
+        ValueError: If the model type is unknown
+    """
+    model_type = model_cfg.get("type", "pinn").lower()
+    
+    if model_type == "pinn":
+        model = PINN(
+            context_dim=context_dim,
+            n_hidden=int(model_cfg.get("n_hidden", 6)),
+            n_neurons=int(model_cfg.get("n_neurons", 128)),
+            activation=model_cfg.get("activation", "tanh"),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05)
+        )
+    elif model_type == "direction_d":
+        from src.models.direction_d_pinn import DirectionDPINN
+        
+        model = DirectionDPINN(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
+            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
+            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
+            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
+            activation=model_cfg.get("activation", "gelu"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+        )
+    elif model_type == "direction_d1":
+        from src.models.direction_d_pinn import DirectionDPINN_D1
+        
+        model = DirectionDPINN_D1(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
+            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
+            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
+            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
+            activation=model_cfg.get("activation", "gelu"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+            integration_method=model_cfg.get("integration_method", "rk4"),
+            use_physics_aware=bool(model_cfg.get("use_physics_aware", True)),
+        )
+    elif model_type == "direction_d15":
+        from src.models.direction_d_pinn import DirectionDPINN_D15
+
+        model = DirectionDPINN_D15(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
+            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
+            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
+            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
+            activation=model_cfg.get("activation", "gelu"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+            use_rotation_6d=bool(model_cfg.get("use_rotation_6d", True)),
+            enforce_mass_monotonicity=bool(model_cfg.get("enforce_mass_monotonicity", False)),
+        )
+    elif model_type == "direction_an":
+        from src.models.direction_an_pinn import DirectionANPINN
+
+        model = DirectionANPINN(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            stem_hidden_dim=int(model_cfg.get("stem_hidden_dim", 128)),
+            stem_layers=int(model_cfg.get("stem_layers", 4)),
+            activation=model_cfg.get("activation", "tanh"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
+            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
+            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+            physics_params=physics_params,
+            physics_scales=scales,
+            physics_derivative_order=int(model_cfg.get("physics_derivative_order", 2)),
+        )
+    elif model_type == "direction_d154":
+        from src.models.direction_d_pinn import DirectionDPINN_D154
+        
+        model = DirectionDPINN_D154(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            extra_embedding_dim=int(model_cfg.get("extra_embedding_dim", 16)),
+            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
+            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
+            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
+            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
+            activation=model_cfg.get("activation", "gelu"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+            use_rotation_6d=bool(model_cfg.get("use_rotation_6d", True)),
+            enforce_mass_monotonicity=bool(model_cfg.get("enforce_mass_monotonicity", False)),
+        )
+    elif model_type == "direction_an1":
+        from src.models.direction_an_pinn import DirectionANPINN_AN1
+
+        model = DirectionANPINN_AN1(
+            context_dim=context_dim,
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            extra_embedding_dim=int(model_cfg.get("extra_embedding_dim", 16)),
+            stem_hidden_dim=int(model_cfg.get("stem_hidden_dim", 128)),
+            stem_layers=int(model_cfg.get("stem_layers", 4)),
+            activation=model_cfg.get("activation", "tanh"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
+            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
+            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
+            dropout=safe_float(model_cfg.get("dropout"), 0.0),
+            physics_params=physics_params,
+            physics_scales=scales,
+            physics_derivative_order=int(model_cfg.get("physics_derivative_order", 2)),
+        )
+    elif model_type == "latent_ode":
+        from src.models.latent_ode import RocketLatentODEPINN
+        model = RocketLatentODEPINN(
+            context_dim=context_dim,
+            latent_dim=int(model_cfg.get("latent_dim", 64)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
+            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
+            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
+            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
+            activation=model_cfg.get("activation", "tanh"),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05)
+        )
+    elif model_type == "sequence":
+        from src.models.sequence_pinn import RocketSequencePINN
+
+        model = RocketSequencePINN(
+            context_dim=context_dim,
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            d_model=int(model_cfg.get("d_model", 128)),
+            n_layers=int(model_cfg.get("n_layers", 4)),
+            n_heads=int(model_cfg.get("n_heads", 4)),
+            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05),
+            activation=model_cfg.get("transformer_activation", "gelu"),
+        )
+    elif model_type == "hybrid":
+        from src.models.hybrid_pinn import RocketHybridPINN
+
+        model = RocketHybridPINN(
+            context_dim=context_dim,
+            latent_dim=int(model_cfg.get("latent_dim", 64)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            d_model=int(model_cfg.get("d_model", 128)),
+            n_layers=int(model_cfg.get("n_layers", 2)),
+            n_heads=int(model_cfg.get("n_heads", 4)),
+            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
+            encoder_window=int(model_cfg.get("encoder_window", 10)),
+            activation=model_cfg.get("activation", "tanh"),
+            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
+            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
+            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
+            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
+            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05),
+        )
+    elif model_type == "hybrid_c1":
+        from src.models.hybrid_pinn import RocketHybridPINNC1
+
+        model = RocketHybridPINNC1(
+            context_dim=context_dim,
+            latent_dim=int(model_cfg.get("latent_dim", 64)),
+            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            d_model=int(model_cfg.get("d_model", 128)),
+            n_layers=int(model_cfg.get("n_layers", 2)),
+            n_heads=int(model_cfg.get("n_heads", 4)),
+            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
+            encoder_window=int(model_cfg.get("encoder_window", 10)),
+            activation=model_cfg.get("activation", "tanh"),
+            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
+            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
+            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
+            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
+            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05),
+            debug_stats=bool(model_cfg.get("debug_stats", True)),
+        )
+    elif model_type == "hybrid_c2":
+        from src.models.hybrid_pinn import RocketHybridPINNC2
+
+        model = RocketHybridPINNC2(
+            context_dim=context_dim,
+            latent_dim=int(model_cfg.get("latent_dim", 64)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            shared_stem_hidden_dim=int(model_cfg.get("shared_stem_hidden_dim", 128)),
+            temporal_type=model_cfg.get("temporal_type", "transformer"),
+            temporal_n_layers=int(model_cfg.get("temporal_n_layers", 4)),
+            temporal_n_heads=int(model_cfg.get("temporal_n_heads", 4)),
+            temporal_dim_feedforward=int(model_cfg.get("temporal_dim_feedforward", 512)),
+            encoder_window=int(model_cfg.get("encoder_window", 10)),
+            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
+            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
+            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
+            activation=model_cfg.get("activation", "tanh"),
+            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
+            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
+            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05),
+            debug_stats=bool(model_cfg.get("debug_stats", True)),
+        )
+    elif model_type == "hybrid_c3":
+        from src.models.hybrid_pinn import RocketHybridPINNC3
+
+        model = RocketHybridPINNC3(
+            context_dim=context_dim,
+            latent_dim=int(model_cfg.get("latent_dim", 64)),
+            fourier_features=int(model_cfg.get("fourier_features", 8)),
+            shared_stem_hidden_dim=int(model_cfg.get("shared_stem_hidden_dim", 128)),
+            temporal_type=model_cfg.get("temporal_type", "transformer"),
+            temporal_n_layers=int(model_cfg.get("temporal_n_layers", 4)),
+            temporal_n_heads=int(model_cfg.get("temporal_n_heads", 4)),
+            temporal_dim_feedforward=int(model_cfg.get("temporal_dim_feedforward", 512)),
+            encoder_window=int(model_cfg.get("encoder_window", 10)),
+            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
+            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
+            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
+            activation=model_cfg.get("activation", "tanh"),
+            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
+            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
+            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
+            layer_norm=bool(model_cfg.get("layer_norm", True)),
+            dropout=safe_float(model_cfg.get("dropout"), 0.05),
+            debug_stats=bool(model_cfg.get("debug_stats", True)),
+            use_physics_aware_translation=bool(model_cfg.get("use_physics_aware_translation", False)),
+            use_coordinated_branches=bool(model_cfg.get("use_coordinated_branches", False)),
+        )
+    else:
+        raise ValueError(
+            f"Unknown model type: {model_type}. Supported: {', '.join(MODEL_TYPES)}"
+        )
+
+    return model
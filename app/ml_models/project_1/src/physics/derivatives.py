@@ -0,0 +1,109 @@
+"""
+Vectorized finite-difference time derivatives on non-uniform grids.
+
+Shared by PhysicsResidualLayer, PINNLoss and PINNLossV2. Every point i uses a
+stencil of `order + 1` consecutive samples: centred in the interior and
+shifted inwards at the boundaries, so the stencil order holds everywhere.
+The stencil weights are the derivatives of the Lagrange basis polynomials
+through the actual sample times, which makes the operator exact for
+polynomials of degree <= order on any (strictly increasing) grid.
+
+All points are evaluated at once with gathered stencils: no Python loop over
+time steps, so a 1,501-point trajectory costs a handful of kernel launches.
+"""
+
+from __future__ import annotations
+
+import torch
+
+STENCIL_ORDERS = (1, 2, 4)
+
+
+def stencil_indices(N: int, order: int, device: torch.device = None) -> torch.Tensor:
+    """
+    Sample indices used for the derivative at each point.
+
+    Args:
+        N: Number of time points (>= order + 1)
+        order: Stencil order (1: forward, 2: 3-point, 4: 5-point)
+        device: Device of the returned index tensor
+
+    Returns:
+        idx: [N, order + 1] long tensor of consecutive indices
+    """
+    size = order + 1
+    start = torch.arange(N, device=device) - order // 2
+    start = start.clamp(min=0, max=N - size)
+    return start.unsqueeze(-1) + torch.arange(size, device=device)
+
+
+def stencil_weights(t_nodes: torch.Tensor, center: torch.Tensor, eps: float = 1e-12) -> torch.Tensor:
+    """
+    First-derivative weights of the Lagrange interpolant through t_nodes.
+
+    Args:
+        t_nodes: Sample times [..., S]
+        center: Position of the evaluation point within each stencil [..., 1] (long)
+        eps: Floor on |t_j - t_m| to keep the weights finite on degenerate grids
+
+    Returns:
+        w: [..., S] weights with sum_j w_j * f(t_j) ~= f'(t_center)
+    """
+    S = t_nodes.shape[-1]
+    eye = torch.eye(S, dtype=torch.bool, device=t_nodes.device)
+    is_center = torch.nn.functional.one_hot(center.squeeze(-1), S).bool()  # [..., S]
+
+    # denom_j = prod_{m != j} (t_j - t_m)
+    diff = t_nodes.unsqueeze(-1) - t_nodes.unsqueeze(-2)  # [..., S, S]
+    diff = torch.where(diff >= 0, diff.clamp_min(eps), diff.clamp_max(-eps))
+    denom = torch.where(eye, torch.ones_like(diff), diff).prod(dim=-1)
+
+    # For j != c: num_j = prod_{m != j, c} (t_c - t_m)
+    t_center = t_nodes.gather(-1, center)  # [..., 1]
+    offset = (t_center - t_nodes).unsqueeze(-2).expand_as(diff)  # [..., S(j), S(m)]
+    skip = eye | is_center.unsqueeze(-2)
+    num = torch.where(skip, torch.ones_like(offset), offset).prod(dim=-1)
+
+    w = torch.where(is_center, torch.zeros_like(num), num / denom)
+    # Derivative weights sum to zero (constants have no slope)
+    return torch.where(is_center, -w.sum(dim=-1, keepdim=True), w)
+
+
+def time_derivative(
+    values: torch.Tensor,
+    t: torch.Tensor,
+    order: int = 2,
+    eps: float = 1e-12,
+) -> torch.Tensor:
+    """
+    d(values)/dt along the time axis of a batched trajectory.
+
+    Args:
+        values: [batch, N, dim] trajectory
+        t: [batch, N, 1] or [batch, N] time grid (may be non-uniform; batch may be 1)
+        order: Stencil order, one of STENCIL_ORDERS. 1 is the forward difference
+            (backward at the last point); grids with fewer than order + 1
+            points fall back to the highest order they support
+        eps: Floor on time differences to prevent division by zero
+
+    Returns:
+        derivative: [batch, N, dim]
+    """
+    if order not in STENCIL_ORDERS:
+        raise ValueError(f"Unsupported stencil order {order}; expected one of {STENCIL_ORDERS}")
+
+    N = values.shape[1]
+    if N < 2:
+        return torch.zeros_like(values)
+    order = min(order, N - 1)
+
+    t_vals = t[..., 0] if t.dim() == 3 else t  # [batch, N]
+    idx = stencil_indices(N, order, device=values.device)  # [N, S]
+    center = (torch.arange(N, device=values.device).unsqueeze(-1) - idx[:, :1])  # [N, 1]
+
+    weights = stencil_weights(
+        t_vals[:, idx].to(values.dtype),
+        center.expand(t_vals.shape[0], N, 1),
+        eps=eps,
+    )  # [batch, N, S]
+    return torch.einsum('bns,bnsd->bnd', weights, values[:, idx, :])
@@ -2,7 +2,7 @@
 # Central Difference Derivative (v2)
 # ======================================
 
-import torch
+from src.physics.derivatives import time_derivative
 
 
 def central_difference(state, t, eps=1e-12):
@@ -10,8 +10,10 @@ def central_difference(state, t, eps=1e-12):
     Computes central difference derivative:
         dstate/dt = (s(t+1) - s(t-1)) / (2*dt)
     
-    For interior points, uses central difference. For boundaries, falls back
-    to forward/backward difference.
+    Thin wrapper around the shared 3-point operator
+    (`src.physics.derivatives.time_derivative` with order=2), which also
+    weights non-uniform spacing correctly and uses one-sided 3-point stencils
+    at the boundaries.
     
     Args:
         state: [batch, N, dim] - state trajectory
@@ -21,46 +23,4 @@ def central_difference(state, t, eps=1e-12):
     Returns:
         derivative: [batch, N, dim] - time derivative of state
     """
-    # Prepare output with same shape
-    deriv = torch.zeros_like(state)
-    
-    batch, N, dim = state.shape
-    
-    if N < 2:
-        return deriv
-    
-    # Extract time values
-    if t.dim() == 3:
-        t_vals = t[:, :, 0]  # [batch, N]
-    else:
-        t_vals = t  # [batch, N]
-    
-    # Work only on interior points (indices 1 to N-2)
-    # Central difference: (s[i+1] - s[i-1]) / (2*dt_central)
-    if N >= 3:
-        s_next = state[:, 2:, :]  # [batch, N-2, dim]
-        s_prev = state[:, :-2, :]  # [batch, N-2, dim]
-        
-        # Compute dt_central = t[i+1] - t[i-1] for each interior point
-        t_next = t_vals[:, 2:]  # [batch, N-2]
-        t_prev = t_vals[:, :-2]  # [batch, N-2]
-        dt_central = (t_next - t_prev).clamp_min(eps).unsqueeze(-1)  # [batch, N-2, 1]
-        
-        d_mid = (s_next - s_prev) / (2.0 * dt_central)
-        
-        # Assign to interior indices (1 to N-2)
-        deriv[:, 1:-1, :] = d_mid
-    
-    # Boundary handling (fallback to forward/backward diff)
-    # First point: forward difference
-    if N > 1:
-        dt_forward = (t_vals[:, 1] - t_vals[:, 0]).clamp_min(eps).unsqueeze(-1)  # [batch, 1]
-        deriv[:, 0, :] = (state[:, 1, :] - state[:, 0, :]) / dt_forward
-    
-    # Last point: backward difference
-    if N > 1:
-        dt_backward = (t_vals[:, -1] - t_vals[:, -2]).clamp_min(eps).unsqueeze(-1)  # [batch, 1]
-        deriv[:, -1, :] = (state[:, -1, :] - state[:, -2, :]) / dt_backward
-    
-    return deriv
-
+    return time_derivative(state, t, order=2, eps=eps)
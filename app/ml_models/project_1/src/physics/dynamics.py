@@ -2,21 +2,324 @@
 Python wrapper for 6-DOF rocket dynamics integration (WP1 contract).
 
 Provides integrate_truth function for uniform time grid integration.
+
+The right-hand side is the SI model of ``solver/dynamics_casadi.py``
+(exponential atmosphere, drag/lift from the body-frame relative velocity,
+pitch moment from angle of attack, diagonal inertia, ``m_dot = -T/(Isp g0)``)
+with the environment of ``data/generator.build_phys_limits_env``: constant,
+gust or zero wind and constant or inverse-square gravity. Everything is
+evaluated on NumPy arrays for a whole batch of cases at once ([B, 14]
+states, per-case parameters), so integrating B cases costs about as many
+Python-level operations as integrating one.
 """
 
 import numpy as np
-from typing import Callable, Dict, Any, NamedTuple
+from typing import Callable, Dict, Any, NamedTuple, Sequence, Union
+
+EARTH_RADIUS = 6371000.0  # m, inverse-square gravity
+
+# Parameter defaults (SI), matching build_phys_limits_env
+PHYS_DEFAULTS = {
+    "Cd": 0.3, "CL_alpha": 3.5, "Cm_alpha": -0.8, "C_delta": 0.05, "S": 0.05, "l_ref": 1.2,
+    "Isp": 250.0, "Ix": 10.0, "Iy": 10.0, "Iz": 1.0, "rho0": 1.225, "H": 8500.0,
+}
+LIMITS_DEFAULTS = {"Tmax": 4000.0, "mdry": 35.0}
+
+# Dormand-Prince 5(4) tableau
+_DP_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0])
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+_DP_E = _DP_B - np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+ParamSource = Union[Dict[str, Any], Sequence[Dict[str, Any]]]
 
 
 class IntegrateResult(NamedTuple):
     """Result from truth integration (WP1 contract)."""
     t: np.ndarray  # [N] - uniform time grid
-    x: np.ndarray  # [N, 14] - states in SI
-    u: np.ndarray  # [N, 4] - controls [T, uTx, uTy, uTz] in SI
-    monitors: Dict[str, np.ndarray]  # at least: "rho", "q_dyn", "n_load"
+    x: np.ndarray  # [N, 14] - states in SI ([B, N, 14] for a batch)
+    u: np.ndarray  # [N, 4] - controls [T, uTx, uTy, uTz] in SI ([B, N, 4] for a batch)
+    monitors: Dict[str, np.ndarray]  # at least: "rho", "q_dyn", "n_load" ([N] or [B, N])
     diag: Dict[str, Any]  # e.g., {"renorm_events": int}
 
 
+def _per_case(source: ParamSource, key: str, default: Any, batch: int) -> np.ndarray:
+    """[B] values of a parameter from one dict (scalar or [B] value) or one dict per case."""
+    if isinstance(source, dict):
+        return np.broadcast_to(np.asarray(source.get(key, default), dtype=float), (batch,)).copy()
+    return np.array([case.get(key, default) for case in source], dtype=float)
+
+
+def _as_case_list(source: ParamSource, batch: int) -> Sequence[Dict[str, Any]]:
+    return [source] * batch if isinstance(source, dict) else list(source)
+
+
+def case_parameters(phys: ParamSource, limits: ParamSource, env: ParamSource, batch: int) -> Dict[str, np.ndarray]:
+    """
+    Per-case parameter arrays for the batched dynamics.
+
+    Args:
+        phys, limits, env: Dicts as built by build_phys_limits_env (numeric
+            entries may be scalars or [B] arrays), or sequences of B such dicts
+        batch: Number of cases B
+
+    Returns:
+        {name: [B]} for the phys/limits fields, plus the environment as
+        wind_const [B, 3], gust_amp [B, 3], gust_omega [B], gust_phase [B],
+        g0 [B] and inverse_square [B] (bool)
+    """
+    params = {key: _per_case(phys, key, default, batch) for key, default in PHYS_DEFAULTS.items()}
+    params.update({key: _per_case(limits, key, default, batch) for key, default in LIMITS_DEFAULTS.items()})
+
+    wind_const = np.zeros((batch, 3))
+    gust_amp = np.zeros((batch, 3))
+    gust_omega = np.zeros(batch)
+    gust_phase = np.zeros(batch)
+    g0 = np.full(batch, 9.80665)
+    inverse_square = np.zeros(batch, dtype=bool)
+    for i, case_env in enumerate(_as_case_list(env, batch)):
+        gravity = case_env.get("gravity", {})
+        g0[i] = _case_value(gravity.get("g0", 9.80665), i)
+        inverse_square[i] = bool(gravity.get("use_inverse_square", False))
+        wind = case_env.get("wind", {"type": "zero"})
+        wind_type = wind.get("type", "zero")
+        if wind_type == "constant":
+            if "wind_u" in wind:
+                wind_const[i] = [_case_value(wind.get(k, 0.0), i) for k in ("wind_u", "wind_v", "wind_w")]
+            else:
+                # Horizontal wind, direction measured from the x axis
+                magnitude = _case_value(wind.get("wind_mag", 0.0), i)
+                direction = _case_value(wind.get("wind_dir_rad", 0.0), i)
+                wind_const[i] = [magnitude * np.cos(direction), magnitude * np.sin(direction), 0.0]
+        elif wind_type == "gust":
+            axis = {"x": 0, "y": 1, "z": 2}[wind.get("gust_axis", "x")]
+            gust_amp[i, axis] = _case_value(wind.get("gust_amp", 0.0), i)
+            gust_omega[i] = 2.0 * np.pi * _case_value(wind.get("gust_freq", 1.0), i)
+            gust_phase[i] = _case_value(wind.get("gust_phase", 0.0), i)
+        elif wind_type != "zero":
+            raise ValueError(f"Unknown wind type '{wind_type}'")
+    params.update(
+        wind_const=wind_const, gust_amp=gust_amp, gust_omega=gust_omega, gust_phase=gust_phase,
+        g0=g0, inverse_square=inverse_square,
+    )
+    return params
+
+
+def _case_value(value: Any, index: int) -> float:
+    """Scalar value, or element `index` of a per-case array."""
+    value = np.asarray(value, dtype=float)
+    return float(value if value.ndim == 0 else value[index])
+
+
+def wind_velocity(t, params: Dict[str, np.ndarray]) -> np.ndarray:
+    """[B, 3] inertial wind at time t (scalar or [B]): constant part + amp * sin(omega t + phase) gust."""
+    return params["wind_const"] + params["gust_amp"] * np.sin(params["gust_omega"] * t + params["gust_phase"])[:, None]
+
+
+def gravity_acceleration(z: np.ndarray, params: Dict[str, np.ndarray]) -> np.ndarray:
+    """[B] downward gravity magnitude: g0, or g0 (R / (R + z))^2 for inverse-square cases."""
+    ratio = EARTH_RADIUS / (EARTH_RADIUS + np.maximum(z, 0.0))
+    return np.where(params["inverse_square"], params["g0"] * ratio * ratio, params["g0"])
+
+
+def _effective_thrust(x: np.ndarray, u: np.ndarray, params: Dict[str, np.ndarray]) -> np.ndarray:
+    """[B] thrust clamped to [0, Tmax], zero once the propellant is spent (m <= mdry)."""
+    thrust = np.clip(u[:, 0], 0.0, params["Tmax"])
+    return np.where(x[:, 13] > params["mdry"], thrust, 0.0)
+
+
+def rigid_body_derivative(
+    t: float, x: np.ndarray, u: np.ndarray, params: Dict[str, np.ndarray], return_monitors: bool = False
+):
+    """
+    Batched SI state derivative.
+
+    Written per component on [B] vectors (no [B, 3, 3] matrices, einsum or
+    cross products): the per-call overhead then stays a few hundred
+    microseconds at any batch size.
+
+    Args:
+        t: Time [s] (wind gusts), scalar or per case [B]
+        x: States [B, 14] = [x, y, z, vx, vy, vz, q_w, q_x, q_y, q_z, wx, wy, wz, m]
+        u: Controls [B, 4] = [T, uTx, uTy, uTz], uT the unit thrust direction in the body frame
+        params: case_parameters(...)
+        return_monitors: Also return {"rho", "q_dyn", "n_load"} ([B] each)
+
+    Returns:
+        xdot [B, 14] (and the monitors)
+    """
+    z, vx, vy, vz = x[:, 2], x[:, 3], x[:, 4], x[:, 5]
+    wx, wy, wz = x[:, 10], x[:, 11], x[:, 12]
+    m = np.maximum(x[:, 13], params["mdry"])
+
+    rho = params["rho0"] * np.exp(-np.maximum(z, 0.0) / params["H"])
+    wind = wind_velocity(t, params)
+    ax, ay, az = vx - wind[:, 0], vy - wind[:, 1], vz - wind[:, 2]  # Air-relative velocity
+    v_rel_sq = ax*ax + ay*ay + az*az + 1e-12
+    q_dyn = 0.5 * rho * v_rel_sq
+
+    q_norm = np.sqrt(x[:, 6]**2 + x[:, 7]**2 + x[:, 8]**2 + x[:, 9]**2 + 1e-12)
+    q0, q1, q2, q3 = x[:, 6] / q_norm, x[:, 7] / q_norm, x[:, 8] / q_norm, x[:, 9] / q_norm
+
+    # Body-to-inertial rotation matrix entries
+    r00 = q0*q0 + q1*q1 - q2*q2 - q3*q3
+    r01 = 2*(q1*q2 - q0*q3)
+    r02 = 2*(q1*q3 + q0*q2)
+    r10 = 2*(q1*q2 + q0*q3)
+    r11 = q0*q0 - q1*q1 + q2*q2 - q3*q3
+    r12 = 2*(q2*q3 - q0*q1)
+    r20 = 2*(q1*q3 - q0*q2)
+    r21 = 2*(q2*q3 + q0*q1)
+    r22 = q0*q0 - q1*q1 - q2*q2 + q3*q3
+
+    # Air-relative velocity in the body frame: R^T v_rel
+    bx = r00*ax + r10*ay + r20*az
+    by = r01*ax + r11*ay + r21*az
+    bz = r02*ax + r12*ay + r22*az
+
+    bx_smooth = np.sqrt(bx*bx + 1e-12)
+    alpha = np.arctan2(bz, bx_smooth * np.sign(bx + 1e-15))
+
+    # Thrust along the commanded (re-normalized) body direction
+    thrust = _effective_thrust(x, u, params)
+    thrust_scale = thrust / np.sqrt(u[:, 1]**2 + u[:, 2]**2 + u[:, 3]**2 + 1e-12)
+
+    # Drag opposes the body-frame airflow; lift acts in the x-z plane, perpendicular
+    # to it and against the crossflow (same convention as dynamics_casadi.py and
+    # dynamics_pytorch.compute_dynamics)
+    qS = q_dyn * params["S"]
+    drag_scale = qS * params["Cd"] / np.sqrt(bx*bx + by*by + bz*bz + 1e-12)
+    lx, lz = -bz / (bx_smooth + 1e-12), bx / (bx_smooth + 1e-12)
+    lift_scale = qS * params["CL_alpha"] * alpha / np.sqrt(lx*lx + lz*lz + 1e-12)
+    fx = thrust_scale * u[:, 1] - drag_scale * bx - lift_scale * lx
+    fy = thrust_scale * u[:, 2] - drag_scale * by
+    fz = thrust_scale * u[:, 3] - drag_scale * bz - lift_scale * lz
+
+    # Inertial acceleration R F / m - g e_z
+    m_inv = 1.0 / m
+    v_dot_x = (r00*fx + r01*fy + r02*fz) * m_inv
+    v_dot_y = (r10*fx + r11*fy + r12*fz) * m_inv
+    v_dot_z = (r20*fx + r21*fy + r22*fz) * m_inv - gravity_acceleration(z, params)
+
+    # w_dot = I^-1 (M - w x I w), pitch moment from angle of attack
+    Ix, Iy, Iz = params["Ix"], params["Iy"], params["Iz"]
+    pitch_moment = qS * params["l_ref"] * params["Cm_alpha"] * alpha
+
+    xdot = np.stack([
+        vx, vy, vz,
+        v_dot_x, v_dot_y, v_dot_z,
+        # q_dot = 0.5 * q * [0, w]
+        0.5 * (-q1*wx - q2*wy - q3*wz),
+        0.5 * (q0*wx + q2*wz - q3*wy),
+        0.5 * (q0*wy - q1*wz + q3*wx),
+        0.5 * (q0*wz + q1*wy - q2*wx),
+        -(Iz - Iy) * wy * wz / Ix,
+        (pitch_moment - (Ix - Iz) * wz * wx) / Iy,
+        -(Iy - Ix) * wx * wy / Iz,
+        -thrust / (params["Isp"] * params["g0"]),
+    ], axis=1)
+    if not return_monitors:
+        return xdot
+    # Load factor: non-gravitational (sensed) acceleration in g
+    n_load = np.sqrt(fx*fx + fy*fy + fz*fz) * m_inv / params["g0"]
+    return xdot, {"rho": rho, "q_dyn": q_dyn, "n_load": n_load}
+
+
+def _controls(control_cb: Callable, t: float, x: np.ndarray, single: bool) -> np.ndarray:
+    """[B, 4] controls; a single-case control_cb keeps the (t, x[14]) -> [4] contract."""
+    u = np.asarray(control_cb(t, x[0] if single else x), dtype=float)
+    return np.broadcast_to(u, (x.shape[0], 4))
+
+
+def _normalize_quaternions(x: np.ndarray) -> None:
+    x[:, 6:10] /= np.linalg.norm(x[:, 6:10], axis=1, keepdims=True)
+
+
+def _rk4_step(f: Callable, t: float, x: np.ndarray, h: float, k1: np.ndarray) -> np.ndarray:
+    k2 = f(t + 0.5 * h, x + 0.5 * h * k1)
+    k3 = f(t + 0.5 * h, x + 0.5 * h * k2)
+    k4 = f(t + h, x + h * k3)
+    return x + (h / 6.0) * (k1 + 2.0 * k2 + 2.0 * k3 + k4)
+
+
+def _burnout_fractions(x: np.ndarray, mass_rate: np.ndarray, h: float, mdry: np.ndarray) -> np.ndarray:
+    """
+    [B] fraction of a step of size h at which each case reaches mdry (inf if it does not).
+
+    Extrapolated from the mass rate at the start of the step: the stages of
+    a step across burnout already see the thrust cut, so the stepped mass
+    itself can stop short of mdry.
+    """
+    end_mass = x[:, 13] + h * mass_rate
+    crossing = (x[:, 13] > mdry) & (end_mass <= mdry)
+    fractions = np.full(len(x), np.inf)
+    fractions[crossing] = (x[crossing, 13] - mdry[crossing]) / (x[crossing, 13] - end_mass[crossing])
+    # Stop just short of mdry, so that the stages at the end of the step still see the thrust
+    return fractions * (1.0 - 1e-6)
+
+
+def _rk4_step_with_burnout(f: Callable, t: float, x: np.ndarray, h: float, mdry: np.ndarray) -> np.ndarray:
+    """
+    RK4 step that is split where a case reaches its dry mass.
+
+    The thrust cut-off is a discontinuity of the right-hand side; a fixed
+    step across it is only first-order accurate. The step is taken up to
+    the (extrapolated) burnout time of the first case, whose mass is then
+    set to mdry (from just above it), and continued from there.
+    """
+    while True:
+        k1 = f(t, x)
+        fractions = _burnout_fractions(x, k1[:, 13], h, mdry)
+        if not np.isfinite(fractions).any():
+            return _rk4_step(f, t, x, h, k1)
+        h_burn = h * fractions.min()
+        x = _rk4_step(f, t, x, h_burn, k1)
+        first = fractions == fractions.min()
+        x[first, 13] = mdry[first]
+        t, h = t + h_burn, h - h_burn
+
+
+def _dopri_step(f: Callable, t: float, x: np.ndarray, h: float, k1: np.ndarray):
+    """One Dormand-Prince step: (x_new, per-case error vector [B, 14], last stage = f(t + h, x_new))."""
+    k = [k1]
+    for stage in range(1, 7):
+        increment = sum(a * k[j] for j, a in enumerate(_DP_A[stage]) if a != 0.0)
+        k.append(f(t + _DP_C[stage] * h, x + h * increment))
+    x_new = x + h * sum(b * k[j] for j, b in enumerate(_DP_B) if b != 0.0)
+    error = h * sum(e * k[j] for j, e in enumerate(_DP_E) if e != 0.0)
+    return x_new, error, k[6]
+
+
+def trajectory_monitors(
+    t: np.ndarray, x: np.ndarray, u: np.ndarray, params: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    rho, q_dyn and n_load ([B, N] each) of whole trajectories in one vectorized call.
+
+    Args:
+        t: Time grid [N]
+        x: States [B, N, 14]
+        u: Controls [B, N, 4]
+        params: case_parameters(...) of the B cases
+    """
+    batch, n_points = x.shape[:2]
+    per_point = {
+        name: np.repeat(values, n_points, axis=0) for name, values in params.items()
+    }
+    _, monitors = rigid_body_derivative(
+        np.tile(t, batch), x.reshape(-1, 14), u.reshape(-1, 4), per_point, return_monitors=True
+    )
+    return {name: values.reshape(batch, n_points) for name, values in monitors.items()}
+
+
 def integrate_truth(
     x0: np.ndarray,
     t: np.ndarray,
@@ -31,28 +334,127 @@ def integrate_truth(
 ) -> IntegrateResult:
     """
     Integrate the 6-DOF dynamics on the provided uniform time grid `t` (seconds).
-    
+
+    A batch of B cases is integrated at once when x0 is [B, 14]; phys,
+    limits and env then hold per-case values ([B] arrays in the dicts, or a
+    sequence of B dicts) and control_cb receives the whole batch.
+
     Args:
-        x0: Initial state [14] in SI
+        x0: Initial state [14] (or [B, 14]) in SI
         t: Uniform time grid [N] in seconds
         control_cb: Control function (t, x) -> [T, uTx, uTy, uTz] in SI, unit uT
+            in the body frame; for a batch (t, x [B, 14]) -> [B, 4] (or [4] for all cases)
         phys: Physical parameters (SI)
         limits: Operational limits (SI)
         env: Environment (gravity, wind) dict
         method: "rk45" (adaptive) or "rk4" (fixed step)
         rtol: Relative tolerance for adaptive
         atol: Absolute tolerance for adaptive
-        normalize_quat_every: Renormalize quaternion every N steps
-        
+        normalize_quat_every: Renormalize quaternion every N steps (0: never)
+
     Returns:
-        IntegrateResult with t, x, u, monitors, diag all in SI
-        
-    Note: This is a stub. Implement using scipy.integrate.solve_ivp or
-    wrap the C++ integrator via pybind11.
-    """
-    raise NotImplementedError(
-        "integrate_truth: Implement using scipy.integrate.solve_ivp (rk45/rk4) "
-        "or wrap C++ integrator. Return IntegrateResult with SI values. "
-        "Ensure control_cb returns unit thrust direction."
-    )
+        IntegrateResult with t, x, u, monitors, diag all in SI. x, u and the
+        monitors carry a leading batch axis when x0 is batched. RK4 takes
+        one step per grid interval (split at burnout); RK45 shares one
+        adaptive step across the batch (error norm of the worst case) and
+        lands exactly on every grid point.
+    """
+    if method not in ("rk45", "rk4"):
+        raise ValueError(f"Unknown method '{method}', expected 'rk45' or 'rk4'")
+    t = np.asarray(t, dtype=float)
+    x0 = np.asarray(x0, dtype=float)
+    single = x0.ndim == 1
+    x = np.array(x0.reshape(-1, 14))
+    batch, n_points = x.shape[0], len(t)
+    params = case_parameters(phys, limits, env, batch)
+
+    n_evals = 0
+
+    def f(time: float, state: np.ndarray) -> np.ndarray:
+        nonlocal n_evals
+        n_evals += 1
+        return rigid_body_derivative(time, state, _controls(control_cb, time, state, single), params)
+
+    states = np.empty((batch, n_points, 14))
+    controls = np.empty((batch, n_points, 4))
+
+    def record(k: int, time: float, state: np.ndarray) -> None:
+        u = _controls(control_cb, time, state, single)
+        states[:, k] = state
+        controls[:, k, 0] = _effective_thrust(state, u, params)
+        controls[:, k, 1:] = u[:, 1:] / np.linalg.norm(u[:, 1:], axis=1, keepdims=True)
+
+    renorm_events = 0
+    steps = rejected = 0
+    max_quat_drift = 0.0
+
+    def after_step() -> bool:
+        """Quaternion renormalization every normalize_quat_every accepted steps."""
+        nonlocal renorm_events, max_quat_drift
+        drift = float(np.abs(np.linalg.norm(x[:, 6:10], axis=1) - 1.0).max())
+        max_quat_drift = max(max_quat_drift, drift)
+        if normalize_quat_every and steps % normalize_quat_every == 0:
+            _normalize_quaternions(x)
+            renorm_events += 1
+            return True
+        return False
+
+    record(0, t[0], x)
+    if method == "rk4":
+        for k in range(1, n_points):
+            x = _rk4_step_with_burnout(f, t[k - 1], x, t[k] - t[k - 1], params["mdry"])
+            steps += 1
+            after_step()
+            record(k, t[k], x)
+    else:
+        h = (t[1] - t[0]) if n_points > 1 else 0.0
+        k1 = f(t[0], x)
+        time = t[0]
+        for k in range(1, n_points):
+            while time < t[k] - 1e-12 * max(1.0, abs(t[k])):
+                h_step = min(h, t[k] - time)
+                # Steps across a burnout end at it (see _rk4_step_with_burnout)
+                fractions = _burnout_fractions(x, k1[:, 13], h_step, params["mdry"])
+                burning_out = fractions == fractions.min() if np.isfinite(fractions).any() else None
+                if burning_out is not None:
+                    h_step *= fractions.min()
+                x_new, error, k_last = _dopri_step(f, time, x, h_step, k1)
+                scale = atol + rtol * np.maximum(np.abs(x), np.abs(x_new))
+                error_norm = float(np.sqrt(np.mean((error / scale) ** 2, axis=1)).max())
+                if not np.isfinite(error_norm):
+                    error_norm = np.inf
+                if error_norm <= 1.0:
+                    time = t[k] if h_step == t[k] - time else time + h_step
+                    x = x_new
+                    steps += 1
+                    modified = after_step()
+                    if burning_out is not None:
+                        x[burning_out, 13] = params["mdry"][burning_out]
+                        modified = True
+                    # FSAL: the last stage is the next step's first unless x was modified
+                    k1 = f(time, x) if modified else k_last
+                    factor = 5.0 if error_norm == 0.0 else min(5.0, 0.9 * error_norm ** -0.2)
+                    # A step cut short by the grid point or a burnout does not limit the next one
+                    h = max(h, h_step * factor) if h_step < h else h_step * factor
+                else:
+                    rejected += 1
+                    h = h_step * max(0.2, 0.9 * error_norm ** -0.2)
+                    if h < 1e-12 * max(1.0, abs(time)):
+                        raise RuntimeError(f"integrate_truth: step size underflow at t={time:.6g} s")
+            record(k, t[k], x)
 
+    monitors = trajectory_monitors(t, states, controls, params)
+    diag = {
+        "method": method,
+        "renorm_events": renorm_events,
+        "steps": steps,
+        "rejected_steps": rejected,
+        "rhs_evals": n_evals,
+        "max_quat_norm_drift": max_quat_drift,
+        "burnout": states[:, -1, 13] <= params["mdry"] + 1e-9,
+    }
+    if single:
+        states, controls = states[0], controls[0]
+        monitors = {name: values[0] for name, values in monitors.items()}
+        diag["burnout"] = bool(diag["burnout"][0])
+    return IntegrateResult(t=t, x=states, u=controls, monitors=monitors, diag=diag)
@@ -3,50 +3,48 @@ PyTorch implementation of 6-DOF rocket dynamics for autograd.
 
 This module provides differentiable dynamics functions for use in PINN training.
 The implementation mirrors the CasADi version but uses PyTorch tensors for autograd.
+The environment (constant / gust wind, constant / inverse-square gravity) follows
+``data/generator.build_phys_limits_env`` and the NumPy model of ``dynamics.py``.
 """
 
 import torch
 import torch.nn as nn
-from typing import Dict, Tuple
+from torch.func import jacrev
+from typing import Any, Dict, Optional, Tuple
+
+from src.physics.dynamics import EARTH_RADIUS, case_parameters
 
 
 def quaternion_to_rotation_matrix(q: torch.Tensor) -> torch.Tensor:
     """
     Convert quaternion to rotation matrix (body to inertial).
     
+    Batched over all leading dimensions (no Python loops). The quaternion is
+    used as given, matching the CasADi implementation; normalize it first.
+    
     Args:
         q: Quaternion [..., 4] = [q0, q1, q2, q3] (w, x, y, z)
         
     Returns:
         R: Rotation matrix [..., 3, 3]
     """
-    q0, q1, q2, q3 = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
-    
-    # Ensure quaternion is normalized
-    q_norm = torch.sqrt(torch.sum(q**2, dim=-1, keepdim=True) + 1e-12)
-    q = q / q_norm
-    
-    R = torch.zeros(*q.shape[:-1], 3, 3, device=q.device, dtype=q.dtype)
-    
-    R[..., 0, 0] = q0*q0 + q1*q1 - q2*q2 - q3*q3
-    R[..., 0, 1] = 2*(q1*q2 - q0*q3)
-    R[..., 0, 2] = 2*(q1*q3 + q0*q2)
+    q0, q1, q2, q3 = q.unbind(dim=-1)
     
-    R[..., 1, 0] = 2*(q1*q2 + q0*q3)
-    R[..., 1, 1] = q0*q0 - q1*q1 + q2*q2 - q3*q3
-    R[..., 1, 2] = 2*(q2*q3 - q0*q1)
-    
-    R[..., 2, 0] = 2*(q1*q3 - q0*q2)
-    R[..., 2, 1] = 2*(q2*q3 + q0*q1)
-    R[..., 2, 2] = q0*q0 - q1*q1 - q2*q2 + q3*q3
+    R = torch.stack([
+        q0*q0 + q1*q1 - q2*q2 - q3*q3, 2*(q1*q2 - q0*q3), 2*(q1*q3 + q0*q2),
+        2*(q1*q2 + q0*q3), q0*q0 - q1*q1 + q2*q2 - q3*q3, 2*(q2*q3 - q0*q1),
+        2*(q1*q3 - q0*q2), 2*(q2*q3 + q0*q1), q0*q0 - q1*q1 - q2*q2 + q3*q3,
+    ], dim=-1)
     
-    return R
+    return R.view(*q.shape[:-1], 3, 3)
 
 
 def quaternion_multiply(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
     """
     Multiply two quaternions: q1 * q2.
     
+    Batched over (broadcastable) leading dimensions.
+    
     Args:
         q1: First quaternion [..., 4]
         q2: Second quaternion [..., 4]
@@ -54,8 +52,8 @@ def quaternion_multiply(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
     Returns:
         q: Product quaternion [..., 4]
     """
-    q0_1, q1_1, q2_1, q3_1 = q1[..., 0], q1[..., 1], q1[..., 2], q1[..., 3]
-    q0_2, q1_2, q2_2, q3_2 = q2[..., 0], q2[..., 1], q2[..., 2], q2[..., 3]
+    q0_1, q1_1, q2_1, q3_1 = q1.unbind(dim=-1)
+    q0_2, q1_2, q2_2, q3_2 = q2.unbind(dim=-1)
     
     q0 = q0_1*q0_2 - q1_1*q1_2 - q2_1*q2_2 - q3_1*q3_2
     q1 = q0_1*q1_2 + q1_1*q0_2 + q2_1*q3_2 - q3_1*q2_2
@@ -65,24 +63,164 @@ def quaternion_multiply(q1: torch.Tensor, q2: torch.Tensor) -> torch.Tensor:
     return torch.stack([q0, q1, q2, q3], dim=-1)
 
 
+def _per_row(value: torch.Tensor, batch_shape: torch.Size, width: int = 1) -> torch.Tensor:
+    """
+    Broadcast a per-case parameter to the flattened rows of compute_dynamics.
+    
+    Scalars pass through. A tensor whose shape is a leading part of the state's
+    batch dims (e.g. [B] for x [B, N, 14]), followed by `width` entries when
+    width > 1, becomes [M, width] with M = prod(batch_shape).
+    """
+    if value.dim() == 0:
+        return value
+    case_dims = value.dim() - (width > 1)
+    value = value.reshape(*value.shape[:case_dims], *([1] * (len(batch_shape) - case_dims)), *value.shape[case_dims:])
+    value = value.expand(*batch_shape, *value.shape[len(batch_shape):])
+    return value.reshape(-1, width)
+
+
+def environment_params(
+    env: Any,
+    batch: int,
+    scales: Dict[str, float] = None,
+    dtype: torch.dtype = torch.float32,
+    device: Optional[torch.device] = None
+) -> Dict[str, torch.Tensor]:
+    """
+    Per-case environment tensors for compute_dynamics from generator env dicts.
+    
+    Parsed as in the NumPy truth model (dynamics.case_parameters). Wind and gust
+    amplitudes are divided by V and gust frequencies multiplied by T (when
+    scales are given), so they apply to nondimensional velocities and times;
+    g0 stays in m/s^2 like the g0 parameter of compute_dynamics.
+    
+    Args:
+        env: env dict of build_phys_limits_env (numeric entries scalar or [B]),
+             or a sequence of B such dicts
+        batch: Number of cases B
+        scales: Scaling factors (V, T); None for SI
+        
+    Returns:
+        {wind_const [B, 3], gust_amp [B, 3], gust_omega [B], gust_phase [B],
+         g0 [B], inverse_square [B] (bool)}, to be merged into the params
+    """
+    numpy_params = case_parameters({}, {}, env, batch)
+    V = scales.get('V', 1.0) if scales is not None else 1.0
+    T = scales.get('T', 1.0) if scales is not None else 1.0
+    converted = {
+        'wind_const': numpy_params['wind_const'] / V,
+        'gust_amp': numpy_params['gust_amp'] / V,
+        'gust_omega': numpy_params['gust_omega'] * T,
+        'gust_phase': numpy_params['gust_phase'],
+        'g0': numpy_params['g0'],
+    }
+    params = {k: torch.as_tensor(v, dtype=dtype, device=device) for k, v in converted.items()}
+    params['inverse_square'] = torch.as_tensor(numpy_params['inverse_square'], device=device)
+    return params
+
+
+def wind_velocity(
+    t: Optional[torch.Tensor],
+    params: Dict[str, torch.Tensor],
+    batch_shape: torch.Size,
+    like: torch.Tensor
+) -> torch.Tensor:
+    """
+    Inertial wind of the flattened rows: constant part + amp * sin(omega t + phase).
+    
+    Args:
+        t: Time of every row, [...] or [..., 1] over batch_shape (or scalar);
+           only needed for gust wind
+        params: compute_dynamics parameters; wind_const / gust_amp ([3] shared
+                or per case [..., 3]), gust_omega / gust_phase (scalar or per case)
+        batch_shape: Leading dims of the state
+        like: [M, 3] tensor giving dtype, device and the zero-wind result
+        
+    Returns:
+        wind: [M, 3] (units of the velocity state)
+    """
+    wind = torch.zeros_like(like)
+    wind_const = params.get('wind_const')
+    if wind_const is not None:
+        wind = wind + _per_row(wind_const, batch_shape, width=3)
+    gust_amp = params.get('gust_amp')
+    if gust_amp is not None:
+        if t is None:
+            raise ValueError("Gust wind requires the time t of every row")
+        t = torch.as_tensor(t, dtype=like.dtype, device=like.device)
+        if t.dim() == len(batch_shape) + 1 and t.shape[-1] == 1:
+            t = t.squeeze(-1)
+        omega = _per_row(params.get('gust_omega', torch.tensor(0.0)), batch_shape)
+        phase = _per_row(params.get('gust_phase', torch.tensor(0.0)), batch_shape)
+        wind = wind + _per_row(gust_amp, batch_shape, width=3) * torch.sin(omega * _per_row(t, batch_shape) + phase)
+    return wind
+
+
+def gravity_acceleration(
+    altitude: torch.Tensor,
+    g0: torch.Tensor,
+    params: Dict[str, torch.Tensor],
+    batch_shape: torch.Size
+) -> torch.Tensor:
+    """
+    Downward gravity magnitude of the flattened rows.
+    
+    g0, or g0 (R / (R + z))^2 for rows whose case has inverse_square set
+    (R = EARTH_RADIUS, z clamped at 0).
+    
+    Args:
+        altitude: Altitude [M, 1] in meters
+        g0: Surface gravity, scalar or [M, 1] (m/s^2)
+        params: compute_dynamics parameters (inverse_square: bool, scalar or per case)
+        batch_shape: Leading dims of the state
+        
+    Returns:
+        g: [M, 1] or g0 unchanged without inverse_square
+    """
+    inverse_square = params.get('inverse_square')
+    if inverse_square is None:
+        return g0
+    ratio = EARTH_RADIUS / (EARTH_RADIUS + torch.clamp(altitude, min=0.0))
+    return torch.where(_per_row(inverse_square, batch_shape).bool(), g0 * ratio * ratio, g0)
+
+
 def compute_dynamics(
     x: torch.Tensor,
     u: torch.Tensor,
     params: Dict[str, torch.Tensor],
-    scales: Dict[str, float] = None
+    scales: Dict[str, float] = None,
+    t: Optional[torch.Tensor] = None
 ) -> torch.Tensor:
     """
     Compute state derivative for 6-DOF rocket dynamics (nondimensional).
     
+    Vectorized over all leading dimensions: the rotation matrices and
+    quaternion products are computed for every row at once.
+    
+    Parameters are scalars shared by every row, or per-case tensors over the
+    leading dims of x ([B] for x [B, N, 14], [B, N] per point). I_b is a [3]
+    diagonal or [3, 3] matrix shared by every row, or per-case [..., 3, 3]
+    matrices.
+    
+    Wind and gravity come from the environment entries of params (see
+    environment_params): wind_const, gust_amp, gust_omega, gust_phase and
+    inverse_square. Without them there is no wind and gravity is g0.
+    
     Args:
         x: State vector [..., 14] = [x, y, z, vx, vy, vz, q0, q1, q2, q3, wx, wy, wz, m] (nondim)
         u: Control vector [..., 4] = [T, theta_g, phi_g, delta] (nondim)
-        params: Dictionary of physical parameters (nondim)
+        params: Dictionary of physical parameters (nondim), scalar or per case
         scales: Scaling factors for dimensionalization (optional, for dimensional params)
+        t: Time of every row [...] or [..., 1] (nondim), needed for gust wind
         
     Returns:
         xdot: State derivative [..., 14] (nondim)
     """
+    # Flatten leading dimensions: all kernels below operate on [M, *]
+    batch_shape = x.shape[:-1]
+    x = x.reshape(-1, x.shape[-1])
+    u = u.reshape(-1, u.shape[-1]).expand(x.shape[0], -1)
+    
     # Unpack state
     r_i = x[..., 0:3]      # Position (nondim)
     v_i = x[..., 3:6]      # Velocity (nondim)
@@ -96,35 +234,40 @@ def compute_dynamics(
     phi_g = u[..., 2:3]    # Gimbal angle (yaw) [rad]
     delta = u[..., 3:4]    # Control surface deflection [rad]
     
-    # Extract parameters (assumed nondimensional)
-    Cd = params.get('Cd', torch.tensor(0.3, device=x.device, dtype=x.dtype))
-    CL_alpha = params.get('CL_alpha', torch.tensor(3.5, device=x.device, dtype=x.dtype))
-    Cm_alpha = params.get('Cm_alpha', torch.tensor(-0.8, device=x.device, dtype=x.dtype))
-    C_delta = params.get('C_delta', torch.tensor(0.05, device=x.device, dtype=x.dtype))
-    S_ref = params.get('S_ref', torch.tensor(0.05, device=x.device, dtype=x.dtype))
-    l_ref = params.get('l_ref', torch.tensor(1.2, device=x.device, dtype=x.dtype))
-    Isp = params.get('Isp', torch.tensor(300.0, device=x.device, dtype=x.dtype))
-    g0 = params.get('g0', torch.tensor(9.81, device=x.device, dtype=x.dtype))
-    rho0 = params.get('rho0', torch.tensor(1.225, device=x.device, dtype=x.dtype))
-    h_scale = params.get('h_scale', torch.tensor(8400.0, device=x.device, dtype=x.dtype))
-    
-    # Inertia tensor (assumed diagonal, nondim)
+    # Extract parameters (assumed nondimensional), per-case values as [M, 1] columns
+    def param(name: str, default: float) -> torch.Tensor:
+        value = params.get(name)
+        if value is None:
+            return torch.tensor(default, device=x.device, dtype=x.dtype)
+        return _per_row(value, batch_shape)
+    
+    Cd = param('Cd', 0.3)
+    CL_alpha = param('CL_alpha', 3.5)
+    Cm_alpha = param('Cm_alpha', -0.8)
+    C_delta = param('C_delta', 0.05)
+    S_ref = param('S_ref', 0.05)
+    l_ref = param('l_ref', 1.2)
+    Isp = param('Isp', 300.0)
+    g0 = param('g0', 9.81)
+    rho0 = param('rho0', 1.225)
+    h_scale = param('h_scale', 8400.0)
+    
+    # Inertia tensor (assumed diagonal, nondim): [3] shared or [M, 3] per row
     I_b = params.get('I_b', torch.tensor([1000.0, 1000.0, 100.0], device=x.device, dtype=x.dtype))
-    if I_b.dim() == 1 and len(I_b) == 3:
-        I_xx, I_yy, I_zz = I_b[0], I_b[1], I_b[2]
-    else:
+    if I_b.shape == (3, 3):
         # Full matrix case (simplified for now - extract diagonal)
-        if I_b.dim() == 2:
-            I_xx, I_yy, I_zz = I_b[0, 0], I_b[1, 1], I_b[2, 2]
-        else:
-            I_xx, I_yy, I_zz = I_b[0], I_b[1], I_b[2]
+        I_diag = torch.diagonal(I_b)
+    elif I_b.dim() == 1:
+        I_diag = I_b[:3]
+    else:
+        I_diag = _per_row(torch.diagonal(I_b, dim1=-2, dim2=-1), batch_shape, width=3)
     
     # Limits (nondim)
-    T_max = params.get('T_max', torch.tensor(10.0, device=x.device, dtype=x.dtype))
-    m_dry = params.get('m_dry', torch.tensor(0.2, device=x.device, dtype=x.dtype))
+    T_max = param('T_max', 10.0)
+    m_dry = param('m_dry', 0.2)
     
     # Clamp thrust and mass
-    T = torch.clamp(T, min=0.0, max=T_max)
+    T = torch.clamp(T, min=0.0).clamp(max=T_max)
     m = torch.clamp(m, min=m_dry)
     
     # Atmospheric density (exponential model)
@@ -138,45 +281,20 @@ def compute_dynamics(
         altitude = r_i[..., 2:3]
         rho = rho0 * torch.exp(-torch.clamp(altitude, min=0.0) / h_scale)
     
-    # Wind (simplified: no wind for now)
-    wind_i = torch.zeros_like(v_i)
+    # Wind: constant + gust per case
+    wind_i = wind_velocity(t, params, batch_shape, v_i)
     v_rel_i = v_i - wind_i
     
     # Use smooth norm
     v_rel_norm_smooth = torch.sqrt(torch.sum(v_rel_i**2, dim=-1, keepdim=True) + 1e-12)
     
-    # Rotation matrix from quaternion (body to inertial)
+    # Rotation matrix from quaternion (body to inertial), batched: [M, 3, 3]
     q_norm_smooth = torch.sqrt(torch.sum(q**2, dim=-1, keepdim=True) + 1e-12)
     q_normalized = q / q_norm_smooth
+    R_b2i = quaternion_to_rotation_matrix(q_normalized)
     
-    # Determine if batched (input is 2D: [batch, 4] or [batch*N, 4])
-    # Always treat as batched if q is 2D (even if batch_size=1)
-    is_batched = q.dim() == 2
-    
-    # Compute rotation matrices
-    if is_batched:
-        # Batched: [batch, 4] or [batch*N, 4]
-        batch_size = q.shape[0]
-        R_b2i = torch.stack([quaternion_to_rotation_matrix(q_normalized[i]) for i in range(batch_size)])
-        # R_b2i: [batch, 3, 3]
-    else:
-        # Unbatched: [4] - single sample
-        R_b2i = quaternion_to_rotation_matrix(q_normalized)
-        R_b2i = R_b2i.unsqueeze(0)  # [1, 3, 3] to make it batched
-        is_batched = True  # Treat as batched for consistency
-    
-    # Relative velocity in body frame
-    if is_batched and R_b2i.dim() == 3:
-        # Batched: [batch, 3, 3] and v_rel_i: [batch, 3]
-        v_rel_i_expanded = v_rel_i.unsqueeze(-1)  # [batch, 3, 1]
-        v_rel_b = torch.bmm(R_b2i.transpose(-2, -1), v_rel_i_expanded).squeeze(-1)  # [batch, 3]
-    else:
-        # Unbatched: [3, 3] and [3]
-        R_b2i_single = R_b2i.squeeze(0) if R_b2i.dim() == 3 else R_b2i
-        v_rel_i_single = v_rel_i.squeeze(0) if v_rel_i.dim() == 2 else v_rel_i
-        v_rel_b = (R_b2i_single.T @ v_rel_i_single.unsqueeze(-1)).squeeze(-1)
-        if v_rel_i.dim() == 2:
-            v_rel_b = v_rel_b.unsqueeze(0)
+    # Relative velocity in body frame: R^T v
+    v_rel_b = torch.bmm(R_b2i.transpose(-2, -1), v_rel_i.unsqueeze(-1)).squeeze(-1)  # [M, 3]
     
     # Dynamic pressure (nondim)
     # q_dyn = 0.5 * rho * v^2, but need to handle scaling
@@ -193,147 +311,77 @@ def compute_dynamics(
     alpha = torch.atan2(v_rel_b[..., 2:3], v_rel_b_x_smooth)
     
     # Thrust direction unit vector in body frame
-    # Use cat instead of stack to avoid dimension issues
     uT_b_x = torch.cos(theta_g) * torch.cos(phi_g)
     uT_b_y = torch.sin(phi_g)
     uT_b_z = torch.sin(theta_g) * torch.cos(phi_g)
-    uT_b = torch.cat([uT_b_x, uT_b_y, uT_b_z], dim=-1)  # [batch, 3]
+    uT_b = torch.cat([uT_b_x, uT_b_y, uT_b_z], dim=-1)  # [M, 3]
     
     # Normalize
     uT_b_norm = torch.sqrt(torch.sum(uT_b**2, dim=-1, keepdim=True) + 1e-12)
     uT_b = uT_b / uT_b_norm
     
     # Thrust force in body frame (nondim)
-    # Ensure T and uT_b have compatible shapes
-    if T.dim() == 1:
-        T = T.unsqueeze(-1)
-    F_T_b = T * uT_b  # [batch, 3] or [batch*N, 3]
+    F_T_b = T * uT_b  # [M, 3]
     
-    # Drag force in body frame
+    # Drag force in body frame (opposite to the relative velocity)
     v_rel_b_norm = torch.sqrt(torch.sum(v_rel_b**2, dim=-1, keepdim=True) + 1e-12)
     u_drag_b = -v_rel_b / v_rel_b_norm
-    # Ensure q_dyn has right shape for broadcasting
-    if q_dyn.dim() == 1:
-        q_dyn = q_dyn.unsqueeze(-1)
-    F_D_b = -q_dyn * S_ref * Cd * u_drag_b
+    F_D_b = q_dyn * S_ref * Cd * u_drag_b
     
     # Lift force in body frame
     v_rel_b_x_smooth = torch.sqrt(v_rel_b[..., 0:1]**2 + 1e-12)
-    # Stack along last dimension to get [batch, 3]
     e_lift_b_x = -v_rel_b[..., 2:3] / (v_rel_b_x_smooth + 1e-12)
     e_lift_b_y = torch.zeros_like(v_rel_b[..., 0:1])
     e_lift_b_z = v_rel_b[..., 0:1] / (v_rel_b_x_smooth + 1e-12)
-    e_lift_b = torch.cat([e_lift_b_x, e_lift_b_y, e_lift_b_z], dim=-1)  # [batch, 3]
+    e_lift_b = torch.cat([e_lift_b_x, e_lift_b_y, e_lift_b_z], dim=-1)  # [M, 3]
     e_lift_b_norm = torch.sqrt(torch.sum(e_lift_b**2, dim=-1, keepdim=True) + 1e-12)
     e_lift_b = e_lift_b / e_lift_b_norm
-    if alpha.dim() == 1:
-        alpha = alpha.unsqueeze(-1)
-    F_L_b = q_dyn * S_ref * CL_alpha * alpha * e_lift_b
+    F_L_b = -q_dyn * S_ref * CL_alpha * alpha * e_lift_b  # Against the crossflow
     
     # Total force in body frame
-    F_b = F_T_b + F_D_b + F_L_b  # Should be [batch, 3] or [batch*N, 3]
-    
-    # Ensure F_b is 2D: [batch, 3]
-    if F_b.dim() == 1:
-        F_b = F_b.unsqueeze(0)
-    elif F_b.dim() == 3:
-        # If somehow 3D, reshape
-        F_b = F_b.view(-1, 3)
-    
-    # Transform to inertial frame
-    if is_batched and R_b2i.dim() == 3:
-        # Batched: R_b2i [batch, 3, 3], F_b [batch, 3]
-        # Ensure shapes match
-        if F_b.shape[0] != R_b2i.shape[0]:
-            # Reshape if needed
-            F_b = F_b.view(R_b2i.shape[0], -1)
-        F_b_expanded = F_b.unsqueeze(-1)  # [batch, 3, 1]
-        F_i = torch.bmm(R_b2i, F_b_expanded).squeeze(-1)  # [batch, 3]
-    else:
-        # Unbatched
-        R_b2i_single = R_b2i.squeeze(0) if R_b2i.dim() == 3 else R_b2i
-        F_b_single = F_b.squeeze(0) if F_b.dim() == 2 else F_b
-        F_i = (R_b2i_single @ F_b_single.unsqueeze(-1)).squeeze(-1)
-        if F_b.dim() == 2:
-            F_i = F_i.unsqueeze(0)
+    F_b = F_T_b + F_D_b + F_L_b  # [M, 3]
+    
+    # Transform to inertial frame: R F
+    F_i = torch.bmm(R_b2i, F_b.unsqueeze(-1)).squeeze(-1)  # [M, 3]
     
     # Gravity (nondim)
     if scales is not None:
-        g_dim = torch.tensor([0.0, 0.0, -g0], device=x.device, dtype=x.dtype)
-        g_scale = scales['V']**2 / scales['L']
-        g_i_scalar = g_dim / g_scale  # [3] - nondimensionalize acceleration
-        # Broadcast to match r_i shape: [batch*N, 3]
-        if is_batched:
-            batch_size_flat = r_i.shape[0]
-            if batch_size_flat > 0:
-                g_i = g_i_scalar.unsqueeze(0).repeat(batch_size_flat, 1)  # [batch*N, 3]
-            else:
-                g_i = g_i_scalar.unsqueeze(0)  # [1, 3] fallback
-        else:
-            g_i = g_i_scalar  # [3]
+        g_scale = scales['V']**2 / scales['L']  # nondimensionalize acceleration
     else:
-        g_i = torch.zeros_like(r_i)
-        g_i[..., 2] = -g0 / (313.0**2 / 10000.0)  # Approximate scaling
+        g_scale = 313.0**2 / 10000.0  # Approximate scaling
+    g = gravity_acceleration(altitude, g0, params, batch_shape)
+    g_z = (-g / g_scale).expand(r_i.shape[0], 1)
+    g_i = torch.cat([torch.zeros_like(r_i[..., 0:2]), g_z], dim=-1)  # [M, 3]
     
     # Position derivative
     r_dot = v_i
     
     # Velocity derivative
     m_safe = torch.clamp(m, min=1e-3)
-    # Ensure shapes are compatible for broadcasting
-    # F_i: [batch*N, 3], m_safe: [batch*N, 1], g_i: [batch*N, 3] or broadcastable
-    # Ensure m_safe has shape [batch*N, 1]
-    if m_safe.dim() == 1:
-        m_safe = m_safe.unsqueeze(-1)
-    # Ensure g_i matches F_i shape for broadcasting
-    if g_i.dim() == 1 and g_i.shape[0] == 3:
-        g_i = g_i.unsqueeze(0).expand(F_i.shape[0], -1)
-    elif g_i.dim() == 2:
-        if g_i.shape[0] == 1 and g_i.shape[1] == 3:
-            g_i = g_i.expand(F_i.shape[0], -1)
-        elif g_i.shape[0] != F_i.shape[0] and g_i.shape[1] == 3:
-            g_i = g_i[0:1].expand(F_i.shape[0], -1)
     v_dot = F_i / m_safe + g_i
     
-    # Quaternion derivative: q_dot = 0.5 * q * [0, w]
+    # Quaternion derivative: q_dot = 0.5 * q * [0, w], batched: [M, 4]
     omega_quat = torch.cat([
         torch.zeros_like(w_b[..., 0:1]),
         w_b
     ], dim=-1)
-    
-    if q.dim() == 2:
-        # Batched
-        q_dot = torch.stack([
-            quaternion_multiply(q_normalized[i], omega_quat[i]) for i in range(q.shape[0])
-        ]) * 0.5
-    else:
-        # Unbatched
-        q_dot = quaternion_multiply(q_normalized, omega_quat) * 0.5
+    q_dot = quaternion_multiply(q_normalized, omega_quat) * 0.5
     
     # Angular velocity derivative: w_dot = I^(-1) * (M - w × I*w)
     # Moments in body frame
-    M_aero_b = torch.zeros_like(w_b)
-    M_aero_b[..., 1:2] = q_dyn * S_ref * l_ref * (Cm_alpha * alpha + C_delta * delta)
+    M_aero_y = q_dyn * S_ref * l_ref * (Cm_alpha * alpha + C_delta * delta)
+    M_aero_b = torch.cat([torch.zeros_like(M_aero_y), M_aero_y, torch.zeros_like(M_aero_y)], dim=-1)
     
     # Thrust moment (simplified: assume no offset)
-    M_T_b = torch.zeros_like(w_b)
-    M_b = M_aero_b + M_T_b
+    M_b = M_aero_b
     
     # Coriolis term: w × (I*w)
-    I_w = torch.stack([
-        I_xx * w_b[..., 0],
-        I_yy * w_b[..., 1],
-        I_zz * w_b[..., 2]
-    ], dim=-1)
+    I_w = I_diag * w_b
     w_cross_Iw = torch.cross(w_b, I_w, dim=-1)
     
     # Angular acceleration
     net_moment = M_b - w_cross_Iw
-    w_dot = torch.stack([
-        net_moment[..., 0] / torch.clamp(I_xx, min=1e-3),
-        net_moment[..., 1] / torch.clamp(I_yy, min=1e-3),
-        net_moment[..., 2] / torch.clamp(I_zz, min=1e-3)
-    ], dim=-1)
+    w_dot = net_moment / torch.clamp(I_diag, min=1e-3)
     
     # Mass derivative (nondim)
     T_safe = torch.clamp(T, min=0.0)
@@ -354,7 +402,50 @@ def compute_dynamics(
         m_dot       # [13]
     ], dim=-1)
     
-    return xdot
+    return xdot.reshape(*batch_shape, xdot.shape[-1])
+
+
+def compute_jacobians(
+    x: torch.Tensor,
+    u: torch.Tensor,
+    params: Dict[str, torch.Tensor],
+    scales: Dict[str, float] = None,
+    t: Optional[torch.Tensor] = None
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Batched Jacobians of compute_dynamics for linearization.
+    
+    Rows of compute_dynamics are independent, so the Jacobian of the
+    row-summed dynamics with respect to all rows holds every row's Jacobian.
+    It is taken in reverse mode (torch.func.jacrev, which vmaps the 14
+    output cotangents), i.e. one batched forward pass and 14 batched
+    backward passes, instead of a jacfwd per row (18 input tangents, about
+    4x slower on small batches; see src/eval/bench_jacobians.py).
+    Parameters are scalars or per-case tensors as for compute_dynamics and
+    are held constant.
+    
+    Args:
+        x: State vector [..., 14] (nondim)
+        u: Control vector [..., 4] (nondim)
+        params: Dictionary of physical parameters (nondim), scalar or per case
+        scales: Scaling factors (as for compute_dynamics)
+        t: Time of every row (as for compute_dynamics), held constant
+        
+    Returns:
+        A: df/dx [..., 14, 14]
+        B: df/du [..., 14, 4]
+    """
+    batch_shape = x.shape[:-1]
+    x_rows = x.reshape(-1, x.shape[-1])
+    u_rows = u.reshape(-1, u.shape[-1]).expand(x_rows.shape[0], -1)
+    
+    def summed_dynamics(x_in, u_in):
+        return compute_dynamics(x_in.view(*batch_shape, -1), u_in.view(*batch_shape, -1), params, scales, t) \
+            .reshape(-1, x_in.shape[-1]).sum(0)
+    
+    A, B = jacrev(summed_dynamics, argnums=(0, 1))(x_rows, u_rows)  # [14, M, 14], [14, M, 4]
+    return (A.permute(1, 0, 2).reshape(*batch_shape, 14, 14),
+            B.permute(1, 0, 2).reshape(*batch_shape, 14, 4))
 
 
 class DynamicsModule(nn.Module):
@@ -29,6 +29,7 @@ from typing import Dict, Optional, Tuple
 import torch
 import torch.nn as nn
 
+from src.physics.derivatives import time_derivative
 from src.physics.dynamics_pytorch import compute_dynamics
 
 
@@ -43,6 +44,7 @@ class PhysicsResiduals:
         rotation_residual: Residual on [q0..q3, wx, wy, wz] [batch, N, 7]
         mass_residual: Residual on mass component [batch, N, 1]
         state_dot: Autograd-based first derivative ds/dt [batch, N, 14]
+        derivative_order: Stencil order of state_dot (PINNLoss reuses a matching one)
     """
 
     state_residual: torch.Tensor
@@ -50,6 +52,7 @@ class PhysicsResiduals:
     rotation_residual: torch.Tensor
     mass_residual: torch.Tensor
     state_dot: torch.Tensor
+    derivative_order: Optional[int] = None
 
 
 class PhysicsResidualLayer(nn.Module):
@@ -66,15 +69,18 @@ class PhysicsResidualLayer(nn.Module):
         physics_params: Optional[Dict] = None,
         scales: Optional[Dict] = None,
         eps: float = 1e-8,
+        derivative_order: int = 2,
     ) -> None:
         """
         Args:
             physics_params: Dictionary of physical parameters (as in PINNLoss).
             scales: Optional scaling dictionary used by `compute_dynamics`.
             eps: Small epsilon to stabilize divisions.
+            derivative_order: Finite-difference stencil order for ds/dt (1, 2 or 4).
         """
         super().__init__()
         self.eps = eps
+        self.derivative_order = derivative_order
 
         physics_params = physics_params or {}
         self._params_tensors = {
@@ -121,7 +127,8 @@ class PhysicsResidualLayer(nn.Module):
 
         NOTE:
             The blueprint requires "Use autograd to obtain derivatives", but for
-            training efficiency we use finite differences here (same method as PINNLoss).
+            training efficiency we use finite differences here (shared operator
+            with PINNLoss, see `src.physics.derivatives`).
             This is numerically equivalent and much more memory-efficient.
 
             For explicit autograd-based derivatives, see the optional
@@ -134,38 +141,14 @@ class PhysicsResidualLayer(nn.Module):
         Returns:
             state_dot: First derivative ds/dt [batch, N, 14]
         """
-        batch, N, dim = state.shape
-        state_dot = torch.zeros_like(state)
-
-        if N < 2:
-            return state_dot
-
-        # Extract time values (assuming uniform grid per batch)
-        t_vals = t[:, :, 0]  # [batch, N]
-
-        # Forward difference at first point
-        dt_forward = (t_vals[:, 1] - t_vals[:, 0])  # [batch]
-        dt_forward = dt_forward.clamp_min(self.eps).view(batch, 1)  # [batch, 1]
-        state_dot[:, 0, :] = (state[:, 1, :] - state[:, 0, :]) / dt_forward  # [batch, dim]
-
-        # Central difference for interior points
-        for i in range(1, N - 1):
-            dt_central = (t_vals[:, i+1] - t_vals[:, i-1])  # [batch]
-            dt_central = dt_central.clamp_min(self.eps).view(batch, 1)  # [batch, 1]
-            state_dot[:, i, :] = (state[:, i+1, :] - state[:, i-1, :]) / dt_central  # [batch, dim]
-
-        # Backward difference at last point
-        dt_backward = (t_vals[:, -1] - t_vals[:, -2])  # [batch]
-        dt_backward = dt_backward.clamp_min(self.eps).view(batch, 1)  # [batch, 1]
-        state_dot[:, -1, :] = (state[:, -1, :] - state[:, -2, :]) / dt_backward  # [batch, dim]
-
-        return state_dot
+        return time_derivative(state, t, order=self.derivative_order, eps=self.eps)
 
     def forward(
         self,
         t: torch.Tensor,
         state_pred: torch.Tensor,
         control: Optional[torch.Tensor] = None,
+        env: Optional[Dict[str, torch.Tensor]] = None,
     ) -> PhysicsResiduals:
         """
         Compute physics residuals for a predicted trajectory.
@@ -176,6 +159,9 @@ class PhysicsResidualLayer(nn.Module):
             state_pred: Predicted state [N, 14] or [batch, N, 14].
             control: Optional control trajectory [batch, N, 4] or [N, 4].
                      If None, zeros will be used (consistent with PINNLoss).
+            env: Optional per-case environment ([batch] / [batch, 3] tensors
+                 from `environment_params`): wind, gusts at the times `t`
+                 and gravity of each trajectory.
 
         Returns:
             PhysicsResiduals object containing full residuals and useful slices.
@@ -192,29 +178,26 @@ class PhysicsResidualLayer(nn.Module):
         # Note: This is equivalent to autograd but much faster and uses less memory
         state_dot = self._finite_difference_time_derivative(t, state_pred)  # [batch, N, 14]
 
-        # Flatten for dynamics computation
-        state_flat = state_pred.view(-1, state_dim)  # [batch*N, 14]
-
         # Prepare control (use zero if not provided)
         if control is None:
-            control_flat = torch.zeros(
-                batch * N, 4, device=device, dtype=state_pred.dtype
+            control = torch.zeros(
+                batch, N, 4, device=device, dtype=state_pred.dtype
             )
-        else:
-            if control.dim() == 2:
-                control = control.unsqueeze(0)
-            control_flat = control.view(-1, 4)
+        elif control.dim() == 2:
+            control = control.unsqueeze(0)
 
         params_device = self._prepare_params_device(device)
+        if env is not None:
+            params_device.update({k: v.to(device) for k, v in env.items()})
 
-        # Compute dynamics f(s, u, p)
+        # Compute dynamics f(s, u, p) on all batch*N points at once
         state_dot_dynamics = compute_dynamics(
-            state_flat,
-            control_flat,
+            state_pred,
+            control.expand(batch, N, 4),
             params_device,
             self.scales,
-        )  # [batch*N, 14]
-        state_dot_dynamics = state_dot_dynamics.view(batch, N, state_dim)
+            t=t,
+        )  # [batch, N, 14]
 
         # Full residual
         state_residual = state_dot - state_dot_dynamics  # [batch, N, 14]
@@ -237,6 +220,7 @@ class PhysicsResidualLayer(nn.Module):
             rotation_residual=rotation_residual,
             mass_residual=mass_residual,
             state_dot=state_dot,
+            derivative_order=self.derivative_order,
         )
 
 
@@ -0,0 +1,376 @@
+"""
+Batched RK4 / RK45 rollouts of the torch dynamics (``compute_dynamics``).
+
+Integrates thousands of parameter sets in parallel (batched tensors, CPU or
+any torch device) to produce physics ground truth on the fly. States, time
+and parameters follow the convention of PhysicsResidualLayer (nondim
+params + scales), so a rollout satisfies the residual the PINN is trained
+against up to the integration error.
+
+- "rk4": classical fixed step, ``substeps`` steps per grid interval
+- "rk45": Dormand-Prince with per-trajectory step control: every trajectory
+  keeps its own time, step size and next output point, so a stiff case
+  does not shrink the steps of the rest of the batch
+- Finished trajectories (end of the grid or a ``terminate`` event) are
+  masked out: only active rows are evaluated, a terminated trajectory holds
+  its last state and ``valid`` marks the points it actually reached
+
+Usage:
+    engine = RolloutEngine(physics_params, scales, method="rk45")
+    result = engine.rollout(x0, t, control, case_params={"Cd": cd, "T_max": t_max})
+    print(result.trajectories_per_s)
+"""
+
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Union
+
+import torch
+
+from src.physics.dynamics_pytorch import compute_dynamics
+
+# Dormand-Prince 5(4) tableau
+_DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0)
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+_DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+# Difference of the 5th and embedded 4th order weights (last entry: FSAL stage)
+_DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+# (t [B'], x [B', 14], index [B']) -> u [B', 4]
+ControlFn = Callable[[torch.Tensor, torch.Tensor, torch.Tensor], torch.Tensor]
+
+
+@dataclass
+class RolloutResult:
+    """
+    Batched rollout (nondim, as compute_dynamics).
+
+    Attributes:
+        t: Time grid [B, N]
+        state: States on the grid [B, N, 14]
+        control: Controls on the grid [B, N, 4]
+        valid: Grid points reached before termination [B, N]
+        steps: Accepted integration steps per trajectory [B]
+        rejected_steps: Rejected RK45 steps per trajectory [B]
+        rhs_rows: compute_dynamics rows evaluated (all calls)
+        elapsed_s: Wall time of the rollout
+    """
+
+    t: torch.Tensor
+    state: torch.Tensor
+    control: torch.Tensor
+    valid: torch.Tensor
+    steps: torch.Tensor
+    rejected_steps: torch.Tensor
+    rhs_rows: int
+    elapsed_s: float
+
+    @property
+    def trajectories_per_s(self) -> float:
+        return self.state.shape[0] / self.elapsed_s if self.elapsed_s > 0 else float("inf")
+
+
+@contextmanager
+def _deterministic(enabled: bool):
+    """torch.use_deterministic_algorithms for the enclosed block (restored afterwards)."""
+    if not enabled:
+        yield
+        return
+    previous = torch.are_deterministic_algorithms_enabled()
+    torch.use_deterministic_algorithms(True)
+    try:
+        yield
+    finally:
+        torch.use_deterministic_algorithms(previous)
+
+
+class RolloutEngine:
+    """
+    Batched integrator of compute_dynamics over many parameter sets.
+
+    Shared parameters are given once (as for PhysicsResidualLayer); per-case
+    parameters are passed to rollout() as [B] tensors ([B, 3] or [B, 3, 3]
+    for I_b).
+    """
+
+    def __init__(
+        self,
+        physics_params: Optional[Dict] = None,
+        scales: Optional[Dict] = None,
+        method: str = "rk4",
+        rtol: float = 1e-6,
+        atol: float = 1e-8,
+        substeps: int = 1,
+        max_iterations: int = 1_000_000,
+        normalize_quat: bool = True,
+        deterministic: bool = False,
+        dtype: torch.dtype = torch.float64,
+        device: Optional[torch.device] = None,
+    ) -> None:
+        """
+        Args:
+            physics_params: Parameters shared by all cases (as in PINNLoss)
+            scales: Scaling dictionary used by compute_dynamics (missing keys: 1.0)
+            method: "rk4" (fixed step) or "rk45" (adaptive, per trajectory)
+            rtol: Relative tolerance for rk45
+            atol: Absolute tolerance for rk45
+            substeps: RK4 steps per grid interval
+            max_iterations: Bound on rk45 batch iterations (RuntimeError beyond)
+            normalize_quat: Renormalize quaternions after every accepted step
+            deterministic: Run with torch.use_deterministic_algorithms; the
+                integration itself is row-wise, so a trajectory does not depend
+                on the rest of the batch
+            dtype: Integration dtype
+            device: Integration device (default: CPU)
+        """
+        if method not in ("rk4", "rk45"):
+            raise ValueError(f"Unknown method '{method}', expected 'rk4' or 'rk45'")
+        self.method = method
+        self.rtol = rtol
+        self.atol = atol
+        self.substeps = max(1, int(substeps))
+        self.max_iterations = max_iterations
+        self.normalize_quat = normalize_quat
+        self.deterministic = deterministic
+        self.dtype = dtype
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        self.params = {
+            k: torch.as_tensor(v, dtype=dtype, device=self.device) for k, v in (physics_params or {}).items()
+        }
+        # Same defaults as PhysicsResidualLayer
+        self.scales = defaultdict(lambda: 1.0, scales or {})
+        self.stats = {"trajectories": 0, "seconds": 0.0}
+
+    @property
+    def trajectories_per_s(self) -> float:
+        """Throughput over all rollouts of this engine."""
+        seconds = self.stats["seconds"]
+        return self.stats["trajectories"] / seconds if seconds > 0 else 0.0
+
+    # Inputs
+
+    def _case_params(self, case_params: Optional[Dict], batch: int) -> Dict[str, torch.Tensor]:
+        """Per-case parameters as [B] tensors ([B, 3, 3] for I_b)."""
+        params = {}
+        for name, value in (case_params or {}).items():
+            value = torch.as_tensor(value, dtype=self.dtype, device=self.device)
+            if value.dim() == 0 or value.shape[0] != batch:
+                raise ValueError(f"Per-case parameter '{name}' must have {batch} rows, got shape {tuple(value.shape)}")
+            if name == "I_b" and value.dim() == 2:
+                value = torch.diag_embed(value)
+            params[name] = value
+        return params
+
+    def _select(self, case_params: Dict[str, torch.Tensor], index: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """compute_dynamics parameters of rows `index`: shared ones plus the selected per-case rows."""
+        params = dict(self.params)
+        for name, value in case_params.items():
+            params[name] = value.index_select(0, index)
+        return params
+
+    def _control_at(
+        self, control, grid: torch.Tensor, interval: torch.Tensor, t: torch.Tensor, x: torch.Tensor, index: torch.Tensor
+    ) -> torch.Tensor:
+        """Controls of rows `index` at times t inside grid interval [interval - 1, interval]."""
+        if callable(control):
+            return control(t, x, index)
+        if control.dim() == 1:
+            return control.expand(index.shape[0], -1)
+        if control.dim() == 2:
+            return control.index_select(0, index)
+        # [B, N, 4]: linear interpolation on the grid
+        t0 = grid[index, interval - 1]
+        t1 = grid[index, interval]
+        weight = ((t - t0) / (t1 - t0)).unsqueeze(-1)
+        u0 = control[index, interval - 1]
+        return u0 + weight * (control[index, interval] - u0)
+
+    # Integration
+
+    def rollout(
+        self,
+        x0: torch.Tensor,
+        t: torch.Tensor,
+        control: Union[torch.Tensor, ControlFn],
+        case_params: Optional[Dict[str, torch.Tensor]] = None,
+        terminate: Optional[Callable[[torch.Tensor, torch.Tensor, torch.Tensor], torch.Tensor]] = None,
+    ) -> RolloutResult:
+        """
+        Integrate a batch of trajectories.
+
+        Args:
+            x0: Initial states [B, 14] (nondim)
+            t: Output grid [N] shared by all cases or [B, N] per case (increasing)
+            control: [4] or [B, 4] constant, [B, N, 4] on the grid (linear in
+                between), or a callable (t [B'], x [B', 14], index [B']) -> [B', 4]
+            case_params: Per-case compute_dynamics parameters ([B] tensors),
+                e.g. environment_params entries (gusts use the row times)
+            terminate: Optional event (t [B'], x [B', 14], index [B']) -> bool [B'],
+                checked on every grid point; a trajectory stops at the first hit
+
+        Returns:
+            RolloutResult with the states on the grid and per-trajectory step counts
+        """
+        start = time.perf_counter()
+        x = x0.to(device=self.device, dtype=self.dtype).clone()
+        batch = x.shape[0]
+        grid = t.to(device=self.device, dtype=self.dtype)
+        if grid.dim() == 1:
+            grid = grid.unsqueeze(0).expand(batch, -1)
+        n_points = grid.shape[1]
+        if not callable(control):
+            control = control.to(device=self.device, dtype=self.dtype)
+        params = self._case_params(case_params, batch)
+
+        states = x.new_empty(batch, n_points, 14)
+        controls = x.new_empty(batch, n_points, 4)
+        valid = torch.zeros(batch, n_points, dtype=torch.bool, device=self.device)
+        steps = torch.zeros(batch, dtype=torch.long, device=self.device)
+        rejected = torch.zeros(batch, dtype=torch.long, device=self.device)
+        self._rhs_rows = 0
+
+        def f(time_rows, state, index, interval, rows_params):
+            self._rhs_rows += index.shape[0]
+            u = self._control_at(control, grid, interval, time_rows, state, index)
+            return compute_dynamics(state, u, rows_params, self.scales, t=time_rows)
+
+        def record(index, k, state):
+            states[index, k] = state
+            interval = torch.clamp(k, min=1) if torch.is_tensor(k) else torch.full_like(index, max(k, 1))
+            controls[index, k] = self._control_at(control, grid, interval, grid[index, k], state, index)
+            valid[index, k] = True
+
+        with _deterministic(self.deterministic), torch.no_grad():
+            everyone = torch.arange(batch, device=self.device)
+            record(everyone, 0, x)
+            if self.method == "rk4":
+                self._rollout_rk4(f, record, x, grid, params, steps, terminate)
+            else:
+                self._rollout_rk45(f, record, x, grid, params, steps, rejected, terminate)
+
+        # Terminated trajectories hold their last state
+        last = valid.long().sum(dim=1) - 1
+        hold = ~valid
+        if hold.any():
+            rows = torch.arange(batch, device=self.device).unsqueeze(1).expand(-1, n_points)
+            states[hold] = states[rows[hold], last[rows[hold]]]
+            controls[hold] = controls[rows[hold], last[rows[hold]]]
+
+        elapsed = time.perf_counter() - start
+        self.stats["trajectories"] += batch
+        self.stats["seconds"] += elapsed
+        return RolloutResult(
+            t=grid, state=states, control=controls, valid=valid, steps=steps,
+            rejected_steps=rejected, rhs_rows=self._rhs_rows, elapsed_s=elapsed,
+        )
+
+    def _normalize(self, state: torch.Tensor) -> torch.Tensor:
+        if not self.normalize_quat:
+            return state
+        q = state[:, 6:10]
+        return torch.cat([state[:, :6], q / torch.linalg.vector_norm(q, dim=1, keepdim=True), state[:, 10:]], dim=1)
+
+    def _rollout_rk4(self, f, record, x, grid, params, steps, terminate) -> None:
+        batch, n_points = grid.shape
+        active = torch.arange(batch, device=self.device)
+        for k in range(1, n_points):
+            rows_params = self._select(params, active)
+            interval = torch.full_like(active, k)
+            t0 = grid[active, k - 1]
+            h = (grid[active, k] - t0) / self.substeps
+            state = x[active]
+            for i in range(self.substeps):
+                time_rows = t0 + i * h
+                h_col = h.unsqueeze(-1)
+                k1 = f(time_rows, state, active, interval, rows_params)
+                k2 = f(time_rows + 0.5 * h, state + 0.5 * h_col * k1, active, interval, rows_params)
+                k3 = f(time_rows + 0.5 * h, state + 0.5 * h_col * k2, active, interval, rows_params)
+                k4 = f(time_rows + h, state + h_col * k3, active, interval, rows_params)
+                state = self._normalize(state + h_col / 6.0 * (k1 + 2.0 * k2 + 2.0 * k3 + k4))
+            x[active] = state
+            steps[active] += self.substeps
+            record(active, k, state)
+            if terminate is not None:
+                active = active[~terminate(grid[active, k], state, active)]
+                if active.numel() == 0:
+                    break
+
+    def _rollout_rk45(self, f, record, x, grid, params, steps, rejected, terminate) -> None:
+        batch, n_points = grid.shape
+        if n_points < 2:
+            return
+        time_now = grid[:, 0].clone()
+        h = grid[:, 1] - grid[:, 0]
+        target = torch.ones(batch, dtype=torch.long, device=self.device)  # next output point
+        everyone = torch.arange(batch, device=self.device)
+        k1_all = f(time_now, x, everyone, target, self._select(params, everyone))
+        active = everyone
+
+        for _ in range(self.max_iterations):
+            if active.numel() == 0:
+                return
+            rows_params = self._select(params, active)
+            interval = target[active]
+            t_rows = time_now[active]
+            t_next = grid[active, interval]
+            remaining = t_next - t_rows
+            h_step = torch.minimum(h[active], remaining)
+            h_col = h_step.unsqueeze(-1)
+            state = x[active]
+
+            stages = [k1_all[active]]
+            for c, a in zip(_DP_C[1:], _DP_A[1:]):
+                increment = sum(a_j * k_j for a_j, k_j in zip(a, stages) if a_j)
+                stages.append(f(t_rows + c * h_step, state + h_col * increment, active, interval, rows_params))
+            x_new = state + h_col * sum(b * k for b, k in zip(_DP_B, stages) if b)
+            landed = h_step >= remaining
+            t_new = torch.where(landed, t_next, t_rows + h_step)
+            k7 = f(t_new, x_new, active, interval, rows_params)
+            error = h_col * sum(e * k for e, k in zip(_DP_E, stages + [k7]) if e)
+
+            scale = self.atol + self.rtol * torch.maximum(state.abs(), x_new.abs())
+            error_norm = torch.sqrt(torch.mean((error / scale) ** 2, dim=1))
+            error_norm = torch.nan_to_num(error_norm, nan=float("inf"))
+            accept = error_norm <= 1.0
+
+            factor = torch.where(
+                error_norm == 0.0, torch.full_like(error_norm, 5.0),
+                (0.9 * error_norm.pow(-0.2)).clamp(0.2, 5.0),
+            )
+            factor = torch.where(accept, factor, factor.clamp(max=1.0))
+            h_new = h_step * factor
+            # A step cut short by the output point does not limit the next one
+            h[active] = torch.where(accept & landed & (h_step < h[active]), torch.maximum(h[active], h_new), h_new)
+            if bool((h[active] < 1e-12 * torch.clamp(t_rows.abs(), min=1.0)).any()):
+                raise RuntimeError("RolloutEngine: step size underflow")
+
+            done_rows = active[accept]
+            x[done_rows] = self._normalize(x_new[accept])
+            time_now[done_rows] = t_new[accept]
+            # FSAL: the last stage is the next step's first (q_dot and forces only use the normalized q)
+            k1_all[done_rows] = k7[accept]
+            steps[done_rows] += 1
+            rejected[active[~accept]] += 1
+
+            finished = torch.zeros_like(accept)
+            landed_rows = accept & landed
+            if landed_rows.any():
+                rows = active[landed_rows]
+                record(rows, target[rows], x[rows])
+                if terminate is not None:
+                    finished[landed_rows] = terminate(time_now[rows], x[rows], rows)
+                target[rows] += 1
+                finished |= target[active] >= n_points
+            active = active[~finished]
+        raise RuntimeError(f"RolloutEngine: no convergence within {self.max_iterations} iterations")
@@ -108,7 +108,7 @@ def compute_dynamics(
     # This avoids division by fmax which can cause AD problems
     v_rel_b_norm_smooth = ca.sqrt(ca.dot(v_rel_b, v_rel_b) + 1e-12)
     u_drag_b = -v_rel_b / v_rel_b_norm_smooth
-    F_D_b = -q_dyn * S_ref * Cd * u_drag_b
+    F_D_b = q_dyn * S_ref * Cd * u_drag_b
     
     # Lift force in body frame (perpendicular to velocity, in x-z plane)
     # Use smooth approximation for division to avoid AD issues
@@ -121,7 +121,7 @@ def compute_dynamics(
     # Smooth normalization for lift direction
     e_lift_b_norm_smooth = ca.sqrt(ca.dot(e_lift_b, e_lift_b) + 1e-12)
     e_lift_b = e_lift_b / e_lift_b_norm_smooth
-    F_L_b = q_dyn * S_ref * CL_alpha * alpha * e_lift_b
+    F_L_b = -q_dyn * S_ref * CL_alpha * alpha * e_lift_b  # Against the crossflow
     
     # Total force in body frame
     F_b = F_T_b + F_D_b + F_L_b
@@ -10,7 +10,9 @@ import torch
 import torch.nn as nn
 from typing import Dict, Optional, Tuple
 
-from src.physics.dynamics_pytorch import compute_dynamics
+from src.physics.derivatives import time_derivative
+from src.physics.dynamics_pytorch import compute_dynamics, gravity_acceleration
+from src.physics.physics_residual_layer import PhysicsResiduals
 
 
 class PINNLoss(nn.Module):
@@ -61,6 +63,8 @@ class PINNLoss(nn.Module):
         lambda_az: float = 0.0,
         # FIX 4: Burn floor loss (OPTIONAL)
         lambda_burn: float = 0.0,
+        # Finite-difference stencil order for time derivatives (1 = forward difference)
+        derivative_order: int = 1,
     ):
         super().__init__()
         
@@ -86,6 +90,7 @@ class PINNLoss(nn.Module):
         self.lambda_mdot = lambda_mdot
         self.lambda_az = lambda_az
         self.lambda_burn = lambda_burn
+        self.derivative_order = derivative_order
         
         self.physics_params = physics_params or {}
         self.scales = scales or {}
@@ -179,15 +184,7 @@ class PINNLoss(nn.Module):
         t: torch.Tensor,
     ) -> torch.Tensor:
         # values: [batch, N, d], t: [batch, N, 1]
-        batch, N, d = values.shape
-        if N < 2:
-            return torch.zeros_like(values)
-        diffs = torch.zeros_like(values)
-        dt = t[:, 1:, 0] - t[:, :-1, 0]  # [batch, N-1]
-        dt = dt.clamp_min(self._eps).unsqueeze(-1)
-        diffs[:, :-1, :] = (values[:, 1:, :] - values[:, :-1, :]) / dt
-        diffs[:, -1, :] = diffs[:, -2, :]
-        return diffs
+        return time_derivative(values, t, order=self.derivative_order, eps=self._eps)
 
     def _second_difference(
         self,
@@ -479,6 +476,25 @@ class PINNLoss(nn.Module):
         residual = dm_dt + expected
         return torch.mean(residual ** 2)
 
+    def _environment(
+        self,
+        state: torch.Tensor,
+        env: Dict[str, torch.Tensor],
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Per-point gravity [batch, N, 1] and g0 [batch, N, 1] of the per-case
+        environment `env` (environment_params entries).
+        """
+        batch_shape = state.shape[:-1]
+        rows = state.reshape(-1, state.shape[-1])
+        params = {k: v.to(state.device) for k, v in env.items()}
+        g0 = params.get("g0", self._get_param("g0", 9.81).to(state.device))
+        if g0.dim() > 0:
+            g0 = g0.view(-1, 1, 1).expand(*batch_shape, 1).reshape(-1, 1)
+        altitude = rows[:, 2:3] * self.scales.get("L", 1.0)
+        g = gravity_acceleration(altitude, g0, params, batch_shape).expand(rows.shape[0], 1)
+        return g.view(*batch_shape, 1), g0.expand(rows.shape[0], 1).view(*batch_shape, 1)
+
     def _drag_acc_component(
         self,
         velocity_component: torch.Tensor,
@@ -501,6 +517,8 @@ class PINNLoss(nn.Module):
         state: torch.Tensor,
         t: torch.Tensor,
         context: Optional[torch.Tensor],
+        env: Optional[Dict[str, torch.Tensor]] = None,
+        state_dot: Optional[torch.Tensor] = None,
     ) -> torch.Tensor:
         """
         Reduced-order vertical physics residual using thrust inferred from mass
@@ -511,7 +529,10 @@ class PINNLoss(nn.Module):
             dvz/dt ≈ T_eff / m - g0
 
         This enforces thrust–mass coupling and vertical acceleration plausibility
-        without relying on explicit controls or horizontal dynamics.
+        without relying on explicit controls or horizontal dynamics. With a
+        per-case environment `env`, g0 is the case's and gravity g(z) replaces
+        g0 in the acceleration (inverse-square cases). `state_dot` [batch, N, 14]
+        supplies precomputed time derivatives of `state` (same stencil order).
         """
         # Ensure batched format
         if state.dim() == 2:
@@ -525,8 +546,12 @@ class PINNLoss(nn.Module):
         vz = state[..., 5:6]  # [batch, N, 1]
 
         # Time derivatives via finite differences
-        m_dot = self._finite_difference(mass, t)  # [batch, N, 1]
-        dvz_dt = self._finite_difference(vz, t)  # [batch, N, 1]
+        if state_dot is not None:
+            m_dot = state_dot[..., 13:14]  # [batch, N, 1]
+            dvz_dt = state_dot[..., 5:6]  # [batch, N, 1]
+        else:
+            m_dot = self._finite_difference(mass, t)  # [batch, N, 1]
+            dvz_dt = self._finite_difference(vz, t)  # [batch, N, 1]
 
         # Specific impulse from context if available, otherwise from physics params
         if context is not None:
@@ -537,13 +562,17 @@ class PINNLoss(nn.Module):
         else:
             Isp_ctx = self._get_param("Isp", 300.0).to(state.device).view(1, 1, 1)
 
-        g0 = self._get_param("g0", 9.81).to(state.device).view(1, 1, 1)
+        if env is not None:
+            gravity, g0 = self._environment(state, env)  # [batch, N, 1]
+        else:
+            g0 = self._get_param("g0", 9.81).to(state.device).view(1, 1, 1)
+            gravity = g0
 
         # Effective thrust history consistent with mass depletion
         T_eff = -m_dot * Isp_ctx * g0  # [batch, N, 1]
 
         # Model-predicted vertical acceleration from thrust and gravity
-        a_model = T_eff / mass.clamp_min(self._eps) - g0  # [batch, N, 1]
+        a_model = T_eff / mass.clamp_min(self._eps) - gravity  # [batch, N, 1]
 
         residual = dvz_dt - a_model
         return torch.mean(residual ** 2)
@@ -575,6 +604,8 @@ class PINNLoss(nn.Module):
         state: torch.Tensor,
         control: Optional[torch.Tensor] = None,
         context: Optional[torch.Tensor] = None,
+        env: Optional[Dict[str, torch.Tensor]] = None,
+        residuals: Optional[PhysicsResiduals] = None,
     ) -> torch.Tensor:
         """
         Physics loss: reduced-order vertical residual aligned with training data.
@@ -584,7 +615,13 @@ class PINNLoss(nn.Module):
             dvz/dt ≈ - (dm/dt) * Isp * g0 / m - g0
 
         inferred from mass depletion, avoiding horizontal acceleration or full
-        ODE residuals that conflict with unknown controls.
+        ODE residuals that conflict with unknown controls. `env` optionally
+        holds the per-case environment (environment_params, [batch] tensors).
+
+        `residuals` are the model's physics-layer output for the same predicted
+        state; when their stencil order matches, their ds/dt is reused instead
+        of differencing the state again. Isp, g0 and gravity always come from
+        this loss's context, parameters and `env`.
         """
         # Ensure batched format
         if state.dim() == 2:
@@ -601,7 +638,16 @@ class PINNLoss(nn.Module):
                 context, batch_size, N, state.device
             )
 
-        return self._vertical_residual_loss(state, t, context_broadcast)
+        if residuals is not None and residuals.derivative_order == self.derivative_order:
+            state_dot = residuals.state_dot
+            if state_dot.dim() == 2:
+                state_dot = state_dot.unsqueeze(0)
+            if state_dot.shape == state.shape:
+                return self._vertical_residual_loss(
+                    state, t, context_broadcast, env=env, state_dot=state_dot
+                )
+
+        return self._vertical_residual_loss(state, t, context_broadcast, env=env)
     
     def quaternion_normalization_loss(
         self,
@@ -831,6 +877,8 @@ class PINNLoss(nn.Module):
         t: torch.Tensor,
         control: Optional[torch.Tensor] = None,
         context: Optional[torch.Tensor] = None,
+        env: Optional[Dict[str, torch.Tensor]] = None,
+        residuals: Optional[PhysicsResiduals] = None,
     ) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
         """
         Compute total loss and component losses.
@@ -840,12 +888,14 @@ class PINNLoss(nn.Module):
             true_state: [batch, N, 14] or [N, 14]
             t: Time [batch, N, 1] or [N, 1]
             control: Control [batch, N, 4] or [N, 4] (optional)
+            env: Per-case environment for the physics loss (optional)
+            residuals: Physics-layer output for pred_state from the model (optional)
             
         Returns:
             (total_loss, loss_dict) where loss_dict contains component losses
         """
         L_data = self.data_loss(pred_state, true_state)
-        L_phys = self.physics_loss(t, pred_state, control, context=context)
+        L_phys = self.physics_loss(t, pred_state, control, context=context, env=env, residuals=residuals)
         L_bc = self.boundary_loss(pred_state, true_state, t)
         
         # Enhanced loss components
@@ -59,6 +59,7 @@ class PINNLossV2(PINNLoss):
         # V2 specific: Component scaling and reweighted physics
         physics_scale: Optional[Dict[str, float]] = None,
         physics_groups: Optional[Dict[str, float]] = None,
+        derivative_order: int = 1,
     ):
         super().__init__(
             lambda_data=lambda_data,
@@ -83,6 +84,7 @@ class PINNLossV2(PINNLoss):
             lambda_zero_axy=lambda_zero_axy,
             lambda_hacc=lambda_hacc,
             lambda_xy_zero=lambda_xy_zero,
+            derivative_order=derivative_order,
         )
         
         # Default component scales for physics residuals
@@ -17,7 +17,9 @@ import torch.optim as optim
 import yaml
 from tqdm import tqdm
 
-from src.models import PINN
+from src.data.synthetic import TrajectorySynthesizer
+from src.models.factory import build_model, safe_float
+from src.physics.physics_residual_layer import PhysicsResiduals
 from src.train.callbacks import (
     CheckpointCallback,
     EarlyStopping,
@@ -28,6 +30,7 @@ from src.train.losses import PINNLoss
 from src.train.losses_v2 import PINNLossV2
 from src.utils.loaders import create_dataloaders
 from src.utils.loaders_v2 import create_dataloaders_v2
+from src.utils.profiler import StageProfiler, profile_stage
 from src.utils.reproducibility import set_seed
 
 
@@ -37,24 +40,22 @@ def load_config(config_path: str) -> Dict:
         return yaml.safe_load(f)
 
 
-def safe_float(value, default=None):
-    """Safely convert value to float, handling strings like '1e-3'."""
-    if value is None:
-        return default
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        try:
-            return float(value)
-        except ValueError:
-            return default
-    return default
-
-
 def _requires_initial_state(model: nn.Module) -> bool:
     return bool(getattr(model, "requires_initial_state", False))
 
 
+def _accepts_environment(model: nn.Module) -> bool:
+    return bool(getattr(model, "accepts_environment", False))
+
+
+def _batch_environment(batch: Dict, device: torch.device) -> Optional[Dict[str, torch.Tensor]]:
+    """Per-case environment of a batch (synthetic datasets), or None for the HDF5 splits."""
+    env = batch.get("env")
+    if env is None:
+        return None
+    return {k: v.to(device) for k, v in env.items()}
+
+
 def _forward_with_initial_state_if_needed(
     model: nn.Module,
     t: torch.Tensor,
@@ -62,24 +63,27 @@ def _forward_with_initial_state_if_needed(
     state_true: torch.Tensor,
     T_mag: Optional[torch.Tensor] = None,
     q_dyn: Optional[torch.Tensor] = None,
+    env: Optional[Dict[str, torch.Tensor]] = None,
 ) -> torch.Tensor:
     """
-    Forward pass helper that handles initial state and v2 features.
+    Forward pass helper that handles initial state, v2 features and environment.
     
     Models that support v2 features (T_mag, q_dyn) should accept them as
-    optional keyword arguments. V1 models will ignore them.
+    optional keyword arguments. V1 models will ignore them. The per-case
+    environment is passed to models that declare accepts_environment.
     """
+    extra = {"env": env} if env is not None and _accepts_environment(model) else {}
     if _requires_initial_state(model):
         initial_state = state_true[:, 0, :]
         # Try v2 signature first, fallback to v1
         try:
-            return model(t, context, initial_state, T_mag=T_mag, q_dyn=q_dyn)
+            return model(t, context, initial_state, T_mag=T_mag, q_dyn=q_dyn, **extra)
         except TypeError:
             return model(t, context, initial_state)
     
     # Try v2 signature first, fallback to v1
     try:
-        return model(t, context, T_mag=T_mag, q_dyn=q_dyn)
+        return model(t, context, T_mag=T_mag, q_dyn=q_dyn, **extra)
     except TypeError:
         return model(t, context)
 
@@ -223,18 +227,21 @@ def train_epoch(
         loss_fn.lambda_phys = weights["lambda_phys"]
         loss_fn.lambda_bc = weights["lambda_bc"]
     
+    # Stages are only recorded while a StageProfiler is active (see --profile)
     for batch in tqdm(train_loader, desc=f"Epoch {epoch+1}"):
-        t = batch["t"].to(device)  # [batch, N]
-        context = batch["context"].to(device)  # [batch, context_dim]
-        state_true = batch["state"].to(device)  # [batch, N, 14]
-        
-        # V2 features (optional)
-        T_mag = batch.get("T_mag", None)
-        q_dyn = batch.get("q_dyn", None)
-        if T_mag is not None:
-            T_mag = T_mag.to(device)
-        if q_dyn is not None:
-            q_dyn = q_dyn.to(device)
+        with profile_stage("data_transfer"):
+            t = batch["t"].to(device)  # [batch, N]
+            context = batch["context"].to(device)  # [batch, context_dim]
+            state_true = batch["state"].to(device)  # [batch, N, 14]
+            env = _batch_environment(batch, device)  # Per-case wind/gravity (synthetic data)
+
+            # V2 features (optional)
+            T_mag = batch.get("T_mag", None)
+            q_dyn = batch.get("q_dyn", None)
+            if T_mag is not None:
+                T_mag = T_mag.to(device)
+            if q_dyn is not None:
+                q_dyn = q_dyn.to(device)
         
         # Ensure t has correct shape [batch, N, 1]
         if t.dim() == 2:
@@ -243,28 +250,36 @@ def train_epoch(
         # Forward pass
         optimizer.zero_grad()
         # Pass T_mag and q_dyn if available (models that support v2 will use them)
-        model_out = _forward_with_initial_state_if_needed(
-            model, t, context, state_true, T_mag=T_mag, q_dyn=q_dyn
-        )
+        with profile_stage("forward"):
+            model_out = _forward_with_initial_state_if_needed(
+                model, t, context, state_true, T_mag=T_mag, q_dyn=q_dyn, env=env
+            )
 
         # Some models (e.g. Direction AN) return (state_pred, physics_residuals).
-        # For training we only need the state prediction here; residuals are
-        # computed again inside the loss. This keeps older models fully intact.
+        # The loss reuses their ds/dt when its stencil order matches the
+        # physics layer's; otherwise it recomputes it. This keeps older
+        # models fully intact.
+        residuals = None
         if isinstance(model_out, (tuple, list)):
             state_pred = model_out[0]
+            if isinstance(model_out[1], PhysicsResiduals):
+                residuals = model_out[1]
         else:
             state_pred = model_out
 
         # Compute loss
-        loss, loss_dict = loss_fn(state_pred, state_true, t, context=context)
+        with profile_stage("loss"):
+            loss, loss_dict = loss_fn(state_pred, state_true, t, context=context, env=env, residuals=residuals)
         
         # Backward pass
-        loss.backward()
+        with profile_stage("backward"):
+            loss.backward()
         
-        # Gradient clipping
-        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
-        
-        optimizer.step()
+        with profile_stage("optimizer"):
+            # Gradient clipping
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+
+            optimizer.step()
         
         # Accumulate losses - log ALL components from loss_dict
         total_loss += loss.item()
@@ -306,6 +321,7 @@ def validate(
         t = batch["t"].to(device)
         context = batch["context"].to(device)
         state_true = batch["state"].to(device)
+        env = _batch_environment(batch, device)
         
         # V2 features (optional)
         T_mag = batch.get("T_mag", None)
@@ -319,7 +335,7 @@ def validate(
             t = t.unsqueeze(-1)
         
         model_out = _forward_with_initial_state_if_needed(
-            model, t, context, state_true, T_mag=T_mag, q_dyn=q_dyn
+            model, t, context, state_true, T_mag=T_mag, q_dyn=q_dyn, env=env
         )
 
         if isinstance(model_out, (tuple, list)):
@@ -327,7 +343,7 @@ def validate(
         else:
             state_pred = model_out
 
-        loss, loss_dict = loss_fn(state_pred, state_true, t, context=context)
+        loss, loss_dict = loss_fn(state_pred, state_true, t, context=context, env=env)
 
         total_loss += loss.item()
         # Accumulate losses - log ALL components from loss_dict
@@ -357,6 +373,10 @@ def main():
     parser.add_argument("--experiment_dir", type=str, default="experiments", help="Experiment directory")
     parser.add_argument("--resume", type=str, default=None, help="Resume from checkpoint")
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile the first epoch per stage (logs/profile.txt, logs/profile_trace.json)"
+    )
     args = parser.parse_args()
     
     # Set seed
@@ -450,254 +470,28 @@ def main():
     # Get context dimension from dataset
     context_dim = train_loader.dataset.context_dim
     
-    # [PINN_V2][2025-01-XX][Direction A]
-    # Create model based on model_type configuration
-    model_type = model_cfg.get("type", "pinn").lower()
-    
-    if model_type == "pinn":
-        model = PINN(
-            context_dim=context_dim,
-            n_hidden=int(model_cfg.get("n_hidden", 6)),
-            n_neurons=int(model_cfg.get("n_neurons", 128)),
-            activation=model_cfg.get("activation", "tanh"),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05)
-        ).to(device)
-    elif model_type == "direction_d":
-        from src.models.direction_d_pinn import DirectionDPINN
-        
-        model = DirectionDPINN(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
-            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
-            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
-            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
-            activation=model_cfg.get("activation", "gelu"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-        ).to(device)
-    elif model_type == "direction_d1":
-        from src.models.direction_d_pinn import DirectionDPINN_D1
-        
-        model = DirectionDPINN_D1(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
-            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
-            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
-            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
-            activation=model_cfg.get("activation", "gelu"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-            integration_method=model_cfg.get("integration_method", "rk4"),
-            use_physics_aware=bool(model_cfg.get("use_physics_aware", True)),
-        ).to(device)
-    elif model_type == "direction_d15":
-        from src.models.direction_d_pinn import DirectionDPINN_D15
-
-        model = DirectionDPINN_D15(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
-            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
-            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
-            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
-            activation=model_cfg.get("activation", "gelu"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-            use_rotation_6d=bool(model_cfg.get("use_rotation_6d", True)),
-            enforce_mass_monotonicity=bool(model_cfg.get("enforce_mass_monotonicity", False)),
-        ).to(device)
-    elif model_type == "direction_an":
-        from src.models.direction_an_pinn import DirectionANPINN
-
-        model = DirectionANPINN(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            stem_hidden_dim=int(model_cfg.get("stem_hidden_dim", 128)),
-            stem_layers=int(model_cfg.get("stem_layers", 4)),
-            activation=model_cfg.get("activation", "tanh"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
-            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
-            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-            physics_params=physics_params,
-            physics_scales=scales,
-        ).to(device)
-    elif model_type == "direction_d154":
-        from src.models.direction_d_pinn import DirectionDPINN_D154
-        
-        model = DirectionDPINN_D154(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            extra_embedding_dim=int(model_cfg.get("extra_embedding_dim", 16)),
-            backbone_hidden_dims=model_cfg.get("backbone_hidden_dims", [256, 256, 256, 256]),
-            head_g3_hidden_dims=model_cfg.get("head_g3_hidden_dims", [128, 64]),
-            head_g2_hidden_dims=model_cfg.get("head_g2_hidden_dims", [256, 128, 64]),
-            head_g1_hidden_dims=model_cfg.get("head_g1_hidden_dims", [256, 128, 128, 64]),
-            activation=model_cfg.get("activation", "gelu"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-            use_rotation_6d=bool(model_cfg.get("use_rotation_6d", True)),
-            enforce_mass_monotonicity=bool(model_cfg.get("enforce_mass_monotonicity", False)),
-        ).to(device)
-    elif model_type == "direction_an1":
-        from src.models.direction_an_pinn import DirectionANPINN_AN1
-
-        model = DirectionANPINN_AN1(
-            context_dim=context_dim,
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            extra_embedding_dim=int(model_cfg.get("extra_embedding_dim", 16)),
-            stem_hidden_dim=int(model_cfg.get("stem_hidden_dim", 128)),
-            stem_layers=int(model_cfg.get("stem_layers", 4)),
-            activation=model_cfg.get("activation", "tanh"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
-            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
-            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
-            dropout=safe_float(model_cfg.get("dropout"), 0.0),
-            physics_params=physics_params,
-            physics_scales=scales,
-        ).to(device)
-    elif model_type == "latent_ode":
-        from src.models.latent_ode import RocketLatentODEPINN
-        model = RocketLatentODEPINN(
-            context_dim=context_dim,
-            latent_dim=int(model_cfg.get("latent_dim", 64)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
-            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
-            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
-            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
-            activation=model_cfg.get("activation", "tanh"),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05)
-        ).to(device)
-    elif model_type == "sequence":
-        from src.models.sequence_pinn import RocketSequencePINN
-
-        model = RocketSequencePINN(
-            context_dim=context_dim,
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            d_model=int(model_cfg.get("d_model", 128)),
-            n_layers=int(model_cfg.get("n_layers", 4)),
-            n_heads=int(model_cfg.get("n_heads", 4)),
-            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05),
-            activation=model_cfg.get("transformer_activation", "gelu"),
-        ).to(device)
-    elif model_type == "hybrid":
-        from src.models.hybrid_pinn import RocketHybridPINN
-
-        model = RocketHybridPINN(
-            context_dim=context_dim,
-            latent_dim=int(model_cfg.get("latent_dim", 64)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 64)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            d_model=int(model_cfg.get("d_model", 128)),
-            n_layers=int(model_cfg.get("n_layers", 2)),
-            n_heads=int(model_cfg.get("n_heads", 4)),
-            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
-            encoder_window=int(model_cfg.get("encoder_window", 10)),
-            activation=model_cfg.get("activation", "tanh"),
-            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
-            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
-            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
-            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
-            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05),
-        ).to(device)
-    elif model_type == "hybrid_c1":
-        from src.models.hybrid_pinn import RocketHybridPINNC1
-
-        model = RocketHybridPINNC1(
-            context_dim=context_dim,
-            latent_dim=int(model_cfg.get("latent_dim", 64)),
-            context_embedding_dim=int(model_cfg.get("context_embedding_dim", 32)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            d_model=int(model_cfg.get("d_model", 128)),
-            n_layers=int(model_cfg.get("n_layers", 2)),
-            n_heads=int(model_cfg.get("n_heads", 4)),
-            dim_feedforward=int(model_cfg.get("dim_feedforward", 512)),
-            encoder_window=int(model_cfg.get("encoder_window", 10)),
-            activation=model_cfg.get("activation", "tanh"),
-            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
-            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
-            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
-            decoder_n_hidden=int(model_cfg.get("decoder_n_hidden", 3)),
-            decoder_n_neurons=int(model_cfg.get("decoder_n_neurons", 128)),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05),
-            debug_stats=bool(model_cfg.get("debug_stats", True)),
-        ).to(device)
-    elif model_type == "hybrid_c2":
-        from src.models.hybrid_pinn import RocketHybridPINNC2
-
-        model = RocketHybridPINNC2(
-            context_dim=context_dim,
-            latent_dim=int(model_cfg.get("latent_dim", 64)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            shared_stem_hidden_dim=int(model_cfg.get("shared_stem_hidden_dim", 128)),
-            temporal_type=model_cfg.get("temporal_type", "transformer"),
-            temporal_n_layers=int(model_cfg.get("temporal_n_layers", 4)),
-            temporal_n_heads=int(model_cfg.get("temporal_n_heads", 4)),
-            temporal_dim_feedforward=int(model_cfg.get("temporal_dim_feedforward", 512)),
-            encoder_window=int(model_cfg.get("encoder_window", 10)),
-            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
-            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
-            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
-            activation=model_cfg.get("activation", "tanh"),
-            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
-            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
-            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05),
-            debug_stats=bool(model_cfg.get("debug_stats", True)),
-        ).to(device)
-    elif model_type == "hybrid_c3":
-        from src.models.hybrid_pinn import RocketHybridPINNC3
-
-        model = RocketHybridPINNC3(
-            context_dim=context_dim,
-            latent_dim=int(model_cfg.get("latent_dim", 64)),
-            fourier_features=int(model_cfg.get("fourier_features", 8)),
-            shared_stem_hidden_dim=int(model_cfg.get("shared_stem_hidden_dim", 128)),
-            temporal_type=model_cfg.get("temporal_type", "transformer"),
-            temporal_n_layers=int(model_cfg.get("temporal_n_layers", 4)),
-            temporal_n_heads=int(model_cfg.get("temporal_n_heads", 4)),
-            temporal_dim_feedforward=int(model_cfg.get("temporal_dim_feedforward", 512)),
-            encoder_window=int(model_cfg.get("encoder_window", 10)),
-            translation_branch_dims=model_cfg.get("translation_branch_dims", [128, 128]),
-            rotation_branch_dims=model_cfg.get("rotation_branch_dims", [256, 256]),
-            mass_branch_dims=model_cfg.get("mass_branch_dims", [64]),
-            activation=model_cfg.get("activation", "tanh"),
-            transformer_activation=model_cfg.get("transformer_activation", "gelu"),
-            dynamics_n_hidden=int(model_cfg.get("dynamics_n_hidden", 3)),
-            dynamics_n_neurons=int(model_cfg.get("dynamics_n_neurons", 128)),
-            layer_norm=bool(model_cfg.get("layer_norm", True)),
-            dropout=safe_float(model_cfg.get("dropout"), 0.05),
-            debug_stats=bool(model_cfg.get("debug_stats", True)),
-            use_physics_aware_translation=bool(model_cfg.get("use_physics_aware_translation", False)),
-            use_coordinated_branches=bool(model_cfg.get("use_coordinated_branches", False)),
-        ).to(device)
-    else:
-        raise ValueError(
-            "Unknown model type: "
-            f"{model_type}. Supported: 'pinn', 'latent_ode', 'sequence', 'hybrid', "
-            "'hybrid_c1', 'hybrid_c2', 'hybrid_c3', 'direction_d', 'direction_d1', 'direction_d15', "
-            "'direction_d154', 'direction_an', 'direction_an1'"
+    # Optional: fresh training trajectories every epoch from the rollout engine
+    # (train.synthetic); validation and test stay on the HDF5 splits
+    synthetic_cfg = train_cfg.get("synthetic") or {}
+    synthesizer = None
+    if synthetic_cfg.get("enabled", False):
+        synthesizer = TrajectorySynthesizer.from_config(
+            synthetic_cfg, physics_params, scales,
+            context_fields=getattr(train_loader.dataset, "context_fields", None) or None,
+            seed=args.seed,
         )
+        if len(synthesizer.context_fields) != context_dim:
+            raise ValueError(
+                f"Synthetic context has {len(synthesizer.context_fields)} fields, the dataset {context_dim}"
+            )
+        print(f"Synthesizing {synthesizer.cases_per_epoch} trajectories per epoch "
+              f"({synthesizer.engine.method}, deterministic={synthesizer.engine.deterministic})")
+    
+    # [PINN_V2][2025-01-XX][Direction A]
+    # Create model based on model_type configuration. The physics layer uses the
+    # loss's stencil order so PINNLoss can reuse its ds/dt.
+    model_cfg = {"physics_derivative_order": int(loss_cfg.get("derivative_order", 1)), **model_cfg}
+    model = build_model(model_cfg, context_dim, physics_params, scales).to(device)
     
     print(f"Model parameters: {sum(p.numel() for p in model.parameters()):,}")
     
@@ -733,6 +527,7 @@ def main():
         "lambda_mdot": safe_float(loss_cfg.get("lambda_mdot"), 0.0),
         "lambda_az": safe_float(loss_cfg.get("lambda_az"), 0.0),
         "lambda_burn": safe_float(loss_cfg.get("lambda_burn"), 0.0),
+        "derivative_order": int(loss_cfg.get("derivative_order", 1)),
     }
     
     if loss_type == "PINNLossV2":
@@ -897,10 +692,25 @@ def main():
         
         if soft_loss_scheduler is not None:
             soft_loss_scheduler.update(epoch)
+        epoch_loader = train_loader
+        if synthesizer is not None:
+            epoch_loader = synthesizer.dataloader(epoch, batch_size=batch_size)
+            print(f"  Synthesized {len(epoch_loader.dataset)} trajectories "
+                  f"({synthesizer.engine.trajectories_per_s:.1f} traj/s)")
         # Train
-        train_losses = train_epoch(
-            model, train_loader, loss_fn, optimizer, device, epoch, weight_scheduler
-        )
+        if args.profile and epoch == start_epoch:
+            with StageProfiler(model) as profiler:
+                train_losses = train_epoch(
+                    model, epoch_loader, loss_fn, optimizer, device, epoch, weight_scheduler
+                )
+            summary = profiler.summary()
+            print(summary)
+            (logs_dir / "profile.txt").write_text(summary + "\n")
+            profiler.export_chrome_trace(logs_dir / "profile_trace.json")
+        else:
+            train_losses = train_epoch(
+                model, epoch_loader, loss_fn, optimizer, device, epoch, weight_scheduler
+            )
         
         # Validate
         val_losses = validate(model, val_loader, loss_fn, device)
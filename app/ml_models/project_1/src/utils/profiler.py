@@ -0,0 +1,247 @@
+"""
+Opt-in per-stage profiling of the PINN models.
+
+``StageProfiler`` attaches forward pre/post hooks to a model's submodules
+(``stem``, ``translation_branch``, ..., ``physics_layer`` for Direction AN;
+the top-level children of any other architecture) for as long as it is
+active, and records per stage:
+
+- wall time (``perf_counter_ns``; CUDA is synchronized at stage boundaries)
+- output size: bytes of the tensors the stage returns (any device)
+- allocated memory: net change of ``torch.cuda.memory_allocated`` (CUDA only)
+
+Code that is not a submodule marks its stages with ``profile_stage(name)``
+(a no-op unless a profiler is active), e.g. the cumsum position
+reconstruction of Direction AN and the forward/loss/backward/optimizer
+steps of ``train_pinn.train_epoch``. Every stage is also opened as a
+``torch.profiler.record_function`` range, so it shows up in traces of an
+enclosing ``torch.profiler.profile``.
+
+Usage:
+    with StageProfiler(model) as profiler:
+        model(t, context)               # or train_epoch(...), evaluate_model(...), predict_state(...)
+    print(profiler.summary())
+    profiler.export_chrome_trace("trace.json")   # chrome://tracing / Perfetto
+
+Command line (serving path or full forward/backward of a configured model):
+    python -m src.eval.profile_stages --config config.yaml --mode inference --batch 8 --trace trace.json
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+_active: Optional["StageProfiler"] = None
+_NOT_PROFILED = nullcontext()
+
+
+def _output_bytes(output: Any) -> int:
+    """Bytes of the tensors in a (nested tuple/list/dict/dataclass) module output."""
+    if isinstance(output, torch.Tensor):
+        return output.element_size() * output.numel()
+    if isinstance(output, (tuple, list)):
+        return sum(_output_bytes(item) for item in output)
+    if isinstance(output, dict):
+        return sum(_output_bytes(item) for item in output.values())
+    if hasattr(output, "__dataclass_fields__"):
+        return sum(_output_bytes(getattr(output, name)) for name in output.__dataclass_fields__)
+    return 0
+
+
+class StageProfiler:
+    """
+    Per-submodule / per-stage wall time and memory of a model (context manager).
+
+    Hooks are only installed while the profiler is active; outside of it the
+    model runs unchanged.
+    """
+
+    def __init__(
+        self,
+        model: Optional[nn.Module] = None,
+        depth: int = 1,
+        synchronize: Optional[bool] = None,
+        max_events: int = 100_000,
+    ) -> None:
+        """
+        Args:
+            model: Eager model whose submodules are timed (None: profile_stage() marks only)
+            depth: Submodule nesting depth to hook (1: direct children, 2: their children, ...)
+            synchronize: torch.cuda.synchronize at stage boundaries (default: if CUDA is available)
+            max_events: Trace events kept for export_chrome_trace (stats are always complete)
+        """
+        if isinstance(model, torch.jit.ScriptModule):
+            raise TypeError("Hooks cannot be attached to TorchScript modules; profile the eager model")
+        self.model = model
+        self.depth = depth
+        self.synchronize = torch.cuda.is_available() if synchronize is None else synchronize
+        self.max_events = max_events
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.events: List[Dict] = []
+        self._handles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._previous: Optional[StageProfiler] = None
+        self._start_ns = 0
+        self._wall_ns = 0
+
+    # Stage bookkeeping
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _sync(self) -> None:
+        if self.synchronize:
+            torch.cuda.synchronize()
+
+    def _allocated(self) -> int:
+        return torch.cuda.memory_allocated() if torch.cuda.is_available() else 0
+
+    def _enter(self, name: str) -> None:
+        self._sync()
+        scope = torch.profiler.record_function(name)
+        scope.__enter__()
+        self._stack().append((name, scope, self._allocated(), time.perf_counter_ns()))
+
+    def _exit(self, name: str, output: Any = None) -> None:
+        self._sync()
+        end = time.perf_counter_ns()
+        stack = self._stack()
+        # A stage that raised never got its exit; close it together with its parent
+        while stack:
+            entry_name, scope, allocated, start = stack.pop()
+            scope.__exit__(None, None, None)
+            if entry_name == name:
+                break
+        else:
+            return
+        self._record(name, start, end, _output_bytes(output), self._allocated() - allocated)
+
+    def _record(self, name: str, start: int, end: int, output_bytes: int, allocated_bytes: int) -> None:
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = {"calls": 0, "total_ns": 0, "output_bytes": 0, "allocated_bytes": 0}
+            stats["calls"] += 1
+            stats["total_ns"] += end - start
+            stats["output_bytes"] += output_bytes
+            stats["allocated_bytes"] += allocated_bytes
+            if len(self.events) < self.max_events:
+                self.events.append({
+                    "name": name,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": (start - self._start_ns) / 1e3,
+                    "dur": (end - start) / 1e3,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": {"output_bytes": output_bytes, "allocated_bytes": allocated_bytes},
+                })
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as a stage."""
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(name)
+
+    # Hooks
+
+    def _hooked_modules(self):
+        for name, module in self.model.named_modules():
+            if name and name.count(".") < self.depth:
+                yield name, module
+
+    def _attach(self) -> None:
+        for name, module in self._hooked_modules():
+            self._handles.append(module.register_forward_pre_hook(
+                lambda _module, _inputs, name=name: self._enter(name)
+            ))
+            self._handles.append(module.register_forward_hook(
+                lambda _module, _inputs, output, name=name: self._exit(name, output)
+            ))
+
+    def _detach(self) -> None:
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+
+    def __enter__(self) -> "StageProfiler":
+        global _active
+        self._start_ns = time.perf_counter_ns()
+        if self.model is not None:
+            self._attach()
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active
+        _active = self._previous
+        self._detach()
+        stack = self._stack()
+        while stack:
+            stack.pop()[1].__exit__(None, None, None)
+        self._wall_ns += time.perf_counter_ns() - self._start_ns
+
+    # Reports
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """{stage: calls, total_ms, mean_ms, percent (of the profiled wall time), output_mb, allocated_mb}"""
+        wall_ns = self._wall_ns or (time.perf_counter_ns() - self._start_ns)
+        with self._lock:
+            stats = {name: dict(values) for name, values in self.stats.items()}
+        return {
+            name: {
+                "calls": values["calls"],
+                "total_ms": values["total_ns"] / 1e6,
+                "mean_ms": values["total_ns"] / 1e6 / values["calls"],
+                "percent": 100.0 * values["total_ns"] / wall_ns if wall_ns else 0.0,
+                "output_mb": values["output_bytes"] / 2**20,
+                "allocated_mb": values["allocated_bytes"] / 2**20,
+            }
+            for name, values in stats.items()
+        }
+
+    def summary(self) -> str:
+        """Stage table sorted by total time (nested stages are included in their parent's time)."""
+        stats = self.get_stats()
+        width = max([len(name) for name in stats] + [5])
+        lines = [
+            f"{'stage':<{width}} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'% wall':>7} "
+            f"{'out MB':>9} {'alloc MB':>9}"
+        ]
+        for name, values in sorted(stats.items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(
+                f"{name:<{width}} {values['calls']:>7} {values['total_ms']:>10.2f} {values['mean_ms']:>9.3f} "
+                f"{values['percent']:>6.1f}% {values['output_mb']:>9.2f} {values['allocated_mb']:>9.2f}"
+            )
+        lines.append(f"wall time {(self._wall_ns or (time.perf_counter_ns() - self._start_ns)) / 1e6:.2f} ms")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path) -> None:
+        """Write the recorded stages in the Chrome trace event format."""
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def profile_stage(name: str):
+    """Context manager marking a stage for the active StageProfiler (no-op when none is active)."""
+    profiler = _active
+    if profiler is None:
+        return _NOT_PROFILED
+    return profiler.stage(name)
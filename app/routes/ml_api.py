@@ -1,7 +1,22 @@
 """ML API routes for project demos"""
-from flask import Blueprint, request, jsonify, abort, current_app
+import json
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import (
+    Blueprint, Response, request, jsonify, abort, current_app, stream_with_context, after_this_request, g
+)
 from app.services.content_service import ContentService
-from app.services.ml_model_service import get_ml_model_service
+from app.services.ml_model_service import get_ml_model_service, DEFAULT_MODEL_VERSION
+from app.services.ml_registry import get_model_registry, UnknownModelVersion
+from app.services.ml_batcher import get_ml_batcher, BatcherQueueFull
+from app.services.ml_executor import get_ml_executor, ExecutorQueueFull, InferenceTimeout
+from app.utils.trajectory_format import (
+    select_format, columnar_trajectory, final_state, trajectory_bytes, ndjson_trajectory,
+    BINARY_COLUMNS, NPY_MIMETYPE, RAW_MIMETYPE, NDJSON_MIMETYPE
+)
+from app.utils.trajectory_downsample import downsample_trajectory
+from app.utils.metrics import timed
 
 ml_api_bp = Blueprint('ml_api', __name__, url_prefix='/api/ml')
 
@@ -16,11 +31,21 @@ def predict(project_id):
     
     Expected request body (JSON):
     {
-        "data": {...}  # Model-specific input data
+        "data": {...},       # Model-specific input data
+        "format": "rows"     # Optional: "rows" (default), "columnar" or "ndjson"
     }
     
+    Binary output is selected with the Accept header: application/x-npy
+    (.npy bytes) or application/octet-stream (raw float32 little-endian).
+    application/x-ndjson (or "format": "ndjson") streams the trajectory in
+    chunks as newline-delimited JSON.
+    
+    The X-Model-Version header selects a model version; without it the
+    ML_AB_WEIGHTS split decides (sticky per X-AB-Key). The version that
+    served the request is returned in the X-Model-Version response header.
+    
     Returns:
-        JSON response with prediction results
+        JSON (or binary) response with prediction results
     """
     try:
         # Verify project exists
@@ -41,10 +66,21 @@ def predict(project_id):
                 'project_id': project_id
             }), 400
         
+        try:
+            response_format = select_format(
+                request.accept_mimetypes, data.get('format', request.args.get('format'))
+            )
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid format',
+                'message': str(e),
+                'project_id': project_id
+            }), 400
+        
         # Project-specific implementations
         if project_id == 1:
             # Rocket Dynamics Prediction using PINN model
-            return _predict_rocket_dynamics_pinn(data.get('data', {}))
+            return _predict_rocket_dynamics_pinn(data.get('data', {}), response_format)
         else:
             # Generic placeholder for other projects
             current_app.logger.info(f"ML prediction request for project {project_id}")
@@ -65,7 +101,7 @@ def predict(project_id):
         }), 500
 
 
-def _predict_rocket_dynamics_pinn(input_data):
+def _predict_rocket_dynamics_pinn(input_data, response_format='rows'):
     """
     Predict rocket trajectory using trained Physics Informed Neural Network (PINN).
     
@@ -80,90 +116,84 @@ def _predict_rocket_dynamics_pinn(input_data):
         "wind_mag": float,        # Wind magnitude (m/s)
         "t_start": float,         # Start time (s) - optional, default 0.0
         "t_end": float,           # End time (s) - optional, default 30.0
-        "dt": float               # Time step (s) - optional, default 0.02
+        "dt": float,              # Time step (s) - optional, default 0.02
+        "max_points": int,        # Return at most this many points - optional
+        "adaptive": bool,         # Non-uniform grid within "tolerance" - optional
+        "tolerance": float        # Interpolation error, fraction of each component's range - optional
     }
+    
+    response_format: 'rows', 'columnar', 'npy', 'raw' or 'ndjson' (see select_format)
     """
     try:
-        # Get ML model service
-        ml_service = get_ml_model_service()
+        started = time.perf_counter()
         
-        # Load model if not already loaded
-        if not ml_service.load_model(project_id=1):
+        # Get the ML model service of the version this request routes to
+        try:
+            registry, ml_service = _resolve_model_service()
+        except UnknownModelVersion as e:
+            return jsonify({
+                'error': 'Unknown model version',
+                'message': str(e)
+            }), 400
+        
+        # Load model if not already loaded (or reload a replaced checkpoint)
+        if not _load_model_service(registry, ml_service):
             return jsonify({
                 'error': 'Model not available',
                 'message': 'Failed to load ML model'
             }), 503
         
-        # Extract parameters
-        params = {
-            'm0': float(input_data.get('m0', 55.0)),
-            'Isp': float(input_data.get('Isp', 250.0)),
-            'Cd': float(input_data.get('Cd', 0.35)),
-            'CL_alpha': float(input_data.get('CL_alpha', 3.5)),
-            'Cm_alpha': float(input_data.get('Cm_alpha', -0.8)),
-            'Tmax': float(input_data.get('Tmax', 4000.0)),
-            'wind_mag': float(input_data.get('wind_mag', 5.0)),
-        }
+        params, t_start, t_end, dt = _parse_rocket_input(input_data)
+        downsampling = _parse_downsampling(input_data)
         
-        # Time parameters
-        t_start = float(input_data.get('t_start', 0.0))
-        t_end = float(input_data.get('t_end', 30.0))
-        dt = float(input_data.get('dt', 0.02))
+        if response_format == 'ndjson':
+            if downsampling:
+                raise ValueError("max_points/adaptive cannot be combined with the ndjson stream")
+            return _stream_rocket_trajectory(ml_service, params, t_start, t_end, dt)
         
-        # Run prediction
-        time_array, state_array = ml_service.predict(
-            params=params,
-            t_start=t_start,
-            t_end=t_end,
-            dt=dt
-        )
+        # Run prediction (coalesced with concurrent requests when batching is enabled;
+        # the batcher serves the default version)
+        # Either way the forward pass runs on the executor (off the request
+        # thread when ML_EXECUTOR is 'thread' or 'process')
+        executor = get_ml_executor(current_app.config)
+        if current_app.config.get('ML_BATCHING_ENABLED', False) and ml_service.version == DEFAULT_MODEL_VERSION:
+            batcher = get_ml_batcher(current_app.config)
+            try:
+                time_array, state_array = batcher.predict(
+                    {'params': params, 't_start': t_start, 't_end': t_end, 'dt': dt},
+                    timeout=executor.timeout
+                )
+            except FutureTimeoutError:
+                raise InferenceTimeout(f"ML inference did not finish within {executor.timeout:g} s")
+        else:
+            time_array, state_array = executor.predict_batch(
+                ml_service, [{'params': params, 't_start': t_start, 't_end': t_end, 'dt': dt}]
+            )[0]
         
-        # Convert to trajectory format
-        # State format: [x, y, z, vx, vy, vz, q0, q1, q2, q3, wx, wy, wz, m]
-        trajectory = []
-        for i in range(len(time_array)):
-            trajectory.append({
-                'time': float(time_array[i]),
-                'position': {
-                    'x': float(state_array[i, 0]),
-                    'y': float(state_array[i, 1]),
-                    'z': float(state_array[i, 2])
-                },
-                'velocity': {
-                    'x': float(state_array[i, 3]),
-                    'y': float(state_array[i, 4]),
-                    'z': float(state_array[i, 5])
-                },
-                'quaternion': {
-                    'q0': float(state_array[i, 6]),
-                    'q1': float(state_array[i, 7]),
-                    'q2': float(state_array[i, 8]),
-                    'q3': float(state_array[i, 9])
-                },
-                'angular_velocity': {
-                    'wx': float(state_array[i, 10]),
-                    'wy': float(state_array[i, 11]),
-                    'wz': float(state_array[i, 12])
-                },
-                'mass': float(state_array[i, 13])
-            })
+        # The model still runs on the full grid (x/y and mass are cumulative
+        # sums over it); only the returned points are reduced
+        downsampling_info = None
+        if downsampling:
+            time_array, state_array, downsampling_info = downsample_trajectory(
+                time_array, state_array, **downsampling
+            )
+        registry.record_request(1, ml_service.version, time.perf_counter() - started)
         
-        return jsonify({
-            'project_id': 1,
-            'status': 'success',
-            'trajectory': trajectory,
-            'final_position': trajectory[-1]['position'] if trajectory else None,
-            'final_velocity': trajectory[-1]['velocity'] if trajectory else None,
-            'final_mass': trajectory[-1]['mass'] if trajectory else None,
-            'simulation_params': {
-                't_start': t_start,
-                't_end': t_end,
-                'dt': dt,
-                'total_time': t_end - t_start,
-                'num_points': len(trajectory)
+        with timed('serialization'):
+            if response_format in ('npy', 'raw'):
+                return _binary_rocket_trajectory(time_array, state_array, response_format)
+            
+            result = {
+                'project_id': 1,
+                'status': 'success',
+                **_format_rocket_trajectory(time_array, state_array, t_start, t_end, dt, response_format)
             }
-        }), 200
+            if downsampling_info:
+                result['downsampling'] = downsampling_info
+            return jsonify(result), 200
         
+    except (BatcherQueueFull, ExecutorQueueFull, InferenceTimeout) as e:
+        return _executor_error_response(e)
     except (KeyError, ValueError, TypeError) as e:
         current_app.logger.error(f"Error in prediction: {e}", exc_info=True)
         return jsonify({
@@ -179,7 +209,10 @@ def _predict_rocket_dynamics_pinn(input_data):
                 'wind_mag': 'Wind magnitude (m/s)',
                 't_start': 'Start time (s) - optional',
                 't_end': 'End time (s) - optional',
-                'dt': 'Time step (s) - optional'
+                'dt': 'Time step (s) - optional',
+                'max_points': 'Maximum number of returned points - optional',
+                'adaptive': 'Return an error-bounded non-uniform grid - optional',
+                'tolerance': 'Adaptive interpolation tolerance - optional'
             }
         }), 400
     except Exception as e:
@@ -190,11 +223,359 @@ def _predict_rocket_dynamics_pinn(input_data):
         }), 500
 
 
+def _executor_error_response(error):
+    """429 (retry later) for a full inference queue, 504 for an inference timeout"""
+    current_app.logger.warning(f"Rejected prediction: {error}")
+    if isinstance(error, (BatcherQueueFull, ExecutorQueueFull)):
+        response = jsonify({'error': 'Too many requests', 'message': str(error)})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    return jsonify({'error': 'Inference timeout', 'message': str(error)}), 504
+
+
+def _resolve_model_service(project_id=1):
+    """
+    Registry and service of the model version for the current request.
+    
+    Sets the X-Model-Version response header.
+    
+    Raises:
+        UnknownModelVersion: If the requested version does not exist
+    """
+    registry = get_model_registry()
+    version = registry.resolve_version(
+        request.headers.get('X-Model-Version'),
+        routing_key=request.headers.get('X-AB-Key'),
+        ab_weights=current_app.config.get('ML_AB_WEIGHTS', ''),
+    )
+    ml_service = registry.get_service(project_id, version)
+    
+    @after_this_request
+    def add_version_header(response):
+        response.headers['X-Model-Version'] = version
+        return response
+    
+    return registry, ml_service
+
+
+def _load_model_service(registry, ml_service):
+    """
+    Load the service's model, evicting idle versions beyond ML_MODEL_MEMORY_BUDGET_MB.
+    
+    The version stays leased (never evicted) until the request is torn down.
+    """
+    budget_mb = current_app.config.get('ML_MODEL_MEMORY_BUDGET_MB', 0)
+    if not registry.load(ml_service, budget_bytes=budget_mb * 1024 * 1024, lease=True):
+        return False
+    g.setdefault('ml_leases', []).append(ml_service)
+    return True
+
+
+@ml_api_bp.teardown_request
+def _release_model_leases(exc=None):
+    """Return the serving leases taken by _load_model_service"""
+    for ml_service in g.pop('ml_leases', []):
+        ml_service.release()
+
+
+def _stream_rocket_trajectory(ml_service, params, t_start, t_end, dt):
+    """
+    Stream a predicted trajectory as NDJSON, one line per chunk of the time grid.
+    
+    Each chunk is evaluated on the inference executor, under its queue limit
+    and timeout. The first chunk is computed before the response starts so
+    that invalid input still gets a 400 and a full queue a 429; later
+    failures can only end the stream with an {"type": "error"} line.
+    """
+    executor = get_ml_executor(current_app.config)
+    app = current_app._get_current_object()
+    chunks = ml_service.predict_stream(
+        params, t_start=t_start, t_end=t_end, dt=dt,
+        chunk_points=current_app.config.get('ML_STREAM_CHUNK_POINTS', 1024)
+    )
+    first = executor.call(next, chunks, None, app=app)
+    
+    def all_chunks():
+        chunk = first
+        try:
+            while chunk is not None:
+                yield chunk
+                chunk = executor.call(next, chunks, None, app=app)
+        finally:
+            if not chunks.gi_running:  # Still running on the executor after a timeout
+                chunks.close()
+    
+    header = {
+        'project_id': 1,
+        'status': 'success',
+        'chunked': ml_service.supports_streaming(),
+        'simulation_params': {
+            't_start': t_start,
+            't_end': t_end,
+            'dt': dt,
+            'total_time': t_end - t_start,
+        },
+    }
+    
+    def generate():
+        lines = ndjson_trajectory(all_chunks(), header)
+        while True:
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            except Exception as e:
+                current_app.logger.error(f"Error while streaming prediction: {e}", exc_info=True)
+                yield json.dumps({'type': 'error', 'message': str(e)}) + '\n'
+                return
+            yield line
+    
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def _parse_rocket_input(input_data):
+    """
+    Extract model parameters and time grid settings from a request payload.
+    
+    Returns:
+        Tuple of (params, t_start, t_end, dt)
+    """
+    params = {
+        'm0': float(input_data.get('m0', 55.0)),
+        'Isp': float(input_data.get('Isp', 250.0)),
+        'Cd': float(input_data.get('Cd', 0.35)),
+        'CL_alpha': float(input_data.get('CL_alpha', 3.5)),
+        'Cm_alpha': float(input_data.get('Cm_alpha', -0.8)),
+        'Tmax': float(input_data.get('Tmax', 4000.0)),
+        'wind_mag': float(input_data.get('wind_mag', 5.0)),
+    }
+    
+    # Time parameters
+    t_start = float(input_data.get('t_start', 0.0))
+    t_end = float(input_data.get('t_end', 30.0))
+    dt = float(input_data.get('dt', 0.02))
+    
+    return params, t_start, t_end, dt
+
+
+def _parse_downsampling(input_data):
+    """
+    Extract the optional point-reduction settings from a request payload.
+    
+    Returns:
+        Keyword arguments for downsample_trajectory, or None for the full grid
+    """
+    max_points = input_data.get('max_points')
+    adaptive = bool(input_data.get('adaptive', False))
+    if max_points is None and not adaptive:
+        return None
+    
+    if max_points is not None:
+        max_points = int(max_points)
+        if max_points < 2:
+            raise ValueError("max_points must be at least 2")
+    tolerance = float(input_data.get('tolerance', current_app.config.get('ML_ADAPTIVE_TOLERANCE', 1e-3)))
+    if not tolerance > 0:
+        raise ValueError("tolerance must be positive")
+    
+    return {'max_points': max_points, 'adaptive': adaptive, 'tolerance': tolerance}
+
+
+def _format_rocket_trajectory(time_array, state_array, t_start, t_end, dt, response_format='rows'):
+    """
+    Convert a predicted trajectory to the JSON response fields.
+    
+    'rows' returns one dict per time step; 'columnar' returns one list per
+    state component, built directly from the arrays.
+    
+    State format: [x, y, z, vx, vy, vz, q0, q1, q2, q3, wx, wy, wz, m]
+    """
+    simulation_params = {
+        't_start': t_start,
+        't_end': t_end,
+        'dt': dt,
+        'total_time': t_end - t_start,
+        'num_points': len(time_array)
+    }
+    
+    if response_format == 'columnar':
+        return {
+            'format': 'columnar',
+            'trajectory': columnar_trajectory(time_array, state_array),
+            **final_state(state_array),
+            'simulation_params': simulation_params
+        }
+    
+    trajectory = []
+    for i in range(len(time_array)):
+        trajectory.append({
+            'time': float(time_array[i]),
+            'position': {
+                'x': float(state_array[i, 0]),
+                'y': float(state_array[i, 1]),
+                'z': float(state_array[i, 2])
+            },
+            'velocity': {
+                'x': float(state_array[i, 3]),
+                'y': float(state_array[i, 4]),
+                'z': float(state_array[i, 5])
+            },
+            'quaternion': {
+                'q0': float(state_array[i, 6]),
+                'q1': float(state_array[i, 7]),
+                'q2': float(state_array[i, 8]),
+                'q3': float(state_array[i, 9])
+            },
+            'angular_velocity': {
+                'wx': float(state_array[i, 10]),
+                'wy': float(state_array[i, 11]),
+                'wz': float(state_array[i, 12])
+            },
+            'mass': float(state_array[i, 13])
+        })
+    
+    return {
+        'trajectory': trajectory,
+        'final_position': trajectory[-1]['position'] if trajectory else None,
+        'final_velocity': trajectory[-1]['velocity'] if trajectory else None,
+        'final_mass': trajectory[-1]['mass'] if trajectory else None,
+        'simulation_params': simulation_params
+    }
+
+
+def _binary_rocket_trajectory(time_array, state_array, response_format):
+    """
+    Binary trajectory response: [N, 15] float32 little-endian, row-major,
+    columns [time, x, y, z, vx, vy, vz, q0, q1, q2, q3, wx, wy, wz, m].
+    """
+    return Response(
+        trajectory_bytes(time_array, state_array, response_format),
+        mimetype=NPY_MIMETYPE if response_format == 'npy' else RAW_MIMETYPE,
+        headers={
+            'X-Trajectory-Shape': f'{len(time_array)},{len(BINARY_COLUMNS)}',
+            'X-Trajectory-Dtype': '<f4',
+            'X-Trajectory-Columns': ','.join(BINARY_COLUMNS)
+        }
+    )
+
+
+@ml_api_bp.route('/projects/<int:project_id>/predict/batch', methods=['POST'])
+def predict_batch(project_id):
+    """
+    Batched ML prediction endpoint.
+    
+    Runs every scenario through a single forward pass of the model. Model
+    versions are selected as for /predict (X-Model-Version, ML_AB_WEIGHTS).
+    
+    Expected request body (JSON):
+    {
+        "scenarios": [{...}, {...}],  # Each entry uses the /predict "data" format
+        "format": "rows"              # Optional: "rows" (default) or "columnar"
+    }
+    
+    Returns:
+        JSON response with one result per scenario, in request order
+    """
+    try:
+        # Verify project exists
+        content_service = ContentService(current_app.config)
+        project = content_service.get_project_by_id(project_id)
+        
+        if not project:
+            return jsonify({
+                'error': 'Project not found',
+                'project_id': project_id
+            }), 404
+        
+        if project_id != 1:
+            return jsonify({
+                'project_id': project_id,
+                'project_title': project.get('title'),
+                'status': 'not_implemented',
+                'message': 'Batched ML inference not yet implemented for this project'
+            }), 501
+        
+        data = request.get_json(silent=True) or {}
+        scenarios = data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({
+                'error': 'No scenarios provided',
+                'message': 'Expected a non-empty "scenarios" list',
+                'project_id': project_id
+            }), 400
+        
+        max_batch_size = current_app.config.get('ML_MAX_BATCH_SIZE', 256)
+        if len(scenarios) > max_batch_size:
+            return jsonify({
+                'error': 'Batch too large',
+                'message': f'At most {max_batch_size} scenarios per request',
+                'project_id': project_id
+            }), 400
+        
+        started = time.perf_counter()
+        try:
+            registry, ml_service = _resolve_model_service()
+        except UnknownModelVersion as e:
+            return jsonify({
+                'error': 'Unknown model version',
+                'message': str(e),
+                'project_id': project_id
+            }), 400
+        if not _load_model_service(registry, ml_service):
+            return jsonify({
+                'error': 'Model not available',
+                'message': 'Failed to load ML model'
+            }), 503
+        
+        try:
+            parsed = [_parse_rocket_input(s or {}) for s in scenarios]
+            response_format = data.get('format', request.args.get('format', 'rows'))
+            if response_format not in ('rows', 'columnar'):
+                raise ValueError(f"Unknown format '{response_format}', expected 'rows' or 'columnar'")
+        except (AttributeError, ValueError, TypeError) as e:
+            return jsonify({
+                'error': 'Invalid input data',
+                'message': str(e),
+                'project_id': project_id
+            }), 400
+        
+        try:
+            results = get_ml_executor(current_app.config).predict_batch(ml_service, [
+                {'params': params, 't_start': t_start, 't_end': t_end, 'dt': dt}
+                for params, t_start, t_end, dt in parsed
+            ])
+        except (ExecutorQueueFull, InferenceTimeout) as e:
+            return _executor_error_response(e)
+        registry.record_request(1, ml_service.version, time.perf_counter() - started)
+        
+        with timed('serialization'):
+            return jsonify({
+                'project_id': project_id,
+                'status': 'success',
+                'batch_size': len(results),
+                'results': [
+                    _format_rocket_trajectory(time_array, state_array, t_start, t_end, dt, response_format)
+                    for (time_array, state_array), (_, t_start, t_end, dt) in zip(results, parsed)
+                ]
+            }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error in batched ML prediction for project {project_id}: {e}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'project_id': project_id,
+            'message': str(e)
+        }), 500
+
+
 @ml_api_bp.route('/projects/<int:project_id>/health', methods=['GET'])
 def ml_health(project_id):
     """
     Health check endpoint for ML model associated with a project.
     
+    While a startup preload (ML_PRELOAD) is loading and warming up the model,
+    reports status 'warming' with HTTP 503 so load balancers hold traffic.
+    
     Returns:
         JSON response indicating if the ML model is ready
     """
@@ -211,17 +592,42 @@ def ml_health(project_id):
         
         # Check if ML model is loaded and ready
         if project_id == 1:
+            registry = get_model_registry()
             ml_service = get_ml_model_service()
-            model_loaded = ml_service.load_model(project_id)
+            
+            # Don't block on (or duplicate) a startup preload that is still running
+            if ml_service.get_status() == 'warming':
+                return jsonify({
+                    'project_id': project_id,
+                    'project_title': project.get('title'),
+                    'status': 'warming',
+                    'ready': False,
+                    'model_info': {}
+                }), 503
+            
+            # Through the registry: memory budget and serving lease as for /predict
+            model_loaded = _load_model_service(registry, ml_service)
             model_info = ml_service.get_model_info() if model_loaded else {}
             
-            return jsonify({
+            response = {
                 'project_id': project_id,
                 'project_title': project.get('title'),
                 'status': 'ready' if model_loaded else 'not_loaded',
                 'ready': model_loaded,
                 'model_info': model_info
-            }), 200
+            }
+            cache_stats = ml_service.get_cache_stats()
+            if cache_stats is not None:
+                response['cache'] = cache_stats
+            if current_app.config.get('ML_BATCHING_ENABLED', False):
+                response['batching'] = get_ml_batcher(current_app.config).get_stats()
+            response['executor'] = get_ml_executor(current_app.config).get_stats()
+            response['registry'] = {
+                'available_versions': registry.list_versions(project_id),
+                **registry.get_stats(),
+            }
+            
+            return jsonify(response), 200
         else:
             return jsonify({
                 'project_id': project_id,
@@ -271,6 +677,7 @@ def ml_info(project_id):
                 'model_details': project.get('model_info', {}),
                 'endpoints': {
                     'predict': f'/api/ml/projects/{project_id}/predict',
+                    'predict_batch': f'/api/ml/projects/{project_id}/predict/batch',
                     'health': f'/api/ml/projects/{project_id}/health'
                 },
                 'input_format': {
@@ -283,10 +690,20 @@ def ml_info(project_id):
                     'wind_mag': 'Wind magnitude (m/s)',
                     't_start': 'Start time (s) - optional',
                     't_end': 'End time (s) - optional',
-                    'dt': 'Time step (s) - optional'
+                    'dt': 'Time step (s) - optional',
+                    'max_points': 'Maximum number of returned points - optional',
+                    'adaptive': 'Return an error-bounded non-uniform grid - optional',
+                    'tolerance': 'Adaptive interpolation tolerance - optional'
                 },
                 'output_format': {
                     'trajectory': 'Array of state vectors',
+                    'formats': {
+                        'rows': 'Default JSON, one object per time step',
+                        'columnar': 'JSON, one array per state component ("format": "columnar")',
+                        'npy': f'Accept: {NPY_MIMETYPE} - [N, 15] float32 .npy',
+                        'raw': f'Accept: {RAW_MIMETYPE} - [N, 15] float32 little-endian',
+                        'ndjson': f'Accept: {NDJSON_MIMETYPE} - streamed, one columnar chunk per line'
+                    },
                     'state_dimension': 14,
                     'state_components': ['x', 'y', 'z', 'vx', 'vy', 'vz', 'q0', 'q1', 'q2', 'q3', 'wx', 'wy', 'wz', 'm']
                 }
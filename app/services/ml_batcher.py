@@ -0,0 +1,238 @@
+"""Dynamic micro-batching for ML inference requests"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class BatcherQueueFull(Exception):
+    """Raised when the pending-request queue is at capacity"""
+    pass
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predict calls into batched forward passes.
+
+    Callers submit single scenarios and block on a Future. A worker thread
+    drains the queue and flushes a batch as soon as either max_batch_size
+    scenarios are waiting or max_wait_ms has passed since the first one
+    arrived. Results are fanned back out to each caller's Future.
+
+    If a batch fails it is retried one scenario at a time, except for the
+    no_retry exception types (e.g. executor backpressure), which fail the
+    whole batch at once.
+    """
+
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[List[Dict]], List],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 1024,
+        no_retry: Tuple[type, ...] = ()
+    ):
+        """
+        Args:
+            predict_batch_fn: Function mapping a list of scenarios to a list of results
+            max_batch_size: Flush once this many scenarios are waiting
+            max_wait_ms: Flush at most this long after the first scenario arrived
+            max_queue: Reject new scenarios when this many are pending
+            no_retry: Exception types that fail the whole batch without per-scenario retry
+        """
+        self._predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.max_queue = max(1, int(max_queue))
+        self._no_retry = tuple(no_retry)
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._stopped = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'rejected': 0,
+            'errors': 0,
+            'max_batch_seen': 0,
+            'queue_wait_ms_total': 0.0,
+            'queue_wait_ms_max': 0.0,
+            'batch_time_ms_total': 0.0,
+        }
+
+    def _ensure_worker(self):
+        """Start the worker thread (again, after a fork: threads do not survive it)"""
+        pid = os.getpid()
+        if self._worker is not None and self._worker.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive() and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Queue contents and locks inherited from the parent are not usable
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._reset_stats()
+            self._pid = pid
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run, name='ml-micro-batcher', daemon=True)
+            self._worker.start()
+
+    def submit(self, scenario: Dict) -> Future:
+        """
+        Queue a scenario for the next batch.
+
+        Returns:
+            Future resolving to the predict_batch_fn result for this scenario
+
+        Raises:
+            BatcherQueueFull: If max_queue scenarios are already pending
+        """
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((scenario, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise BatcherQueueFull(f"ML inference queue is full ({self.max_queue} pending)")
+        return future
+
+    def predict(self, scenario: Dict, timeout: Optional[float] = None):
+        """Submit a scenario and wait for its result"""
+        return self.submit(scenario).result(timeout=timeout)
+
+    def _collect(self) -> List:
+        """Block for the first item, then gather more until the batch is full or the deadline passes"""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = first[2] + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect()
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _flush(self, batch: List):
+        start = time.perf_counter()
+        waits = [(start - enqueued) * 1000.0 for _, _, enqueued in batch]
+        scenarios = [scenario for scenario, _, _ in batch]
+
+        # Resolve outcomes first and publish stats before waking callers
+        outcomes = []
+        try:
+            results = self._predict_batch_fn(scenarios)
+            outcomes = [(result, None) for result in results]
+        except self._no_retry as e:
+            outcomes = [(None, e) for _ in scenarios]
+        except Exception:
+            # Re-run one by one so a single bad scenario doesn't fail its neighbours
+            for scenario in scenarios:
+                try:
+                    outcomes.append((self._predict_batch_fn([scenario])[0], None))
+                except Exception as e:
+                    outcomes.append((None, e))
+        errors = sum(1 for _, error in outcomes if error is not None)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['errors'] += errors
+            self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(batch))
+            self._stats['queue_wait_ms_total'] += sum(waits)
+            self._stats['queue_wait_ms_max'] = max(self._stats['queue_wait_ms_max'], max(waits))
+            self._stats['batch_time_ms_total'] += elapsed_ms
+
+        for (_, future, _), (result, error) in zip(batch, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, timeout: Optional[float] = 1.0):
+        """Stop the worker thread after it finishes the current batch"""
+        if self._worker is None:
+            return
+        self._stopped = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._worker.join(timeout=timeout)
+        self._worker = None
+
+    def get_stats(self) -> Dict:
+        """Batching configuration and counters for health/metrics endpoints"""
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats['batches']
+        requests = stats['requests']
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'max_queue': self.max_queue,
+            'queue_depth': self._queue.qsize(),
+            'requests': requests,
+            'batches': batches,
+            'rejected': stats['rejected'],
+            'errors': stats['errors'],
+            'max_batch_seen': stats['max_batch_seen'],
+            'avg_batch_size': requests / batches if batches else 0.0,
+            'avg_queue_wait_ms': stats['queue_wait_ms_total'] / requests if requests else 0.0,
+            'max_queue_wait_ms': stats['queue_wait_ms_max'],
+            'avg_batch_time_ms': stats['batch_time_ms_total'] / batches if batches else 0.0,
+        }
+
+
+# Singleton instance
+_ml_batcher = None
+_ml_batcher_lock = threading.Lock()
+
+def get_ml_batcher(config) -> MicroBatcher:
+    """
+    Get singleton micro-batcher in front of the ML model service.
+
+    Batches are flushed through the inference executor, so batched requests
+    get the same backpressure, timeout and off-loop execution as unbatched
+    ones. Must be first called inside an app context; that app's context is
+    pushed around each flush.
+    """
+    global _ml_batcher
+    if _ml_batcher is None:
+        with _ml_batcher_lock:
+            if _ml_batcher is None:
+                from flask import current_app
+                from app.services.ml_executor import get_ml_executor, ExecutorQueueFull, InferenceTimeout
+                from app.services.ml_model_service import get_ml_model_service
+                _ml_batcher = MicroBatcher(
+                    partial(get_ml_executor(config).predict_batch, get_ml_model_service(),
+                            app=current_app._get_current_object()),
+                    max_batch_size=config.get('ML_BATCH_MAX_SIZE', 16),
+                    max_wait_ms=config.get('ML_BATCH_MAX_WAIT_MS', 5.0),
+                    max_queue=config.get('ML_BATCH_MAX_QUEUE', 1024),
+                    no_retry=(ExecutorQueueFull, InferenceTimeout),
+                )
+    return _ml_batcher
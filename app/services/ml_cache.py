@@ -0,0 +1,137 @@
+"""LRU result cache for deterministic ML predictions"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _quantize(value, significant_digits: int):
+    """Round floats to a fixed number of significant digits so near-identical inputs share a key"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, np.floating, np.integer)):
+        return float(f"{float(value):.{significant_digits}g}")
+    return str(value)
+
+
+def make_cache_key(
+    params: Dict,
+    t_start: float,
+    t_end: float,
+    dt: float,
+    model_checksum: Optional[str],
+    significant_digits: int = 9
+) -> str:
+    """
+    Canonical, quantized hash of a prediction request.
+
+    Args:
+        params: Physical parameters (any key order)
+        t_start, t_end, dt: Time grid settings
+        model_checksum: Checksum of the checkpoint the model was loaded from
+        significant_digits: Precision kept for float inputs
+
+    Returns:
+        Hex sha256 digest
+    """
+    canonical = {
+        'model': model_checksum,
+        'params': {str(k): _quantize(v, significant_digits) for k, v in params.items()},
+        'grid': [_quantize(v, significant_digits) for v in (t_start, t_end, dt)],
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def file_checksum(path, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of (time_array, state_array) results.
+
+    Entries are evicted least-recently-used first once the total size of the
+    cached arrays exceeds max_bytes, and expire ttl_seconds after insertion.
+    Cached arrays are marked read-only since they are shared between callers.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600.0):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()  # key -> (expires_at, nbytes, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return the cached value, or None on a miss/expired entry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, nbytes, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._bytes -= nbytes
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: str, value: Tuple[np.ndarray, np.ndarray]):
+        """Insert a value, evicting least-recently-used entries to stay within max_bytes"""
+        arrays = [np.array(a, copy=True) for a in value]
+        for a in arrays:
+            a.flags.writeable = False
+        nbytes = sum(a.nbytes for a in arrays)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, nbytes, tuple(arrays))
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self._evictions += 1
+
+    def clear(self):
+        """Drop every entry (e.g. after the checkpoint changed)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._invalidations += 1
+
+    def get_stats(self) -> Dict:
+        """Size and hit/miss counters for the health endpoint"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
@@ -0,0 +1,336 @@
+"""Executors that run ML inference off the request thread (in-thread, thread pool, process pool)"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app, has_app_context
+
+EXECUTOR_BACKENDS = ('inline', 'thread', 'process')
+
+
+class ExecutorQueueFull(Exception):
+    """Raised when max_queue inference calls are already pending"""
+    pass
+
+
+class InferenceTimeout(Exception):
+    """Raised when an inference call does not finish within the timeout"""
+    pass
+
+
+def _gevent_patched() -> bool:
+    """True if gevent monkey-patched threading (gevent worker class)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+# Process-pool worker state: one Flask app (and model) per worker process
+_worker_app = None
+
+
+def _init_worker(config_name: Optional[str]):
+    """Process-pool initializer: build the app and load the default model once"""
+    global _worker_app
+    from app import create_app
+    from app.services.ml_model_service import get_ml_model_service
+    _worker_app = create_app(config_name)
+    # The pool provides the parallelism: one intra-op thread per worker
+    if not _worker_app.config.get('ML_ONNX_THREADS'):
+        _worker_app.config['ML_ONNX_THREADS'] = 1
+    with _worker_app.app_context():
+        get_ml_model_service().load_model()
+    if 'torch' in sys.modules:  # Not imported at all when the model runs on ONNX Runtime
+        sys.modules['torch'].set_num_threads(1)
+
+
+def _predict_in_worker(project_id: int, version: str, scenarios: List[Dict]):
+    """Process-pool task: predict_batch on the worker's copy of the version's model"""
+    from app.services.ml_registry import get_model_registry
+    with _worker_app.app_context():
+        registry = get_model_registry()
+        service = registry.get_service(project_id, version)
+        if not registry.load(service):
+            raise RuntimeError(f"Failed to load model version '{version}' in inference worker")
+        return service.predict_batch(scenarios)
+
+
+def _call_in_app(app, fn: Callable, *args):
+    """fn(*args) inside the serving app's context (pool threads and the batcher have none)"""
+    if app is None or has_app_context():
+        return fn(*args)
+    with app.app_context():
+        return fn(*args)
+
+
+class InferenceExecutor:
+    """
+    Runs MLModelService.predict_batch calls on a configurable backend.
+
+    Backends:
+        inline:  in the calling thread (previous behaviour)
+        thread:  pool of OS threads; torch releases the GIL inside kernels.
+                 Under gevent, gevent's pool of real threads is used so the
+                 event loop keeps serving while a forward pass runs
+        process: pool of worker processes, each loading the model once at
+                 start; no GIL contention at all
+
+    call() runs any other callable (e.g. one chunk of a streamed
+    prediction) the same way; on the process backend, where it cannot be
+    sent to a worker, it runs on a pool of threads in this process.
+
+    At most max_queue calls may be pending (queued or running); further
+    calls raise ExecutorQueueFull. A call that is not done after timeout
+    seconds raises InferenceTimeout and is cancelled if it has not started.
+    """
+
+    def __init__(
+        self,
+        backend: str = 'inline',
+        workers: int = 2,
+        max_queue: int = 32,
+        timeout: Optional[float] = 30.0,
+        config_name: Optional[str] = None
+    ):
+        """
+        Args:
+            backend: One of EXECUTOR_BACKENDS
+            workers: Pool size for the thread/process backends
+            max_queue: Reject new calls when this many are pending
+            timeout: Seconds to wait for a result (None or <= 0 waits forever)
+            config_name: App config for the process-pool workers (None: FLASK_ENV)
+        """
+        if backend not in EXECUTOR_BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend}', expected one of {', '.join(EXECUTOR_BACKENDS)}")
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.config_name = config_name
+
+        self._pool = None
+        self._call_pool = None  # Threads for call() on the process backend
+        self._pid = os.getpid()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            'requests': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'errors': 0,
+            'run_time_ms_total': 0.0,
+        }
+
+    def _ensure_pool(self):
+        """Create the pool on first use (or after a worker died)"""
+        if self._pool is not None:
+            return self._pool
+        with self._lock:
+            if self._pool is not None:
+                return self._pool
+            if self.backend == 'thread':
+                self._pool = self._new_thread_pool()
+            else:
+                import multiprocessing
+                # spawn: never fork a process that has torch thread pools running
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.config_name,),
+                )
+            return self._pool
+
+    def _ensure_call_pool(self):
+        """Pool that runs call() tasks: the thread pool, or local threads beside a process pool"""
+        if self.backend != 'process':
+            return self._ensure_pool()
+        if self._call_pool is not None:
+            return self._call_pool
+        with self._lock:
+            if self._call_pool is None:
+                self._call_pool = self._new_thread_pool()
+            return self._call_pool
+
+    def _new_thread_pool(self):
+        """A pool of workers threads (under gevent, real threads so the event loop keeps serving)"""
+        if _gevent_patched():
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ml-inference')
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's pool threads/processes and pending calls are not ours
+                self._pid = os.getpid()
+                self._pool = None
+                self._call_pool = None
+                self._pending = 0
+                self._reset_stats()
+            if self._pending >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise ExecutorQueueFull(f"ML inference queue is full ({self.max_queue} pending)")
+            self._pending += 1
+            self._stats['requests'] += 1
+
+    def _release(self, elapsed: float, error: bool = False):
+        with self._lock:
+            self._pending -= 1
+            self._stats['run_time_ms_total'] += elapsed * 1000.0
+            if error:
+                self._stats['errors'] += 1
+
+    def submit(self, service, scenarios: List[Dict], app=None) -> Future:
+        """
+        Queue a predict_batch call on the backend.
+
+        Args:
+            service: MLModelService whose model (version) serves the call
+            scenarios: As for MLModelService.predict_batch
+            app: Flask app whose context the call runs in (default: the
+                current app, if any)
+
+        Returns:
+            Future resolving to the predict_batch result
+
+        Raises:
+            ExecutorQueueFull: If max_queue calls are already pending
+        """
+        if self.backend == 'process':
+            return self._submit(
+                self._ensure_pool, _predict_in_worker, service.project_id, service.version, scenarios
+            )
+        return self._submit(self._ensure_pool, _call_in_app, self._app(app), service.predict_batch, scenarios)
+
+    def predict_batch(self, service, scenarios: List[Dict], app=None):
+        """
+        Run predict_batch on the backend and wait for it (app as for submit).
+
+        Raises:
+            ExecutorQueueFull: If max_queue calls are already pending
+            InferenceTimeout: If the result is not ready within the timeout
+        """
+        return self._result(self.submit(service, scenarios, app=app))
+
+    def call(self, fn: Callable, *args, app=None):
+        """
+        Run fn(*args) in the app's context off the request thread and wait for it.
+
+        Counts against max_queue and the timeout like predict_batch.
+
+        Raises:
+            ExecutorQueueFull: If max_queue calls are already pending
+            InferenceTimeout: If the result is not ready within the timeout
+        """
+        return self._result(self._submit(self._ensure_call_pool, _call_in_app, self._app(app), fn, *args))
+
+    @staticmethod
+    def _app(app):
+        if app is None and has_app_context():
+            return current_app._get_current_object()
+        return app
+
+    def _submit(self, get_pool: Callable, task: Callable, *args) -> Future:
+        """Admit one call (or raise ExecutorQueueFull) and start task(*args) on the backend"""
+        self._acquire()
+        start = time.perf_counter()
+        try:
+            if self.backend == 'inline':
+                future = Future()
+                try:
+                    future.set_result(task(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                future = get_pool().submit(task, *args)
+        except Exception:
+            self._release(time.perf_counter() - start, error=True)
+            raise
+
+        def done(f):
+            failed = f.cancelled() or f.exception() is not None
+            self._release(time.perf_counter() - start, error=failed and not f.cancelled())
+            if isinstance(None if f.cancelled() else f.exception(), BrokenProcessPool):
+                self._discard_pool()
+
+        future.add_done_callback(done)
+        return future
+
+    def _result(self, future: Future):
+        """Wait for a submitted call; cancel it if it has not started by the timeout"""
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            cancelled = future.cancel()  # Only succeeds if the call has not started yet
+            with self._lock:
+                self._stats['timeouts'] += 1
+                self._stats['cancelled'] += int(cancelled)
+            raise InferenceTimeout(f"ML inference did not finish within {self.timeout:g} s")
+
+    def _discard_pool(self):
+        """Drop a pool whose worker died; the next call starts a fresh one"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pools (pending calls are cancelled)"""
+        with self._lock:
+            pools = [self._pool, self._call_pool]
+            self._pool = self._call_pool = None
+        for pool in pools:
+            if pool is not None and self._pid == os.getpid():
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        """Executor configuration and counters for health/metrics endpoints"""
+        with self._lock:
+            stats = dict(self._stats)
+            pending = self._pending
+        requests = stats['requests']
+        return {
+            'backend': self.backend,
+            'workers': self.workers if self.backend != 'inline' else 0,
+            'max_queue': self.max_queue,
+            'timeout_seconds': self.timeout,
+            'pending': pending,
+            'requests': requests,
+            'rejected': stats['rejected'],
+            'timeouts': stats['timeouts'],
+            'cancelled': stats['cancelled'],
+            'errors': stats['errors'],
+            'avg_run_time_ms': stats['run_time_ms_total'] / requests if requests else 0.0,
+        }
+
+
+# Singleton instance
+_ml_executor = None
+_ml_executor_lock = threading.Lock()
+
+def get_ml_executor(config) -> InferenceExecutor:
+    """Get singleton inference executor configured from the app config"""
+    global _ml_executor
+    if _ml_executor is None:
+        with _ml_executor_lock:
+            if _ml_executor is None:
+                _ml_executor = InferenceExecutor(
+                    backend=config.get('ML_EXECUTOR', 'inline'),
+                    workers=config.get('ML_EXECUTOR_WORKERS', 2),
+                    max_queue=config.get('ML_EXECUTOR_MAX_QUEUE', 32),
+                    timeout=config.get('ML_EXECUTOR_TIMEOUT_SECONDS', 30.0),
+                    config_name=config.get('CONFIG_NAME'),
+                )
+    return _ml_executor
@@ -0,0 +1,301 @@
+"""Precomputed trajectory table over the demo parameter space, answered by nearest-neighbour interpolation"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+LOOKUP_DIR = 'lookup'  # Table directory inside a model version directory
+PARAMS_FILE = 'params.npy'
+TRAJECTORIES_FILE = 'trajectories.npy'
+META_FILE = 'meta.json'
+
+
+def param_bounds(config: Dict, model_dir=None) -> Dict[str, Tuple[float, float]]:
+    """
+    Context parameter ranges of the dataset a model was trained on.
+
+    Read from the 'params' section of the model config, which has the schema
+    of the generator's dataset config (src.data.generator.Config.params), or
+    from the generator config that 'dataset_config' points to (relative to
+    model_dir).
+
+    Raises:
+        ValueError: If the config records neither
+    """
+    if config.get('params'):
+        return {field: tuple(bounds) for field, bounds in config['params'].items()}
+    if config.get('dataset_config'):
+        import yaml
+        path = Path(model_dir or '.') / config['dataset_config']
+        if path.exists():
+            with open(path, 'r') as f:
+                return param_bounds({'params': (yaml.safe_load(f) or {}).get('params')})
+    raise ValueError("Model config has no parameter bounds ('params' or 'dataset_config')")
+
+
+class TrajectoryTable:
+    """
+    Trajectories of the model at fixed parameter sets on one shared time grid.
+
+    A query is answered by a weighted least-squares affine fit through the
+    k nearest table entries (distances in the unit cube spanned by the
+    bounds, inverse-square-distance weights), evaluated at the query: exact
+    for trajectories that depend linearly on the parameters. Queries that
+    miss a field, lie outside the sampled box, are farther from every entry
+    than the table's coverage radius, or use a time grid other than a prefix
+    of the table's (same t_start and dt), are not answered (lookup returns
+    None) and go to the live model.
+    """
+
+    def __init__(self, params: np.ndarray, trajectories: np.ndarray, meta: Dict):
+        """
+        Args:
+            params: [n, d] dimensional parameter sets, columns in meta['fields'] order
+            trajectories: [n, N, 14] dimensional states on the grid t_start + dt * arange(N)
+            meta: Table description (fields, bounds, t_start, dt, neighbours, coverage_radius, ...)
+        """
+        self.params = params
+        self.trajectories = trajectories
+        self.meta = meta
+        self.fields = list(meta['fields'])
+        self.lows = np.array([meta['bounds'][f][0] for f in self.fields], dtype=float)
+        self.highs = np.array([meta['bounds'][f][1] for f in self.fields], dtype=float)
+        self.t_start = float(meta['t_start'])
+        self.dt = float(meta['dt'])
+        self.n_points = trajectories.shape[1]
+        self.neighbours = min(int(meta.get('neighbours', 32)), len(params))
+        self.power = float(meta.get('power', 2.0))
+
+        self._unit = self._to_unit(np.asarray(params, dtype=float))
+        self._unit_min = self._unit.min(axis=0)
+        self._unit_max = self._unit.max(axis=0)
+        self.coverage_radius = float(meta.get('coverage_radius', np.inf))
+
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'lookup_us_total': 0.0}
+
+    def _to_unit(self, params: np.ndarray) -> np.ndarray:
+        return (params - self.lows) / (self.highs - self.lows)
+
+    def _grid_indices(self, t_start: float, t_end: float, dt: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (time grid, table row indices) of a request grid, or None if it is not a prefix of the table grid.
+
+        The model integrates x/y and mass from the first grid point with the
+        request's dt, so a grid with another start or step is a different
+        trajectory from the tabulated rows (and outside the measured error).
+        """
+        if dt <= 0 or abs(t_start - self.t_start) > 1e-9 or abs(dt - self.dt) > 1e-9 * self.dt:
+            return None
+        time_array = np.arange(t_start, t_end + dt, dt)  # Same grid as MLModelService._time_grid
+        if len(time_array) == 0 or len(time_array) > self.n_points:
+            return None
+        return time_array, np.arange(len(time_array))
+
+    def _distances(self, point: np.ndarray) -> np.ndarray:
+        """[n] unit-cube distances from point to every entry"""
+        offset = self._unit - point
+        return np.sqrt(np.einsum('ij,ij->i', offset, offset))
+
+    def interpolate(self, point: np.ndarray, indices: Optional[np.ndarray] = None,
+                    distances: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Local-linear interpolation of the trajectory at a unit-cube point.
+
+        Args:
+            point: [d] parameters mapped to the unit cube
+            indices: Optional time rows to evaluate (default: the whole grid)
+            distances: Precomputed _distances(point)
+
+        Returns:
+            [len(indices), 14] dimensional states
+        """
+        if distances is None:
+            distances = self._distances(point)
+        nearest = np.sort(np.argpartition(distances, self.neighbours - 1)[:self.neighbours])
+        # Only the requested rows of the k entries are read from the (mapped) file
+        states = self.trajectories[nearest, _as_slice(indices)]  # [k, n, 14]
+        if distances[nearest].min() < 1e-12:
+            return states[np.argmin(distances[nearest])].astype(float)
+        weights = distances[nearest] ** -self.power
+        # Affine fit state ~ c0 + c . (x - point); its value at the point is c0,
+        # a fixed linear combination of the neighbours' states
+        design = np.column_stack([np.ones(len(nearest)), self._unit[nearest] - point])  # [k, d + 1]
+        weighted = design.T * weights
+        normal = weighted @ design
+        normal[np.diag_indices_from(normal)] += 1e-12 * np.trace(normal)  # Degenerate neighbourhoods
+        combination = np.linalg.solve(normal, weighted)[0]  # [k]
+        k, n, dim = states.shape
+        return (combination.astype(states.dtype) @ states.reshape(k, n * dim)).reshape(n, dim).astype(float)
+
+    def covers(self, point: np.ndarray, distances: Optional[np.ndarray] = None) -> bool:
+        """True if the unit-cube point lies inside the sampled region"""
+        if np.any(point < self._unit_min) or np.any(point > self._unit_max):
+            return False
+        if distances is None:
+            distances = self._distances(point)
+        return distances.min() <= self.coverage_radius
+
+    def lookup(self, params: Dict[str, float], t_start: float = 0.0, t_end: float = 30.0,
+               dt: float = 0.02) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Interpolated (time_array, state_array) for a request, or None if the table cannot answer it.
+        """
+        start = time.perf_counter()
+        result = None
+        if all(field in params for field in self.fields):
+            point = self._to_unit(np.array([float(params[f]) for f in self.fields]))
+            grid = self._grid_indices(t_start, t_end, dt)
+            distances = self._distances(point)
+            if grid is not None and self.covers(point, distances):
+                time_array, indices = grid
+                result = (time_array, self.interpolate(point, indices, distances))
+        with self._lock:
+            self._stats['hits' if result is not None else 'misses'] += 1
+            self._stats['lookup_us_total'] += (time.perf_counter() - start) * 1e6
+        return result
+
+    def get_stats(self) -> Dict:
+        """Table size, measured error bound and hit counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'entries': len(self.params),
+            'points': self.n_points,
+            'dt': self.dt,
+            't_end': self.t_start + self.dt * (self.n_points - 1),
+            'max_error': self.meta.get('max_error'),
+            'p95_error': self.meta.get('p95_error'),
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'avg_lookup_us': stats['lookup_us_total'] / lookups if lookups else 0.0,
+        }
+
+    def save(self, directory) -> Path:
+        """Write params.npy, trajectories.npy (float32) and meta.json to directory"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / PARAMS_FILE, np.asarray(self.params, dtype=np.float64))
+        np.save(directory / TRAJECTORIES_FILE, np.asarray(self.trajectories, dtype=np.float32))
+        (directory / META_FILE).write_text(json.dumps(self.meta, indent=2))
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> 'TrajectoryTable':
+        """Load a saved table; trajectories are memory-mapped (read-only) unless mmap=False"""
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        params = np.load(directory / PARAMS_FILE)
+        trajectories = np.load(directory / TRAJECTORIES_FILE, mmap_mode='r' if mmap else None)
+        return cls(params, trajectories, meta)
+
+
+def _as_slice(indices: Optional[np.ndarray]):
+    """Equivalent slice for evenly spaced indices (basic indexing copies less), else the indices"""
+    if indices is None:
+        return slice(None)
+    if len(indices) == 1:
+        return slice(int(indices[0]), int(indices[0]) + 1)
+    step = int(indices[1] - indices[0])
+    if step > 0 and np.all(np.diff(indices) == step):
+        return slice(int(indices[0]), int(indices[-1]) + 1, step)
+    return indices
+
+
+def table_errors(table: TrajectoryTable, params: np.ndarray, trajectories: np.ndarray) -> np.ndarray:
+    """
+    Per-scenario interpolation error against reference trajectories.
+
+    The error of a scenario is the largest deviation over its grid and the
+    14 state components, each component scaled by its range across the table.
+
+    Args:
+        params: [m, d] held-out parameter sets (table field order)
+        trajectories: [m, N, 14] model trajectories for them on the table grid
+
+    Returns:
+        [m] errors as fractions of the component ranges
+    """
+    span = np.ptp(np.asarray(table.trajectories, dtype=float).reshape(-1, 14), axis=0)
+    span = np.where(span > 0, span, 1.0)
+    errors = []
+    for point, reference in zip(table._to_unit(params), trajectories):
+        errors.append(float((np.abs(table.interpolate(point) - reference) / span).max()))
+    return np.array(errors)
+
+
+def build_trajectory_table(
+    predict_batch_fn: Callable[[List[Dict]], List[Tuple[np.ndarray, np.ndarray]]],
+    bounds: Dict[str, Tuple[float, float]],
+    n_samples: int = 512,
+    t_end: float = 30.0,
+    dt: float = 0.02,
+    sampler: str = 'lhs',
+    seed: int = 0,
+    batch_size: int = 64,
+    validation_samples: int = 64,
+    neighbours: int = 32
+) -> TrajectoryTable:
+    """
+    Evaluate the model on a space-filling design and measure the interpolation error.
+
+    Args:
+        predict_batch_fn: Model evaluation (e.g. MLModelService._run_batch on a snapshot)
+        bounds: Parameter ranges (param_bounds of the model config)
+        n_samples: Table entries
+        t_end, dt: Table time grid (starting at 0)
+        sampler: 'lhs' or 'sobol' (src.data.sampler)
+        seed: Design seed; the held-out set uses seed + 1
+        batch_size: Scenarios per model call
+        validation_samples: Held-out parameter sets for the error bound
+        neighbours: k of the local-linear interpolation (> number of fields)
+
+    Returns:
+        TrajectoryTable whose meta records max_error/p95_error on the held-out set
+    """
+    from src.data.sampler import lhs_sample, sobol_sample
+
+    bounds = dict(bounds)
+    fields = list(bounds)
+    sample = {'lhs': lhs_sample, 'sobol': sobol_sample}[sampler]
+
+    def evaluate(points: np.ndarray) -> np.ndarray:
+        states = []
+        for start in range(0, len(points), batch_size):
+            scenarios = [
+                {'params': dict(zip(fields, row.tolist())), 't_start': 0.0, 't_end': t_end, 'dt': dt}
+                for row in points[start:start + batch_size]
+            ]
+            states.extend(state for _, state in predict_batch_fn(scenarios))
+        return np.stack(states).astype(np.float32)
+
+    params = sample(n_samples, bounds, seed)
+    meta = {
+        'fields': fields,
+        'bounds': {f: list(bounds[f]) for f in fields},
+        'sampler': sampler,
+        'seed': seed,
+        't_start': 0.0,
+        'dt': dt,
+        'neighbours': neighbours,
+        'power': 2.0,
+    }
+    table = TrajectoryTable(params, evaluate(params), meta)
+
+    # Queries farther than this from every entry are left to the live model
+    unit = table._unit
+    distances = np.sqrt(((unit[:, None, :] - unit[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    table.coverage_radius = meta['coverage_radius'] = float(distances.min(axis=1).max())
+
+    if validation_samples > 0:
+        held_out = lhs_sample(validation_samples, bounds, seed + 1)
+        errors = table_errors(table, held_out, evaluate(held_out))
+        meta['validation_samples'] = validation_samples
+        meta['max_error'] = float(errors.max())
+        meta['p95_error'] = float(np.percentile(errors, 95))
+    return table
@@ -1,51 +1,171 @@
-"""ML Model Service for loading and running PINN models"""
+"""
+ML Model Service for loading and running PINN models
+
+torch, yaml and the model sources (the `src` package) are imported on first
+ML use, inside the methods that need them, so importing this module (and
+create_app) stays cheap. A model served by ONNX Runtime never imports torch.
+"""
 import os
 import sys
-import yaml
-import torch
+import time
+import logging
+import threading
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from flask import current_app
 
-# Add model source code to path
+from app.services.ml_cache import PredictionCache, make_cache_key, file_checksum
+from app.services.ml_lookup import LOOKUP_DIR, TrajectoryTable, param_bounds
+from app.utils.metrics import timed
+
+if TYPE_CHECKING:
+    import torch
+    from src.data.preprocess import Scales
+    from src.export.onnx import OnnxStateModel
+
+logger = logging.getLogger(__name__)
+
+# Model source code (the `src` package), put on sys.path by add_model_sources_to_path()
 MODEL_BASE_PATH = Path(__file__).parent.parent / 'ml_models' / 'project_1'
-sys.path.insert(0, str(MODEL_BASE_PATH))
 
-from src.models.direction_an_pinn import DirectionANPINN
-from src.data.preprocess import load_scales, build_context_vector, CONTEXT_FIELDS, Scales
+DEFAULT_MODEL_VERSION = 'default'
+
+# Architectures the service knows how to feed (t, context[, initial_state] -> state)
+SERVABLE_MODEL_TYPES = ('direction_an', 'direction_d1', 'hybrid_c3', 'latent_ode')
+
+
+def add_model_sources_to_path():
+    """Make the model sources importable as `src`; done when the first model service is created"""
+    path = str(MODEL_BASE_PATH)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def _is_onnx(model) -> bool:
+    """True if model is an ONNX Runtime session (checked without importing anything new)"""
+    onnx_module = sys.modules.get('src.export.onnx')
+    return onnx_module is not None and isinstance(model, onnx_module.OnnxStateModel)
+
+
+class ModelSnapshot(NamedTuple):
+    """Everything a request needs from a loaded model, published together so a hot-swap is atomic"""
+    model: 'torch.nn.Module'  # Or an OnnxStateModel (ONNX Runtime, numpy in/out)
+    scripted: Optional['torch.nn.Module']
+    scales: 'Scales'
+    context_dim: int
+    checksum: Optional[str]
+    lookup: Optional[TrajectoryTable] = None
+
+
+def load_checkpoint_state(checkpoint_path, device, mmap: bool = True) -> Tuple[Dict, bool]:
+    """
+    Load the model state dict from a checkpoint file.
+    
+    With mmap=True the tensor storages are memory-mapped from the file
+    (copy-on-write), so every process loading the same checkpoint shares the
+    same physical pages. best.pt must then be replaced atomically (write a new
+    file and rename it over the old one), never rewritten in place.
+    Falls back to a regular load for checkpoints that cannot be mapped
+    (legacy serialization format).
+    
+    Returns:
+        Tuple of (state_dict, mmapped)
+    """
+    import torch
+    
+    checkpoint = None
+    mmapped = False
+    if mmap:
+        try:
+            checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False, mmap=True)
+            mmapped = True
+        except RuntimeError:
+            checkpoint = None
+    if checkpoint is None:
+        checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+    
+    if 'model_state_dict' in checkpoint:
+        return checkpoint['model_state_dict'], mmapped
+    # Try direct state dict
+    return checkpoint, mmapped
 
 
 class MLModelService:
-    """Service for loading and running ML models"""
+    """
+    Loads one model version (checkpoint + config + scales) and runs inference on it.
+    
+    Instances are owned by the ModelRegistry (app/services/ml_registry.py),
+    one per (project, version); get_ml_model_service() returns the default one.
+    """
     
-    _instance = None
     _model = None
     _scales = None
     _config = None
     _context_dim = None
+    _cache = None
+    _scripted = None  # Frozen TorchScript export of _model (state only), preferred when present
+    _lookup = None  # Precomputed trajectory table (ML_LOOKUP_TABLE), tried before the model
+    _precision = 'float32'  # Precision mode _model runs in (ML_PRECISION, unless refused)
+    _precision_error = None  # Measured deviation of that mode from float32 (fraction of range)
+    _precision_requested = 'float32'
+    _checkpoint_stat = None
+    _checkpoint_checksum = None
+    _state = 'cold'  # cold | warming | ready | failed
+    _preload_thread = None
+    _warmed_pid = None  # Process that ran the warm-up pass (a forked worker must warm up itself)
+    _in_flight = 0
+    _last_used = 0.0
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MLModelService, cls).__new__(cls)
-        return cls._instance
+    def __init__(self, model_dir: Path = MODEL_BASE_PATH, project_id: int = 1,
+                 version: str = DEFAULT_MODEL_VERSION):
+        add_model_sources_to_path()
+        self.model_dir = Path(model_dir)
+        self.project_id = project_id
+        self.version = version
+        self._load_lock = threading.Lock()  # Serializes (re)loads
+        self._publish_lock = threading.Lock()  # Guards the published model fields and counters
     
     def load_model(self, project_id: int = 1) -> bool:
         """
         Load the ML model for a specific project.
-        Uses lazy loading - only loads on first request.
+        Uses lazy loading - only loads on first request, and reloads (dropping
+        cached predictions) when best.pt changes on disk. A reload builds the
+        new model next to the old one and swaps it in atomically; requests
+        already running finish on the model they started with.
         
         Args:
-            project_id: Project ID (currently only 1 is supported)
+            project_id: Project ID (kept for callers; the service is bound to self.project_id)
             
         Returns:
             True if model loaded successfully, False otherwise
         """
-        if self._model is not None:
+        if self._model is not None and not self._checkpoint_changed():
             return True
         
+        # Concurrent callers wait for the load in progress (e.g. a startup preload)
+        with self._load_lock:
+            loaded = self._load_model(project_id)
+        if self._state != 'warming':
+            self._state = 'ready' if loaded else 'failed'
+        return loaded
+    
+    def _load_model(self, project_id: int) -> bool:
+        """Body of load_model, called with _load_lock held"""
+        if self._model is not None:
+            if not self._checkpoint_changed():
+                return True
+            current_app.logger.info("Checkpoint changed on disk, reloading model")
+            if self._cache is not None:
+                self._cache.clear()
+        
         try:
-            model_dir = MODEL_BASE_PATH
+            import yaml
+            from src.data.preprocess import load_scales, Scales
+            from src.export.onnx import ARTIFACT_NAME as ONNX_ARTIFACT
+            
+            model_dir = self.model_dir
             checkpoint_path = model_dir / 'best.pt'
             config_path = model_dir / 'config.yaml'
             scales_path = model_dir / 'scales.yaml'
@@ -63,17 +183,17 @@ class MLModelService:
                 return False
             
             # Load scales
-            self._scales = load_scales(str(scales_path))
+            scales = load_scales(str(scales_path))
             
             # Load config
             with open(config_path, 'r') as f:
-                self._config = yaml.safe_load(f)
+                config = yaml.safe_load(f)
             
-            model_cfg = self._config.get('model', {})
+            model_cfg = dict(config.get('model', {}))
             
             # Determine context dimension (use default 7 for basic fields)
             # In production, this should be loaded from dataset metadata
-            self._context_dim = 7  # m0, Isp, Cd, CL_alpha, Cm_alpha, Tmax, wind_mag
+            context_dim = int(config.get('context_dim', 7))  # m0, Isp, Cd, CL_alpha, Cm_alpha, Tmax, wind_mag
             
             # Load physics params (optional - use empty dict if not available)
             physics_params = {}
@@ -89,52 +209,462 @@ class MLModelService:
                         physics_params.update(phys_config['atmosphere'])
             
             # Convert scales dict to Scales object if needed
-            if isinstance(self._scales, dict):
-                scales_dict = self._scales.get('scales', self._scales)
-                self._scales = Scales(**{k: v for k, v in scales_dict.items() if k in ['L', 'V', 'T', 'M', 'F', 'W']})
+            if isinstance(scales, dict):
+                scales_dict = scales.get('scales', scales)
+                scales = Scales(**{k: v for k, v in scales_dict.items() if k in ['L', 'V', 'T', 'M', 'F', 'W']})
             
-            # Create model
+            # Create model (same factory as training, so any servable architecture works)
             model_type = model_cfg.get('type', 'direction_an').lower()
-            
-            if model_type == 'direction_an':
-                self._model = DirectionANPINN(
-                    context_dim=self._context_dim,
-                    fourier_features=int(model_cfg.get('fourier_features', 8)),
-                    stem_hidden_dim=int(model_cfg.get('stem_hidden_dim', 128)),
-                    stem_layers=int(model_cfg.get('stem_layers', 4)),
-                    activation=model_cfg.get('activation', 'tanh'),
-                    layer_norm=bool(model_cfg.get('layer_norm', True)),
-                    translation_branch_dims=model_cfg.get('translation_branch_dims', [128, 128]),
-                    rotation_branch_dims=model_cfg.get('rotation_branch_dims', [256, 256]),
-                    mass_branch_dims=model_cfg.get('mass_branch_dims', [64]),
-                    dropout=float(model_cfg.get('dropout', 0.0)),
-                    physics_params=physics_params if physics_params else None,
-                    physics_scales=self._scales.__dict__ if physics_params else None,
-                )
-            else:
+            if model_type not in SERVABLE_MODEL_TYPES:
                 current_app.logger.error(f"Unsupported model type: {model_type}")
                 return False
+            model_cfg['type'] = model_type
             
-            # Load checkpoint
-            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+            checkpoint_stat = self._stat_checkpoint()
+            checkpoint_checksum = file_checksum(checkpoint_path)
+            requested_precision = current_app.config.get('ML_PRECISION', 'float32')
+            precision, precision_error = 'float32', None
+            scripted = None
             
-            if 'model_state_dict' in checkpoint:
-                self._model.load_state_dict(checkpoint['model_state_dict'])
-            else:
-                # Try direct state dict
-                self._model.load_state_dict(checkpoint)
+            # A current ONNX export replaces the torch model entirely (the graph is float32)
+            model = None
+            if current_app.config.get('ML_ONNX', True) and requested_precision == 'float32':
+                model = self._load_onnx(model_dir / ONNX_ARTIFACT, checkpoint_checksum, context_dim)
             
-            self._model.eval()
-            self._model.to(device)
+            if model is None:
+                import torch
+                from src.models.factory import build_model
+                from src.export.torchscript import ARTIFACT_NAME as TORCHSCRIPT_ARTIFACT
+                
+                model = build_model(
+                    model_cfg,
+                    context_dim,
+                    physics_params=physics_params if physics_params else None,
+                    scales=scales.__dict__ if physics_params else None,
+                )
+                
+                # Load checkpoint
+                device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+                use_mmap = current_app.config.get('ML_MMAP_WEIGHTS', True) and device.type == 'cpu'
+                state_dict, mmapped = load_checkpoint_state(checkpoint_path, device, mmap=use_mmap)
+                
+                # assign=True keeps the memory-mapped tensors instead of copying them into
+                # freshly allocated parameters, so workers share the file's page cache
+                model.load_state_dict(state_dict, assign=mmapped)
+                
+                model.eval()
+                model.to(device)
+                
+                if requested_precision != 'float32':
+                    reduced, precision_error = self._reduce_precision(model, requested_precision, scales, config,
+                                                                      context_dim)
+                    if reduced is not None:
+                        model, precision = reduced, requested_precision
+                
+                # The TorchScript export is a float32 graph
+                if current_app.config.get('ML_TORCHSCRIPT', True) and precision == 'float32':
+                    scripted = self._load_scripted(model_dir / TORCHSCRIPT_ARTIFACT, device, checkpoint_checksum,
+                                                   context_dim)
             
-            current_app.logger.info(f"Model loaded successfully for project {project_id}")
+            # Only publish the model once its weights loaded
+            lookup = None
+            if current_app.config.get('ML_LOOKUP_TABLE', False):
+                lookup = self._load_lookup(model_dir / LOOKUP_DIR, checkpoint_checksum)
+            cache = None
+            if current_app.config.get('ML_CACHE_ENABLED', True):
+                cache = PredictionCache(
+                    max_bytes=current_app.config.get('ML_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                    ttl_seconds=current_app.config.get('ML_CACHE_TTL_SECONDS', 3600.0),
+                )
+            
+            with self._publish_lock:
+                self._model = model
+                self._scripted = scripted
+                self._lookup = lookup
+                self._precision = precision
+                self._precision_error = precision_error
+                self._precision_requested = requested_precision
+                self._scales = scales
+                self._config = config
+                self._context_dim = context_dim
+                self._checkpoint_stat = checkpoint_stat
+                self._checkpoint_checksum = checkpoint_checksum
+                self._cache = cache
+            
+            current_app.logger.info(
+                f"Model {model_type} ({self.version}) loaded successfully for project {self.project_id}"
+            )
             return True
             
         except Exception as e:
             current_app.logger.error(f"Error loading model: {e}", exc_info=True)
+            if self._model is not None:
+                # Reload failed: keep serving the previous weights until best.pt changes again
+                self._checkpoint_stat = self._stat_checkpoint()
+                return True
             return False
     
+    def _stat_checkpoint(self) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of best.pt, or None if it cannot be read"""
+        try:
+            stat = (self.model_dir / 'best.pt').stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _load_scripted(self, artifact_path: Path, device, checkpoint_checksum: str, context_dim: int):
+        """Load the TorchScript export if it exists and was exported from the current checkpoint"""
+        if not artifact_path.exists():
+            return None
+        from src.export.torchscript import load_torchscript
+        try:
+            scripted, metadata = load_torchscript(artifact_path, map_location=device)
+        except Exception as e:
+            current_app.logger.warning(f"Ignoring unreadable TorchScript artifact {artifact_path}: {e}")
+            return None
+        if metadata.get('checkpoint_sha256') != checkpoint_checksum:
+            current_app.logger.warning(f"Ignoring stale TorchScript artifact {artifact_path} (re-export it)")
+            return None
+        if metadata.get('context_dim', context_dim) != context_dim:
+            current_app.logger.warning(f"Ignoring TorchScript artifact with context_dim {metadata.get('context_dim')}")
+            return None
+        current_app.logger.info(f"Using TorchScript artifact {artifact_path}")
+        return scripted
+    
+    def _load_onnx(self, artifact_path: Path, checkpoint_checksum: str, context_dim: int) -> Optional['OnnxStateModel']:
+        """Load the ONNX export with ONNX Runtime if both exist and it was exported from the current checkpoint"""
+        if not artifact_path.exists():
+            return None
+        from src.export.onnx import load_onnx, onnxruntime_available
+        if not onnxruntime_available():
+            current_app.logger.info(f"onnxruntime is not installed, ignoring {artifact_path}")
+            return None
+        try:
+            model, metadata = load_onnx(artifact_path, threads=current_app.config.get('ML_ONNX_THREADS', 0))
+        except Exception as e:
+            current_app.logger.warning(f"Ignoring unreadable ONNX artifact {artifact_path}: {e}")
+            return None
+        if metadata.get('checkpoint_sha256') != checkpoint_checksum:
+            current_app.logger.warning(f"Ignoring stale ONNX artifact {artifact_path} (re-export it)")
+            return None
+        if metadata.get('context_dim', context_dim) != context_dim:
+            current_app.logger.warning(f"Ignoring ONNX artifact with context_dim {metadata.get('context_dim')}")
+            return None
+        current_app.logger.info(f"Using ONNX Runtime on {artifact_path}")
+        return model
+    
+    def _snapshot(self) -> ModelSnapshot:
+        """The currently published model, read in one step so it cannot be torn by a reload"""
+        with self._publish_lock:
+            if self._model is None or self._scales is None:
+                raise RuntimeError("Model not loaded. Call load_model() first.")
+            return ModelSnapshot(
+                self._model, self._scripted, self._scales, self._context_dim, self._checkpoint_checksum,
+                self._lookup
+            )
+    
+    def acquire(self):
+        """Take a serving lease: the registry never evicts a service while one is held"""
+        with self._publish_lock:
+            self._in_flight += 1
+            self._last_used = time.monotonic()
+    
+    def release(self):
+        """Return a lease taken with acquire()"""
+        with self._publish_lock:
+            self._in_flight -= 1
+            self._last_used = time.monotonic()
+    
+    @contextmanager
+    def _serving(self):
+        """Mark a request as in flight for the duration of the block"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def is_idle(self) -> bool:
+        """True if no request is currently running on this service"""
+        return self._in_flight == 0
+    
+    def last_used(self) -> float:
+        """time.monotonic() of the last request start/end (0.0 if never used)"""
+        return self._last_used
+    
+    def model_bytes(self) -> int:
+        """Bytes held by the loaded model's parameters and buffers (0 when unloaded)"""
+        model = self._model
+        if model is None:
+            return 0
+        if _is_onnx(model):
+            return model.nbytes
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    
+    def unload(self) -> bool:
+        """
+        Drop the loaded model and its cache so the memory can be reclaimed.
+        
+        Returns:
+            False (and keeps the model) if a request is still in flight
+        """
+        with self._load_lock, self._publish_lock:
+            if self._in_flight:
+                return False
+            self._model = None
+            self._scripted = None
+            self._lookup = None
+            self._precision = 'float32'
+            self._precision_error = None
+            self._precision_requested = 'float32'
+            self._scales = None
+            self._config = None
+            self._context_dim = None
+            self._cache = None
+            self._checkpoint_stat = None
+            self._checkpoint_checksum = None
+            self._warmed_pid = None
+            self._state = 'cold'
+        return True
+    
+    def _reduce_precision(
+        self,
+        model: 'torch.nn.Module',
+        mode: str,
+        scales: 'Scales',
+        config: Dict,
+        context_dim: int,
+        n_probe: int = 8
+    ) -> Tuple[Optional['torch.nn.Module'], Optional[float]]:
+        """
+        Convert the float32 model to a reduced precision mode and check it against float32.
+        
+        The check runs both models on n_probe parameter sets spread over the
+        training parameter space (param_bounds of the config; 30 s at
+        dt = 0.02); the error is the largest deviation, as a fraction of each
+        state component's range.
+        
+        Returns:
+            (reduced model, error), or (None, error) if the mode is refused:
+            it cannot be applied or its error exceeds ML_PRECISION_MAX_ERROR
+        """
+        import torch
+        from src.data.sampler import lhs_sample
+        from src.export.precision import apply_precision, max_relative_error
+        
+        try:
+            bounds = param_bounds(config, self.model_dir)
+            reduced = apply_precision(model, mode)
+        except Exception as e:
+            current_app.logger.error(f"Precision mode '{mode}' unavailable, serving float32: {e}")
+            return None, None
+        
+        fields = list(bounds)
+        scenarios = [
+            {'params': dict(zip(fields, row.tolist())), 't_start': 0.0, 't_end': 30.0, 'dt': 0.02}
+            for row in lhs_sample(n_probe, bounds, 0)
+        ]
+        states = []
+        for candidate in (model, reduced):
+            snapshot = ModelSnapshot(candidate, None, scales, context_dim, None)
+            states.append(torch.from_numpy(np.stack([state for _, state in self._run_batch(scenarios, snapshot)])))
+        error = max_relative_error(*states)
+        
+        allowed = current_app.config.get('ML_PRECISION_MAX_ERROR', 0.01)
+        if not error <= allowed:
+            current_app.logger.error(
+                f"Refusing precision mode '{mode}': error {error:.2e} exceeds ML_PRECISION_MAX_ERROR={allowed}, "
+                f"serving float32"
+            )
+            return None, error
+        current_app.logger.info(f"Serving precision mode '{mode}' (error {error:.2e} vs float32)")
+        return reduced, error
+    
+    def _load_lookup(self, table_dir: Path, checkpoint_checksum: str) -> Optional[TrajectoryTable]:
+        """Load the trajectory table if it exists and was built from the current checkpoint"""
+        if not (table_dir / 'meta.json').exists():
+            return None
+        try:
+            table = TrajectoryTable.load(table_dir)
+        except Exception as e:
+            current_app.logger.warning(f"Ignoring unreadable trajectory table {table_dir}: {e}")
+            return None
+        if table.meta.get('checkpoint_sha256') != checkpoint_checksum:
+            current_app.logger.warning(f"Ignoring stale trajectory table {table_dir} (rebuild it)")
+            return None
+        max_error = table.meta.get('max_error')
+        allowed = current_app.config.get('ML_LOOKUP_MAX_ERROR', 0.01)
+        if max_error is None or max_error > allowed:
+            current_app.logger.warning(
+                f"Ignoring trajectory table {table_dir}: held-out error {max_error} exceeds ML_LOOKUP_MAX_ERROR={allowed}"
+            )
+            return None
+        current_app.logger.info(
+            f"Using trajectory table {table_dir} ({len(table.params)} entries, max error {table.meta.get('max_error')})"
+        )
+        return table
+    
+    def _forward_state(
+        self,
+        t_tensor: 'torch.Tensor',
+        context_tensor: 'torch.Tensor',
+        snapshot: Optional[ModelSnapshot] = None,
+        initial_state: Optional['torch.Tensor'] = None
+    ) -> 'torch.Tensor':
+        """State prediction [B, N, 14], from the TorchScript artifact if available, else eager"""
+        snapshot = snapshot or self._snapshot()
+        scripted = snapshot.scripted
+        # The export is traced for grids with at least two points
+        if scripted is not None and t_tensor.shape[1] > 1:
+            try:
+                return scripted(t_tensor, context_tensor)
+            except Exception as e:
+                logger.warning(f"TorchScript inference failed, falling back to eager mode: {e}")
+                with self._publish_lock:
+                    if self._scripted is scripted:
+                        self._scripted = None
+        
+        model = snapshot.model
+        if getattr(model, 'requires_initial_state', False):
+            if initial_state is None:
+                raise ValueError(f"{type(model).__name__} needs an initial state")
+            result = model(t_tensor, context_tensor, initial_state)
+        elif hasattr(model, 'predict_state'):
+            # Inference-only path: skips the physics residual layer
+            return model.predict_state(t_tensor, context_tensor)
+        else:
+            result = model(t_tensor, context_tensor)
+        
+        # Model forward returns (state, physics_residuals) for DirectionANPINN
+        if isinstance(result, tuple):
+            return result[0]  # Extract state from tuple
+        return result
+    
+    @staticmethod
+    def _initial_state(params: Dict[str, float], scales: 'Scales') -> np.ndarray:
+        """Nondimensional state at launch: at rest at the origin, identity attitude, full mass m0"""
+        state = np.zeros(14)
+        state[6] = 1.0  # q0
+        state[13] = params.get('m0', scales.M) / scales.M
+        return state
+    
+    def get_status(self) -> str:
+        """Readiness state: 'cold', 'warming', 'ready' or 'failed'"""
+        return self._state
+    
+    def warm_up(self, t_end: float = 30.0, dt: float = 0.02) -> float:
+        """
+        Run one dummy forward pass over a default-sized grid so lazy allocations
+        (kernels, thread pools, buffers) happen before the first real request.
+        Bypasses the result cache.
+        
+        Returns:
+            Elapsed time in seconds
+        """
+        start = time.perf_counter()
+        self._run_batch([{'params': {}, 't_start': 0.0, 't_end': t_end, 'dt': dt}], self._snapshot())
+        return time.perf_counter() - start
+    
+    def preload(self, project_id: int = 1, warm_up: bool = True) -> bool:
+        """
+        Load the model and optionally warm it up, reporting 'warming' meanwhile.
+        Must run inside an application context.
+        
+        Returns:
+            True if the model is ready to serve
+        """
+        if self._state == 'ready' and self._model is not None:
+            if not warm_up or self._warmed_pid == os.getpid():
+                return True
+        
+        self._state = 'warming'
+        ready = self.load_model(project_id)
+        if ready and warm_up and self._warmed_pid != os.getpid():
+            try:
+                elapsed = self.warm_up()
+                self._warmed_pid = os.getpid()
+                current_app.logger.info(f"Model warm-up forward pass took {elapsed * 1000:.0f} ms")
+            except Exception as e:
+                current_app.logger.error(f"Model warm-up failed: {e}", exc_info=True)
+                ready = False
+        self._state = 'ready' if ready else 'failed'
+        return ready
+    
+    def start_preload(self, app, mode: str = 'background', project_id: int = 1, warm_up: bool = True) -> bool:
+        """
+        Preload the model at startup.
+        
+        Args:
+            app: Flask application (provides the app context for loading)
+            mode: 'sync' blocks until ready; 'background' loads in a daemon thread
+            project_id: Project ID (currently only 1 is supported)
+            warm_up: Run a dummy forward pass after loading
+            
+        Returns:
+            For 'sync', whether the model is ready; for 'background', True once started
+        """
+        def run():
+            with app.app_context():
+                return self.preload(project_id, warm_up=warm_up)
+        
+        if mode == 'sync':
+            if self._preload_thread is not None and self._preload_thread.is_alive():
+                self._preload_thread.join()
+            return run()
+        if mode != 'background':
+            raise ValueError(f"Unknown preload mode: {mode}")
+        if self._state in ('warming', 'ready'):
+            return True
+        
+        self._state = 'warming'
+        self._preload_thread = threading.Thread(target=run, name='ml-model-preload', daemon=True)
+        self._preload_thread.start()
+        return True
+    
+    def _checkpoint_changed(self) -> bool:
+        """True if best.pt was replaced since the current model was loaded from it"""
+        if self._checkpoint_stat is None:
+            return False
+        current = self._stat_checkpoint()
+        return current is not None and current != self._checkpoint_stat
+    
+    def _build_context(self, params: Dict[str, float], snapshot: Optional[ModelSnapshot] = None) -> np.ndarray:
+        """Build the normalized context vector padded/truncated to the model's context_dim."""
+        from src.data.preprocess import build_context_vector, CONTEXT_FIELDS
+        
+        snapshot = snapshot or self._snapshot()
+        context_dim = snapshot.context_dim
+        # Use only fields that are in params
+        available_fields = [f for f in CONTEXT_FIELDS if f in params]
+        context_normalized = build_context_vector(params, snapshot.scales, fields=available_fields)
+        
+        # Pad context vector to expected dimension
+        if len(context_normalized) < context_dim:
+            # Pad with zeros
+            context_normalized = np.pad(context_normalized, (0, context_dim - len(context_normalized)), 'constant')
+        elif len(context_normalized) > context_dim:
+            # Truncate
+            context_normalized = context_normalized[:context_dim]
+        
+        return context_normalized
+    
+    @staticmethod
+    def _time_grid(t_start: float, t_end: float, dt: float) -> np.ndarray:
+        """Dimensional time grid in seconds"""
+        return np.arange(t_start, t_end + dt, dt)
+    
+    def _denormalize_state(self, state_nondim: np.ndarray, scales: Optional['Scales'] = None) -> np.ndarray:
+        """Convert a [..., 14] nondimensional state array to dimensional units"""
+        scales = scales or self._scales
+        state_dimensional = state_nondim.copy()
+        state_dimensional[..., 0:3] *= scales.L      # Position [x, y, z] → meters
+        state_dimensional[..., 3:6] *= scales.V      # Velocity [vx, vy, vz] → m/s
+        state_dimensional[..., 10:13] *= scales.W     # Angular velocity [wx, wy, wz] → rad/s
+        state_dimensional[..., 13] *= scales.M       # Mass [m] → kg
+        # Quaternion [q0, q1, q2, q3] is already dimensionless
+        return state_dimensional
+    
     def predict(
         self,
         params: Dict[str, float],
@@ -156,61 +686,206 @@ class MLModelService:
             - time_array: [N] time in seconds
             - state_array: [N, 14] state in dimensional units
         """
-        if self._model is None or self._scales is None:
-            raise RuntimeError("Model not loaded. Call load_model() first.")
+        scenario = {'params': params, 't_start': t_start, 't_end': t_end, 'dt': dt}
+        return self.predict_batch([scenario])[0]
+    
+    def predict_batch(self, scenarios: List[Dict]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Predict several rocket trajectories in a single forward pass.
         
-        # Build context vector
-        # Use only fields that are in params
-        available_fields = [f for f in CONTEXT_FIELDS if f in params]
-        context_normalized = build_context_vector(params, self._scales, fields=available_fields)
+        Scenarios may use different time grids. Shorter grids are padded at the
+        end (repeating their last time value) up to the longest grid; since the
+        x/y and mass reconstructions are causal cumulative sums, padding never
+        changes the points that are returned.
         
-        # Pad context vector to expected dimension
-        if len(context_normalized) < self._context_dim:
-            # Pad with zeros
-            context_normalized = np.pad(context_normalized, (0, self._context_dim - len(context_normalized)), 'constant')
-        elif len(context_normalized) > self._context_dim:
-            # Truncate
-            context_normalized = context_normalized[:self._context_dim]
+        Scenarios found in the result cache are answered from it, then those
+        the trajectory table (ML_LOOKUP_TABLE) covers are interpolated from
+        it; only the rest go through the model. The whole call runs on the model that
+        was published when it started, even if a reload swaps it meanwhile.
         
-        # Create time grid (dimensional)
-        t_dimensional = np.arange(t_start, t_end + dt, dt)
-        N = len(t_dimensional)
+        Args:
+            scenarios: List of dicts with keys 'params' (required) and
+                't_start', 't_end', 'dt' (optional, same defaults as predict)
+            
+        Returns:
+            List of (time_array, state_array) tuples, one per scenario, in order
+        """
+        snapshot = self._snapshot()
+        if not scenarios:
+            return []
         
-        # Convert to nondimensional
-        t_nondim = t_dimensional / self._scales.T
+        with self._serving():
+            cache = self._cache
+            if cache is None and snapshot.lookup is None:
+                return self._run_batch(scenarios, snapshot)
+            
+            results = [None] * len(scenarios)
+            if cache is not None:
+                keys = [
+                    make_cache_key(
+                        s['params'], s.get('t_start', 0.0), s.get('t_end', 30.0), s.get('dt', 0.02),
+                        snapshot.checksum
+                    )
+                    for s in scenarios
+                ]
+                results = [cache.get(key) for key in keys]
+            if snapshot.lookup is not None:
+                for i, s in enumerate(scenarios):
+                    if results[i] is None:
+                        results[i] = snapshot.lookup.lookup(
+                            s['params'], s.get('t_start', 0.0), s.get('t_end', 30.0), s.get('dt', 0.02)
+                        )
+            misses = [i for i, result in enumerate(results) if result is None]
+            if misses:
+                computed = self._run_batch([scenarios[i] for i in misses], snapshot)
+                for i, result in zip(misses, computed):
+                    if cache is not None:
+                        cache.put(keys[i], result)
+                    results[i] = result
+            return results
+    
+    def _run_batch(self, scenarios: List[Dict], snapshot: ModelSnapshot) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Run the snapshot's model on a non-empty list of scenarios (see predict_batch)"""
+        scales = snapshot.scales
+        contexts = np.stack([self._build_context(s['params'], snapshot) for s in scenarios])  # [B, context_dim]
+        grids = [
+            self._time_grid(s.get('t_start', 0.0), s.get('t_end', 30.0), s.get('dt', 0.02))
+            for s in scenarios
+        ]
+        lengths = [len(g) for g in grids]
+        if min(lengths) == 0:
+            raise ValueError("Empty time grid: t_end must be >= t_start and dt > 0")
+        N_max = max(lengths)
         
-        # Convert to tensors
-        t_tensor = torch.tensor(t_nondim, dtype=torch.float32).unsqueeze(-1)  # [N, 1]
-        context_tensor = torch.tensor(context_normalized, dtype=torch.float32)  # [context_dim]
+        # Pad time grids to a common length and convert to nondimensional
+        t_padded = np.stack([np.pad(g, (0, N_max - len(g)), 'edge') for g in grids])  # [B, N_max]
+        t_nondim = t_padded / scales.T
         
         # Run inference
-        device = next(self._model.parameters()).device
-        t_tensor = t_tensor.to(device)
-        context_tensor = context_tensor.to(device)
-        
-        with torch.no_grad():
-            # Model forward returns (state, physics_residuals) for DirectionANPINN
-            result = self._model(t_tensor, context_tensor)
-            if isinstance(result, tuple):
-                state_nondim = result[0]  # Extract state from tuple
-            else:
-                state_nondim = result
+        if _is_onnx(snapshot.model):
+            with timed('model_forward'):
+                state_nondim = snapshot.model(t_nondim[..., None], contexts)  # [B, N_max, 14], no torch involved
+        else:
+            import torch
             
-            # Handle batching
-            if state_nondim.dim() == 3:
-                state_nondim = state_nondim.squeeze(0)  # Remove batch dimension
+            device = next(snapshot.model.parameters()).device
+            t_tensor = torch.tensor(t_nondim, dtype=torch.float32, device=device).unsqueeze(-1)  # [B, N_max, 1]
+            context_tensor = torch.tensor(contexts, dtype=torch.float32, device=device)  # [B, context_dim]
+            initial_state = None
+            if getattr(snapshot.model, 'requires_initial_state', False):
+                initial_state = torch.tensor(
+                    np.stack([self._initial_state(s['params'], scales) for s in scenarios]),
+                    dtype=torch.float32, device=device
+                )  # [B, 14]
             
-            state_nondim = state_nondim.cpu().numpy()  # [N, 14]
+            with torch.no_grad(), timed('model_forward'):
+                state_nondim = self._forward_state(t_tensor, context_tensor, snapshot, initial_state)
+                state_nondim = state_nondim.cpu().numpy()  # [B, N_max, 14]
         
-        # Denormalize state
-        state_dimensional = state_nondim.copy()
-        state_dimensional[:, 0:3] *= self._scales.L      # Position [x, y, z] → meters
-        state_dimensional[:, 3:6] *= self._scales.V      # Velocity [vx, vy, vz] → m/s
-        state_dimensional[:, 10:13] *= self._scales.W     # Angular velocity [wx, wy, wz] → rad/s
-        state_dimensional[:, 13] *= self._scales.M       # Mass [m] → kg
-        # Quaternion [q0, q1, q2, q3] is already dimensionless
+        state_dimensional = self._denormalize_state(state_nondim, scales)
+        
+        return [
+            (grid, state_dimensional[i, :len(grid)])
+            for i, grid in enumerate(grids)
+        ]
+    
+    def supports_streaming(self) -> bool:
+        """
+        True if the loaded model can be evaluated chunk by chunk.
+        
+        Models that need the whole sequence at once do not declare
+        supports_chunked_inference; predict_stream then falls back to one
+        full evaluation.
+        """
+        return bool(getattr(self._model, 'supports_chunked_inference', False))
+    
+    def predict_stream(
+        self,
+        params: Dict[str, float],
+        t_start: float = 0.0,
+        t_end: float = 30.0,
+        dt: float = 0.02,
+        chunk_points: int = 1024
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Predict a rocket trajectory as consecutive chunks of the time grid.
+        
+        With a chunk-capable model only one chunk of the grid, the state and
+        the model activations is alive at a time, so peak memory no longer
+        grows with the horizon. Cached results are sliced instead of recomputed;
+        streamed results are not added to the cache.
         
-        return t_dimensional, state_dimensional
+        Args:
+            params, t_start, t_end, dt: As for predict
+            chunk_points: Time points per yielded chunk
+            
+        Yields:
+            (time_array, state_array) pairs of shape [n] and [n, 14], n <= chunk_points
+        """
+        snapshot = self._snapshot()  # Keep one model for the whole stream, even across a reload
+        with self._serving():
+            yield from self._stream_chunks(snapshot, params, t_start, t_end, dt, max(1, int(chunk_points)))
+    
+    def _stream_chunks(
+        self,
+        snapshot: ModelSnapshot,
+        params: Dict[str, float],
+        t_start: float,
+        t_end: float,
+        dt: float,
+        chunk_points: int
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Body of predict_stream, evaluated on snapshot"""
+        cached = None
+        if self._cache is not None:
+            cached = self._cache.get(
+                make_cache_key(params, t_start, t_end, dt, snapshot.checksum)
+            )
+        if cached is None and not getattr(snapshot.model, 'supports_chunked_inference', False):
+            cached = self.predict(params, t_start=t_start, t_end=t_end, dt=dt)
+        if cached is not None:
+            time_array, state_array = cached
+            for start in range(0, len(time_array), chunk_points):
+                yield time_array[start:start + chunk_points], state_array[start:start + chunk_points]
+            return
+        
+        # Same points as _time_grid, generated one chunk at a time
+        n_points = max(0, int(np.ceil((t_end + dt - t_start) / dt))) if dt > 0 else 0
+        if n_points == 0:
+            raise ValueError("Empty time grid: t_end must be >= t_start and dt > 0")
+        
+        import torch
+        
+        model = snapshot.model
+        scales = snapshot.scales
+        device = next(model.parameters()).device
+        context = torch.tensor(
+            self._build_context(params, snapshot), dtype=torch.float32, device=device
+        ).unsqueeze(0)
+        dt_nondim = torch.tensor([dt / scales.T], dtype=torch.float32, device=device)
+        
+        carry = None
+        for start in range(0, n_points, chunk_points):
+            time_chunk = t_start + dt * np.arange(start, min(start + chunk_points, n_points))
+            t_tensor = torch.tensor(
+                time_chunk / scales.T, dtype=torch.float32, device=device
+            ).view(1, -1, 1)
+            with torch.no_grad(), timed('model_forward'):
+                state = model.predict_state_chunk(t_tensor, context, carry=carry, dt=dt_nondim)
+            carry = state[:, -1]
+            yield time_chunk, self._denormalize_state(state[0].cpu().numpy(), scales)
+    
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Prediction cache counters, or None when caching is disabled"""
+        if self._cache is None:
+            return None
+        return self._cache.get_stats()
+    
+    def _runtime(self) -> str:
+        """Backend that serves the loaded model: 'onnxruntime', 'torchscript' or 'eager'"""
+        if _is_onnx(self._model):
+            return 'onnxruntime'
+        return 'torchscript' if self._scripted is not None else 'eager'
     
     def get_model_info(self) -> Dict:
         """Get model information"""
@@ -219,8 +894,16 @@ class MLModelService:
         
         return {
             'loaded': True,
+            'version': self.version,
             'model_type': self._config.get('model', {}).get('type', 'unknown'),
             'context_dim': self._context_dim,
+            'runtime': self._runtime(),
+            'lookup_table': self._lookup.get_stats() if self._lookup is not None else None,
+            'precision': {
+                'mode': self._precision,
+                'requested': self._precision_requested,
+                'max_error': self._precision_error,
+            },
             'scales': {
                 'L': self._scales.L,
                 'V': self._scales.V,
@@ -232,13 +915,7 @@ class MLModelService:
         }
 
 
-# Singleton instance
-_ml_model_service = None
-
 def get_ml_model_service() -> MLModelService:
-    """Get singleton ML model service instance"""
-    global _ml_model_service
-    if _ml_model_service is None:
-        _ml_model_service = MLModelService()
-    return _ml_model_service
-
+    """Get the service of the default model version (see ModelRegistry)"""
+    from app.services.ml_registry import get_model_registry
+    return get_model_registry().get_service(1, DEFAULT_MODEL_VERSION)
@@ -0,0 +1,280 @@
+"""Registry of loaded ML model versions (hot-swap, memory budget, A/B routing)"""
+import hashlib
+import os
+import random
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.ml_model_service import (
+    DEFAULT_MODEL_VERSION, MODEL_BASE_PATH, MLModelService
+)
+
+# Extra versions of a project live next to its default checkpoint:
+#   <project dir>/versions/<version>/{best.pt, config.yaml, scales.yaml}
+VERSIONS_DIR = 'versions'
+PROJECT_DIRS = {1: MODEL_BASE_PATH}
+
+
+class UnknownModelVersion(ValueError):
+    """Raised when a request names a model version that has no checkpoint directory"""
+    pass
+
+
+def parse_ab_weights(spec: str) -> List[Tuple[str, float]]:
+    """
+    Parse an A/B split such as 'default:90,candidate:10'.
+
+    Returns:
+        List of (version, weight) pairs with positive weights, in spec order
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    weights = []
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        version, sep, weight = entry.partition(':')
+        if not sep or not version.strip():
+            raise ValueError(f"Invalid A/B weight '{entry}', expected 'version:weight'")
+        weight = float(weight)
+        if weight > 0:
+            weights.append((version.strip(), weight))
+    return weights
+
+
+class ModelRegistry:
+    """
+    Keeps one MLModelService per (project, version).
+
+    Each service owns its checkpoint, config and scales, so versions may use
+    different architectures. Reloading a version (best.pt replaced on disk)
+    swaps the model atomically inside its service; requests already running
+    finish on the previous weights. Under a memory budget the least recently
+    used idle versions are unloaded; the default version never is.
+    """
+
+    def __init__(self, project_dirs: Optional[Dict[int, Path]] = None):
+        self._project_dirs = {pid: Path(path) for pid, path in (project_dirs or PROJECT_DIRS).items()}
+        self._services = OrderedDict()  # (project_id, version) -> MLModelService, least recently used first
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {'evictions': 0, 'requests': {}}
+
+    def version_dir(self, project_id: int, version: str) -> Path:
+        """Directory holding the checkpoint of a version"""
+        if project_id not in self._project_dirs:
+            raise UnknownModelVersion(f"Unknown project {project_id}")
+        project_dir = self._project_dirs[project_id]
+        if version == DEFAULT_MODEL_VERSION:
+            return project_dir
+        # Version names come from request headers: never let them leave versions/
+        if not version or Path(version).name != version or version.startswith('.'):
+            raise UnknownModelVersion(f"Invalid model version '{version}'")
+        return project_dir / VERSIONS_DIR / version
+
+    def list_versions(self, project_id: int) -> List[str]:
+        """Versions of a project that have a checkpoint on disk (default first)"""
+        project_dir = self._project_dirs.get(project_id)
+        if project_dir is None:
+            return []
+        versions = [DEFAULT_MODEL_VERSION]
+        versions_dir = project_dir / VERSIONS_DIR
+        if versions_dir.is_dir():
+            versions += sorted(
+                entry.name for entry in versions_dir.iterdir()
+                if (entry / 'best.pt').exists() and not entry.name.startswith('.')
+            )
+        return versions
+
+    def get_service(self, project_id: int, version: str = DEFAULT_MODEL_VERSION) -> MLModelService:
+        """
+        Service for a version, created (unloaded) on first use.
+
+        Raises:
+            UnknownModelVersion: If the version has no checkpoint directory
+        """
+        key = (project_id, version)
+        with self._lock:
+            service = self._services.get(key)
+            if service is None:
+                model_dir = self.version_dir(project_id, version)
+                if version != DEFAULT_MODEL_VERSION and not model_dir.is_dir():
+                    raise UnknownModelVersion(f"Unknown model version '{version}'")
+                service = MLModelService(model_dir, project_id=project_id, version=version)
+                self._services[key] = service
+            self._services.move_to_end(key)
+            return service
+
+    def resolve_version(
+        self,
+        requested: Optional[str] = None,
+        routing_key: Optional[str] = None,
+        ab_weights: str = ''
+    ) -> str:
+        """
+        Pick the version that serves a request.
+
+        An explicitly requested version (X-Model-Version) wins. Otherwise the
+        A/B split picks one; with a routing key (X-AB-Key) the choice is a
+        stable hash of it, so a client keeps seeing the same version.
+
+        Args:
+            requested: Explicit version, or None
+            routing_key: Sticky routing key, or None for a random draw
+            ab_weights: Split in parse_ab_weights format ('' = always default)
+        """
+        if requested:
+            return requested
+        weights = parse_ab_weights(ab_weights)
+        total = sum(weight for _, weight in weights)
+        if total <= 0:
+            return DEFAULT_MODEL_VERSION
+        if routing_key:
+            digest = hashlib.sha256(str(routing_key).encode('utf-8')).digest()
+            point = int.from_bytes(digest[:8], 'big') / 2 ** 64 * total
+        else:
+            point = random.random() * total
+        for version, weight in weights:
+            point -= weight
+            if point < 0:
+                return version
+        return weights[-1][0]
+
+    def load(self, service: MLModelService, budget_bytes: float = 0, lease: bool = False) -> bool:
+        """
+        Load (or reload a replaced checkpoint of) a version's model.
+
+        Args:
+            service: Service returned by get_service
+            budget_bytes: If > 0, then unload idle versions (least recently used
+                first) until the loaded models fit; in-flight and default versions stay
+            lease: Take a serving lease before loading and keep it when True is
+                returned, so no other request's budget enforcement can evict the
+                version before this one has predicted; the caller must
+                service.release() it
+
+        Returns:
+            True if the model is ready to serve
+        """
+        if lease:
+            service.acquire()
+        try:
+            if not service.load_model(service.project_id):
+                if lease:
+                    service.release()
+                return False
+            if budget_bytes and budget_bytes > 0:
+                self.enforce_budget(budget_bytes, keep=service)
+        except BaseException:
+            if lease:
+                service.release()
+            raise
+        return True
+
+    def enforce_budget(self, budget_bytes: float, keep: Optional[MLModelService] = None) -> int:
+        """
+        Unload idle non-default versions, least recently used first, until the
+        loaded models fit in budget_bytes.
+
+        Returns:
+            Number of versions unloaded
+        """
+        with self._lock:
+            services = list(self._services.items())
+        loaded = sum(service.model_bytes() for _, service in services)
+        candidates = sorted(
+            (
+                (key, service) for key, service in services
+                if service is not keep and key[1] != DEFAULT_MODEL_VERSION and service.model_bytes()
+            ),
+            key=lambda item: item[1].last_used()
+        )
+        evicted = 0
+        for _, service in candidates:
+            if loaded <= budget_bytes:
+                break
+            if not service.is_idle():
+                continue
+            size = service.model_bytes()
+            if service.unload():
+                loaded -= size
+                evicted += 1
+        if evicted:
+            with self._lock:
+                self._stats['evictions'] += evicted
+        return evicted
+
+    def record_request(self, project_id: int, version: str, seconds: float):
+        """Count a served request and its latency per version"""
+        with self._lock:
+            entry = self._stats['requests'].setdefault(
+                f'{project_id}/{version}', {'count': 0, 'latency_ms_total': 0.0}
+            )
+            entry['count'] += 1
+            entry['latency_ms_total'] += seconds * 1000.0
+
+    def get_stats(self) -> Dict:
+        """Loaded versions, memory and per-version request counters"""
+        with self._lock:
+            services = list(self._services.items())
+            evictions = self._stats['evictions']
+            requests = {key: dict(entry) for key, entry in self._stats['requests'].items()}
+        for entry in requests.values():
+            entry['latency_ms_avg'] = entry['latency_ms_total'] / entry['count'] if entry['count'] else 0.0
+        versions = {
+            f'{project_id}/{version}': {
+                'loaded': service._model is not None,
+                'state': service.get_status(),
+                'model_bytes': service.model_bytes(),
+                'in_flight': service._in_flight,
+            }
+            for (project_id, version), service in services
+        }
+        return {
+            'versions': versions,
+            'model_bytes': sum(v['model_bytes'] for v in versions.values()),
+            'evictions': evictions,
+            'requests': requests,
+        }
+
+    def _reset_after_fork(self):
+        """Threads (and locks they hold) do not survive fork(); let the child preload again"""
+        self._lock = threading.Lock()
+        for service in self._services.values():
+            service._load_lock = threading.Lock()
+            service._publish_lock = threading.Lock()
+            service._in_flight = 0
+            service._preload_thread = None
+            if service._state == 'warming':
+                service._state = 'cold'
+
+
+# Singleton instance
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Get singleton model registry"""
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
+
+
+def _reset_after_fork():
+    global _model_registry_lock
+    _model_registry_lock = threading.Lock()
+    if _model_registry is not None:
+        _model_registry._reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -3,6 +3,8 @@ import requests
 from typing import Dict, List, Any, Optional
 from flask import current_app
 
+from app.utils.metrics import timed
+
 
 class CMSClient:
     """Base class for CMS clients"""
@@ -42,9 +44,10 @@ class StrapiClient(CMSClient):
     def _get(self, endpoint: str) -> Dict[str, Any]:
         """Make GET request to Strapi API"""
         url = f"{self.base_url}/api/{endpoint}"
-        response = requests.get(url, headers=self.headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        with timed('cms_fetch'):
+            response = requests.get(url, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            return response.json()
     
     def get_profile(self) -> Dict[str, Any]:
         """Get profile from Strapi"""
@@ -87,9 +90,10 @@ class ContentfulClient(CMSClient):
     def _get(self, endpoint: str) -> Dict[str, Any]:
         """Make GET request to Contentful API"""
         url = f"{self.base_url}/{endpoint}"
-        response = requests.get(url, headers=self.headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        with timed('cms_fetch'):
+            response = requests.get(url, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            return response.json()
     
     def get_profile(self) -> Dict[str, Any]:
         """Get profile from Contentful"""
@@ -132,9 +136,10 @@ class SanityClient(CMSClient):
     def _query(self, groq_query: str) -> Dict[str, Any]:
         """Execute GROQ query"""
         params = {'query': groq_query}
-        response = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        with timed('cms_fetch'):
+            response = requests.get(self.base_url, params=params, headers=self.headers, timeout=10)
+            response.raise_for_status()
+            return response.json()
     
     def get_profile(self) -> Dict[str, Any]:
         """Get profile from Sanity"""
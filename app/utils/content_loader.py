@@ -3,6 +3,8 @@ import json
 from pathlib import Path
 from typing import Dict, List, Any
 
+from app.utils.metrics import timed
+
 
 def load_content(filename: str) -> Any:
     """
@@ -36,7 +38,7 @@ def load_content(filename: str) -> Any:
         possible_paths = [str(p) for p in base_paths]
         raise FileNotFoundError(f"Content file not found: {filename}. Tried: {possible_paths}")
     
-    with open(content_path, 'r', encoding='utf-8') as f:
+    with timed('content_load'), open(content_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
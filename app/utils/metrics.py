@@ -0,0 +1,228 @@
+"""Lightweight request and stage telemetry, exposed at /metrics in the Prometheus text format"""
+import bisect
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from flask import Response, current_app, g, has_app_context, request
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Histogram:
+    """Cumulative latency histogram per label set; observations are integer nanoseconds"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._bounds_ns = [int(bound * 1e9) for bound in buckets]
+        self._series: Dict[Tuple, List[int]] = {}  # labels -> [count per bucket..., +Inf, sum_ns, count]
+        self._lock = threading.Lock()
+
+    def observe_ns(self, labels: Tuple, elapsed_ns: int):
+        index = bisect.bisect_left(self._bounds_ns, elapsed_ns)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self._bounds_ns) + 3)
+            series[index] += 1
+            series[-2] += elapsed_ns
+            series[-1] += 1
+
+    def get_count(self, labels: Tuple) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = 'le="%s"' % (bound if isinstance(bound, str) else repr(float(bound)))
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {values[-2] / 1e9!r}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {values[-1]}')
+        return lines
+
+
+class Gauge:
+    """Current value per label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple, amount: float = 1):
+        self.inc(labels, -amount)
+
+    def get(self, labels: Tuple) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self, values: Optional[Dict[Tuple, float]] = None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge']
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {value}')
+        return lines
+
+
+class _StageTimer:
+    """Context manager observing its block's perf_counter_ns duration (cheaper than a generator)"""
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe_ns(self.labels, time.perf_counter_ns() - self.start)
+
+
+_NOT_TIMED = nullcontext()
+
+
+class Metrics:
+    """
+    Process-wide telemetry: per-endpoint request latency and in-flight
+    gauges (Flask hooks), stage timings (timed()) and gauges read at scrape
+    time (ML queue depths).
+
+    Each process keeps its own counters: with several gunicorn workers a
+    scrape sees the worker that answered it, and inference run in the
+    process-pool executor is timed in its worker processes. Whether an app
+    records anything is its own METRICS_ENABLED setting.
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'HTTP request latency by endpoint',
+            ('method', 'endpoint', 'status')
+        )
+        self.in_flight = Gauge('http_requests_in_flight', 'Requests currently being handled', ('endpoint',))
+        self.stage_latency = Histogram(
+            'app_stage_duration_seconds',
+            'Time spent in instrumented stages (model_forward, serialization, content_load, cms_fetch)',
+            ('stage',)
+        )
+        self.ml_queue_depth = Gauge('ml_queue_depth', 'Pending ML inference calls by queue', ('queue',))
+
+    def timed(self, stage: str):
+        """Context manager recording the wall time of the enclosed block under stage"""
+        return _StageTimer(self.stage_latency, (stage,))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        lines += self.request_latency.render()
+        lines += self.in_flight.render()
+        lines += self.stage_latency.render()
+        lines += self.ml_queue_depth.render(_ml_queue_depths())
+        return '\n'.join(lines) + '\n'
+
+
+def _ml_queue_depths() -> Dict[Tuple, float]:
+    """Pending calls of the ML batcher and executor, if this process created them"""
+    depths = {}
+    batcher_module = sys.modules.get('app.services.ml_batcher')
+    batcher = getattr(batcher_module, '_ml_batcher', None)
+    if batcher is not None:
+        depths[('batcher',)] = batcher.get_stats()['queue_depth']
+    executor_module = sys.modules.get('app.services.ml_executor')
+    executor = getattr(executor_module, '_ml_executor', None)
+    if executor is not None:
+        depths[('executor',)] = executor.get_stats()['pending']
+    return depths
+
+
+# Singleton instance
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics"""
+    return _metrics
+
+
+def timed(stage: str):
+    """
+    Context manager timing a stage on the process-wide metrics (no-op when
+    the current app has METRICS_ENABLED off; timed outside an app context)
+    """
+    if has_app_context() and not current_app.config.get('METRICS_ENABLED', True):
+        return _NOT_TIMED
+    return _metrics.timed(stage)
+
+
+def init_metrics(app):
+    """
+    Install the request hooks and the /metrics endpoint (METRICS_ENABLED).
+
+    Latency is measured from before_request to teardown_request, so a
+    streamed response is timed until its last chunk was sent.
+    """
+    metrics = _metrics
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_endpoint = request.endpoint or 'unmatched'
+        g.metrics_start_ns = time.perf_counter_ns()
+        metrics.in_flight.inc((g.metrics_endpoint,))
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def stop_request_timer(error=None):
+        start = g.pop('metrics_start_ns', None)
+        if start is None:
+            return
+        endpoint = g.pop('metrics_endpoint')
+        status = g.pop('metrics_status', 500)
+        metrics.in_flight.dec((endpoint,))
+        metrics.request_latency.observe_ns((request.method, endpoint, str(status)), time.perf_counter_ns() - start)
+
+    def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return Response(metrics.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+    app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', metrics_endpoint)
@@ -0,0 +1,119 @@
+"""Point reduction for predicted trajectories (uniform stride or adaptive, error-bounded)"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def uniform_indices(n_points: int, max_points: int) -> np.ndarray:
+    """
+    Evenly spaced indices into a grid of n_points, first and last point included.
+
+    Args:
+        n_points: Length of the source grid
+        max_points: Upper bound on the number of returned indices (>= 2)
+
+    Returns:
+        Sorted unique index array
+    """
+    if n_points <= max_points:
+        return np.arange(n_points)
+    return np.unique(np.round(np.linspace(0, n_points - 1, max_points)).astype(int))
+
+
+def interpolation_error(time_array: np.ndarray, state_array: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """
+    Per-point error of linearly interpolating the trajectory from the kept points.
+
+    Each state component is scaled by its range over the trajectory, so the
+    error is a fraction of that component's span (constant components count
+    as range 1). The error of a point is its worst component.
+
+    Returns:
+        error: [N] array, zero at the kept points
+    """
+    span = np.ptp(state_array, axis=0)
+    span = np.where(span > 0, span, 1.0)
+    t_kept = time_array[indices]
+    error = np.zeros(len(time_array))
+    for component in range(state_array.shape[1]):
+        interpolated = np.interp(time_array, t_kept, state_array[indices, component])
+        error = np.maximum(error, np.abs(interpolated - state_array[:, component]) / span[component])
+    return error
+
+
+def adaptive_indices(
+    time_array: np.ndarray,
+    state_array: np.ndarray,
+    tolerance: float,
+    max_points: Optional[int] = None,
+    initial_points: int = 17
+) -> Tuple[np.ndarray, float]:
+    """
+    Non-uniform subset of the grid that linear interpolation reproduces within tolerance.
+
+    Starts from a coarse uniform grid and, each round, adds the worst
+    point of every interval whose interpolation error exceeds the tolerance,
+    so points concentrate where the state bends (burnout, apogee) and
+    smooth coasting phases stay sparse.
+
+    Args:
+        time_array: [N] strictly increasing times
+        state_array: [N, D] states
+        tolerance: Allowed error as a fraction of each component's range
+        max_points: Optional cap; refinement stops before exceeding it
+        initial_points: Size of the starting uniform grid
+
+    Returns:
+        (indices, max_error) - sorted kept indices and the achieved error
+    """
+    n_points = len(time_array)
+    limit = n_points if max_points is None else min(max_points, n_points)
+    kept = uniform_indices(n_points, max(2, min(initial_points, limit)))
+
+    while True:
+        error = interpolation_error(time_array, state_array, kept)
+        if error.max() <= tolerance or len(kept) >= limit:
+            return kept, float(error.max())
+
+        # Worst point of every interval that is still out of tolerance
+        interval = np.searchsorted(kept, np.arange(n_points), side='right') - 1
+        order = np.lexsort((-error, interval))
+        first_of_interval = np.r_[True, interval[order][1:] != interval[order][:-1]]
+        worst = order[first_of_interval]
+        worst = worst[error[worst] > tolerance]
+        if len(kept) + len(worst) > limit:
+            worst = worst[np.argsort(-error[worst])][:limit - len(kept)]
+        kept = np.union1d(kept, worst)
+
+
+def downsample_trajectory(
+    time_array: np.ndarray,
+    state_array: np.ndarray,
+    max_points: Optional[int] = None,
+    adaptive: bool = False,
+    tolerance: float = 1e-3
+) -> Tuple[np.ndarray, np.ndarray, dict]:
+    """
+    Reduce a trajectory for transport/plotting.
+
+    adaptive=False keeps max_points evenly spaced points; adaptive=True keeps
+    the points adaptive_indices selects for the tolerance (capped at max_points).
+
+    Returns:
+        (time_array, state_array, info) where info describes the reduction
+    """
+    n_points = len(time_array)
+    if adaptive:
+        indices, max_error = adaptive_indices(time_array, state_array, tolerance, max_points)
+    else:
+        indices = uniform_indices(n_points, max_points or n_points)
+        max_error = float(interpolation_error(time_array, state_array, indices).max()) if n_points else 0.0
+    info = {
+        'method': 'adaptive' if adaptive else 'uniform',
+        'source_points': n_points,
+        'num_points': len(indices),
+        'max_error': max_error,
+    }
+    if adaptive:
+        info['tolerance'] = tolerance
+    return time_array[indices], state_array[indices], info
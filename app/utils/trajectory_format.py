@@ -0,0 +1,134 @@
+"""Serialization of predicted trajectories (row JSON, columnar JSON, NDJSON stream, binary)"""
+import io
+import json
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+# State layout: [x, y, z, vx, vy, vz, q0, q1, q2, q3, wx, wy, wz, m]
+STATE_GROUPS = {
+    'position': (('x', 0), ('y', 1), ('z', 2)),
+    'velocity': (('x', 3), ('y', 4), ('z', 5)),
+    'quaternion': (('q0', 6), ('q1', 7), ('q2', 8), ('q3', 9)),
+    'angular_velocity': (('wx', 10), ('wy', 11), ('wz', 12)),
+}
+BINARY_COLUMNS = ['time', 'x', 'y', 'z', 'vx', 'vy', 'vz',
+                  'q0', 'q1', 'q2', 'q3', 'wx', 'wy', 'wz', 'm']
+
+NPY_MIMETYPE = 'application/x-npy'
+RAW_MIMETYPE = 'application/octet-stream'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+RESPONSE_FORMATS = ('rows', 'columnar', 'npy', 'raw', 'ndjson')
+
+
+def select_format(accept_mimetypes, requested: Optional[str] = None) -> str:
+    """
+    Pick the response format for a trajectory.
+
+    Binary formats and the NDJSON stream are chosen through the Accept header
+    (or an explicit 'format' value); JSON layouts through 'format' ('rows' or
+    'columnar'). Defaults to 'rows'.
+
+    Args:
+        accept_mimetypes: Flask request.accept_mimetypes
+        requested: Optional 'format' value from the request body/query string
+
+    Returns:
+        One of RESPONSE_FORMATS
+
+    Raises:
+        ValueError: If requested is not a known format
+    """
+    # Only explicit media types count; wildcards keep the JSON default
+    explicit = {mimetype for mimetype, quality in (accept_mimetypes or []) if quality > 0}
+    if NPY_MIMETYPE in explicit:
+        return 'npy'
+    if RAW_MIMETYPE in explicit:
+        return 'raw'
+    if NDJSON_MIMETYPE in explicit:
+        return 'ndjson'
+    if requested is None:
+        return 'rows'
+    requested = str(requested).lower()
+    if requested not in RESPONSE_FORMATS:
+        raise ValueError(f"Unknown format '{requested}', expected one of {', '.join(RESPONSE_FORMATS)}")
+    return requested
+
+
+def final_state(state_array: np.ndarray) -> Dict:
+    """Final position/velocity/mass fields shared by all JSON layouts"""
+    if len(state_array) == 0:
+        return {'final_position': None, 'final_velocity': None, 'final_mass': None}
+    last = state_array[-1].tolist()
+    return {
+        'final_position': {name: last[i] for name, i in STATE_GROUPS['position']},
+        'final_velocity': {name: last[i] for name, i in STATE_GROUPS['velocity']},
+        'final_mass': last[13],
+    }
+
+
+def columnar_trajectory(time_array: np.ndarray, state_array: np.ndarray) -> Dict:
+    """
+    Column-oriented trajectory built straight from the arrays (no per-row loop).
+
+    Returns:
+        {'time': [...], 'position': {'x': [...], ...}, ..., 'mass': [...]}
+    """
+    columns = np.asarray(state_array).T.tolist()  # 14 lists of N floats
+    trajectory = {'time': np.asarray(time_array).tolist()}
+    for group, fields in STATE_GROUPS.items():
+        trajectory[group] = {name: columns[i] for name, i in fields}
+    trajectory['mass'] = columns[13]
+    return trajectory
+
+
+def trajectory_matrix(time_array: np.ndarray, state_array: np.ndarray) -> np.ndarray:
+    """[N, 15] little-endian float32 matrix with columns BINARY_COLUMNS"""
+    matrix = np.column_stack([np.asarray(time_array), np.asarray(state_array)])
+    return np.ascontiguousarray(matrix, dtype='<f4')
+
+
+def trajectory_bytes(time_array: np.ndarray, state_array: np.ndarray, fmt: str) -> bytes:
+    """
+    Encode a trajectory as binary.
+
+    Args:
+        fmt: 'npy' for .npy file bytes (self-describing) or 'raw' for the bare
+            float32 little-endian buffer, row-major [N, 15]
+    """
+    matrix = trajectory_matrix(time_array, state_array)
+    if fmt == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, matrix, allow_pickle=False)
+        return buffer.getvalue()
+    return matrix.tobytes()
+
+
+def ndjson_trajectory(
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+    header: Optional[Dict] = None
+) -> Iterator[str]:
+    """
+    Encode a chunked trajectory as newline-delimited JSON, one line per chunk.
+
+    Lines, in order:
+        {"type": "header", **header}
+        {"type": "chunk", "offset": i, "trajectory": <columnar_trajectory>}  (per chunk)
+        {"type": "end", "num_points": N, "final_position": ..., ...}
+
+    Only the current chunk is held in memory.
+    """
+    yield json.dumps({'type': 'header', **(header or {})}) + '\n'
+    offset = 0
+    last_state = np.zeros((0, 14))
+    for time_array, state_array in chunks:
+        yield json.dumps({
+            'type': 'chunk',
+            'offset': offset,
+            'trajectory': columnar_trajectory(time_array, state_array),
+        }) + '\n'
+        offset += len(time_array)
+        last_state = state_array[-1:]
+    yield json.dumps({'type': 'end', 'num_points': offset, **final_state(last_state)}) + '\n'
@@ -8,8 +8,11 @@ Output:
     ./build/  — static HTML + all assets, ready for GitHub Pages.
 """
 import json
+import os
 from pathlib import Path
 from flask_frozen import Freezer
+
+os.environ.setdefault("METRICS_ENABLED", "false")  # No live /metrics endpoint in a static build
 from app import create_app
 
 app = create_app()
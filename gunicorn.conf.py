@@ -0,0 +1,31 @@
+"""Gunicorn configuration hooks (settings such as bind/workers stay on the command line)"""
+import os
+
+
+# GUNICORN_PRELOAD_APP=true imports the app once in the master, which loads the
+# (memory-mapped) model weights before fork so workers share them copy-on-write.
+# The warm-up forward pass is deferred to the workers: torch's intra-op thread
+# pool must not be started in a process that is about to fork.
+preload_app = os.environ.get('GUNICORN_PRELOAD_APP', 'False').lower() == 'true'
+if preload_app:
+    os.environ.setdefault('ML_PRELOAD', 'sync')
+    os.environ.setdefault('ML_WARMUP', 'False')
+
+
+def post_worker_init(worker):
+    """
+    Load and warm up the ML model in each worker before it accepts requests.
+    
+    Runs after the worker imported the app. A model inherited from the master
+    is reused and only warmed up; otherwise (e.g. the master was still loading
+    in the background when it forked) the worker loads it synchronously here,
+    so it never serves cold.
+    """
+    app = worker.wsgi
+    config = getattr(app, 'config', {})
+    if config.get('ML_PRELOAD', 'off') == 'off':
+        return
+    
+    from app.services.ml_model_service import get_ml_model_service
+    ready = get_ml_model_service().start_preload(app, mode='sync', warm_up=True)
+    worker.log.info(f"ML model preload in worker {worker.pid}: {'ready' if ready else 'failed'}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark batched vs. sequential rocket PINN predictions (scenarios/s on CPU)"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app
+from app.services.ml_model_service import get_ml_model_service
+
+
+def ensure_model(service):
+    """Load the checkpoint, or fall back to random weights (same cost per forward pass)"""
+    if service.load_model(project_id=1) and service._model is not None:
+        return
+    import torch
+    from src.models.direction_an_pinn import DirectionANPINN
+    from src.data.preprocess import Scales
+
+    print("⚠️  Checkpoint not loadable, benchmarking randomly initialised weights")
+    model_cfg = (service._config or {}).get('model', {})
+    service._model = DirectionANPINN(
+        context_dim=7,
+        fourier_features=int(model_cfg.get('fourier_features', 8)),
+        stem_hidden_dim=int(model_cfg.get('stem_hidden_dim', 128)),
+        stem_layers=int(model_cfg.get('stem_layers', 4)),
+    ).eval()
+    service._scales = service._scales or Scales(L=10000.0, V=313.0, T=31.62, M=50.0, F=490.0, W=0.0316)
+    service._config = service._config or {'model': {'type': 'direction_an'}}
+    service._context_dim = 7
+    torch.set_grad_enabled(False)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batch-sizes', type=str, default='1,2,4,8,16,32')
+    parser.add_argument('--t-end', type=float, default=30.0)
+    parser.add_argument('--dt', type=float, default=0.02)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        service = get_ml_model_service()
+        ensure_model(service)
+
+        base = {'m0': 55.0, 'Isp': 250.0, 'Cd': 0.35, 'CL_alpha': 3.5,
+                'Cm_alpha': -0.8, 'Tmax': 4000.0, 'wind_mag': 5.0}
+
+        print(f"{'batch':>6} {'sequential/s':>14} {'batched/s':>12} {'speedup':>8}")
+        for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+            scenarios = [
+                {'params': {**base, 'm0': base['m0'] + i}, 't_start': 0.0,
+                 't_end': args.t_end, 'dt': args.dt}
+                for i in range(batch_size)
+            ]
+
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                for s in scenarios:
+                    service.predict(s['params'], s['t_start'], s['t_end'], s['dt'])
+            sequential = batch_size * args.repeats / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                service.predict_batch(scenarios)
+            batched = batch_size * args.repeats / (time.perf_counter() - start)
+
+            print(f"{batch_size:>6} {sequential:>14.1f} {batched:>12.1f} {batched / sequential:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure per-worker memory (RSS/PSS) of ML model weights under different loading strategies"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import torch
+
+DEFAULT_CHECKPOINT = Path(__file__).parent.parent / 'app' / 'ml_models' / 'project_1' / 'best.pt'
+STRATEGIES = ('copy', 'mmap', 'fork')
+
+
+def read_memory_kb():
+    """(RSS, PSS) of the current process in kB, from /proc/self/smaps_rollup"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def load_state(path, mmap):
+    checkpoint = torch.load(path, map_location='cpu', weights_only=False, mmap=mmap)
+    return checkpoint.get('model_state_dict', checkpoint)
+
+
+def touch(state):
+    """Read every weight once, as a forward pass would, so the pages are resident"""
+    return sum(float(t.float().sum()) for t in state.values() if torch.is_tensor(t))
+
+
+def worker(path, strategy, inherited, loaded, measured, results):
+    state = inherited if strategy == 'fork' else load_state(path, mmap=(strategy == 'mmap'))
+    touch(state)
+    loaded.wait()
+    results.put((os.getpid(), *read_memory_kb()))
+    measured.wait()
+
+
+def run_strategy(path, strategy, workers):
+    """Fork `workers` processes that hold the weights at the same time; return their (pid, rss, pss)"""
+    ctx = mp.get_context('fork')
+    inherited = load_state(path, mmap=False) if strategy == 'fork' else None
+    loaded = ctx.Barrier(workers)
+    measured = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(path, strategy, inherited, loaded, measured, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    rows = [results.get(timeout=120) for _ in procs]
+    measured.wait()
+    for p in procs:
+        p.join()
+    return rows
+
+
+def write_synthetic_checkpoint(size_mb):
+    """Checkpoint with ~size_mb of float32 weights, to make sharing visible above interpreter noise"""
+    n = int(size_mb * 1024 * 1024 / 4)
+    state = {f'layer{i}.weight': torch.randn(n // 8) for i in range(8)}
+    fd, path = tempfile.mkstemp(suffix='.pt')
+    os.close(fd)
+    torch.save({'model_state_dict': state}, path)
+    return path
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--checkpoint', type=str, default=str(DEFAULT_CHECKPOINT))
+    parser.add_argument('--synthetic-mb', type=float, default=0.0,
+                        help='Benchmark a generated checkpoint of this size instead')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--strategies', type=str, default=','.join(STRATEGIES))
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("❌ /proc/self/smaps_rollup not available (Linux only)")
+        return 1
+
+    path = write_synthetic_checkpoint(args.synthetic_mb) if args.synthetic_mb > 0 else args.checkpoint
+    try:
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Checkpoint: {path} ({size_mb:.1f} MB), {args.workers} workers\n")
+        print(f"{'strategy':>8} {'RSS/worker MB':>14} {'PSS/worker MB':>14} {'PSS total MB':>13}")
+        for strategy in args.strategies.split(','):
+            if strategy not in STRATEGIES:
+                print(f"❌ Unknown strategy: {strategy}")
+                return 1
+            rows = run_strategy(path, strategy, args.workers)
+            rss = sum(r[1] for r in rows) / len(rows) / 1024
+            pss = sum(r[2] for r in rows) / len(rows) / 1024
+            print(f"{strategy:>8} {rss:>14.1f} {pss:>14.1f} {pss * len(rows):>13.1f}")
+    finally:
+        if args.synthetic_mb > 0:
+            os.remove(path)
+
+    print("\ncopy: each worker torch.load()s its own copy (previous behaviour)")
+    print("mmap: each worker memory-maps the file (ML_MMAP_WEIGHTS=true)")
+    print("fork: master loads once, workers inherit copy-on-write (GUNICORN_PRELOAD_APP=true)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
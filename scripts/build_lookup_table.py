@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Precompute the rocket PINN trajectory table used by ML_LOOKUP_TABLE and report its error and latency"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from app import create_app
+from app.services.ml_lookup import LOOKUP_DIR, TrajectoryTable, build_trajectory_table, param_bounds
+from app.services.ml_registry import get_model_registry
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--version', default='default', help='Model version to tabulate')
+    parser.add_argument('--samples', type=int, default=512, help='Table entries')
+    parser.add_argument('--sampler', choices=('lhs', 'sobol'), default='lhs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--t-end', type=float, default=30.0)
+    parser.add_argument('--dt', type=float, default=0.02)
+    parser.add_argument('--validation', type=int, default=64, help='Held-out parameter sets for the error bound')
+    parser.add_argument('--neighbours', type=int, default=32, help='k of the local-linear interpolation')
+    parser.add_argument('--out', default=None, help='Output directory (default: <version dir>/lookup)')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        registry = get_model_registry()
+        service = registry.get_service(1, args.version)
+        if not registry.load(service):
+            print(f"❌ Could not load model version '{args.version}'")
+            return 1
+        snapshot = service._snapshot()
+
+        start = time.perf_counter()
+        table = build_trajectory_table(
+            lambda scenarios: service._run_batch(scenarios, snapshot),  # Always the live model
+            bounds=param_bounds(service._config or {}, service.model_dir),
+            n_samples=args.samples,
+            t_end=args.t_end,
+            dt=args.dt,
+            sampler=args.sampler,
+            seed=args.seed,
+            validation_samples=args.validation,
+            neighbours=args.neighbours,
+        )
+        table.meta['checkpoint_sha256'] = snapshot.checksum
+        out = table.save(Path(args.out) if args.out else service.model_dir / LOOKUP_DIR)
+        size_mb = sum(f.stat().st_size for f in out.iterdir()) / 1e6
+        print(f"✅ {args.samples} trajectories x {table.n_points} points -> {out} "
+              f"({size_mb:.1f} MB, {time.perf_counter() - start:.1f} s)")
+        if 'max_error' in table.meta:
+            print(f"Held-out error ({args.validation} sets, fraction of component range): "
+                  f"max {table.meta['max_error']:.2e}, p95 {table.meta['p95_error']:.2e}")
+
+        # Latency: mapped table lookup vs. live model, same request
+        table = TrajectoryTable.load(out)
+        params = {field: (low + high) / 2 for field, (low, high) in table.meta['bounds'].items()}
+        scenario = {'params': params, 't_start': 0.0, 't_end': args.t_end, 'dt': args.dt}
+        timings = {}
+        for name, fn in (('table', lambda: table.lookup(params, 0.0, args.t_end, args.dt)),
+                         ('model', lambda: service._run_batch([scenario], snapshot))):
+            fn()
+            runs = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                fn()
+                runs.append(time.perf_counter() - t0)
+            timings[name] = float(np.median(runs)) * 1e6
+        print(f"Median latency: table {timings['table']:.0f} us, model {timings['model']:.0f} us "
+              f"({timings['model'] / timings['table']:.0f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
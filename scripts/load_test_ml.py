@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Load test: HTML page latency with and without concurrent ML /predict traffic"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def probe_pages(base_url, paths, duration, interval):
+    """Request the pages round-robin for duration seconds, returning latencies in ms"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    session = requests.Session()
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = session.get(base_url + paths[i % len(paths)], timeout=30).status_code < 500
+        except requests.RequestException:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        errors += not ok
+        i += 1
+        time.sleep(interval)
+    return latencies, errors
+
+
+def ml_client(base_url, payload, headers, stop, statuses, lock):
+    """Post /predict back to back until stopped"""
+    session = requests.Session()
+    session.headers.update(headers)
+    while not stop.is_set():
+        try:
+            status = session.post(base_url + '/api/ml/projects/1/predict', json=payload, timeout=60).status_code
+        except requests.RequestException:
+            status = 'error'
+        with lock:
+            statuses[status] += 1
+
+
+def report(name, latencies, errors):
+    print(f"{name:>10} {len(latencies):>6} {statistics.median(latencies):>8.1f} "
+          f"{percentile(latencies, 0.95):>8.1f} {max(latencies):>8.1f} {errors:>7}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running server')
+    parser.add_argument('--pages', default='/,/about,/health',
+                        help='Comma-separated paths whose latency is measured')
+    parser.add_argument('--ml-clients', type=int, default=8, help='Concurrent /predict clients')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase')
+    parser.add_argument('--interval', type=float, default=0.05, help='Pause between page requests (s)')
+    parser.add_argument('--model-version', default=None, help='Sent as X-Model-Version')
+    parser.add_argument('--t-end', type=float, default=30.0)
+    parser.add_argument('--dt', type=float, default=0.02)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    paths = [p.strip() for p in args.pages.split(',') if p.strip()]
+    payload = {'data': {'m0': 55.0, 'Isp': 250.0, 'Cd': 0.35, 'CL_alpha': 3.5, 'Cm_alpha': -0.8,
+                        'Tmax': 4000.0, 'wind_mag': 5.0, 't_end': args.t_end, 'dt': args.dt}}
+
+    try:
+        requests.get(base_url + paths[0], timeout=10)
+    except requests.RequestException as e:
+        print(f"❌ Server not reachable at {base_url}: {e}")
+        return 1
+
+    print(f"Pages: {', '.join(paths)}")
+    print(f"{'phase':>10} {'reqs':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}")
+    idle, idle_errors = probe_pages(base_url, paths, args.duration, args.interval)
+    report('idle', idle, idle_errors)
+
+    headers = {'X-Model-Version': args.model_version} if args.model_version else {}
+    stop = threading.Event()
+    statuses = Counter()
+    lock = threading.Lock()
+    clients = [
+        threading.Thread(target=ml_client, args=(base_url, payload, headers, stop, statuses, lock), daemon=True)
+        for _ in range(args.ml_clients)
+    ]
+    for client in clients:
+        client.start()
+    loaded, loaded_errors = probe_pages(base_url, paths, args.duration, args.interval)
+    stop.set()
+    for client in clients:
+        client.join(timeout=60)
+    report('ml load', loaded, loaded_errors)
+
+    ml_total = sum(statuses.values())
+    print(f"\n/predict: {ml_total} requests in {args.duration:.0f} s ({ml_total / args.duration:.1f}/s), "
+          f"statuses {dict(statuses)}")
+    print(f"p95 page latency under ML load: {percentile(loaded, 0.95) / percentile(idle, 0.95):.2f}x idle")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,16 @@
 """Pytest fixtures"""
+import sys
+from pathlib import Path
+
 import pytest
 from app import create_app
 from app.database.db import db
 
+# ML model sources (the `src` package) for model-level tests
+ML_MODEL_PATH = Path(__file__).parent.parent / 'app' / 'ml_models' / 'project_1'
+if str(ML_MODEL_PATH) not in sys.path:
+    sys.path.insert(0, str(ML_MODEL_PATH))
+
 
 @pytest.fixture
 def app():
@@ -31,3 +39,39 @@ def db_session(app):
         yield db
         db.session.remove()
         db.drop_all()
+
+
+@pytest.fixture
+def ml_service():
+    """ML model service backed by a small, randomly initialised DirectionANPINN"""
+    import torch
+    from app.services.ml_model_service import get_ml_model_service
+    from src.models.direction_an_pinn import DirectionANPINN
+    from src.data.preprocess import Scales
+    
+    torch.manual_seed(0)
+    service = get_ml_model_service()
+    service._model = DirectionANPINN(
+        context_dim=7,
+        stem_hidden_dim=32,
+        stem_layers=2,
+        translation_branch_dims=[32],
+        rotation_branch_dims=[32],
+        mass_branch_dims=[16],
+    ).eval()
+    service._scales = Scales(L=10000.0, V=313.0, T=31.62, M=50.0, F=490.0, W=0.0316)
+    service._config = {'model': {'type': 'direction_an'}}
+    service._context_dim = 7
+    service._cache = None
+    service._scripted = None
+    service._lookup = None
+    service._state = 'cold'
+    yield service
+    service._model = None
+    service._scales = None
+    service._config = None
+    service._context_dim = None
+    service._cache = None
+    service._scripted = None
+    service._lookup = None
+    service._state = 'cold'
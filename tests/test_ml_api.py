@@ -0,0 +1,764 @@
+"""ML API and model service tests"""
+import numpy as np
+import pytest
+
+
+ROCKET_PARAMS = {
+    'm0': 55.0, 'Isp': 250.0, 'Cd': 0.35, 'CL_alpha': 3.5,
+    'Cm_alpha': -0.8, 'Tmax': 4000.0, 'wind_mag': 5.0,
+}
+
+# Training ranges of the context fields (the 'params' section of a model config)
+PARAM_BOUNDS = {
+    'm0': (45.0, 65.0), 'Isp': (220.0, 280.0), 'Cd': (0.25, 0.45), 'CL_alpha': (2.5, 4.5),
+    'Cm_alpha': (-1.2, -0.4), 'Tmax': (3000.0, 5000.0), 'wind_mag': (0.0, 15.0),
+}
+
+
+def test_predict_batch_matches_single(ml_service):
+    """Test batched prediction matches one-at-a-time prediction, including mixed grids"""
+    scenarios = [
+        {'params': ROCKET_PARAMS, 't_start': 0.0, 't_end': 2.0, 'dt': 0.1},
+        {'params': {**ROCKET_PARAMS, 'm0': 60.0}, 't_start': 0.0, 't_end': 1.0, 'dt': 0.05},
+    ]
+    results = ml_service.predict_batch(scenarios)
+    
+    assert len(results) == 2
+    for scenario, (time_array, state_array) in zip(scenarios, results):
+        t_single, state_single = ml_service.predict(
+            scenario['params'], scenario['t_start'], scenario['t_end'], scenario['dt']
+        )
+        assert state_array.shape == (len(time_array), 14)
+        np.testing.assert_allclose(time_array, t_single)
+        np.testing.assert_allclose(state_array, state_single, rtol=1e-5, atol=1e-5)
+
+
+def test_predict_batch_endpoint(client, ml_service):
+    """Test batch endpoint returns one result per scenario"""
+    response = client.post('/api/ml/projects/1/predict/batch', json={
+        'scenarios': [
+            {'t_end': 1.0, 'dt': 0.1},
+            {'m0': 60.0, 't_end': 2.0, 'dt': 0.5},
+        ]
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['batch_size'] == 2
+    assert [r['simulation_params']['num_points'] for r in data['results']] == [11, 5]
+
+
+def test_predict_batch_requires_scenarios(client):
+    """Test batch endpoint rejects an empty request"""
+    response = client.post('/api/ml/projects/1/predict/batch', json={'scenarios': []})
+    assert response.status_code == 400
+
+
+def test_micro_batcher_coalesces_and_isolates_errors():
+    """Test concurrent submissions share a batch and a bad scenario only fails its own caller"""
+    from app.services.ml_batcher import MicroBatcher
+    
+    batch_sizes = []
+    
+    def fake_predict_batch(scenarios):
+        batch_sizes.append(len(scenarios))
+        if any(s < 0 for s in scenarios):
+            raise ValueError("negative scenario")
+        return [s * 2 for s in scenarios]
+    
+    batcher = MicroBatcher(fake_predict_batch, max_batch_size=8, max_wait_ms=50.0)
+    try:
+        futures = [batcher.submit(i) for i in range(4)] + [batcher.submit(-1)]
+        assert [f.result(timeout=5) for f in futures[:4]] == [0, 2, 4, 6]
+        with pytest.raises(ValueError):
+            futures[4].result(timeout=5)
+        
+        assert batch_sizes[0] == 5
+        stats = batcher.get_stats()
+        assert stats['requests'] == 5
+        assert stats['batches'] == 1
+        assert stats['errors'] == 1
+    finally:
+        batcher.shutdown()
+
+
+def test_predict_endpoint_with_batching(app, client, ml_service):
+    """Test /predict goes through the micro-batcher onto the executor, with 429 when either queue is full"""
+    import app.services.ml_batcher as ml_batcher
+    import app.services.ml_executor as ml_executor
+    
+    app.config.update(ML_BATCHING_ENABLED=True, ML_EXECUTOR='thread')
+    ml_batcher._ml_batcher = None
+    ml_executor._ml_executor = None
+    try:
+        response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0, 'dt': 0.1}})
+        assert response.status_code == 200
+        assert response.get_json()['simulation_params']['num_points'] == 11
+        
+        health = client.get('/api/ml/projects/1/health').get_json()
+        assert health['batching']['requests'] == 1
+        assert health['executor']['requests'] == 1
+        
+        executor = ml_executor._ml_executor
+        executor._pending = executor.max_queue  # Executor saturated: the batch fails as a whole
+        response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0}})
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+        executor._pending = 0
+        
+        def full_queue(scenario):
+            raise ml_batcher.BatcherQueueFull("ML inference queue is full")
+        
+        ml_batcher._ml_batcher.submit = full_queue
+        response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0}})
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        if ml_batcher._ml_batcher is not None:
+            ml_batcher._ml_batcher.shutdown()
+        ml_batcher._ml_batcher = None
+        if ml_executor._ml_executor is not None:
+            ml_executor._ml_executor.shutdown()
+        ml_executor._ml_executor = None
+
+
+def test_predict_columnar_and_binary_formats(client, ml_service):
+    """Test columnar JSON and .npy responses carry the same values as the row format"""
+    import io
+    
+    payload = {'data': {'t_end': 1.0, 'dt': 0.1}}
+    rows = client.post('/api/ml/projects/1/predict', json=payload).get_json()
+    
+    columnar = client.post('/api/ml/projects/1/predict', json={**payload, 'format': 'columnar'}).get_json()
+    assert columnar['format'] == 'columnar'
+    assert columnar['trajectory']['time'] == [r['time'] for r in rows['trajectory']]
+    assert columnar['trajectory']['position']['z'] == [r['position']['z'] for r in rows['trajectory']]
+    assert columnar['final_mass'] == rows['final_mass']
+    
+    response = client.post('/api/ml/projects/1/predict', json=payload,
+                           headers={'Accept': 'application/x-npy'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-npy'
+    matrix = np.load(io.BytesIO(response.data))
+    assert matrix.shape == (11, 15)
+    np.testing.assert_allclose(matrix[:, 14], [r['mass'] for r in rows['trajectory']], rtol=1e-6)
+
+
+def test_prediction_cache_lru_and_ttl():
+    """Test byte-bounded LRU eviction, TTL expiry and key quantization"""
+    from app.services.ml_cache import PredictionCache, make_cache_key
+    
+    value = (np.zeros(8), np.zeros((8, 14)))  # 960 bytes
+    cache = PredictionCache(max_bytes=2000, ttl_seconds=60.0)
+    cache.put('a', value)
+    cache.put('b', value)
+    assert cache.get('a') is not None      # 'a' is now most recently used
+    cache.put('c', value)                  # evicts 'b'
+    assert cache.get('b') is None
+    assert cache.get('c')[1].flags.writeable is False
+    assert cache.get_stats()['evictions'] == 1
+    
+    expired = PredictionCache(ttl_seconds=0.0)
+    expired.put('a', value)
+    assert expired.get('a') is None
+    
+    key = make_cache_key({'m0': 55.0, 'Cd': 0.35}, 0.0, 30.0, 0.02, 'abc')
+    assert key == make_cache_key({'Cd': 0.35 + 1e-13, 'm0': 55}, 0, 30.0, 0.02, 'abc')
+    assert key != make_cache_key({'m0': 55.0, 'Cd': 0.35}, 0.0, 30.0, 0.02, 'def')
+
+
+def test_predict_batch_uses_cache(client, ml_service):
+    """Test repeated scenarios are served from the cache and counted on /health"""
+    from app.services.ml_cache import PredictionCache
+    
+    ml_service._cache = PredictionCache()
+    try:
+        scenario = {'params': ROCKET_PARAMS, 't_start': 0.0, 't_end': 1.0, 'dt': 0.1}
+        (t_first, state_first), = ml_service.predict_batch([scenario])
+        (t_second, state_second), = ml_service.predict_batch([scenario])
+        np.testing.assert_array_equal(state_first, state_second)
+        
+        cache = client.get('/api/ml/projects/1/health').get_json()['cache']
+        assert cache['hits'] == 1
+        assert cache['misses'] == 1
+    finally:
+        ml_service._cache = None
+
+
+def test_preload_warms_up_and_reports_readiness(app, client, ml_service):
+    """Test health reports 'warming' during a preload and 'ready' after it"""
+    ml_service._state = 'warming'
+    response = client.get('/api/ml/projects/1/health')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'warming'
+    
+    ml_service._state = 'cold'
+    assert ml_service.start_preload(app, mode='background')
+    ml_service._preload_thread.join(timeout=30)
+    assert ml_service.get_status() == 'ready'
+    
+    response = client.get('/api/ml/projects/1/health')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
+
+
+def test_health_loads_through_registry(app, client, ml_service, monkeypatch):
+    """Test the health probe loads via the registry (budget and lease) and returns its lease"""
+    from app.services.ml_registry import ModelRegistry
+    
+    calls = []
+    original_load = ModelRegistry.load
+    
+    def recording_load(self, service, budget_bytes=0, lease=False):
+        calls.append((service, budget_bytes, lease))
+        return original_load(self, service, budget_bytes=budget_bytes, lease=lease)
+    
+    monkeypatch.setattr(ModelRegistry, 'load', recording_load)
+    app.config['ML_MODEL_MEMORY_BUDGET_MB'] = 512
+    response = client.get('/api/ml/projects/1/health')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
+    assert calls == [(ml_service, 512 * 1024 * 1024, True)]
+    assert ml_service.is_idle()
+
+
+def test_load_checkpoint_state_mmap(tmp_path, ml_service):
+    """Test memory-mapped checkpoint loading round-trips the weights"""
+    import torch
+    from app.services.ml_model_service import load_checkpoint_state
+    
+    path = tmp_path / 'best.pt'
+    torch.save({'model_state_dict': ml_service._model.state_dict()}, path)
+    
+    state_dict, mmapped = load_checkpoint_state(path, torch.device('cpu'), mmap=True)
+    assert mmapped
+    for name, tensor in ml_service._model.state_dict().items():
+        assert torch.equal(state_dict[name], tensor)
+
+
+def test_predict_prefers_torchscript_artifact(tmp_path, ml_service):
+    """Test the service serves from the TorchScript export with eager-mode parity"""
+    from src.export.torchscript import export_torchscript, load_torchscript
+    
+    scenario = {'params': ROCKET_PARAMS, 't_start': 0.0, 't_end': 2.0, 'dt': 0.1}
+    _, eager_state = ml_service.predict_batch([scenario])[0]
+    
+    path = export_torchscript(ml_service._model, tmp_path / 'best.torchscript.pt', context_dim=7)
+    ml_service._scripted, _ = load_torchscript(path)
+    assert ml_service.get_model_info()['runtime'] == 'torchscript'
+    
+    _, scripted_state = ml_service.predict_batch([scenario])[0]
+    np.testing.assert_allclose(scripted_state, eager_state, rtol=1e-5, atol=1e-4)
+
+
+def test_predict_stream_matches_full_prediction(ml_service):
+    """Test chunked evaluation reproduces predict() across chunk boundaries, with and without chunk support"""
+    time_full, state_full = ml_service.predict(ROCKET_PARAMS, t_end=5.0, dt=0.1)
+    
+    chunks = list(ml_service.predict_stream(ROCKET_PARAMS, t_end=5.0, dt=0.1, chunk_points=16))
+    assert [len(t) for t, _ in chunks] == [16, 16, 16, 3]
+    np.testing.assert_allclose(np.concatenate([t for t, _ in chunks]), time_full)
+    np.testing.assert_allclose(np.concatenate([s for _, s in chunks]), state_full, rtol=1e-5, atol=1e-4)
+    
+    # Whole-sequence models fall back to one full evaluation, sliced into chunks
+    type(ml_service._model).supports_chunked_inference = False
+    try:
+        assert not ml_service.supports_streaming()
+        chunks = list(ml_service.predict_stream(ROCKET_PARAMS, t_end=5.0, dt=0.1, chunk_points=16))
+    finally:
+        type(ml_service._model).supports_chunked_inference = True
+    np.testing.assert_allclose(np.concatenate([s for _, s in chunks]), state_full, rtol=1e-5, atol=1e-4)
+
+
+def test_predict_ndjson_stream(app, client, ml_service):
+    """Test the NDJSON response streams header, chunk and end lines matching the columnar format"""
+    import json
+    
+    app.config['ML_STREAM_CHUNK_POINTS'] = 4
+    payload = {'data': {'t_end': 1.0, 'dt': 0.1}}
+    columnar = client.post('/api/ml/projects/1/predict', json={**payload, 'format': 'columnar'}).get_json()
+    
+    response = client.post('/api/ml/projects/1/predict', json=payload,
+                           headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    
+    assert [line['type'] for line in lines] == ['header', 'chunk', 'chunk', 'chunk', 'end']
+    assert lines[0]['chunked'] is True
+    assert [line['offset'] for line in lines[1:-1]] == [0, 4, 8]
+    times = sum((line['trajectory']['time'] for line in lines[1:-1]), [])
+    np.testing.assert_allclose(times, columnar['trajectory']['time'])
+    z = sum((line['trajectory']['position']['z'] for line in lines[1:-1]), [])
+    np.testing.assert_allclose(z, columnar['trajectory']['position']['z'], rtol=1e-5, atol=1e-4)
+    assert lines[-1]['num_points'] == 11
+    
+    bad = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': -1.0}, 'format': 'ndjson'})
+    assert bad.status_code == 400
+
+
+def test_adaptive_downsampling_stays_within_tolerance():
+    """Test the adaptive grid cuts a smooth ascent profile >= 10x within the interpolation tolerance"""
+    from app.utils.trajectory_downsample import downsample_trajectory, interpolation_error
+    
+    t = np.arange(0.0, 30.0 + 0.02, 0.02)
+    burn = t < 10.0
+    z = np.where(burn, 30.0 * t ** 2, 3000.0 + 600.0 * (t - 10.0) - 4.905 * (t - 10.0) ** 2)
+    vz = np.where(burn, 60.0 * t, 600.0 - 9.81 * (t - 10.0))
+    m = np.where(burn, 55.0 - 2.0 * t, 35.0)
+    state = np.zeros((len(t), 14))
+    state[:, 2], state[:, 5], state[:, 6], state[:, 13] = z, vz, 1.0, m
+    
+    t_small, state_small, info = downsample_trajectory(t, state, adaptive=True, tolerance=1e-3)
+    assert info['source_points'] == len(t) and info['num_points'] * 10 <= len(t)
+    assert t_small[0] == t[0] and t_small[-1] == t[-1]
+    indices = np.searchsorted(t, t_small)
+    assert interpolation_error(t, state, indices).max() <= 1e-3
+    
+    _, capped, info = downsample_trajectory(t, state, max_points=8, adaptive=True, tolerance=1e-6)
+    assert len(capped) == 8 and info['max_error'] > 1e-6
+
+
+def test_predict_max_points_and_adaptive(client, ml_service):
+    """Test /predict returns reduced grids with downsampling metadata"""
+    payload = {'t_end': 30.0, 'dt': 0.02}
+    uniform = client.post('/api/ml/projects/1/predict',
+                          json={'data': {**payload, 'max_points': 100}}).get_json()
+    assert len(uniform['trajectory']) == 100
+    assert uniform['downsampling']['method'] == 'uniform'
+    assert uniform['downsampling']['source_points'] == 1501
+    
+    adaptive = client.post('/api/ml/projects/1/predict', json={
+        'data': {**payload, 'adaptive': True, 'tolerance': 1e-2, 'max_points': 500}, 'format': 'columnar'
+    }).get_json()
+    assert adaptive['downsampling']['num_points'] == len(adaptive['trajectory']['time']) <= 500
+    assert adaptive['trajectory']['time'][-1] == pytest.approx(30.0)
+    
+    bad = client.post('/api/ml/projects/1/predict', json={'data': {**payload, 'max_points': 1}})
+    assert bad.status_code == 400
+
+
+SMALL_MODEL_CONFIGS = {
+    'direction_an': {'stem_hidden_dim': 16, 'stem_layers': 1, 'translation_branch_dims': [16],
+                     'rotation_branch_dims': [16], 'mass_branch_dims': [8]},
+    'direction_d1': {'backbone_hidden_dims': [16], 'head_g3_hidden_dims': [8],
+                     'head_g2_hidden_dims': [8], 'head_g1_hidden_dims': [8]},
+    'hybrid_c3': {'latent_dim': 8, 'shared_stem_hidden_dim': 16, 'temporal_n_layers': 1,
+                  'temporal_n_heads': 2, 'temporal_dim_feedforward': 16, 'translation_branch_dims': [16],
+                  'rotation_branch_dims': [16], 'mass_branch_dims': [8], 'dynamics_n_hidden': 1,
+                  'dynamics_n_neurons': 16, 'debug_stats': False},
+    'latent_ode': {'latent_dim': 8, 'context_embedding_dim': 8, 'dynamics_n_hidden': 1,
+                   'dynamics_n_neurons': 16, 'decoder_n_hidden': 1, 'decoder_n_neurons': 16},
+}
+
+
+def _write_model_version(model_dir, model_type, seed=0):
+    """Save a randomly initialised model of model_type with its config and scales"""
+    import torch
+    import yaml
+    from src.models.factory import build_model
+    
+    model_dir.mkdir(parents=True, exist_ok=True)
+    model_cfg = {'type': model_type, **SMALL_MODEL_CONFIGS[model_type]}
+    torch.manual_seed(seed)
+    model = build_model(model_cfg, context_dim=7)
+    # Write-then-rename, as a deployment replacing best.pt would
+    torch.save({'model_state_dict': model.state_dict()}, model_dir / 'best.tmp')
+    (model_dir / 'best.tmp').replace(model_dir / 'best.pt')
+    (model_dir / 'config.yaml').write_text(yaml.safe_dump({
+        'model': model_cfg, 'params': {field: list(bounds) for field, bounds in PARAM_BOUNDS.items()}
+    }))
+    (model_dir / 'scales.yaml').write_text(yaml.safe_dump({
+        'scales': {'L': 10000.0, 'V': 313.0, 'T': 31.62, 'M': 50.0, 'F': 490.0, 'W': 0.0316}
+    }))
+
+
+def test_model_registry_serves_versions_and_hot_swaps(app, tmp_path):
+    """Test every servable architecture loads as a version, reloads atomically and is evicted when idle"""
+    import os
+    from app.services.ml_registry import ModelRegistry, UnknownModelVersion
+    
+    _write_model_version(tmp_path, 'direction_an')
+    for model_type in ('direction_d1', 'hybrid_c3', 'latent_ode'):
+        _write_model_version(tmp_path / 'versions' / model_type, model_type)
+    registry = ModelRegistry({1: tmp_path})
+    assert registry.list_versions(1) == ['default', 'direction_d1', 'hybrid_c3', 'latent_ode']
+    with pytest.raises(UnknownModelVersion):
+        registry.get_service(1, 'missing')
+    with pytest.raises(UnknownModelVersion):
+        registry.get_service(1, '../versions')
+    
+    with app.app_context():
+        for version in registry.list_versions(1):
+            service = registry.get_service(1, version)
+            assert registry.load(service)
+            time_array, state_array = service.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+            assert state_array.shape == (len(time_array), 14)
+            assert np.isfinite(state_array).all()
+        assert registry.get_service(1, 'hybrid_c3').get_model_info()['model_type'] == 'hybrid_c3'
+        
+        # A stream started before the checkpoint is replaced finishes on the old weights
+        service = registry.get_service(1, 'default')
+        _, before = service.predict(ROCKET_PARAMS, t_end=2.0, dt=0.1)
+        stream = service.predict_stream(ROCKET_PARAMS, t_end=2.0, dt=0.1, chunk_points=8)
+        first = next(stream)
+        _write_model_version(tmp_path, 'direction_an', seed=1)
+        os.utime(tmp_path / 'best.pt', ns=(1, 1))  # Distinct stat even within the same mtime tick
+        assert registry.load(service)
+        streamed = np.concatenate([first[1]] + [state for _, state in stream])
+        np.testing.assert_allclose(streamed, before, rtol=1e-5, atol=1e-4)
+        _, after = service.predict(ROCKET_PARAMS, t_end=2.0, dt=0.1)
+        assert not np.allclose(after, before)
+        
+        # Idle non-default versions are evicted, least recently used first; in-flight ones stay
+        busy = registry.get_service(1, 'latent_ode')
+        busy_stream = busy.predict_stream(ROCKET_PARAMS, t_end=1.0, dt=0.1, chunk_points=4)
+        next(busy_stream)
+        assert registry.enforce_budget(budget_bytes=1) == 2
+        assert registry.get_service(1, 'direction_d1').model_bytes() == 0
+        assert busy.model_bytes() > 0 and service.model_bytes() > 0
+        busy_stream.close()
+        assert busy.is_idle()
+        assert registry.get_stats()['evictions'] == 2
+
+
+def test_model_registry_lease_blocks_eviction_until_released(app, tmp_path):
+    """Test a version leased by load() cannot be evicted by another request before it has predicted"""
+    from app.services.ml_registry import ModelRegistry
+    
+    _write_model_version(tmp_path, 'direction_an')
+    for model_type in ('direction_d1', 'latent_ode'):
+        _write_model_version(tmp_path / 'versions' / model_type, model_type)
+    registry = ModelRegistry({1: tmp_path})
+    
+    with app.app_context():
+        routed = registry.get_service(1, 'direction_d1')
+        assert registry.load(routed, lease=True)
+        # Another request loads a version under a budget that fits neither
+        assert registry.load(registry.get_service(1, 'latent_ode'), budget_bytes=1)
+        assert routed.model_bytes() > 0
+        _, state_array = routed.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+        assert np.isfinite(state_array).all()
+        routed.release()
+        assert routed.is_idle()
+        assert registry.enforce_budget(budget_bytes=1) == 2
+        assert routed.model_bytes() == 0
+
+
+def test_model_version_routing(app, client, ml_service):
+    """Test explicit version headers, sticky A/B splits and the X-Model-Version response header"""
+    from app.services.ml_registry import ModelRegistry
+    
+    registry = ModelRegistry()
+    assert registry.resolve_version() == 'default'
+    assert registry.resolve_version('candidate', ab_weights='default:100') == 'candidate'
+    picks = {registry.resolve_version(routing_key=f'user-{i}', ab_weights='default:50,candidate:50')
+             for i in range(64)}
+    assert picks == {'default', 'candidate'}
+    for i in range(8):
+        key = f'user-{i}'
+        assert (registry.resolve_version(routing_key=key, ab_weights='default:50,candidate:50')
+                == registry.resolve_version(routing_key=key, ab_weights='default:50,candidate:50'))
+    assert registry.resolve_version(routing_key='x', ab_weights='default:0,candidate:1') == 'candidate'
+    
+    response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0, 'dt': 0.5}})
+    assert response.status_code == 200
+    assert response.headers['X-Model-Version'] == 'default'
+    assert ml_service.is_idle()  # The request's lease is returned at teardown
+    
+    response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0}},
+                           headers={'X-Model-Version': 'no-such-version'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown model version'
+    
+    health = client.get('/api/ml/projects/1/health').get_json()
+    assert health['registry']['requests']['1/default']['count'] >= 1
+
+
+def test_inference_executor_backpressure_timeout_and_cancel():
+    """Test the thread executor rejects beyond max_queue, times out and cancels calls that never started"""
+    import threading
+    from app.services.ml_executor import InferenceExecutor, ExecutorQueueFull, InferenceTimeout
+    
+    release = threading.Event()
+    
+    class SlowService:
+        def predict_batch(self, scenarios):
+            release.wait(5.0)
+            return scenarios
+    
+    executor = InferenceExecutor('thread', workers=1, max_queue=2, timeout=0.05)
+    try:
+        running = executor.submit(SlowService(), ['a'])
+        with pytest.raises(InferenceTimeout):
+            executor.predict_batch(SlowService(), ['b'])  # Queued behind 'a', so cancelled
+        queued = executor.submit(SlowService(), ['c'])
+        with pytest.raises(ExecutorQueueFull):
+            executor.submit(SlowService(), ['d'])
+        
+        release.set()
+        assert running.result(timeout=5.0) == ['a']
+        assert queued.result(timeout=5.0) == ['c']
+        stats = executor.get_stats()
+        assert stats['pending'] == 0
+        assert (stats['timeouts'], stats['cancelled'], stats['rejected']) == (1, 1, 1)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_thread_executor_runs_in_app_context(app):
+    """Test thread-backend calls run inside the submitting app's context"""
+    from flask import current_app, has_app_context
+    from app.services.ml_executor import InferenceExecutor
+    
+    class ContextService:
+        def predict_batch(self, scenarios):
+            assert has_app_context()
+            return [current_app.name for _ in scenarios]
+    
+    executor = InferenceExecutor('thread', workers=1, timeout=5.0)
+    try:
+        with app.app_context():
+            assert executor.predict_batch(ContextService(), ['a']) == [app.name]
+        assert executor.predict_batch(ContextService(), ['b'], app=app) == [app.name]
+    finally:
+        executor.shutdown()
+
+
+def test_executor_config_name_follows_app(app):
+    """Test the executor singleton hands the app's config name to process workers"""
+    import app.services.ml_executor as ml_executor
+    
+    assert app.config['CONFIG_NAME'] == 'testing'
+    ml_executor._ml_executor = None
+    try:
+        assert ml_executor.get_ml_executor(app.config).config_name == 'testing'
+    finally:
+        ml_executor._ml_executor = None
+
+
+def test_predict_endpoint_with_thread_executor(app, client, ml_service):
+    """Test /predict runs on the thread executor and answers 429 when its queue is full"""
+    import app.services.ml_executor as ml_executor
+    
+    time_array, state_array = ml_service.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+    app.config.update(ML_EXECUTOR='thread', ML_EXECUTOR_MAX_QUEUE=1)
+    ml_executor._ml_executor = None
+    try:
+        response = client.post('/api/ml/projects/1/predict',
+                               json={'data': {**ROCKET_PARAMS, 't_end': 1.0, 'dt': 0.1}, 'format': 'columnar'})
+        assert response.status_code == 200
+        trajectory = response.get_json()['trajectory']
+        np.testing.assert_allclose(trajectory['mass'], state_array[:, 13], rtol=1e-6)
+        
+        executor = ml_executor._ml_executor
+        executor._pending = executor.max_queue  # Saturated by requests in flight elsewhere
+        response = client.post('/api/ml/projects/1/predict', json={'data': {'t_end': 1.0}})
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+        executor._pending = 0
+        
+        health = client.get('/api/ml/projects/1/health').get_json()
+        assert health['executor']['backend'] == 'thread'
+        assert health['executor']['rejected'] == 1
+    finally:
+        if ml_executor._ml_executor is not None:
+            ml_executor._ml_executor.shutdown()
+        ml_executor._ml_executor = None
+
+
+def test_ndjson_stream_runs_on_executor(app, client, ml_service):
+    """Test streamed chunks go through the executor and a full queue rejects the stream with 429"""
+    import json
+    import app.services.ml_executor as ml_executor
+    
+    app.config.update(ML_EXECUTOR='thread', ML_EXECUTOR_MAX_QUEUE=1, ML_STREAM_CHUNK_POINTS=4)
+    ml_executor._ml_executor = None
+    payload = {'data': {'t_end': 1.0, 'dt': 0.1}, 'format': 'ndjson'}
+    try:
+        response = client.post('/api/ml/projects/1/predict', json=payload)
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['type'] for line in lines] == ['header', 'chunk', 'chunk', 'chunk', 'end']
+        executor = ml_executor._ml_executor
+        assert executor.get_stats()['requests'] == 4  # Three chunks and the end of the stream
+        
+        executor._pending = executor.max_queue  # Saturated by requests in flight elsewhere
+        response = client.post('/api/ml/projects/1/predict', json=payload)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+        executor._pending = 0
+        assert executor.get_stats()['rejected'] == 1
+    finally:
+        if ml_executor._ml_executor is not None:
+            ml_executor._ml_executor.shutdown()
+        ml_executor._ml_executor = None
+
+
+def test_trajectory_table_interpolation_and_coverage(tmp_path):
+    """Test the lookup table reproduces parameter-linear trajectories and declines what it does not cover"""
+    from app.services.ml_lookup import TrajectoryTable
+    from src.data.sampler import lhs_sample
+    
+    fields = list(PARAM_BOUNDS)
+    params = lhs_sample(128, PARAM_BOUNDS, seed=0)
+    time_grid = 0.1 * np.arange(21)
+    rng = np.random.default_rng(0)
+    slopes, offsets = rng.normal(size=(len(fields), 14)), rng.normal(size=14)
+    
+    def trajectory(row):
+        return np.outer(1.0 + time_grid, row @ slopes + offsets)  # [21, 14], affine in the parameters
+    
+    meta = {'fields': fields, 'bounds': PARAM_BOUNDS, 't_start': 0.0, 'dt': 0.1, 'neighbours': 16}
+    TrajectoryTable(params, np.stack([trajectory(row) for row in params]), meta).save(tmp_path)
+    table = TrajectoryTable.load(tmp_path)
+    assert isinstance(table.trajectories, np.memmap)
+    
+    query = {'m0': 55.0, 'Isp': 250.0, 'Cd': 0.35, 'CL_alpha': 3.5, 'Cm_alpha': -0.8, 'Tmax': 4000.0, 'wind_mag': 5.0}
+    expected = trajectory(np.array([query[f] for f in fields]))
+    time_array, state_array = table.lookup(query, t_start=0.0, t_end=2.0, dt=0.1)
+    np.testing.assert_allclose(time_array, time_grid, atol=1e-12)
+    np.testing.assert_allclose(state_array, expected, rtol=1e-4, atol=1e-3)
+    
+    # Shorter horizons on the same grid are prefixes of the table rows
+    time_array, state_array = table.lookup(query, t_start=0.0, t_end=1.0, dt=0.1)
+    np.testing.assert_allclose(state_array, expected[:11], rtol=1e-4, atol=1e-3)
+    
+    assert table.lookup({**query, 'Tmax': 6000.0}, t_end=2.0, dt=0.1) is None  # Outside the sampled box
+    assert table.lookup({k: v for k, v in query.items() if k != 'Cd'}, t_end=2.0, dt=0.1) is None
+    assert table.lookup(query, t_end=2.0, dt=0.03) is None           # Not on the table grid
+    assert table.lookup(query, t_end=3.0, dt=0.1) is None            # Beyond the table horizon
+    # The model integrates from the request's first point with its dt: another
+    # start or a coarser step is a different trajectory, not a subset of rows
+    assert table.lookup(query, t_start=0.5, t_end=1.5, dt=0.1) is None
+    assert table.lookup(query, t_start=0.0, t_end=2.0, dt=0.5) is None
+    stats = table.get_stats()
+    assert (stats['hits'], stats['misses']) == (2, 6)
+
+
+def test_predict_served_from_lookup_table(client, ml_service):
+    """Test predict_batch answers covered requests from the table and the rest from the model"""
+    from app.services.ml_lookup import build_trajectory_table
+    
+    snapshot = ml_service._snapshot()
+    table = build_trajectory_table(
+        lambda scenarios: ml_service._run_batch(scenarios, snapshot), PARAM_BOUNDS,
+        n_samples=64, t_end=1.0, dt=0.1, validation_samples=8
+    )
+    assert 0.0 <= table.meta['p95_error'] <= table.meta['max_error']
+    ml_service._lookup = table
+    
+    response = client.post('/api/ml/projects/1/predict',
+                           json={'data': {**ROCKET_PARAMS, 't_end': 1.0, 'dt': 0.1}, 'format': 'columnar'})
+    assert response.status_code == 200
+    _, expected = table.lookup(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+    np.testing.assert_allclose(response.get_json()['trajectory']['mass'], expected[:, 13], rtol=1e-6)
+    
+    _, live = ml_service._run_batch([{'params': ROCKET_PARAMS, 't_end': 1.0, 'dt': 0.05}], snapshot)[0]
+    _, served = ml_service.predict(ROCKET_PARAMS, t_end=1.0, dt=0.05)  # Off the table grid
+    np.testing.assert_allclose(served, live)
+    assert ml_service.get_model_info()['lookup_table']['hits'] == 2
+
+
+def test_precision_mode_refused_beyond_error_budget(app, tmp_path):
+    """Test a reduced precision mode is served within ML_PRECISION_MAX_ERROR and refused beyond it"""
+    from app.services.ml_model_service import MLModelService
+    
+    _write_model_version(tmp_path, 'direction_an')
+    with app.app_context():
+        reference = MLModelService(tmp_path)
+        assert reference.load_model()
+        _, expected = reference.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+        
+        app.config.update(ML_PRECISION='int8', ML_PRECISION_MAX_ERROR=1.0)
+        service = MLModelService(tmp_path)
+        assert service.load_model()
+        precision = service.get_model_info()['precision']
+        assert precision['mode'] == 'int8' and 0.0 < precision['max_error'] <= 1.0
+        _, state = service.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)
+        assert not np.array_equal(state, expected)
+        
+        app.config.update(ML_PRECISION='bfloat16', ML_PRECISION_MAX_ERROR=0.0)
+        service = MLModelService(tmp_path)
+        assert service.load_model()
+        precision = service.get_model_info()['precision']
+        assert precision == {'mode': 'float32', 'requested': 'bfloat16', 'max_error': precision['max_error']}
+        assert precision['max_error'] > 0.0
+        np.testing.assert_array_equal(service.predict(ROCKET_PARAMS, t_end=1.0, dt=0.1)[1], expected)
+
+
+def test_param_bounds_from_model_or_dataset_config(tmp_path):
+    """Test parameter ranges come from the model config or the generator config it names"""
+    import yaml
+    from app.services.ml_lookup import param_bounds
+    
+    assert param_bounds({'params': {'m0': [45.0, 65.0]}}) == {'m0': (45.0, 65.0)}
+    (tmp_path / 'dataset.yaml').write_text(yaml.safe_dump({'params': {'Isp': [220.0, 280.0]}}))
+    assert param_bounds({'dataset_config': 'dataset.yaml'}, tmp_path) == {'Isp': (220.0, 280.0)}
+    with pytest.raises(ValueError):
+        param_bounds({'model': {}}, tmp_path)
+
+
+def test_predict_served_by_onnx_runtime(app, tmp_path):
+    """Test a current ONNX export is served without a torch model and matches the torch backend"""
+    pytest.importorskip('onnxruntime')
+    import torch
+    from app.services.ml_cache import file_checksum
+    from app.services.ml_model_service import MLModelService
+    from src.export.onnx import export_onnx
+    from src.models.factory import build_model
+    
+    _write_model_version(tmp_path, 'direction_an')
+    model_cfg = {'type': 'direction_an', **SMALL_MODEL_CONFIGS['direction_an']}
+    model = build_model(model_cfg, context_dim=7)
+    model.load_state_dict(torch.load(tmp_path / 'best.pt')['model_state_dict'])
+    export_onnx(model.eval(), tmp_path / 'best.onnx', context_dim=7,
+                metadata={'checkpoint_sha256': file_checksum(tmp_path / 'best.pt')})
+    
+    with app.app_context():
+        app.config.update(ML_ONNX=False)
+        reference = MLModelService(tmp_path)
+        assert reference.load_model() and reference.get_model_info()['runtime'] == 'eager'
+        app.config.update(ML_ONNX=True)
+        service = MLModelService(tmp_path)
+        assert service.load_model()
+        assert service.get_model_info()['runtime'] == 'onnxruntime'
+        assert not isinstance(service._model, torch.nn.Module)
+        
+        scenarios = [{'params': ROCKET_PARAMS, 't_end': 2.0, 'dt': 0.1}, {'params': {}, 't_end': 1.0, 'dt': 0.05}]
+        for (t_onnx, onnx_state), (t_torch, torch_state) in zip(service.predict_batch(scenarios),
+                                                                 reference.predict_batch(scenarios)):
+            np.testing.assert_array_equal(t_onnx, t_torch)
+            np.testing.assert_allclose(onnx_state, torch_state, rtol=1e-4, atol=1e-3)
+        streamed = np.concatenate([state for _, state in service.predict_stream(ROCKET_PARAMS, t_end=2.0, dt=0.1,
+                                                                                 chunk_points=8)])
+        np.testing.assert_allclose(streamed, service.predict(ROCKET_PARAMS, t_end=2.0, dt=0.1)[1])
+        
+        # An export of other weights is ignored
+        _write_model_version(tmp_path, 'direction_an', seed=1)
+        service = MLModelService(tmp_path)
+        assert service.load_model() and service.get_model_info()['runtime'] == 'eager'
+
+
+# Modules create_app() must not import: the ML stack loads on first ML use
+ML_STACK_MODULES = ('torch', 'h5py', 'yaml', 'src', 'onnxruntime')
+
+
+def test_create_app_does_not_import_ml_stack():
+    """Test create_app() stays within the import budget: no torch or model sources until an ML request"""
+    import subprocess
+    import sys
+    from pathlib import Path
+    
+    code = "from app import create_app; create_app('testing')"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+    # Lines look like "import time:  self [us] | cumulative | [indent]package"
+    imported = {
+        line.rsplit('|', 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith('import time:') and line.count('|') == 2
+    }
+    assert 'app.routes.ml_api' in imported
+    heavy = sorted(name for name in imported if name.split('.')[0] in ML_STACK_MODULES)
+    assert not heavy, f"create_app() imported {heavy[:5]}"
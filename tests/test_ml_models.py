@@ -0,0 +1,501 @@
+"""Model-level tests for the rocket PINN sources (app/ml_models/project_1/src)"""
+import pytest
+
+torch = pytest.importorskip('torch')
+
+
+def _small_direction_an():
+    from src.models.direction_an_pinn import DirectionANPINN
+    
+    torch.manual_seed(0)
+    return DirectionANPINN(
+        context_dim=7,
+        stem_hidden_dim=32,
+        stem_layers=2,
+        translation_branch_dims=[32],
+        rotation_branch_dims=[32],
+        mass_branch_dims=[16],
+    ).eval()
+
+
+def test_torchscript_export_matches_eager(tmp_path):
+    """Test the frozen TorchScript export reproduces the eager state for new shapes"""
+    from src.export.torchscript import export_torchscript, load_torchscript
+    
+    model = _small_direction_an()
+    path = export_torchscript(model, tmp_path / 'best.torchscript.pt', context_dim=7,
+                              metadata={'checkpoint_sha256': 'abc'})
+    scripted, metadata = load_torchscript(path)
+    assert metadata['checkpoint_sha256'] == 'abc'
+    
+    for batch, n_points in [(1, 5), (4, 301)]:
+        t = torch.linspace(0.0, 1.0, n_points).view(1, n_points, 1).repeat(batch, 1, 1)
+        context = torch.randn(batch, 7)
+        with torch.no_grad():
+            eager_state, _ = model(t, context)
+            scripted_state = scripted(t, context)
+        torch.testing.assert_close(scripted_state, eager_state, rtol=1e-5, atol=1e-5)
+
+
+
+def test_onnx_export_matches_eager(tmp_path):
+    """Test the ONNX export run by ONNX Runtime reproduces the eager state for new shapes"""
+    pytest.importorskip('onnxruntime')
+    from src.export.onnx import export_onnx, load_onnx
+    
+    model = _small_direction_an()
+    path = export_onnx(model, tmp_path / 'best.onnx', context_dim=7, metadata={'checkpoint_sha256': 'abc'})
+    session, metadata = load_onnx(path)
+    assert metadata['checkpoint_sha256'] == 'abc' and metadata['context_dim'] == 7
+    
+    for batch, n_points in [(1, 5), (4, 301)]:
+        t = torch.linspace(0.0, 1.0, n_points).view(1, n_points, 1).repeat(batch, 1, 1)
+        context = torch.randn(batch, 7)
+        with torch.no_grad():
+            eager_state = model.predict_state(t, context)
+        onnx_state = torch.from_numpy(session(t.numpy(), context.numpy()))
+        torch.testing.assert_close(onnx_state, eager_state, rtol=1e-4, atol=1e-4)
+
+@pytest.mark.parametrize('model_name', ['DirectionANPINN', 'DirectionANPINN_AN2'])
+def test_predict_state_skips_physics_layer(model_name):
+    """Test predict_state returns the forward state without evaluating physics residuals"""
+    import src.models.direction_an_pinn as an
+    
+    torch.manual_seed(0)
+    model = getattr(an, model_name)(
+        context_dim=7, stem_hidden_dim=32, stem_layers=2,
+        translation_branch_dims=[32], rotation_branch_dims=[32], mass_branch_dims=[16],
+    ).eval()
+    t = torch.linspace(0.0, 1.0, 21).view(1, 21, 1).repeat(2, 1, 1)
+    context = torch.randn(2, 7)
+    
+    with torch.no_grad():
+        state_forward, residuals = model(t, context)
+        assert residuals is not None
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("physics layer called in inference mode")
+        model.physics_layer.forward = fail
+        state_inference = model.predict_state(t, context)
+    
+    torch.testing.assert_close(state_inference, state_forward)
+
+
+
+def test_precision_modes_close_to_float32():
+    """Test bfloat16 autocast and int8 stem/branch quantization keep the interface and stay near float32"""
+    from src.export.precision import apply_precision, max_relative_error, predict_state, quantize_int8
+    
+    model = _small_direction_an()
+    t = torch.linspace(0.0, 1.0, 51).view(1, 51, 1).repeat(3, 1, 1)
+    context = torch.randn(3, 7)
+    reference = predict_state(model, t, context)
+    
+    quantized, n_layers = quantize_int8(model)
+    mlps = [model.stem, model.translation_branch, model.rotation_branch, model.mass_branch]
+    assert n_layers == sum(isinstance(m, torch.nn.Linear) for mlp in mlps for m in mlp.modules())
+    assert type(quantized.stem).__name__ == type(model.stem).__name__
+    assert all(type(m) is not torch.nn.Linear for m in quantized.translation_branch.modules())
+    assert any(type(m) is torch.nn.Linear for m in model.translation_branch.modules())  # Original untouched
+    
+    assert apply_precision(model, 'float32') is model
+    for mode in ('bfloat16', 'int8'):
+        state = predict_state(apply_precision(model, mode), t, context)
+        assert state.dtype == torch.float32 and state.shape == reference.shape
+        assert 0.0 < max_relative_error(reference, state) < 0.5
+    with pytest.raises(ValueError):
+        apply_precision(model, 'float8')
+
+
+def test_stage_profiler_records_submodules_and_marked_stages(tmp_path):
+    """Test StageProfiler times the Direction AN stages and leaves no hooks behind"""
+    import json
+    from src.utils.profiler import StageProfiler, profile_stage
+
+    model = _small_direction_an()
+    t = torch.linspace(0.0, 1.0, 21).view(1, 21, 1).repeat(2, 1, 1)
+    context = torch.randn(2, 7)
+    with torch.no_grad():
+        reference, _ = model(t, context)
+
+    with StageProfiler(model) as profiler:
+        with profile_stage('forward'):
+            state, _ = model(t, context)
+    torch.testing.assert_close(state, reference)
+
+    stats = profiler.get_stats()
+    for stage in ('forward', 'stem', 'translation_branch', 'rotation_branch', 'mass_branch',
+                  'position_reconstruction', 'physics_layer'):
+        assert stats[stage]['calls'] == 1
+    assert stats['stem']['output_mb'] == pytest.approx(state.shape[1] * 2 * 32 * 4 / 2**20)
+    assert stats['forward']['total_ms'] >= stats['stem']['total_ms'] + stats['physics_layer']['total_ms']
+    assert 'position_reconstruction' in profiler.summary()
+
+    profiler.export_chrome_trace(tmp_path / 'trace.json')
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert {event['name'] for event in events} == set(stats)
+
+    # Outside the context the hooks are gone and markers are no-ops
+    assert not model.stem._forward_hooks and not model.stem._forward_pre_hooks
+    with profile_stage('forward'):
+        model(t, context)
+    assert profiler.get_stats()['forward']['calls'] == 1
+
+@pytest.mark.parametrize('scales', [None, {'L': 10000.0, 'V': 313.0, 'T': 31.62, 'M': 50.0, 'F': 490.0}])
+def test_vectorized_dynamics_matches_looped_reference(scales):
+    """Test the loop-free compute_dynamics reproduces the previous per-row implementation"""
+    from src.eval.bench_dynamics import compute_dynamics_looped, random_inputs
+    from src.physics.dynamics_pytorch import compute_dynamics
+    
+    x, u = random_inputs(257)
+    x = x.double()
+    u = u.double()
+    torch.testing.assert_close(compute_dynamics(x, u, {}, scales), compute_dynamics_looped(x, u, {}, scales))
+
+
+def test_vectorized_dynamics_keeps_leading_dims():
+    """Test compute_dynamics accepts [B, N, 14] and single-row inputs"""
+    from src.eval.bench_dynamics import random_inputs
+    from src.physics.dynamics_pytorch import compute_dynamics
+    
+    x, u = random_inputs(3 * 5)
+    flat = compute_dynamics(x, u, {})
+    batched = compute_dynamics(x.view(3, 5, 14), u.view(3, 5, 4), {})
+    assert batched.shape == (3, 5, 14)
+    torch.testing.assert_close(batched.reshape(15, 14), flat)
+    assert compute_dynamics(x[0], u[0], {}).shape == (14,)
+
+
+@pytest.mark.parametrize('order', [1, 2, 4])
+def test_time_derivative_exact_for_polynomials_on_nonuniform_grid(order):
+    """Test each stencil differentiates polynomials of degree <= order exactly, boundaries included"""
+    from src.physics.derivatives import time_derivative
+    
+    torch.manual_seed(0)
+    t = torch.sort(torch.rand(2, 25, dtype=torch.float64), dim=1).values.unsqueeze(-1) * 3.0
+    values = torch.cat([t ** k for k in range(order + 1)], dim=-1)
+    expected = torch.cat([k * t ** (k - 1) if k else torch.zeros_like(t) for k in range(order + 1)], dim=-1)
+    torch.testing.assert_close(time_derivative(values, t, order=order), expected)
+
+
+def test_time_derivative_matches_previous_finite_differences():
+    """Test order 2 reproduces the old residual-layer loop inside, order 1 the old PINNLoss forward difference"""
+    from src.eval.bench_derivatives import finite_difference_looped
+    from src.physics.derivatives import time_derivative
+    
+    t = torch.linspace(0.0, 1.0, 31, dtype=torch.float64).view(1, 31, 1).repeat(2, 1, 1)
+    state = torch.randn(2, 31, 14, dtype=torch.float64)
+    
+    central = time_derivative(state, t, order=2)
+    torch.testing.assert_close(central[:, 1:-1], finite_difference_looped(t, state)[:, 1:-1])
+    
+    forward = (state[:, 1:] - state[:, :-1]) / (t[:, 1:] - t[:, :-1])
+    torch.testing.assert_close(time_derivative(state, t, order=1), torch.cat([forward, forward[:, -1:]], dim=1))
+
+
+def test_integrate_truth_batch_matches_single_cases():
+    """Test a batched integrate_truth reproduces per-case runs and RK4 agrees with RK45"""
+    import numpy as np
+    from src.eval.bench_integrator import ascent_cases
+    from src.physics.dynamics import integrate_truth
+    
+    samples, x0, phys, limits, env, control_cb = ascent_cases(3)
+    t = np.linspace(0.0, 4.0, 41)
+    batched = integrate_truth(x0, t, control_cb, phys, limits, env, method='rk4')
+    assert batched.x.shape == (3, 41, 14) and batched.u.shape == (3, 41, 4)
+    assert set(batched.monitors) >= {'rho', 'q_dyn', 'n_load'} and batched.monitors['rho'].shape == (3, 41)
+    np.testing.assert_allclose(np.linalg.norm(batched.x[:, :, 6:10], axis=-1), 1.0, atol=1e-12)
+    
+    for i in range(3):
+        single = integrate_truth(x0[i], t, lambda time, x: control_cb(time, x)[i],
+                                 phys[i], limits[i], env[i], method='rk4')
+        assert single.x.shape == (41, 14)
+        np.testing.assert_allclose(single.x, batched.x[i], rtol=1e-10, atol=1e-8)
+    
+    adaptive = integrate_truth(x0, t, control_cb, phys, limits, env, method='rk45')
+    np.testing.assert_allclose(adaptive.x[:, :, 0:3], batched.x[:, :, 0:3], atol=2e-2)
+
+
+def test_integrate_truth_vertical_ascent_burns_out():
+    """Test a windless vertical ascent stays on the axis and burns to mdry at the rocket-equation rate"""
+    import numpy as np
+    from src.physics.dynamics import integrate_truth
+    
+    x0 = np.zeros(14)
+    x0[6:10] = [np.sqrt(0.5), 0.0, -np.sqrt(0.5), 0.0]  # Body x up
+    x0[13] = 40.0
+    phys = {'Isp': 250.0}
+    limits = {'Tmax': 4000.0, 'mdry': 35.0}
+    t = np.linspace(0.0, 6.0, 61)
+    result = integrate_truth(x0, t, lambda time, x: np.array([3000.0, 1.0, 0.0, 0.0]),
+                             phys, limits, {'wind': {'type': 'zero'}}, method='rk45')
+    
+    burn_rate = 3000.0 / (250.0 * 9.80665)
+    np.testing.assert_allclose(result.x[:, 13], np.maximum(40.0 - burn_rate * t, 35.0), atol=1e-6)
+    assert result.diag['burnout'] and result.u[-1, 0] == 0.0
+    np.testing.assert_allclose(result.x[:, [0, 1, 3, 4, 10, 11, 12]], 0.0, atol=1e-9)
+    np.testing.assert_allclose(result.x[:, 6:10], np.broadcast_to(x0[6:10], (61, 4)), atol=1e-9)
+    assert result.x[-1, 2] > 0.0 and result.diag['renorm_events'] == result.diag['steps']
+
+
+def _small_synthesizer(method, **kwargs):
+    from src.data.synthetic import TrajectorySynthesizer
+    from src.physics.rollout import RolloutEngine
+    
+    scales = {'L': 10000.0, 'V': 313.0, 'T': 31.62, 'M': 50.0, 'F': 490.0, 'W': 0.0316}
+    engine = RolloutEngine({}, scales, method=method, deterministic=True)
+    return TrajectorySynthesizer(engine, scales, cases_per_epoch=6, horizon_s=6.0, n_points=16, **kwargs)
+
+
+def test_rollout_engine_batch_matches_single_cases():
+    """Test batched rollouts reproduce single-case rollouts exactly and RK4 agrees with per-trajectory RK45"""
+    rk4, _ = _small_synthesizer('rk4').rollout(epoch=0)
+    assert rk4.state.shape == (6, 16, 14) and rk4.valid.all()
+    assert rk4.trajectories_per_s > 0 and (rk4.steps == 15).all()
+    torch.testing.assert_close(rk4.state[..., 6:10].norm(dim=-1), torch.ones(6, 16, dtype=torch.float64))
+    assert (rk4.state[:, -1, 2] > 0).all() and (rk4.state[:, -1, 13] < rk4.state[:, 0, 13]).all()
+    
+    rk45 = _small_synthesizer('rk45').rollout(epoch=0)[0]
+    torch.testing.assert_close(rk45.state, rk4.state, rtol=1e-4, atol=1e-5)
+    
+    synthesizer = _small_synthesizer('rk45')
+    result, _ = synthesizer.rollout(epoch=0)
+    params = synthesizer._case_params(synthesizer.sample(6, 0))
+    engine = synthesizer.engine
+    single = engine.rollout(result.state[2, 0:1], result.t[2], lambda t, x, index: result.control[2, 0:1],
+                            {name: value[2:3] for name, value in params.items()})
+    assert torch.equal(single.state[0, :6], result.state[2, :6])  # Before burnout the controls agree
+    assert torch.equal(engine.rollout(result.state[:, 0], result.t[0], result.control[:, 0], params).state,
+                       engine.rollout(result.state[:, 0], result.t[0], result.control[:, 0], params).state)
+
+
+def test_rollout_engine_masks_terminated_trajectories():
+    """Test trajectories stop at their terminate event, hold the last state and are flagged invalid"""
+    synthesizer = _small_synthesizer('rk4')
+    params = synthesizer._case_params(synthesizer.sample(6, 0))
+    reference, _ = synthesizer.rollout(epoch=0)
+    x0, u = reference.state[:, 0], reference.control[:, 0]
+    ceiling = reference.state[:, -1, 2].median()
+    
+    result = synthesizer.engine.rollout(x0, reference.t[0], u, params,
+                                        terminate=lambda t, x, index: x[:, 2] > ceiling)
+    stopped = result.state[:, -1, 2] > ceiling
+    assert 0 < stopped.sum() < 6 and result.valid[~stopped].all()
+    for i in torch.nonzero(stopped).flatten().tolist():
+        last = int(result.valid[i].sum()) - 1
+        assert not result.valid[i, last + 1:].any()
+        assert (result.state[i, last + 1:] == result.state[i, last]).all()
+        assert result.steps[i] == last
+
+
+def test_synthesizer_dataset_matches_rocket_dataset_layout():
+    """Test the per-epoch synthetic dataset has the RocketDataset item layout and is reproducible"""
+    from src.data.preprocess import CONTEXT_FIELDS
+    
+    synthesizer = _small_synthesizer('rk4')
+    dataset = synthesizer.dataset(epoch=3)
+    item = dataset[0]
+    assert set(item) == {'t', 'context', 'state', 'case_id', 'env'}
+    assert item['t'].shape == (16,) and item['state'].shape == (16, 14)
+    assert item['context'].shape == (len(CONTEXT_FIELDS),) and dataset.context_dim == len(CONTEXT_FIELDS)
+    assert item['state'].dtype == torch.float32
+    torch.testing.assert_close(synthesizer.dataset(epoch=3).state, dataset.state, rtol=0, atol=0)
+    assert not torch.equal(synthesizer.dataset(epoch=4).context, dataset.context)
+
+
+def test_synthetic_environment_reaches_training_residuals():
+    """Test synthetic batches carry each case's wind into the model's physics layer and PINNLoss"""
+    from torch.utils.data import DataLoader
+    from src.models.direction_an_pinn import DirectionANPINN
+    from src.physics.physics_residual_layer import PhysicsResidualLayer
+    from src.train.losses import PINNLoss
+    
+    bounds = {'m0': (45.0, 65.0), 'Tmax': (3000.0, 5000.0), 'wind_mag': (10.0, 15.0), 'wind_dir_rad': (0.0, 6.28)}
+    synthesizer = _small_synthesizer('rk4', bounds=bounds)
+    batch = next(iter(DataLoader(synthesizer.dataset(epoch=0), batch_size=6)))
+    env = batch['env']
+    assert env['wind_const'].shape == (6, 3) and (env['wind_const'].norm(dim=-1) > 0).all()
+    
+    # The synthesized truth satisfies the dynamics only in its own environment
+    result, _ = synthesizer.rollout(epoch=0)
+    case_params = synthesizer._case_params(synthesizer.sample(6, 0))
+    layer = PhysicsResidualLayer(scales=synthesizer.scales, derivative_order=2)
+    t = result.t.unsqueeze(-1)
+    windless = {k: v for k, v in case_params.items() if k not in env}
+    with_env = layer(t, result.state, control=result.control, env=case_params).translation_residual
+    without = layer(t, result.state, control=result.control, env=windless).translation_residual
+    assert with_env[..., 3:5].abs().mean() < 0.01 * without[..., 3:5].abs().mean()
+    
+    # Model and loss residuals change when the batch environment is passed
+    torch.manual_seed(0)
+    model = DirectionANPINN(context_dim=batch['context'].shape[-1], stem_hidden_dim=16, stem_layers=1,
+                            translation_branch_dims=[16], rotation_branch_dims=[16], mass_branch_dims=[8],
+                            physics_scales=synthesizer.scales)
+    assert model.accepts_environment
+    t = batch['t'].unsqueeze(-1)
+    state, residuals = model(t, batch['context'], env=env)
+    _, plain = model(t, batch['context'])
+    assert not torch.allclose(residuals.state_residual, plain.state_residual)
+    loss_fn = PINNLoss(scales=synthesizer.scales)
+    _, with_env = loss_fn(state, batch['state'], t, context=batch['context'], env=env)
+    _, without = loss_fn(state, batch['state'], t, context=batch['context'])
+    assert with_env['physics'] != without['physics']
+
+
+def test_compute_jacobians_match_per_row_autograd():
+    """Test batched Jacobians with per-case parameters match per-row forward and reverse AD"""
+    from src.eval.bench_dynamics import DEFAULT_SCALES, random_inputs
+    from src.eval.bench_jacobians import jacfwd_rows
+    from src.physics.dynamics_pytorch import compute_dynamics, compute_jacobians
+    
+    x, u = (tensor.double() for tensor in random_inputs(12))
+    params = {'Cd': torch.linspace(0.2, 0.5, 3, dtype=torch.float64), 'I_b': torch.tensor([10.0, 10.0, 1.0])}
+    A, B = compute_jacobians(x.view(3, 4, 14), u.view(3, 4, 4), params, DEFAULT_SCALES)
+    assert A.shape == (3, 4, 14, 14) and B.shape == (3, 4, 14, 4)
+    
+    for case in range(3):
+        case_params = {'Cd': params['Cd'][case], 'I_b': params['I_b']}
+        rows = slice(4 * case, 4 * case + 4)
+        A_fwd, B_fwd = jacfwd_rows(x[rows], u[rows], case_params, DEFAULT_SCALES)
+        torch.testing.assert_close(A[case], A_fwd)
+        torch.testing.assert_close(B[case], B_fwd)
+        A_row, B_row = torch.autograd.functional.jacobian(
+            lambda xx, uu: compute_dynamics(xx, uu, case_params, DEFAULT_SCALES), (x[4 * case], u[4 * case])
+        )
+        torch.testing.assert_close(A[case, 0], A_row)
+        torch.testing.assert_close(B[case, 0], B_row)
+
+
+def test_compute_jacobians_match_casadi():
+    """Test the torch Jacobians equal CasADi's jacobian of solver/dynamics_casadi.py (SI, unit scales)"""
+    pytest.importorskip('casadi')
+    from src.eval.bench_jacobians import (
+        CASADI_PARAMS, UNIT_SCALES, casadi_jacobian_function, casadi_jacobians, physical_inputs
+    )
+    from src.physics.dynamics_pytorch import compute_jacobians
+    
+    x, u = physical_inputs(32)
+    A_ca, B_ca = casadi_jacobians(casadi_jacobian_function(CASADI_PARAMS, 32), x, u)
+    params = {k: torch.tensor(v, dtype=torch.float64) for k, v in CASADI_PARAMS.items()}
+    A, B = compute_jacobians(x, u, params, UNIT_SCALES)
+    
+    # Only d(q_dot)/dq differs: the torch model normalizes q inside q_dot, CasADi does not
+    A[:, 6:10, 6:10] = A_ca[:, 6:10, 6:10]
+    torch.testing.assert_close(A, A_ca, rtol=1e-6, atol=1e-9)
+    torch.testing.assert_close(B, B_ca, rtol=1e-6, atol=1e-9)
+
+
+def _mixed_envs():
+    """Generator env dicts covering every wind type and both gravity models."""
+    constant_gravity = {'type': 'constant', 'g0': 9.80665, 'use_inverse_square': False}
+    return [
+        {'gravity': constant_gravity, 'wind': {'type': 'zero'}},
+        {'gravity': constant_gravity, 'wind': {'type': 'constant', 'wind_mag': 8.0, 'wind_dir_rad': 0.7}},
+        {'gravity': {'type': 'inverse_square', 'g0': 9.80665, 'use_inverse_square': True},
+         'wind': {'type': 'constant', 'wind_u': -3.0, 'wind_v': 1.0, 'wind_w': 0.5}},
+        {'gravity': constant_gravity,
+         'wind': {'type': 'gust', 'gust_amp': 5.0, 'gust_freq': 0.3, 'gust_axis': 'y', 'gust_phase': 0.4}},
+    ]
+
+
+def test_torch_environment_matches_numpy_truth_model():
+    """Test per-case wind, gusts and gravity in compute_dynamics equal the NumPy environment of integrate_truth"""
+    import numpy as np
+    from src.eval.bench_jacobians import UNIT_SCALES, physical_inputs
+    from src.physics.dynamics import case_parameters, gravity_acceleration, wind_velocity
+    from src.physics.dynamics_pytorch import compute_dynamics, environment_params
+    
+    envs = _mixed_envs()
+    x, u = physical_inputs(4 * 5)
+    x, u = x.view(4, 5, 14), u.view(4, 5, 4)
+    x[2, :, 2] += 2.0e5  # inverse-square gravity well below g0
+    t = torch.linspace(0.0, 9.0, 5, dtype=torch.float64).expand(4, 5)
+    env = environment_params(envs, 4, UNIT_SCALES, dtype=torch.float64)
+    xdot = compute_dynamics(x, u, env, UNIT_SCALES, t=t)
+    
+    # Reference: air-relative velocity and per-point gravity of the NumPy model, no torch wind
+    reference = case_parameters({}, {}, envs, 4)
+    wind = np.stack([wind_velocity(t[:, n].numpy(), reference) for n in range(5)], axis=1)
+    gravity = np.stack([gravity_acceleration(x[:, n, 2].numpy(), reference) for n in range(5)], axis=1)
+    assert gravity[2].max() < 9.3 and np.abs(wind[3, :, 1]).max() > 1.0
+    shifted = x.clone()
+    shifted[..., 3:6] -= torch.from_numpy(wind)
+    expected = compute_dynamics(shifted, u, {'g0': torch.from_numpy(gravity)}, UNIT_SCALES)
+    torch.testing.assert_close(xdot[..., 3:13], expected[..., 3:13], rtol=1e-10, atol=1e-10)
+    torch.testing.assert_close(xdot[..., 0:3], x[..., 3:6])
+
+
+def test_numpy_and_torch_dynamics_share_aero_convention():
+    """Test rigid_body_derivative and compute_dynamics agree on thrust, drag, lift and moments (SI, unit scales)"""
+    import numpy as np
+    from src.eval.bench_jacobians import UNIT_SCALES, physical_inputs
+    from src.physics.dynamics import case_parameters, rigid_body_derivative
+    from src.physics.dynamics_pytorch import compute_dynamics
+    
+    x, u = physical_inputs(32)
+    u[:, 3] = 0.0  # No control-surface deflection in the NumPy model
+    x[:, 13] = x[:, 13].clamp(min=36.0)
+    phys = {'Cd': 0.4, 'CL_alpha': 3.0, 'Cm_alpha': -0.9, 'S': 0.06, 'l_ref': 1.1, 'Isp': 240.0,
+            'Ix': 12.0, 'Iy': 11.0, 'Iz': 1.5, 'rho0': 1.2, 'H': 8000.0}
+    limits = {'Tmax': 4000.0, 'mdry': 35.0}
+    theta, phi = u[:, 1].numpy(), u[:, 2].numpy()
+    u_numpy = np.stack([u[:, 0].numpy(), np.cos(theta) * np.cos(phi), np.sin(phi), np.sin(theta) * np.cos(phi)], axis=1)
+    expected = rigid_body_derivative(0.0, x.numpy(), u_numpy, case_parameters(phys, limits, {}, 32))
+    
+    params = {name: torch.tensor(value, dtype=torch.float64) for name, value in {
+        'Cd': 0.4, 'CL_alpha': 3.0, 'Cm_alpha': -0.9, 'S_ref': 0.06, 'l_ref': 1.1, 'Isp': 240.0,
+        'I_b': [12.0, 11.0, 1.5], 'rho0': 1.2, 'h_scale': 8000.0, 'g0': 9.80665, 'T_max': 4000.0, 'm_dry': 35.0,
+    }.items()}
+    xdot = compute_dynamics(x, u, params, UNIT_SCALES)
+    np.testing.assert_allclose(xdot.numpy(), expected, rtol=1e-8, atol=1e-8)
+    
+    # Drag decelerates: without thrust or lift the air-relative speed drops
+    params['CL_alpha'] = torch.tensor(0.0, dtype=torch.float64)
+    coasting = compute_dynamics(x, torch.zeros_like(u), params, UNIT_SCALES)
+    power = (coasting[:, 3:5] * x[:, 3:5]).sum(-1) + (coasting[:, 5] + 9.80665) * x[:, 5]
+    assert (power < 0).all()
+
+
+def test_physics_residual_layer_uses_per_case_environment():
+    """Test PhysicsResidualLayer evaluates each trajectory's environment at its own times"""
+    from src.physics.dynamics_pytorch import compute_dynamics, environment_params
+    from src.physics.physics_residual_layer import PhysicsResidualLayer
+    
+    scales = {'L': 10000.0, 'V': 313.0, 'T': 31.62, 'M': 50.0, 'F': 490.0}
+    layer = PhysicsResidualLayer(scales=scales)
+    t = torch.linspace(0.0, 1.0, 8).view(1, 8, 1).repeat(4, 1, 1)
+    t[1:] += 0.25
+    state = torch.randn(4, 8, 14, generator=torch.Generator().manual_seed(0))
+    state[..., 13] = 1.0
+    env = environment_params(_mixed_envs(), 4, scales)
+    
+    residuals = layer(t, state, env=env)
+    f = compute_dynamics(state, torch.zeros(4, 8, 4), env, layer.scales, t=t)
+    torch.testing.assert_close(residuals.state_residual, residuals.state_dot - f)
+    assert not torch.allclose(f, compute_dynamics(state, torch.zeros(4, 8, 4), {}, layer.scales))
+
+
+def test_loss_reuses_layer_derivatives_at_config_order():
+    """Test the physics layer follows loss.derivative_order and the loss is unchanged by reusing its ds/dt"""
+    import yaml
+    from src.eval.bench_residuals import PROJECT_DIR, build_training_pair, trajectory_inputs
+    from src.train.losses import PINNLoss
+    
+    with open(PROJECT_DIR / "config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    t, state_true, context = trajectory_inputs(3, 33)
+    model, loss_fn = build_training_pair(config, context.shape[-1])
+    assert model.physics_layer.derivative_order == loss_fn.derivative_order == 1
+    
+    state_pred, physics = model(t, context)
+    total, terms = loss_fn(state_pred, state_true, t, context=context)
+    total_reused, terms_reused = loss_fn(state_pred, state_true, t, context=context, residuals=physics)
+    torch.testing.assert_close(total_reused, total)
+    torch.testing.assert_close(terms_reused['physics'], terms['physics'])
+    
+    # Gravity and g0 come from the loss's parameters, not the layer's
+    moon = PINNLoss(scales=loss_fn.scales, physics_params={"g0": 1.62}, derivative_order=1)
+    torch.testing.assert_close(
+        moon.physics_loss(t, state_pred, context=context, residuals=physics),
+        moon.physics_loss(t, state_pred, context=context),
+    )
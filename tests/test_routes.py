@@ -45,3 +45,49 @@ def test_health_endpoint(client):
     data = response.get_json()
     assert data['status'] == 'healthy'
     assert data['service'] == 'portfolio'
+
+
+def test_metrics_endpoint(client):
+    """Test /metrics exposes request latency, in-flight and stage timings in Prometheus format"""
+    from app.utils.metrics import get_metrics
+    
+    metrics = get_metrics()
+    before = metrics.request_latency.get_count(('GET', 'main.home', '200'))
+    loads = metrics.stage_latency.get_count(('content_load',))
+    assert client.get('/').status_code == 200
+    assert metrics.request_latency.get_count(('GET', 'main.home', '200')) == before + 1
+    assert metrics.stage_latency.get_count(('content_load',)) > loads
+    
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.data.decode('utf-8')
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",endpoint="main.home",status="200",le="+Inf"}' in text
+    assert 'http_requests_in_flight{endpoint="metrics"} 1' in text  # The scrape itself
+    assert 'app_stage_duration_seconds_count{stage="content_load"}' in text
+
+
+def test_metrics_can_be_disabled(monkeypatch):
+    """Test METRICS_ENABLED=False removes the endpoint, the request hooks and stage timings of that app only"""
+    from app import create_app
+    from app.config import TestingConfig
+    from app.utils.metrics import get_metrics, timed
+    
+    enabled_app = create_app('testing')
+    monkeypatch.setattr(TestingConfig, 'METRICS_ENABLED', False)
+    disabled_app = create_app('testing')
+    client = disabled_app.test_client()
+    metrics = get_metrics()
+    before = metrics.request_latency.get_count(('GET', 'main.health', '200'))
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/health').status_code == 200
+    assert metrics.request_latency.get_count(('GET', 'main.health', '200')) == before
+    
+    stage = ('metrics_switch_test',)
+    with disabled_app.app_context(), timed(stage[0]):
+        pass
+    assert metrics.stage_latency.get_count(stage) == 0
+    with enabled_app.app_context(), timed(stage[0]):  # Created first, still enabled
+        pass
+    assert metrics.stage_latency.get_count(stage) == 1